@@ -316,12 +316,18 @@ def plot(x,*args,**keywds):
         linetype specified by the optional third variable in the triple.  If
         only two plots are being compared, the x-axis does not have to be
         repeated.
+
+        decimate=1 plots only the minimum, maximum and end points of each
+        device pixel column of curves with increasing x, which keeps very
+        long series fast; see gist.plg.
   '''
 
   try: linewidth=float(keywds['width'])
   except KeyError: linewidth=1.0
   try: msize = float(keywds['msize'])
   except KeyError: msize=1.0
+  try: decimate = int(keywds['decimate'])
+  except KeyError: decimate=0
   savesys = gist.plsys()
   winnum = gist.window()
   if winnum < 0:
@@ -336,7 +342,7 @@ def plot(x,*args,**keywds):
       print('Warning: complex data plotting real part.')
       y = y.real
     y = numpy.where(numpy.isfinite(y),y,0)
-    gist.plg(y,x,type='solid',color='blue',marks=0,width=linewidth)
+    gist.plg(y,x,type='solid',color='blue',marks=0,width=linewidth,decimate=decimate)
     return
   y = args[0]
   argpos = 1
@@ -364,7 +370,8 @@ def plot(x,*args,**keywds):
     y = numpy.where(numpy.isfinite(y),y,0)
     y = _minsqueeze(y)
     x = _minsqueeze(x)
-    gist.plg(y,x,type=thetype,color=thecolor,marker=themarker,marks=tomark,msize=msize,width=linewidth)
+    gist.plg(y,x,type=thetype,color=thecolor,marker=themarker,marks=tomark,msize=msize,width=linewidth,
+             decimate=decimate)
     nowplotting = nowplotting + 1
     ## Argpos is pointing to the next potential triple of data.
     ## Now one of four things can happen:
@@ -1262,7 +1269,7 @@ def palette_inspect(p=None):
       gist.plt('%04d'%-c,0.129+i*0.030,0.372+j*0.015, color=-c, height=11)
       c+=1
 
-def movie (draw_func, min_interframe = 0.0, lims = None) :
+def movie (draw_func, min_interframe = 0.0, lims = None, record = None) :
 
    '''Run a movie based on the given DRAW_FUNC function.  The movie
      stops when the DRAW_FUNC function returns zero.
@@ -1273,23 +1280,54 @@ def movie (draw_func, min_interframe = 0.0, lims = None) :
 
      If every frame of your movie has the same limits, use the
      limits command to fix the limits before you call movie.
+
+     With RECORD, every finished frame is also read back from the
+     window and written to RECORD by a background thread (see
+     gist.recorder), while the next frame is drawn:
+       record='movie.apng'      animated PNG
+       record='frame%04d.png'   numbered image files (or .ppm, .pgm)
+       record=proc.stdin        raw rgb24 frames to a pipe or file
+     A recorded movie is drawn without animation mode, and
+     MIN_INTERFRAME sets the frame delay of an animated PNG (default
+     1/25 s) instead of pausing.
    '''
 
    gist.window (wait = 1, style = 'nobox.gs') # make sure window is ready to draw
    gist.fma ()
-   gist.animate (1)
-   i = 0
-   while True:
-      more = draw_func(i)
-      if lims != None:
-         gist.limits(*lims[:4])
+   recorder = None
+   if record is None:
+      gist.animate (1)
+   else:
+      from .recorder import Recorder
+      recorder = Recorder(record, fps = 1./min_interframe if min_interframe else 25)
+   try:
+      i = 0
+      while True:
+         more = draw_func(i)
+         if lims != None:
+            gist.limits(*lims[:4])
+         else:
+            gist.limits(square=1)
+         if recorder:
+            recorder.add(gist.rgb_read())
+         gist.fma()
+         if min_interframe and not recorder: gist.pause(min_interframe*1000.)
+         i += 1
+         if not more: break
+   except:
+      # an error of draw_func takes precedence over one of the recorder
+      if recorder:
+         try:
+            recorder.close()
+         except Exception:
+            pass
       else:
-         gist.limits(square=1)
-      gist.fma()
-      if min_interframe: gist.pause(min_interframe*1000.)
-      i += 1
-      if not more: break
-   gist.animate (0)
+         gist.animate (0)
+      raise
+   if recorder:
+      recorder.close()
+   else:
+      gist.animate (0)
 
 def _nice_levels (z, n = 8) :
     '''Find approximately n 'nice values'
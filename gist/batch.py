@@ -0,0 +1,100 @@
+'''Render many plots to image files on a pool of worker processes.
+
+   Each worker process owns its own headless raster window (see
+   window(raster=1)), loads the style sheet and palette once, then
+   renders jobs one after the other, writing each picture with hcp as
+   soon as it is drawn.  No X server is needed, and since the workers
+   share nothing, throughput grows with the number of cores.
+
+   A job is a tuple (draw_function, args, output_path).  The worker
+   clears the frame and resets the limits, calls draw_function(*args)
+   to make the plot with the usual gist calls, then saves the picture
+   to output_path (the extension picks the image format, as for hcp).
+
+     import numpy, gist
+     from gist import batch
+
+     def draw(i):
+       x = numpy.arange(200)*0.05
+       gist.plg(numpy.sin(x*(1+0.01*i)), x)
+
+     if __name__ == '__main__':
+       jobs = [(draw, (i,), 'plot%05d.png' % i) for i in range(20000)]
+       for r in batch.run(jobs, style='boxed.gs', palette='heat.gp'):
+         if r.error: print(r.path, r.error)
+
+   Worker processes are started with the 'spawn' method by default, so
+   draw functions must be importable (defined at the top level of a
+   module) and the calling script needs the __main__ guard.
+'''
+
+__all__ = ['run', 'JobResult']
+
+import time
+import multiprocessing
+from collections import namedtuple
+
+from . import gistY as gist
+
+JobResult = namedtuple('JobResult', 'path seconds error')
+JobResult.__doc__ = '''Outcome of one job: output path, wall clock seconds
+  spent drawing and saving it, and None or the error message.'''
+
+_plsys = 1
+
+def _setup(style, palette, dpi, width, height):
+  '''Open the raster window of a worker process.'''
+  global _plsys
+  keywds = {'display':'', 'raster':1, 'dpi':dpi, 'legends':0}
+  if style: keywds['style'] = style
+  if width: keywds['width'] = width
+  if height: keywds['height'] = height
+  gist.window(0, **keywds)
+  if palette: gist.palette(palette)
+  _plsys = gist.plsys()
+
+def _render(job):
+  '''Draw and save one job, return its JobResult.'''
+  draw, args, path = job
+  if not isinstance(args, tuple): args = (args,)
+  start = time.time()
+  error = None
+  try:
+    gist.fma()
+    gist.plsys(_plsys)
+    gist.limits()
+    draw(*args)
+    gist.hcp(path)
+  except Exception as e:
+    error = '%s: %s' % (e.__class__.__name__, e)
+  return JobResult(path, time.time() - start, error)
+
+def run(jobs, processes=None, style=None, palette=None, dpi=75,
+        width=None, height=None, chunksize=1, callback=None,
+        context='spawn'):
+  '''run(jobs, processes=None, style=None, palette=None, dpi=75,
+         width=None, height=None, chunksize=1, callback=None)
+
+     Render the (draw_function, args, output_path) JOBS on PROCESSES
+     worker processes (default: one per core) and return the list of
+     JobResult(path, seconds, error), in the order the jobs finished.
+
+     style --    style sheet for every worker window (default work.gs)
+     palette --  palette file loaded once per worker (default earth.gp)
+     dpi, width, height -- size of the raster window, as for window
+     chunksize -- jobs handed to a worker at a time; raise it for many
+                 very small plots
+     callback -- if given, called with each JobResult as it arrives,
+                 e.g. to report progress
+     context --  multiprocessing start method
+
+     A job that raises an exception does not stop the others; its
+     JobResult carries the error message instead.
+  '''
+  ctx = multiprocessing.get_context(context)
+  results = []
+  with ctx.Pool(processes, _setup, (style, palette, dpi, width, height)) as pool:
+    for result in pool.imap_unordered(_render, jobs, chunksize):
+      if callback: callback(result)
+      results.append(result)
+  return results
@@ -0,0 +1,35 @@
+'''Time gistF.index_sort, radix against the heap sort of earlier versions.
+
+   python -m gist.demo.sortbench [n ...]
+'''
+
+import sys
+import time
+import numpy
+from gist.gistF import index_sort
+
+def best(f, repeat=3):
+  '''Shortest wall clock time of REPEAT calls of f().'''
+  t = []
+  for i in range(repeat):
+    start = time.time()
+    f()
+    t.append(time.time() - start)
+  return min(t)
+
+def run(sizes=(10**4, 10**5, 10**6, 10**7)):
+  rng = numpy.random.default_rng(0)
+  print('%10s %-22s %10s %10s %8s' % ('n', 'keys', 'heap', 'radix', 'speedup'))
+  for n in sizes:
+    z = rng.standard_normal(n)
+    nearly = numpy.sort(z) + 1e-3*rng.standard_normal(n)
+    for name, a in (('random float64', z),
+                    ('random float32', z.astype(numpy.float32)),
+                    ('nearly sorted float64', nearly)):
+      heap = best(lambda: index_sort(a, 'heap'))
+      radix = best(lambda: index_sort(a))
+      print('%10d %-22s %10.4f %10.4f %7.1fx' % (n, name, heap, radix, heap/radix))
+
+if __name__ == '__main__':
+  if len(sys.argv) > 1: run([int(n) for n in sys.argv[1:]])
+  else: run()
@@ -31,7 +31,7 @@ __all__ = ['hcp', 'winkill', 'pltitle', 'ylimits', 'moush', 'xytitles', 'plmk',
 import sys, os
 import numpy
 from .gistC import *
-from .gistF import zmin_zmax
+from .gistF import zmin_zmax, contour_bands
 #from mesh import * # still experimental, undebugged
 
 # dpi=75  -> 450 pix
@@ -59,27 +59,36 @@ def hcp(filename,bw=None):
       Example:
          hcp('screenshot.png')
 
+      PNG, PPM, PGM and PNM files are written directly from the window
+      pixels by rgb_write; any other extension goes through
+      scipy.misc.imsave.
+
       The keyword bw= can be set to convert the image to grayscale:
         'ntsc'
         'atsc' or 'hdtv'
         'lightness'
         'average'
+      A PGM file is always grayscale, using 'ntsc' if bw is not given.
 
-      SEE ALSO: rgb_read, scipy.misc.imsave
+      SEE ALSO: rgb_write, rgb_read, scipy.misc.imsave
    '''
+   if os.path.splitext(filename)[1].lower() in ('.png', '.ppm', '.pgm', '.pnm'):
+      rgb_write(filename, bw=bw)
+      return
+
    import scipy.misc
    rgb=rgb_read()
 
-   if bw is 'ntsc':
+   if bw == 'ntsc':
       # Y = 0.2989 * R + 0.5870 * G + 0.1140 * B (luminance)
       # I = 0.596  * R - 0.274  * G - 0.322  * B (hue)
       # Q = 0.211  * R -0.523   * G + 0.312  * B (saturation)
       rgb = 0.2989 * rgb[:,:,0] + 0.5870 * rgb[:,:,1] + 0.1140 * rgb[:,:,2]
    elif bw in ('atsc', 'hdtv'):
       rgb = 0.2126 * rgb[:,:,0] + 0.7152 * rgb[:,:,1] + 0.0722 * rgb[:,:,2]
-   elif bw is 'lightness':
+   elif bw == 'lightness':
       rgb = (numpy.min(rgb,axis=2)+numpy.max(rgb,axis=2))/2
-   elif bw is 'average':
+   elif bw == 'average':
       rgb = rgb.mean(axis=2)
    elif bw is not None:
       raise Exception("bw should be one of 'ntsc', 'atsc', 'hdtv', 'lightness', 'average'")
@@ -376,6 +385,12 @@ def plfc (z, y, x, ireg, contours = 8, colors = None, region = 0,
       Note that you may use spann to calculate your contour levels
       if you wish.
 
+      All the bands are computed in a single sweep of the mesh (see
+      gistF.contour_bands) and drawn as one plfp element.  With REGION
+      nonzero, only the zones of that region are filled.  Zones which
+      cross a contour are cut into two triangles, so TRIANGLE is only
+      passed on to plmesh.
+
       The following keywords are legal (each has a separate help entry):
     KEYWORDS: triangle, region
     SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp, plmesh
@@ -416,7 +431,7 @@ def plfc (z, y, x, ireg, contours = 8, colors = None, region = 0,
       vc [1:n + 1] = numpy.sort (contours)
    else :
       raise _ContourError('Incorrect contour specification.')
-   if colors == None :
+   if colors is None :
       colors = (numpy.arange (n + 1) * (199. / n)).astype(numpy.uint8)
    else :
       colors = numpy.array (colors)
@@ -425,17 +440,14 @@ def plfc (z, y, x, ireg, contours = 8, colors = None, region = 0,
       if colors.dtype != numpy.uint8 :
          colors = bytscl (colors)
 
-   if triangle == None :
+   if triangle is None :
       triangle = numpy.zeros (z.shape, numpy.int32)
 
   # Set mesh first
    plmesh (y, x, ireg, triangle = triangle)
-   for i in range (n + 1) :
-      [nc, yc, xc] = contour (numpy.array ( [vc [i], vc [i + 1]]), z)
-      if nc == 0 or nc is None:
-         continue
-      plfp ( (numpy.ones (len (nc)) * colors [i]).astype(numpy.uint8),
-         yc, xc, nc, edges = 0)
+   [nc, yc, xc, ib] = contour_bands (vc [1:n + 1], z, y, x, ireg, region)
+   if len (nc) :
+      plfp (colors [ib], yc, xc, nc, edges = 0)
 
 def plh (y, x=None, width=1, hide=0, color=None, labels=None, height=None):
    '''
@@ -21,7 +21,7 @@
 #  -----------------------------------------------------------------
 
 import numpy
-from . import gist
+from . import gistY as gist
 from .gistC import *
 import unittest
 
@@ -32,54 +32,50 @@ class InputError ( Exception ):
    Used for input errors in these function calls.
    '''
 
-class Mesh:
+def _grid ( a, dtype, name ):
    '''
-   Saves mesh information:  x, y as double array and ireg as an 
-   int array.
+   Return A as a C-contiguous 2D array of DTYPE, without copying it if
+   it already is one.
    '''
-   def __init__ ( self, x=None, y=None, ireg=None, triangle=None ):
+   try:
+      a = numpy.ascontiguousarray ( a, dtype=dtype )
+   except:
+      raise TypeError('Could not cast %s to numpy ndarray' % name)
 
-      try:
-         self.x = numpy.array ( x, dtype=numpy.float32, copy=0 )
-      except:
-         raise TypeError('Could not cast x to numpy ndarray')
+   if not ( a.ndim == 2 and a.shape[0] >= 2 and a.shape[1] >= 2 ):
+      raise TypeError('%s must be 2D' % name)
+   return a
 
-      if not ( numpy.rank(self.x) == 2 and 
-               numpy.shape(self.x)[0] >=2 and numpy.shape(self.x)[1] >= 2 ):
-         raise TypeError('x must be 2D')
+class Mesh:
+   '''
+   Saves mesh information:  x, y as double arrays, ireg as an int array
+   and triangle as a short array, all C-contiguous: these are the types
+   gistC works with, so plotting never converts them again.
+   setReg and setTriangle bump the version counter.  handle() registers
+   the mesh with plmesh_register once per version, and the plotting
+   functions of this module pass mesh=handle() to gistC, which then
+   skips converting and checking the arrays.  Call changed() after
+   modifying x or y in place.
+   '''
+   def __init__ ( self, x=None, y=None, ireg=None, triangle=None ):
 
-      try:
-         self.y = numpy.array ( y, dtype=numpy.float32, copy=0 )
-      except:
-         raise TypeError('Could not cast y to numpy ndarray')
-      if not ( numpy.rank(self.y) == 2 and 
-               numpy.shape(self.y)[0] >=2 and numpy.shape(self.y)[1] >= 2 ):
-         raise TypeError('y must be 2D')
+      self.x = _grid ( x, numpy.float64, 'x' )
+      self.y = _grid ( y, numpy.float64, 'y' )
 
       if ireg is None:
-         self.ireg = numpy.zeros ( numpy.shape(self.x), numpy.int32 )
+         self.ireg = numpy.zeros ( numpy.shape(self.x), numpy.intc )
          self.ireg[1:,1:] = 1
       else:
-         try:
-            self.ireg = numpy.array ( ireg, dtype=numpy.int32, copy=0 )
-         except:
-            raise TypeError('Could not cast ireg to numpy ndarray')
-         if not ( numpy.rank(self.ireg) == 2 and 
-                  numpy.shape(self.ireg)[0] >=2 and numpy.shape(self.ireg)[1] >= 2 ):
-            raise TypeError('ireg must be 2D')
+         self.ireg = _grid ( ireg, numpy.intc, 'ireg' )
 
       if triangle is None:
-         self.triangle = numpy.zeros ( numpy.shape(self.x), numpy.int32 )
+         self.triangle = numpy.zeros ( numpy.shape(self.x), numpy.short )
       else:
-         try:
-            self.triangle = numpy.array ( triangle, dtype=numpy.int32, copy=0 )
-         except:
-            raise TypeError('Could not cast triangle to numpy ndarray')
-         if not ( numpy.rank(self.triangle) == 2 and
-                  numpy.shape(self.triangle)[0] >=2 and numpy.shape(self.triangle)[1] >= 2 ):
-            raise TypeError('triangle must be 2D')
+         self.triangle = _grid ( triangle, numpy.short, 'triangle' )
 
       self.shape = numpy.shape(self.x) 
+      self.version = 0
+      self._handle = None
 
    def display ( self ):
       print(('mesh.x\n', self.x))
@@ -89,37 +85,61 @@ class Mesh:
 
    def setReg ( self, ireg ):
 
-      try:
-         self.ireg = numpy.array ( ireg, dtype=numpy.int32, copy=0 )
-      except:
-         raise TypeError('Could not cast ireg to numpy ndarray')
-
-      if not ( numpy.rank(self.ireg) == 2 and
-               numpy.shape(self.ireg)[0] >=2 and numpy.shape(self.ireg)[1] >= 2 ):
-         raise TypeError('ireg must be 2D')
-
-      if self.shape != numpy.shape ( self.ireg ):
+      ireg = _grid ( ireg, numpy.intc, 'ireg' )
+      if self.shape != numpy.shape ( ireg ):
          raise InputError('ireg has incompatible shape.')
+      self.ireg = ireg
+      self.changed()
       
    def setTriangle ( self, triangle ):
 
-      try:
-         self.triangle = numpy.array ( triangle, dtype=numpy.int32, copy=0 )
-      except:
-         raise TypeError('Could not cast triangle to numpy ndarray')
-
-      if not ( numpy.rank(self.triangle) == 2 and
-               numpy.shape(self.triangle)[0] >=2 and numpy.shape(self.triangle)[1] >= 2 ):
-         raise TypeError('triangle must be 2D')
-
-      if self.shape != numpy.shape (self.triangle):
+      triangle = _grid ( triangle, numpy.short, 'triangle' )
+      if self.shape != numpy.shape (triangle):
          raise InputError('triangle has incompatible shape.')
+      self.triangle = triangle
+      self.changed()
+
+   def changed ( self ):
+      '''
+      Note that the mesh arrays changed: the next handle() registers
+      them again.
+      '''
+      self.version += 1
+
+   def handle ( self, renew=False ):
+      '''
+      Return the plmesh_register id of this mesh, registering it first
+      if it is new or changed since, or if RENEW is set.
+      '''
+      if renew or self._handle is None or self._handle[0] != self.version:
+         self._handle = ( self.version,
+                          gist.plmesh_register ( self.y, self.x, self.ireg,
+                                                 triangle=self.triangle ) )
+      return self._handle[1]
 
    def clear ( self ):
       self.x = None
       self.y = None
       self.ireg = None
       self.triangle = None
+      self.changed()
+      self._handle = None
+
+def _draw ( func, args, mesh, keywords, once=False ):
+   '''
+   Call FUNC ( *ARGS, mesh=MESH.handle(), **KEYWORDS ), registering MESH
+   again if gistC has dropped it from its cache of meshes.  A mesh used
+   ONCE is passed as ( y, x, ireg ) instead of being registered.
+   '''
+   if once:
+      func ( *( args + ( mesh.y, mesh.x, mesh.ireg ) ), **keywords )
+      return
+   try:
+      func ( *args, mesh=mesh.handle(), **keywords )
+   except gist.error as e:
+      if 'not a registered mesh' not in str(e):
+         raise
+      func ( *args, mesh=mesh.handle(renew=True), **keywords )
 
 def plmesh ( y=None, x=None, ireg=None, triangle=None, mesh=None ):
    '''
@@ -184,9 +204,6 @@ def plmesh ( y=None, x=None, ireg=None, triangle=None, mesh=None ):
       if triangle is not None:
          mesh.setTriangle ( triangle )
 
-   print((savedMesh.x))
-   print((savedMesh.y))
-   print((savedMesh.ireg))
    return savedMesh 
 
 def plc ( z, y=None, x=None, ireg=None, levs=None, mesh=None, **keywords ):
@@ -214,8 +231,9 @@ def plc ( z, y=None, x=None, ireg=None, levs=None, mesh=None, **keywords ):
              limits, logxy, ylimits, fma, hcp
    '''
    global savedMesh
-   _z = numpy.array ( z, numpy.float32, copy=0 )
+   _z = numpy.asarray ( z, numpy.float64 )
 
+   once = False
    if mesh is None:
 
       if x is None and y is None and ireg is None:
@@ -231,6 +249,7 @@ def plc ( z, y=None, x=None, ireg=None, levs=None, mesh=None, **keywords ):
             ireg = numpy.zeros ( numpy.shape(_z), numpy.int32 )
             ireg[1:,1:] = 1
          mesh = Mesh ( x, y, ireg=ireg )
+         once = True
 
    else:
 
@@ -254,13 +273,10 @@ def plc ( z, y=None, x=None, ireg=None, levs=None, mesh=None, **keywords ):
       zdel = ( zmax - zmin ) / 7.0
       _levels = numpy.arange ( zmin, zmax, zdel )
    else:
-      _levels = numpy.array ( levs, numpy.int32, copy = 0 )
+      _levels = numpy.asarray ( levs, numpy.float64 )
 
-   print((mesh.x))
-   print((mesh.y))
-   print((mesh.ireg))
-   print(_levels)
-   gist.plc( _z, mesh.y, mesh.x, mesh.ireg, _levels )
+   keywords['levs'] = _levels
+   _draw ( gist.plc, ( _z, ), mesh, keywords, once )
 
 def plf ( z, y=None, x=None, ireg=None, mesh=None, **keywords ):
    '''
@@ -297,8 +313,9 @@ def plf ( z, y=None, x=None, ireg=None, mesh=None, **keywords ):
              limits, logxy, ylimits, fma, hcp, palette, bytscl
    ''' 
    global savedMesh
-   _z = numpy.array ( z, numpy.float32, copy=0 )
+   _z = numpy.asarray ( z, numpy.float64 )
 
+   once = False
    if mesh is None:
 
       if x is None and y is None and ireg is None:
@@ -310,6 +327,7 @@ def plf ( z, y=None, x=None, ireg=None, mesh=None, **keywords ):
             ireg = numpy.zeros ( numpy.shape(_z), numpy.int32 )
             ireg[1:,1:] = 1
          mesh = Mesh ( x, y, ireg=ireg )
+         once = True
 
    else:
 
@@ -323,12 +341,9 @@ def plf ( z, y=None, x=None, ireg=None, mesh=None, **keywords ):
    if numpy.shape(_z) != mesh.shape:
       raise TypeError('input mesh does not match dimensions of x')
 
-   print((mesh.x))
-   print((mesh.y))
-   print((mesh.ireg))
-   gist.plf( _z, mesh.y, mesh.x, mesh.ireg )
+   _draw ( gist.plf, ( _z, ), mesh, keywords, once )
 
-def plm ( y=None, x=None, ireg=None, mesh=None ):
+def plm ( y=None, x=None, ireg=None, mesh=None, **keywords ):
    '''
    plm ( y, x, boundary=0/1, inhibit=0/1/2 )  or
    plm ( y, x, ireg, boundary=0/1, inhibit=0/1/2 )  or
@@ -359,6 +374,7 @@ def plm ( y=None, x=None, ireg=None, mesh=None ):
    '''
    global savedMesh
 
+   once = False
    if mesh is None:
 
       if x is None and y is None and ireg is None:
@@ -371,6 +387,7 @@ def plm ( y=None, x=None, ireg=None, mesh=None ):
             ireg = numpy.zeros ( numpy.shape(_x), numpy.int32 )
             ireg[1:,1:] = 1
          mesh = Mesh ( x, y, ireg=ireg )
+         once = True
 
    else:
 
@@ -380,10 +397,7 @@ def plm ( y=None, x=None, ireg=None, mesh=None ):
       else:
          print('Warning: provided both (y,x) and mesh; will use mesh')
  
-   print((mesh.x))
-   print((mesh.y))
-   print((mesh.ireg))
-   gist.plm( mesh.y, mesh.x, mesh.ireg ) 
+   _draw ( gist.plm, (), mesh, keywords, once )
 
 def plv ( vy, vx, y=None, x=None, ireg=None, mesh=None, **keywords ):
    '''
@@ -412,12 +426,13 @@ def plv ( vy, vx, y=None, x=None, ireg=None, mesh=None, **keywords ):
              limits, logxy, ylimits, fma, hcp
    ''' 
    global savedMesh
-   _vx = numpy.array ( vx, numpy.float32, copy=0 )
-   _vy = numpy.array ( vy, numpy.float32, copy=0 )
+   _vx = numpy.asarray ( vx, numpy.float64 )
+   _vy = numpy.asarray ( vy, numpy.float64 )
 
    if numpy.shape(_vx) != numpy.shape(_vy):
       raise InputError('Shapes of vx and vy are not the same.')
 
+   once = False
    if mesh is None:
 
       if x is None and y is None and ireg is None:
@@ -429,6 +444,7 @@ def plv ( vy, vx, y=None, x=None, ireg=None, mesh=None, **keywords ):
             ireg = numpy.zeros ( numpy.shape(x), numpy.int32 )
             ireg[1:,1:] = 1
          mesh = Mesh ( x, y, ireg=ireg )
+         once = True
 
    else:
 
@@ -442,10 +458,7 @@ def plv ( vy, vx, y=None, x=None, ireg=None, mesh=None, **keywords ):
    if numpy.shape(_vx) != mesh.shape:
       raise TypeError('input mesh does not match dimensions of x')
 
-   print((mesh.x)) 
-   print((mesh.y)) 
-   print((mesh.ireg)) 
-   gist.plv( _vy, _vx, mesh.y, mesh.x, mesh.ireg )
+   _draw ( gist.plv, ( _vy, _vx ), mesh, keywords, once )
 
 class TestPLMESH ( unittest.TestCase ):
 
@@ -4,7 +4,7 @@
 
 import numpy
 from .gistC import *
-from .gistF import index_sort, array_set
+from .gistF import index_sort, array_set, project3
 from .yorick import *
 
 #  PL3D.PY
@@ -93,6 +93,10 @@ def rot3 (xa = 0., ya = 0., za = 0.) :
     SEE ALSO: orient3, mov3, aim3, setz3, undo3, save3, restore3, light3
     '''
 
+    setrot3_ (rot3_matrix_ (getrot3_ (), xa, ya, za))
+
+def rot3_matrix_ (gr3, xa = 0., ya = 0., za = 0.) :
+    # the viewing rotation GR3 turned as rot3 (xa, ya, za) turns it
     x = numpy.array ([1.,0.,0.], numpy.float32)
     y = numpy.array ([0.,1.,0.], numpy.float32)
     z = numpy.array ([0.,0.,1.], numpy.float32)
@@ -101,8 +105,8 @@ def rot3 (xa = 0., ya = 0., za = 0.) :
     [y, z] = rot3_ (xa, y, z)
     # n. b. matrixMultiply has the unfortunate effect of destroying
     # the matrix that calls it.
-    gr3 = numpy.array (getrot3_ (), copy = 1)
-    setrot3_ (numpy.transpose (numpy.dot (numpy.transpose (gr3), numpy.array ( [x, y, z]))))
+    gr3 = numpy.array (gr3, copy = 1)
+    return numpy.transpose (numpy.dot (numpy.transpose (gr3), numpy.array ( [x, y, z])))
 
 def rot3_ (a, x, y) :
     ca = numpy.cos (a)
@@ -260,6 +264,7 @@ def restore3 ( view = None ) :
         view = _draw3_view + _light3_list
     old = _draw3_list [0:_draw3_n]
     _draw3_list = view [0:_draw3_n] + _draw3_list [_draw3_n:]
+    prune3_cached_ ()
     undo3_set_ (restore3, old)
 
 class _AmbientError(Exception):
@@ -381,11 +386,17 @@ def get3_light (xyz, * nxyz) :
       The parameters of the lighting calculation are set by the
       light3 function.
 
-      SEE ALSO: light3, set3_object, get3_normal, get3_centroid
+      SEE ALSO: light3, set3_object, get3_normal, get3_centroid,
+                get3_project
       '''
 
     global _draw3_list, _draw3_nv
     lst = _draw3_list [_draw3_nv:]
+    if len (nxyz) != 0 :
+        # a polygon list is lit by project3 in one pass, with xyz taken
+        # as already in the viewer's coordinate system
+        return project3 (xyz, nxyz [0], None, None, getzc3_ ( ),
+                         lst [0:5]) [2]
     ambient = lst [0]
     diffuse = lst [1]
     specular = lst [2]
@@ -469,11 +480,11 @@ def get3_normal (xyz, *nxyz) :
         # form normal by getting two approximate diameters
         # (reduces to above medians for quads)
         # (2) compute midpoints of first three sides
-        n2 = (nxyz [0] + 1) / 2
+        n2 = (nxyz [0] + 1) // 2
         c0 = (numpy.take(xyz, frst, 0) + numpy.take(xyz, frst + 1, 0)) / 2.
         i = frst + n2 - 1
         c1 = (numpy.take(xyz, i, 0) + numpy.take(xyz, i + 1, 0)) / 2.
-        i = n2 / 2
+        i = n2 // 2
         c2 = (numpy.take(xyz, frst + i, 0) + numpy.take(xyz, frst + (i + 1) % nxyz [0], 0)) / 2.
         i = numpy.minimum (i + n2, nxyz [0]) - 1
         c3 = (numpy.take(xyz, frst + i, 0) + numpy.take(xyz, frst + (i + 1) % nxyz [0], 0)) / 2.
@@ -541,6 +552,44 @@ def get3_centroid (xyz, * nxyz) :
         centroid = centroid / fnxyz
     return centroid
 
+def get3_project (xyz, nxyz, shade = 1, lim = None, out = None,
+                  view = None) :
+
+    '''
+    [XYZ1, ZCEN, LIGHT] = get3_project (xyz, nxyz, shade = 1, lim = None,
+                                        out = None, view = None)
+      For the polygon list XYZ (sum(nxyz,axis=0)-by-3) and NXYZ, as for
+      get3_light, return XYZ1 = get3_xy (xyz, 1), the mean Z of each
+      polygon in XYZ1, which is what sort3d sorts by (see
+      DepthSort.by_centroid), and, if SHADE is non-zero, the lighting
+      get3_light (XYZ1, nxyz), else None.  All three come from a single
+      pass over the polygons, in C.
+      If LIM = [lo, hi] is given, XYZ is first scaled to the unit cube,
+      (xyz - lo) / (hi - lo) by coordinate, without making a scaled copy.
+      OUT, a list of three float64 arrays of the sizes of the result
+      (None for LIGHT if not SHADE), receives the result instead of new
+      arrays.  VIEW, a viewing transform and lighting as save3 returns
+      it, is used instead of the current one.
+
+      SEE ALSO: get3_xy, get3_light, sort3d
+    '''
+
+    if view is None :
+        view = _draw3_list
+    rot = numpy.asarray (view [0], numpy.float64)
+    org = numpy.asarray (view [1], numpy.float64)
+    if lim is not None :
+        # ((xyz - lo) / scale - org) . rot == (xyz - org1) . rot1
+        lo = numpy.asarray (lim [0], numpy.float64)
+        scale = numpy.asarray (lim [1], numpy.float64) - lo
+        scale = numpy.where (scale == 0., 1., scale)
+        rot = rot / scale [:, numpy.newaxis]
+        org = lo + scale * org
+    light = None
+    if shade :
+        light = view [_draw3_nv:_draw3_nv + 5]
+    return project3 (xyz, nxyz, rot, org, view [2], light, out)
+
 class _Get3Error(Exception):
     pass
 
@@ -627,7 +676,9 @@ def undo3 (n = 1) :
       undo3 ()
           or undo3 (n)
       Undo the effects of the last N (default 1) rot3, orient3, mov3, aim3,
-      setz3, or light3 commands.
+      setz3, or light3 commands.  The display list keeps the projections
+      of its objects for the last few views (see get3_cached), so undoing
+      a recent change redraws without recomputing them.
     '''
 
     global _in_undo3, _undo3_list
@@ -636,8 +687,9 @@ def undo3 (n = 1) :
         raise _UndoError('not that many items in undo list')
     _in_undo3 = 1     # flag to skip undo3_set_
     # perhaps should save discarded items in a redo list?
-    use_list = undo3_list [-n:]
-    undo3_list = undo3_list [:-n]
+    # undo3_set_ puts the newest items first
+    use_list_ = _undo3_list [0:n]
+    _undo3_list = _undo3_list [n:]
     while n > 0 :
         fnc = use_list_ [0]
         del use_list_ [0]
@@ -646,6 +698,7 @@ def undo3 (n = 1) :
         fnc (arg)
         n = n - 2
     _in_undo3 = 0
+    prune3_cached_ ()
     draw3_trigger ( )
 
 def set3_object (fnc, arg) :
@@ -680,8 +733,133 @@ def set3_object (fnc, arg) :
 
     global _draw3_list
     _draw3_list = _draw3_list + [fnc, arg]
+    prune3_cached_ ()
+    _draw3_cache [id (arg)] = [arg, {}, {}]
     draw3_trigger ()
 
+# Values computed by the drawing functions of the display list, kept
+# from one draw3 to the next by get3_cached.  _draw3_cache maps id(arg)
+# of each display list entry to [arg, {kind: [(key, value), ...]},
+# {kind: object}], holding arg so that its id is not reused.  Each kind
+# keeps the values of the last _draw3_cache_depth keys, so that undo3
+# of a view change finds the previous view still there; while spin3
+# turns the view, no frame comes back, so only the last one is kept.
+# The objects of get3_kept_ stay for as long as the entry.  Whatever
+# replaces _draw3_list calls prune3_cached_ to drop entries no longer
+# in it.
+_draw3_cache = {}
+_draw3_cache_depth = 2
+_draw3_spinning = 0 # set by spin3
+_draw3_arg = None # arg of the display list entry draw3 is drawing
+
+def get3_cached (kind, key, compute) :
+
+    '''
+    get3_cached (kind, key, compute)
+
+      Called by a drawing function of the display list while draw3 draws
+      it: return the value COMPUTE() returned the last time this display
+      list entry was drawn with the same KIND and KEY, or call COMPUTE
+      and remember its value.  KEY should be view3_key_() for values
+      which depend only on the viewing transform (get3_xy, sort3d), and
+      (view3_key_(), light3_key_()) for values which also depend on the
+      lighting (get3_light).  Outside of draw3, just returns COMPUTE().
+
+    SEE ALSO: set3_object, draw3
+    '''
+
+    entry = _draw3_cache.get (id (_draw3_arg))
+    if entry is None or entry [0] is not _draw3_arg :
+        return compute ()
+    slots = entry [1].setdefault (kind, [])
+    for i in range (len (slots)) :
+        if slots [i] [0] == key :
+            slots.insert (0, slots.pop (i))
+            return slots [0] [1]
+    # let go of the values to drop before computing the new one
+    del slots [cache3_depth_ () - 1:]
+    value = compute ()
+    slots.insert (0, (key, value))
+    return value
+
+def cache3_depth_ () :
+    # how many keys of each kind get3_cached keeps
+    if _draw3_spinning :
+        return 1
+    return _draw3_cache_depth
+
+def prune3_cached_ () :
+    # forget the values of display list entries no longer in the list,
+    # after anything replaced _draw3_list
+    args = dict ([(id (arg), arg) for arg in _draw3_list [_draw3_n + 1::2]])
+    for k in list (_draw3_cache.keys ()) :
+        if args.get (k) is not _draw3_cache [k] [0] :
+            del _draw3_cache [k]
+
+def get3_kept_ (kind, make, arg = None) :
+    # the object of KIND the display list entry ARG (default: the one
+    # draw3 is drawing) keeps for as long as it stays in the list, made
+    # by MAKE () the first time, e.g. the DepthSort of a pl3surf, so
+    # that each entry sorts coherently from its own previous frame;
+    # outside the display list, a new MAKE () every time
+    if arg is None :
+        arg = _draw3_arg
+    entry = _draw3_cache.get (id (arg))
+    if entry is None or entry [0] is not arg :
+        return make ()
+    kept = entry [2].get (kind)
+    if kept is None :
+        kept = entry [2].setdefault (kind, make ())
+    return kept
+
+def put3_cached_ (arg, kind, key, value) :
+    # store VALUE as get3_cached (kind, key, ...) would have while
+    # draw3 drew the display list entry ARG
+    entry = _draw3_cache.get (id (arg))
+    if entry is None or entry [0] is not arg :
+        return
+    slots = entry [1].setdefault (kind, [])
+    slots [:] = [slot for slot in slots if slot [0] != key]
+    del slots [cache3_depth_ () - 1:]
+    slots.insert (0, (key, value))
+
+def view3_key_ (view = None) :
+    # the viewing transform: rotation, origin and camera distance, of
+    # VIEW as save3 returns it or of the current one
+    if view is None :
+        view = _draw3_list
+    return (numpy.asarray (view [0], numpy.float64).tobytes (),
+            numpy.asarray (view [1], numpy.float64).tobytes (),
+            view [2])
+
+def light3_key_ (view = None) :
+    # the light3 parameters
+    if view is None :
+        view = _draw3_list
+    return tuple ([numpy.asarray (p, numpy.float64).tobytes ()
+                   for p in view [_draw3_nv:_draw3_nv + 5]])
+
+# Functions which compute ahead what a drawing function of the display
+# list gets from get3_cached, for spin3 (see set3_prepare).
+_draw3_prepare = {}
+
+def set3_prepare (fnc, prepare) :
+
+    '''
+    set3_prepare (fnc, prepare)
+      Tell spin3 how to compute ahead, on a thread of its own, the values
+      the drawing function FNC of set3_object gets from get3_cached:
+      PREPARE (arg, view) returns the list of [kind, key, value] that
+      FNC (arg) would compute with the viewing transform and lighting
+      VIEW (as save3 returns it, see view3_key_ and light3_key_).
+      PREPARE must neither draw nor change the display list, the view
+      or the lighting; it runs while FNC draws an earlier frame.
+
+    SEE ALSO: spin3, get3_cached, set3_object
+    '''
+
+    _draw3_prepare [fnc] = prepare
+
 def setorg3_ ( x ) :
     # ZCM 2/21/97 change reflects the fact that I hadn't realized
     # that car and cdr, as functions, return the item replaced.
@@ -779,6 +957,7 @@ def clear3 ( ) :
     'clear3 ( ) : Clear the current 3D display list.'
     global _draw3_list, _draw3_n
     _draw3_list [_draw3_n:] = []
+    _draw3_cache.clear ()
     set_multiple_components (0)
 
 def window3 ( * n , **kw ) :
@@ -797,8 +976,8 @@ def sort3d (z, npolys) :
       a 2-element list [LIST, VLIST] such that Z[VLIST] and NPOLYS[LIST] are
       sorted from smallest average Z to largest average Z, where
       the averages are taken over the clusters of length NPOLYS.
-      Within each cluster (polygon), the cyclic order of Z[VLIST]
-      remains unchanged, but the absolute order may change.
+      Within each cluster (polygon), the order of Z[VLIST] remains
+      unchanged.
 
       This sorting order produces correct or nearly correct order
       for a plfp command to make a plot involving hidden or partially
@@ -813,43 +992,78 @@ def sort3d (z, npolys) :
       may need to be split into pieces in order to do that).  There
       are more nearly correct algorithms than this, but they are much
       slower.
-    SEE ALSO: get3_xy
+    SEE ALSO: get3_xy, DepthSort
     '''
 
-    # first compute z, the z-centroid of every poly
-    # get a list the same length as x, y, or z which is 1 for each
-    # vertex of poly 1, 2 for each vertex of poly2, etc.
-    # the goal is to make nlist with bincount(nlist)==npolys
-    nlist = numpy.bincount(numpy.cumsum (npolys,axis=0))[0:-1]
-    nlist = numpy.cumsum (nlist,axis=0)
-    # now sum the vertex values and divide by the number of vertices
-    z = numpy.bincount (nlist, z) / npolys
-
+    npolys = numpy.asarray (npolys)
     # sort the polygons from smallest z to largest z
-    lst = index_sort (z)
-    # next, find the list which sorts the polygon vertices
-    # first, find a list vlist such that sort(vlist) is above list
-    vlist = numpy.zeros (len (lst), numpy.int32)
-    array_set (vlist, lst, numpy.arange (len (lst), dtype = numpy.int32))
-    # then reset the nlist values to that pre-sorted order, so that
-    # sort(nlist) will be the required vertex sorting list
-    nlist = numpy.take(vlist, nlist, 0)
-    # the final hitch is to ensure that the vertices within each polygon
-    # remain in their initial order (sort scrambles equal values)
-    # since the vertices of a polygon can be cyclically permuted,
-    # it suffices to add a sawtooth function to a scaled nlist to
-    # produce a list in which each cluster of equal values will retain
-    # the same cyclic order after the sort
-    # (note that the more complicated msort routine would leave the
-    #  clusters without even a cyclic permutation, if that were
-    #  necessary)
-    n1max = max (npolys)    # this must never be so large that
-                            # numberof(npolys)*nmax > 2e9
-    nmax = n1max * numpy.ones (len (nlist), numpy.int32)
-    vlist = index_sort (nmax * nlist +
-       numpy.arange (len (nlist), dtype = numpy.int32) % n1max)
-    #         primary sort key ^            secondary key  ^
-    return [lst, vlist]
+    lst = index_sort (_poly_centroids (z, npolys))
+    return [lst, _poly_vertices (npolys, lst)]
+
+def _poly_centroids (z, npolys) :
+    # sum the vertex values of each poly and divide by the number of
+    # vertices; reduceat needs the offset of the first vertex of each poly
+    start = numpy.cumsum (npolys) - npolys
+    return numpy.add.reduceat (numpy.asarray (z, numpy.float64), start) / npolys
+
+def _poly_vertices (npolys, lst) :
+    # the list which puts the polygon vertices in the order LST of the
+    # polygons: the vertices of each poly stay together and in order,
+    # so this is just its polygon offsets, with no sort needed
+    n = numpy.take (npolys, lst)
+    shift = numpy.take (numpy.cumsum (npolys) - npolys, lst) - \
+            (numpy.cumsum (n) - n)
+    return numpy.repeat (shift, n) + numpy.arange (numpy.sum (n))
+
+class DepthSort :
+
+    '''
+    depth_sort = DepthSort (full = 0.25)
+    [LIST, VLIST] = depth_sort (z, npolys)
+      A sort3d which remembers the polygon order of its previous call.
+      While a picture spins (spin3) or is turned a little at a time (rot3),
+      the depth order barely changes between frames, so the previous
+      order is nearly right: it is fixed up with a stable merge sort,
+      which takes close to linear time on such nearly sorted input.
+      When the polygons are not the same as last time, or more than the
+      fraction FULL of neighboring polygons are out of order in the
+      previous order, the polygons are sorted from scratch instead.
+      The result is the same as that of sort3d, except possibly for the
+      order of polygons at exactly the same depth.
+    SEE ALSO: sort3d
+    '''
+
+    def __init__ (self, full = 0.25) :
+        self.full = full
+        self.npolys = None
+        self.order = None
+
+    def __call__ (self, z, npolys) :
+        npolys = numpy.asarray (npolys)
+        return self.by_centroid (_poly_centroids (z, npolys), npolys)
+
+    def by_centroid (self, zc, npolys) :
+        '''
+        [LIST, VLIST] = depth_sort.by_centroid (zcen, npolys)
+          The same, given the mean Z of each polygon, as get3_project
+          returns it, instead of the Z of each vertex.
+        '''
+        npolys = numpy.asarray (npolys)
+        lst = None
+        if self.npolys is not None and numpy.array_equal (npolys, self.npolys) :
+            zs = numpy.take (zc, self.order)
+            if numpy.count_nonzero (zs [1:] < zs [:-1]) <= self.full * len (zs) :
+                lst = numpy.take (self.order, numpy.argsort (zs, kind = 'stable'))
+        if lst is None :
+            lst = index_sort (zc)
+            self.npolys = npolys.copy ()
+        self.order = lst
+        return [lst, _poly_vertices (npolys, lst)]
+
+    def reset (self) :
+        '''Forget the previous order.'''
+        self.npolys = None
+        self.order = None
 
 _square = 1 # Global variable which tells whether to force equal axes
 _xfactor = 1.
@@ -876,6 +1090,7 @@ def draw3 (called_as_idler = 0, lims = None) :
     Ordinarily triggered automatically when the drawing changes.
     '''
     global _draw3, _draw3_changes, _draw3_list, _draw3_n, _gnomon
+    global _draw3_arg
     if _draw3_changes :
         if called_as_idler :
             savesys=plsys()
@@ -896,6 +1111,7 @@ def draw3 (called_as_idler = 0, lims = None) :
         # below, which seems to make things work.
         while lst != [] :
             fnc = lst [0]
+            _draw3_arg = lst [1]
             if no_lims :
                 if (first) :
                     lims = fnc (lst [1])
@@ -912,6 +1128,7 @@ def draw3 (called_as_idler = 0, lims = None) :
             else :
                 fnc (lst [1])
             lst = lst [2:]
+        _draw3_arg = None
         if _gnomon :
             _gnomon_draw ( )
         _draw3_changes = None
@@ -1169,12 +1386,18 @@ def gnomon_text_ (chr, x, y, pts, invert) :
 g_nframes = 30
 
 def spin3 (nframes = 30, axis = numpy.array ([-1, 1, 0],  numpy.float32), 
-   dtmin = 0.0, lims = None, angle = 2. * numpy.pi) :
+   dtmin = 0.0, lims = None, angle = 2. * numpy.pi, ahead = 0) :
 
     '''
     spin3 ( ) or spin3 (nframes) os spin3 (nframes, axis)
       Spin the current 3D display list about AXIS over NFRAMES.  Keywords
       dtmin= the minimum allowed interframe time in seconds (default 0.0),
+      ahead= the number of frames to compute ahead (default 0): while a
+      frame is drawn, a background thread projects and sorts the objects
+      of the display list (those whose drawing function has a
+      set3_prepare) for up to AHEAD of the next frames.  spin3 then
+      returns the largest number of bytes the frames computed ahead
+      held at once.
 
       The default AXIS is [-1,1,0] and the default NFRAMES is 30.
     SEE ALSO: rot3
@@ -1191,7 +1414,7 @@ def spin3 (nframes = 30, axis = numpy.array ([-1, 1, 0],  numpy.float32),
     #   So I have started their names with underscores; at least
     #   this makes them inaccessible outside this module.
     global _phi, _theta, _dtheta
-    global _g_nframes
+    global _g_nframes, _spin3_ahead, _draw3_spinning
     _g_nframes = nframes
     _dtheta = angle / (nframes - 1)
     _theta = numpy.arccos (axis [2] / numpy.sqrt (axis [0] * axis [0] + axis [1] * axis [1] +
@@ -1199,8 +1422,28 @@ def spin3 (nframes = 30, axis = numpy.array ([-1, 1, 0],  numpy.float32),
     inc = axis [0] == axis [1] == 0
     _phi = numpy.arctan2 (axis [1], axis [0] + inc)
     orig = save3 ( )
-    movie (_spin3, dtmin, lims)
+    if ahead > 0 :
+        _spin3_ahead = _SpinAhead (ahead, nframes)
+    _draw3_spinning = 1
+    try :
+        movie (_spin3, dtmin, lims)
+    finally :
+        _draw3_spinning = 0
+        spin = _spin3_ahead
+        _spin3_ahead = None
+        if spin :
+            spin.close ( )
     restore3 (orig)
+    if spin :
+        return spin.peak
+
+_spin3_ahead = None
+
+def _spin3_rot (gr3) :
+    # the rotation of the next frame of spin3: what _spin3 does with rot3
+    gr3 = rot3_matrix_ (gr3, za = -_phi)
+    gr3 = rot3_matrix_ (gr3, ya = -_theta, za = _dtheta)
+    return rot3_matrix_ (gr3, ya = _theta, za = _phi)
 
 def _spin3 (i) :
     global _g_nframes
@@ -1210,11 +1453,100 @@ def _spin3 (i) :
     rot3 (za = -_phi)
     rot3 (ya = -_theta, za = _dtheta)
     rot3 (ya = _theta, za = _phi)
+    if _spin3_ahead :
+        _spin3_ahead.take ( )
     lims = draw3 ( )
     # fixme, gistC does not cast numpy.float64 to float
     limits (float(lims [0]), float(lims [1]), float(lims [2]), float(lims [3]))
     return 1
 
+class _SpinAhead :
+
+    # The frames of spin3 computed ahead: a thread calls the set3_prepare
+    # functions of the display list for the view of each coming frame and
+    # queues the results, at most AHEAD frames in advance; take puts those
+    # of the next frame in the get3_cached caches just before draw3.
+    # project3 and the numpy sorts let go of the GIL, so this goes on
+    # while the current frame is drawn.
+
+    def __init__ (self, ahead, nframes) :
+        import threading, queue
+        self.objects = [(fnc, arg) for [fnc, arg] in
+                        zip (_draw3_list [_draw3_n::2], _draw3_list [_draw3_n + 1::2])
+                        if fnc in _draw3_prepare]
+        self.view = save3 ( )
+        self.nframes = nframes
+        self.frames = queue.Queue (ahead)
+        self.lock = threading.Lock ( )
+        self.bytes = 0 # held by the frames computed ahead
+        self.peak = 0
+        self.stop = False
+        self.done = False # the thread has posted its last frame
+        self.thread = threading.Thread (target = self._run, name = 'gist-spin3')
+        self.thread.daemon = True
+        self.thread.start ( )
+
+    def _run (self) :
+        # whatever ends this thread, a None last in the queue tells take
+        # that no more frames are coming
+        try :
+            view = list (self.view)
+            for i in range (self.nframes) :
+                if self.stop :
+                    break
+                view [0] = _spin3_rot (view [0])
+                values = []
+                try :
+                    for (fnc, arg) in self.objects :
+                        for (kind, key, value) in \
+                            _draw3_prepare [fnc] (arg, view) :
+                            values.append ((arg, kind, key, value))
+                except Exception :
+                    # that frame is computed by draw3 as usual
+                    values = []
+                nbytes = _nbytes (values)
+                with self.lock :
+                    self.bytes = self.bytes + nbytes
+                    self.peak = max (self.peak, self.bytes)
+                self.frames.put ((view3_key_ (view), nbytes, values))
+        finally :
+            self.frames.put (None)
+
+    def take (self) :
+        if self.done :
+            return
+        frame = self.frames.get ( )
+        if frame is None :
+            # the thread is gone: draw3 computes the remaining frames
+            self.done = True
+            return
+        (key, nbytes, values) = frame
+        with self.lock :
+            self.bytes = self.bytes - nbytes
+        if key != view3_key_ ( ) :
+            # the view was changed behind spin3's back
+            return
+        for (arg, kind, key, value) in values :
+            put3_cached_ (arg, kind, key, value)
+
+    def close (self) :
+        import queue
+        self.stop = True
+        while self.thread.is_alive ( ) :
+            try :
+                self.frames.get (timeout = 0.01)
+            except queue.Empty :
+                pass
+        self.thread.join ( )
+
+def _nbytes (x) :
+    # bytes of the arrays in X, a value or nested lists and tuples
+    if isinstance (x, numpy.ndarray) :
+        return x.nbytes
+    if isinstance (x, (list, tuple)) :
+        return sum ([_nbytes (y) for y in x])
+    return 0
+
 #--
 
 def is_scalar(x):
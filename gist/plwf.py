@@ -74,7 +74,10 @@ def plwf (z, y = None, x = None, fill = None, shade = 0, edges = 1,
       cmax = z [7]
       ireg = z [8]
       
-      xyz1 = get3_xy(xyz, 1)
+      # the projection and shading are kept by draw3 until the view
+      # or the lighting changes
+      view = view3_key_ ( )
+      xyz1 = get3_cached ('xyz', view, lambda : get3_xy(xyz, 1))
       x = xyz [0] # the original x
       y = xyz [1] # the original y
       
@@ -98,7 +101,8 @@ def plwf (z, y = None, x = None, fill = None, shade = 0, edges = 1,
       # compute shading if necessary
       if (shade) :
          xyz = xyz1
-         fill = get3_light (xyz)
+         fill = get3_cached ('light', (view, light3_key_ ( )),
+                             lambda : get3_light (xyz1))
       # The order either requires a transpose or not, reversal of the
       # order of the first dimension or not, and reversal of the order
       # of the second dimension or not.
@@ -0,0 +1,209 @@
+'''Record the frames of a movie without holding up the drawing.
+
+   A Recorder takes finished frames (the (ny,nx,3) uint8 arrays of
+   rgb_read) and hands them through a bounded queue to a writer thread,
+   so that compressing and writing one frame overlaps with drawing the
+   next.  When the writer falls behind by more than queue_size frames,
+   add waits for it, which bounds the memory used.
+
+   The target picks the output:
+
+     'movie.apng'      an animated PNG ('.png' works too)
+     'frame%04d.png'   one file per frame, numbered from 0; the name
+                       may also end in .ppm, or .pgm for grayscale
+     a file object     raw rgb24 bytes, frame after frame, e.g. the
+                       stdin of ffmpeg -f rawvideo -pix_fmt rgb24
+                       -s NXxNY -i - out.mp4
+
+   Mplot.movie(draw_func, record=target) uses this for every frame.
+'''
+
+__all__ = ['Recorder']
+
+import struct
+import threading
+import zlib
+import queue
+
+import numpy
+
+_signature = b'\x89PNG\r\n\x1a\n'
+
+def _chunk(kind, data):
+  '''One PNG chunk: length, type, data and CRC.'''
+  crc = zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff
+  return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', crc)
+
+def _ihdr(frame):
+  ny, nx = frame.shape[:2]
+  return _chunk(b'IHDR', struct.pack('>IIBBBBB', nx, ny, 8,
+                                     2 if frame.ndim == 3 else 0, 0, 0, 0))
+
+def _idat(frame, level):
+  '''Deflated PNG image data of FRAME, every row with filter type 0.'''
+  ny = frame.shape[0]
+  rows = numpy.zeros((ny, 1 + frame[0].size), numpy.uint8)
+  rows[:,1:] = frame.reshape(ny, -1)
+  return zlib.compress(rows.tobytes(), level)
+
+def _gray(frame):
+  '''NTSC luminance of an rgb frame, the same weights as rgb_write.'''
+  frame = frame.astype(numpy.uint32)
+  y = 19589*frame[:,:,0] + 38470*frame[:,:,1] + 7471*frame[:,:,2] + 32768
+  return (y >> 16).astype(numpy.uint8)
+
+def _write_png(name, frame, level):
+  with open(name, 'wb') as f:
+    f.write(_signature + _ihdr(frame) +
+            _chunk(b'IDAT', _idat(frame, level)) + _chunk(b'IEND', b''))
+
+def _write_pnm(name, frame):
+  ny, nx = frame.shape[:2]
+  with open(name, 'wb') as f:
+    f.write(('%s\n%d %d\n255\n' % ('P6' if frame.ndim == 3 else 'P5',
+                                   nx, ny)).encode('ascii'))
+    f.write(numpy.ascontiguousarray(frame).tobytes())
+
+class _APNG:
+  '''Animated PNG, written as the frames come; the frame count in the
+     acTL chunk is filled in by close.'''
+
+  def __init__(self, name, fps, level):
+    self.f = open(name, 'wb')
+    self.delay = (max(1, int(round(1000./fps))), 1000)
+    self.level = level
+    self.shape = None
+    self.frames = 0
+    self.sequence = 0
+
+  def write(self, frame):
+    if self.shape is None:
+      self.shape = frame.shape
+      self.f.write(_signature + _ihdr(frame))
+      self.actl = self.f.tell()
+      self.f.write(_chunk(b'acTL', struct.pack('>II', 0, 0)))
+    elif frame.shape != self.shape:
+      raise ValueError('frame shape %s differs from the first frame %s' %
+                       (frame.shape, self.shape))
+    ny, nx = frame.shape[:2]
+    self.f.write(_chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence,
+                                             nx, ny, 0, 0, self.delay[0],
+                                             self.delay[1], 0, 0)))
+    self.sequence += 1
+    data = _idat(frame, self.level)
+    if self.frames:
+      self.f.write(_chunk(b'fdAT', struct.pack('>I', self.sequence) + data))
+      self.sequence += 1
+    else:
+      self.f.write(_chunk(b'IDAT', data))
+    self.frames += 1
+
+  def close(self):
+    try:
+      if self.frames:
+        self.f.write(_chunk(b'IEND', b''))
+        self.f.seek(self.actl)
+        self.f.write(_chunk(b'acTL', struct.pack('>II', self.frames, 0)))
+    finally:
+      self.f.close()
+
+class _Sequence:
+  '''One numbered image file per frame.'''
+
+  def __init__(self, pattern, level):
+    self.pattern = pattern
+    self.level = level
+    self.frames = 0
+
+  def write(self, frame):
+    name = self.pattern % self.frames
+    if name.lower().endswith('.png'):
+      _write_png(name, frame, self.level)
+    elif name.lower().endswith('.pgm'):
+      _write_pnm(name, _gray(frame))
+    else:
+      _write_pnm(name, frame)
+    self.frames += 1
+
+  def close(self):
+    pass
+
+class _Raw:
+  '''Raw rgb24 frames to a file object or pipe, which is left open.'''
+
+  def __init__(self, f):
+    self.f = f
+
+  def write(self, frame):
+    self.f.write(numpy.ascontiguousarray(frame).tobytes())
+
+  def close(self):
+    self.f.flush()
+
+class Recorder:
+  '''Recorder(target, fps=25, queue_size=4, level=6)
+
+     Write the frames passed to add to TARGET (see the module
+     documentation) from a background thread.  FPS is the frame rate
+     stored in an animated PNG, QUEUE_SIZE the number of frames that
+     may wait for the writer, LEVEL the zlib compression level.
+     Call close when done; it waits for the queued frames and raises
+     any error of the writer.  A Recorder is also a context manager.
+  '''
+
+  def __init__(self, target, fps=25, queue_size=4, level=6):
+    if hasattr(target, 'write'):
+      self.writer = _Raw(target)
+    elif '%' in target:
+      self.writer = _Sequence(target, level)
+    elif target.lower().endswith(('.apng', '.png')):
+      self.writer = _APNG(target, fps, level)
+    else:
+      raise ValueError('record to a .apng file, a numbered file name '
+                       'pattern or a writable file object')
+    self.error = None
+    self.frames = queue.Queue(queue_size)
+    self.thread = threading.Thread(target=self._run, name='gist-recorder')
+    self.thread.daemon = True
+    self.thread.start()
+
+  def _run(self):
+    while True:
+      frame = self.frames.get()
+      if frame is None: break
+      if self.error is None:
+        try:
+          self.writer.write(frame)
+        except Exception as e:
+          # keep draining the queue so that add never blocks forever
+          self.error = e
+
+  def add(self, frame):
+    '''Queue FRAME, an (ny,nx,3) uint8 array which must not be modified
+       afterwards; waits while the queue is full.'''
+    if self.error is not None: self.close()
+    self.frames.put(frame)
+
+  def close(self):
+    '''Write the queued frames and finish the output.'''
+    if self.thread is not None:
+      self.frames.put(None)
+      self.thread.join()
+      self.thread = None
+      try:
+        self.writer.close()
+      except Exception as e:
+        if self.error is None: self.error = e
+    if self.error is not None:
+      error, self.error = self.error, None
+      raise error
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, kind, value, traceback):
+    try:
+      self.close()
+    except Exception:
+      # an error of the caller takes precedence over one of the writer
+      if kind is None: raise
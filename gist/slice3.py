@@ -13,15 +13,19 @@
 # assignments to it over there are not reflected in the copy here.
 # This has been fixed by creating an access function.
 
+import threading
+import types
+import weakref
 import numpy
 from .gistC import *
-from .gistF import find_mask, construct3, array_set, interp
+from .gistF import find_mask, construct3, array_set, interp, isosurface3
 from .pl3d import *
+from .pl3d import _nbytes
 from .yorick import *
-import collections
 
 def is_scalar(x):
-    return len(numpy.shape(x)) == 0
+    # a list is never scalar, even of arrays numpy cannot stack
+    return not isinstance(x, (list, tuple)) and len(numpy.shape(x)) == 0
 
 #
  # Caveats:
@@ -126,8 +130,8 @@ def mesh3 (x, y = None, z = None, ** kw) :
     '''
 
     dims = numpy.shape (x)
-    if len (dims) == 1 and y != None and len (x) == len (y) \
-       and z != None and len(x) == len (z) and 'verts' in kw :
+    if len (dims) == 1 and y is not None and len (x) == len (y) \
+       and z is not None and len(x) == len (z) and 'verts' in kw :
         virtuals = [xyz3_irreg, getv3_irreg,
                     getc3_irreg, iterator3_irreg]
         dims = kw ['verts']
@@ -160,21 +164,21 @@ def mesh3 (x, y = None, z = None, ** kw) :
         xyz = x
         dims = dims [1:4]
     elif len (dims) == 1 and len (x) == 3 and type (x [0]) == numpy.int32 \
-       and y != None and z != None and len (y) == len (z) == 3 :
+       and y is not None and z is not None and len (y) == len (z) == 3 :
         xyz = numpy.array ([y, z])
         dims = (1 + x [0], 1 + x [1], 1 + x [2])
         virtuals [0] = xyz3_unif
-    elif len (dims) == 1 and y != None and z != None and len (y.shape) == 1 \
-       and len (z.shape) == 1 and x.typed  == y.typed == \
-       z.typed == numpy.float32 :
-        # regular mesh with unequally spaced points
+    elif len (dims) == 1 and y is not None and z is not None and \
+       len (numpy.shape (y)) == 1 and len (numpy.shape (z)) == 1 :
+        # regular mesh with unequally spaced points, kept as the three
+        # vectors, which xyz3_unif takes as they are
         dims = numpy.array ( [len (x), len (y), len (z)], numpy.int32)
-        xyz = [x, y, z] # has to be a list since could be different lengths
+        xyz = [numpy.asarray (x), numpy.asarray (y), numpy.asarray (z)]
         virtuals [0] = xyz3_unif
     else :
         if len (dims) != 3 or min (dims) < 2 or \
-           y == None or len (numpy.shape (y)) != 3 or numpy.shape (y) != dims or \
-           z == None or len (numpy.shape (z)) != 3 or numpy.shape (z) != dims:
+           y is None or len (numpy.shape (y)) != 3 or numpy.shape (y) != dims or \
+           z is None or len (numpy.shape (z)) != 3 or numpy.shape (z) != dims:
             raise _Mesh3Error('X,Y,Z are not viable 3D coordinate mesh arrays')
         xyz = numpy.array ( [x, y, z])
     dim_cell = (dims [0] - 1, dims [1] - 1, dims [2] - 1)
@@ -241,9 +245,630 @@ def mesh3 (x, y = None, z = None, ** kw) :
  #
  # slice3(m3, fslice, &nverts, &xyzverts, <fcolor>)
 
+def _slice3_chunk (m3, chunk, fslice, slicer_args, node, fcolor, need_clist) :
+    # Evaluate the slicing function on one CHUNK of the mesh M3 and
+    # return [kind, ncut, cell_offset, got_xyz, [clist, fs, xyz3, col]]
+    # for the ncut cells of the chunk cut by fslice==0, kind being 0,
+    # 1, 2 or 3 for tetrahedra, pyramids, prisms or hexahedra (and the
+    # cells of a rectangular mesh).  This touches nothing but its
+    # arguments, so that slice3 can do several chunks at once.
+
+    # get the values of the slicing function at the vertices of
+    # this chunk
+    fs = fslice (m3, chunk, * slicer_args)
+    # an isosurface slicer brings back a list [vals, None]
+    # where vals is simply an array of the values of the
+    # iso_index'th function on the vertices of the specified
+    # chunk, or a triple, consisting of the array of
+    # values, an array of relative cell numbers in the
+    # chunk, and an offset to add to the preceding to
+    # get absolute cell numbers.
+    # In the case of a plane slice, fs is a list [vals, _xyz3]
+    # (or [ [vals, clist, cell_offset], _xyz3] in the irregular case)
+    # where _xyz3 is the array of vertices of the chunk. _xyz3
+    # is ncells by 3 by something (in the irregular case),
+    # ncells by 3 by 2 by 2 by 2 in the regular case,
+    # and 3 by ni by nj by nk otherwise. vals will be
+    # the values of the projections of the corresponding
+    # vertex on the normal to the plane, positive if in
+    # front, and negative if in back.
+    if node == 1 and fcolor is not None and not callable(fcolor):
+        # need vertex-centered data
+        col = getv3 (fcolor, m3, chunk)
+        if type (col) == list :
+            col = col [0]
+    else :
+        col = None
+    # ZCM 2/24/97 Elimination of _xyz3 as a global necessitates the following:
+    # (_xyz3 comes back as the last element of the list fs)
+    _xyz3 = fs [1]
+    fs = fs [0]
+
+    irregular = type (fs) == list
+    cell_offset = None
+    if irregular :
+        cell_offset = fs [2]
+
+    # will need cell list if fslice did not compute xyz
+    got_xyz = _xyz3 is not None
+    need_clist = need_clist or not got_xyz
+
+    # If the m3 mesh is totally unstructured, the chunk should be
+    # arranged so that fslice returns an ncells-by-2-by-2-by-2
+    # (or ncells-by-3-by-2 or ncells-by-5 or ncells-by-4) array
+    # of vertex values of the slicing function. Note that a
+    # chunk of an irregular mesh always consists of just one
+    # kind of cell.
+    # On the other hand, if the mesh vertices are arranged in a
+    # rectangular grid (or a few patches of rectangular grids), the
+    # chunk should be the far less redundant rectangular patch.
+    if (irregular) :
+        # fs is a 2-sequence, of which the first element is an ncells-by-
+        # 2-by-2-by-2 (by-3-by-2, by-5, or by-4) array, and the second
+        # is the array of corresponding cell numbers.
+        # here is the fastest way to generate the required cell list
+        dims = numpy.shape (fs [0])
+        dim1 = dims [0]
+        slice3_precision = 0.0
+        if len (dims) == 4 : # hex case
+            # Note that the sum below will be between 1 and 7
+            # precisely if f changes sign in the cell.
+            critical_cells = numpy.bitwise_and (numpy.add.reduce \
+               (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
+               (8, dim1))), 7)
+            if (numpy.sum (critical_cells,axis=0) != 0) :
+                clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
+            else :
+                clist = None
+            kind = 3
+        elif len (dims) == 3 : # prism case
+            # Note that the sum below will be between 1 and 5
+            # precisely if f changes sign in the cell.
+            critical_cells = numpy.add.reduce \
+               (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
+               (6, dim1)))
+            critical_cells = numpy.logical_and (numpy.greater (critical_cells, 0),
+                                         numpy.less (critical_cells, 6))
+            if (numpy.sum (critical_cells,axis=0) != 0) :
+                clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
+            else :
+                clist = None
+            kind = 2
+        elif dims [1] == 5 : # pyramid case
+            # Note that the sum below will be between 1 and 4
+            # precisely if f changes sign in the cell.
+            critical_cells = numpy.add.reduce \
+               (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
+               (5, dim1)))
+            critical_cells = numpy.logical_and (numpy.greater (critical_cells, 0),
+                                         numpy.less (critical_cells, 5))
+            if (numpy.sum (critical_cells,axis=0) != 0) :
+                clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
+            else :
+                clist = None
+            kind = 1
+        else : # tet case
+            # Note that the sum below will be between 1 and 3
+            # precisely if f changes sign in the cell.
+            critical_cells = numpy.bitwise_and (numpy.add.reduce \
+               (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
+               (4, dim1))), 3)
+            if (numpy.sum (critical_cells,axis=0) != 0) :
+                clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
+            else :
+                clist = None
+            kind = 0
+    else :
+        dims = numpy.shape (fs)
+        # fs is an ni-by-nj-by-nk array
+        # result of the zcen is 0, 1/8, 2/8, ..., 7/8, or 1
+#        slice3_precision = max (numpy.ravel (abs (fs))) * (-1.e-12)
+        slice3_precision = 0
+        clist1 = numpy.ravel (zcen_ (zcen_ (zcen_
+           (numpy.array (numpy.less (fs, slice3_precision), numpy.float32), 0), 1), 2))
+        clist1 = numpy.logical_and (numpy.less (clist1, .9), numpy.greater (clist1, .1))
+        if numpy.sum (clist1,axis=0) > 0 :
+            clist = numpy.nonzero(clist1)[0]
+        else :
+            clist = None
+        kind = 3 # Treat regular case as hex
+
+    if clist is not None :
+        #  we need to save:
+        # (1) the absolute cell indices of the cells in clist
+        # (2) the corresponding ncells-by-2-by-2-by-2 (by-3-by-2,
+        #     by-5, or by-4) list of fslice
+        #     values at the vertices of these cells
+        if (irregular) :
+            # extract the portions of the data indexed by clist
+            fs = numpy.take (fs [0], clist,axis=0)
+            if got_xyz :
+                _xyz3 = numpy.take (_xyz3, clist,axis=0)
+            if col is not None :
+                col = numpy.take (col, clist,axis=0)
+        else :
+            # extract the to_corners portions of the data indexed by clist
+            indices = to_corners3 (clist, dims [1], dims [2])
+            no_cells = numpy.shape (indices) [0]
+            indices = numpy.ravel (indices)
+            fs = numpy.reshape (numpy.take (numpy.ravel (fs), indices,axis=0),\
+               (no_cells, 2, 2, 2))
+            if got_xyz and type (_xyz3) == list :
+                # the x, y and z vectors of _plane_slicer
+                _xyz3 = _xyz3_corners (_xyz3, numpy.unravel_index (clist,
+                   numpy.subtract (dims, 1)))
+            elif got_xyz :
+                new_xyz3 = numpy.zeros ( (no_cells, 3, 2, 2, 2), numpy.float32 )
+                new_xyz3 [:, 0, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [0, ...]),\
+                   indices,axis=0), (no_cells, 2, 2, 2))
+                new_xyz3 [:, 1, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [1, ...]),\
+                   indices,axis=0), (no_cells, 2, 2, 2))
+                new_xyz3 [:, 2, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [2, ...]),\
+                   indices,axis=0), (no_cells, 2, 2, 2))
+                _xyz3 = new_xyz3
+                del new_xyz3
+            if col is not None :
+                col = numpy.reshape (numpy.take (numpy.ravel (col), indices,axis=0), (no_cells, 2, 2, 2))
+                # NB: col represents node colors, and is only used
+                # if those are requested.
+        # here, the iterator converts to absolute cell indices without
+        # incrementing the chunk
+        if (need_clist) :
+            clist = iterator3 (m3, chunk, clist)
+        else :
+            clist = None
+        return [kind, len (fs), cell_offset, got_xyz, [clist, fs, _xyz3, col]]
+    return [kind, 0, cell_offset, got_xyz, [None, None, None, None]]
+
+# slice3 does the chunks of a mesh on _slice3_threads threads unless
+# given threads=; 0 means one per processor
+_slice3_threads = 1
+
+def _slice3_iterator (m3) :
+    # the chunks of M3, copied since iterator3 may update its chunk in
+    # place
+    import copy
+    chunk = iterator3 (m3)
+    while chunk is not None :
+        yield copy.deepcopy (chunk)
+        chunk = iterator3 (m3, chunk)
+
+def _slice3_chunks (m3, args, threads, chunks = None) :
+    # the _slice3_chunk (m3, chunk, * args) of each chunk of M3, or of
+    # the list CHUNKS, in order, done THREADS chunks at a time: numpy
+    # lets go of the GIL in its loops, so a slicing function written
+    # with numpy runs on several processors at once
+    if chunks is None :
+        chunks = _slice3_iterator (m3)
+    if threads == 1 :
+        for chunk in chunks :
+            yield _slice3_chunk (m3, chunk, * args)
+        return
+    import concurrent.futures, os
+    threads = threads or os.cpu_count () or 1
+    pending = []
+    with concurrent.futures.ThreadPoolExecutor (threads) as pool :
+        for chunk in chunks :
+            pending.append (pool.submit (_slice3_chunk, m3, chunk, * args))
+            if len (pending) > 2 * threads :
+                yield pending.pop (0).result ()
+        while pending :
+            yield pending.pop (0).result ()
+
+# slice3 cuts the isosurface of a vertex centered variable of a
+# logically rectangular mesh with gistF.isosurface3 unless this is 0
+_slice3_compiled = 1
+
+def _slice3_axes (m3) :
+    # the x, y and z vectors of a mesh whose coordinates are done by
+    # xyz3_unif, x depending on the first index only, and so on
+    xyz = m3 [1] [1]
+    if type (xyz) == list :
+        return xyz
+    dims = m3 [1] [0]
+    [dxdydz, x0y0z0] = xyz
+    return [x0y0z0 [i] + numpy.arange (dims [i] + 1, dtype = numpy.float32)
+            * dxdydz [i] / dims [i] for i in range (3)]
+
+# With _slice3_blocked = 1, an isosurface of a vertex centered
+# variable of a logically rectangular mesh is only cut in the blocks
+# of _block3_cells cells on a side which it may cross, found from the
+# least and greatest value of the variable over each block (block3),
+# unless more than _block3_dense of the blocks are crossed.  Cutting
+# a block costs more per cell than cutting the whole mesh, and
+# gistF.isosurface3 cut spheres through 128**3 and 200**3 meshes as
+# fast by blocks as whole when about a fifth of the blocks are
+# crossed, twice as fast at a twentieth.  The index costs one or two
+# such cuts to build, and is kept while the variable exists, so that
+# this is off unless asked for.
+_slice3_blocked = 0
+_block3_cells = 16
+_block3_dense = 0.1
+
+# what slice3 works out once for an array of a mesh, by key, each
+# entry going with its array
+_slice3_index = {}
+
+def _slice3_kept (x, key, compute) :
+    # compute (), kept under KEY while the array X exists
+    entry = _slice3_index.get (key)
+    if entry is not None and entry [0] () is x :
+        return entry [1]
+    result = compute ()
+    _slice3_index [key] = [weakref.ref (x,
+       lambda r, key = key : _slice3_index.pop (key, None)), result]
+    return result
+
+def _block3_reduce (f, cells, reduce) :
+    # the ufunc REDUCE of F over the blocks of block3
+    for axis in range (3) :
+        shape = f.shape
+        whole = max ((shape [axis] - 2) // cells, 0)
+        head = [slice (None)] * 3
+        head [axis] = slice (0, whole * cells)
+        tail = [slice (None)] * 3
+        tail [axis] = slice (whole * cells, None)
+        # a reshape is faster than reduceat
+        r = numpy.concatenate ( [reduce.reduce (numpy.reshape (
+           f [tuple (head)], shape [:axis] + (whole, cells) + shape [axis + 1:]),
+           axis = axis + 1), reduce.reduce (f [tuple (tail)], axis = axis,
+           keepdims = True)], axis = axis)
+        if whole :
+            # a block also has the first vertices of the next one
+            head [axis] = slice (0, whole)
+            head = tuple (head)
+            r [head] = reduce (r [head], numpy.take (f,
+               numpy.arange (1, whole + 1) * cells, axis = axis))
+        f = r
+    return f
+
+def block3 (f, cells = None) :
+
+    '''
+    block3 (f, cells = None)
+      Return [fmin, fmax], the least and greatest values of the vertex
+      centered variable F of a logically rectangular mesh over each
+      block of CELLS by CELLS by CELLS cells (_block3_cells by
+      default).  Block [bi, bj, bk] has the vertices bi*CELLS to
+      (bi+1)*CELLS along the first index and so on, the last blocks
+      being smaller.  fmin leaves out NaNs, fmax is NaN where there is
+      one, so that the isosurface F == value can only cross the blocks
+      where fmin < value and not fmax < value.
+
+      The result is kept while F exists, until slice3_cache (clear = 1),
+      so that all the isosurfaces slice3 cuts through F use one index
+      (see _slice3_blocked); clear it after changing F in place.
+    '''
+
+    if cells is None :
+        cells = _block3_cells
+    return _slice3_kept (f, ('block3', id (f), cells),
+       lambda : [_block3_reduce (f, cells, numpy.fmin),
+                 _block3_reduce (f, cells, numpy.maximum)])
+
+def _block3_boxes (m3, iso_index, value, limit = None) :
+    # the boxes of cells of the rectangular mesh M3 in which the
+    # isosurface of its ISO_INDEXth variable at VALUE may be, from the
+    # blocks of block3: a list of [first, last] cells, counted from 1
+    # as in the chunks of iterator3_rect, each a run of blocks along
+    # the last index, runs along the second index being joined while
+    # they have at most LIMIT cells.  None if all the cells should be
+    # cut.  VALUE is a numpy scalar, so that it is compared with the
+    # variable at the precision the slicing does.
+    if not _slice3_blocked or not _block3_cells or \
+       m3 [0] [3] != iterator3_rect or \
+       not 0 < iso_index <= len (m3 [2]) :
+        return None
+    f = m3 [2] [iso_index - 1]
+    dims = m3 [1] [0]
+    if not isinstance (f, numpy.ndarray) or \
+       f.shape != tuple (numpy.add (dims, 1)) :
+        return None
+    cells = _block3_cells
+    [fmin, fmax] = block3 (f, cells)
+    cut = (fmin < value) & ~ (fmax < value)
+    if cut.sum () > _block3_dense * cut.size :
+        return None
+    runs = numpy.diff (numpy.pad (cut.view (numpy.int8),
+       ((0, 0), (0, 0), (1, 1))), axis = 2)
+    [bi, bj, bk] = numpy.nonzero (runs == 1)
+    ends = numpy.nonzero (runs == -1) [2]
+    if limit is None :
+        step = len (runs [0, 0])
+    else :
+        step = max (limit // cells ** 3, 1)
+    boxes = []
+    for t in range (len (bi)) :
+        for k in range (bk [t], ends [t], step) :
+            first = [bi [t] * cells + 1, bj [t] * cells + 1, k * cells + 1]
+            last = numpy.minimum ([(bi [t] + 1) * cells, (bj [t] + 1) * cells,
+               min (k + step, ends [t]) * cells], dims)
+            if boxes :
+                [f0, l0] = boxes [-1]
+                if f0 [0] == first [0] and f0 [2] == first [2] and \
+                   l0 [2] == last [2] and l0 [1] + 1 == first [1] and \
+                   (limit is None or numpy.prod (last - f0 + 1) <= limit) :
+                    l0 [1] = last [1]
+                    continue
+            boxes.append ([first, last])
+    return boxes
+
+def _slice3_rect_axes (m3) :
+    # the x, y and z vectors of M3 if it is a logically rectangular
+    # mesh whose x depends on the first index only, and so on, else
+    # None; for coordinates given in full, these are views of them,
+    # checked on each call since the mesh may have changed in place
+    if m3 [0] [1:] != [getv3_rect, getc3_rect, iterator3_rect] :
+        return None
+    if m3 [0] [0] == xyz3_unif :
+        return _slice3_axes (m3)
+    xyz = m3 [1] [1]
+    if m3 [0] [0] != xyz3_rect or not isinstance (xyz, numpy.ndarray) :
+        return None
+    line = [xyz [0, :, 0, 0], xyz [1, 0, :, 0], xyz [2, 0, 0, :]]
+    if numpy.array_equal (xyz [0], numpy.broadcast_to (
+          line [0] [:, numpy.newaxis, numpy.newaxis], xyz.shape [1:])) and \
+       numpy.array_equal (xyz [1], numpy.broadcast_to (
+          line [1] [:, numpy.newaxis], xyz.shape [1:])) and \
+       numpy.array_equal (xyz [2], numpy.broadcast_to (line [2],
+          xyz.shape [1:])) :
+        return line
+    return None
+
+def _slice3_rect_color (m3, fcolor, node) :
+    # [c], c being the mesh variable FCOLOR of the rectangular mesh M3
+    # for isosurface3, or None for no color; None if FCOLOR is a
+    # function or a variable isosurface3 cannot color with
+    fi = m3 [2]
+    if fcolor is None :
+        return [None]
+    if callable (fcolor) or not 0 < fcolor <= len (fi) or node == 1 and \
+       numpy.shape (fi [fcolor - 1]) != tuple (numpy.add (m3 [1] [0], 1)) :
+        return None
+    return [fi [fcolor - 1]]
+
+def _slice3_cut_rect (f, value, xyz, c, nointerp, node, boxes) :
+    # the [nverts, xyzverts, color] of slice3 where the vertex
+    # centered F of a rectangular mesh with coordinates XYZ (an array
+    # or the three axes) equals VALUE, colored by C, by
+    # gistF.isosurface3 on each of the BOXES of _block3_boxes in turn,
+    # or on the whole mesh if BOXES is None
+    if node == 1 :
+        kind = 2
+    else :
+        kind = nointerp is not None
+    if boxes is None :
+        parts = [isosurface3 (f, value, _poly_permutations [3], xyz, c, kind)]
+    else :
+        dims = numpy.shape (f)
+        if c is not None :
+            c = numpy.asarray (c)
+        parts = []
+        for [first, last] in boxes :
+            nodes = tuple ([slice (first [d] - 1, last [d] + 1)
+                            for d in range (3)])
+            if type (xyz) == list :
+                bxyz = [xyz [d] [nodes [d]] for d in range (3)]
+            else :
+                bxyz = xyz [(slice (None),) + nodes]
+            if c is None :
+                bc = None
+            elif numpy.shape (c) == dims :
+                bc = c [nodes]
+            else :
+                bc = c [tuple ([slice (first [d] - 1, last [d])
+                                for d in range (3)])]
+            parts.append (isosurface3 (f [nodes], value,
+               _poly_permutations [3], bxyz, bc, kind))
+        parts = [part for part in parts if len (part [0])]
+    if not parts or not sum ([len (part [0]) for part in parts]) :
+        return None
+    if len (parts) == 1 :
+        return parts [0]
+    if c is None :
+        col = None
+    else :
+        col = numpy.concatenate ([part [2] for part in parts])
+    return [numpy.concatenate ([part [0] for part in parts]),
+            numpy.concatenate ([part [1] for part in parts]), col]
+
+def _slice3_iso_rect (m3, iso_index, value, fcolor, nointerp, node) :
+    # slice3 (m3, iso_index, nverts, xyzverts, fcolor, nointerp,
+    # value = value, node = node) by gistF.isosurface3, or 0 if M3 or
+    # FCOLOR are not of the kinds it does
+    if not _slice3_compiled or m3 [0] [1:] != [getv3_rect, getc3_rect,
+       iterator3_rect] or m3 [0] [0] not in (xyz3_rect, xyz3_unif) :
+        return 0
+    fi = m3 [2]
+    dims = tuple (numpy.add (m3 [1] [0], 1))
+    if not 0 < iso_index <= len (fi) or numpy.shape (fi [iso_index - 1]) != dims :
+        return 0
+    c = _slice3_rect_color (m3, fcolor, node)
+    if c is None :
+        return 0
+    if m3 [0] [0] == xyz3_unif :
+        xyz = _slice3_axes (m3)
+    else :
+        xyz = m3 [1] [1]
+    f = fi [iso_index - 1]
+    if numpy.asarray (f).dtype == numpy.float32 :
+        boxes = _block3_boxes (m3, iso_index, numpy.float32 (value))
+    else :
+        boxes = _block3_boxes (m3, iso_index, numpy.float64 (value))
+    return _slice3_cut_rect (f, value, xyz, c [0], nointerp, node, boxes)
+
+def _slice3_plane_rect (m3, normal, projection, fcolor, nointerp, node) :
+    # slice3 (m3, plane, nverts, xyzverts, fcolor, nointerp, node =
+    # node) for a plane normal to the axis d of a mesh whose
+    # coordinates are axes (_slice3_rect_axes): the plane function,
+    # which then depends on index d only, is worked out along that
+    # axis, and only the layers of cells where it changes sign are cut
+    # by gistF.isosurface3.  0 if the mesh, the plane or FCOLOR are not
+    # of the kinds this does.
+    if not _slice3_compiled or numpy.count_nonzero (normal) != 1 :
+        return 0
+    xyz = _slice3_rect_axes (m3)
+    if xyz is None :
+        return 0
+    c = _slice3_rect_color (m3, fcolor, node)
+    if c is None :
+        return 0
+    d = numpy.flatnonzero (normal) [0]
+    # as _plane_slicer works it out, the other terms being zero
+    fs = xyz [d] * normal [d] - projection
+    shape = [1, 1, 1]
+    shape [d] = len (fs)
+    f = numpy.broadcast_to (numpy.reshape (fs, shape),
+       [len (x) for x in xyz])
+    below = fs < 0
+    boxes = []
+    for l in numpy.flatnonzero (below [:-1] != below [1:]) :
+        first = [1, 1, 1]
+        last = list (m3 [1] [0])
+        first [d] = last [d] = l + 1
+        boxes.append ([first, last])
+    if not boxes :
+        return None
+    return _slice3_cut_rect (f, 0, xyz, c [0], nointerp, node, boxes)
+
 class _Slice3Error(Exception):
     pass
 
+# slice3 and slice3mesh keep their results, the most recently used
+# last, while they fit in _slice3_cache_bytes; 0, the default, turns
+# the cache off
+_slice3_cache_bytes = 0
+_slice3_cache = {}
+_slice3_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+_slice3_cache_lock = threading.Lock ()
+
+# arrays of up to this many elements are part of a cache key by
+# value, bigger ones by identity
+_slice3_key_size = 64
+
+def _slice3_key (x, refs, methods = 0) :
+    # a hashable cache key for X, a mesh or the arguments of slice3:
+    # big arrays by identity, with a weak reference appended to REFS so
+    # that the key is not matched once the array is gone, the rest by
+    # value; None if X holds a function (but the methods of a mesh,
+    # if METHODS) or anything else that cannot be told apart
+    if isinstance (x, numpy.ndarray) :
+        if x.size <= _slice3_key_size :
+            return (x.dtype.str, x.shape, x.tobytes ())
+        refs.append (weakref.ref (x))
+        return ('id', id (x))
+    if isinstance (x, (list, tuple)) :
+        key = []
+        for y in x :
+            y = _slice3_key (y, refs, methods)
+            if y is None :
+                return None
+            key.append (y)
+        return tuple (key)
+    if x is None or isinstance (x, (int, float, complex, str, numpy.generic)) :
+        return (type (x).__name__, x)
+    if methods and isinstance (x, types.FunctionType) :
+        return ('function', x)
+    return None
+
+def _slice3_readonly (x) :
+    # X with read-only views of its arrays, so that the arrays in the
+    # cache cannot be changed through a result
+    if isinstance (x, numpy.ndarray) :
+        x = x.view ()
+        x.flags.writeable = False
+        return x
+    if isinstance (x, list) :
+        return [_slice3_readonly (y) for y in x]
+    return x
+
+def _slice3_alive (refs) :
+    # whether the arrays of the weak references REFS all still exist
+    for r in refs :
+        if r () is None :
+            return 0
+    return 1
+
+def _slice3_trim (limit) :
+    # drop the entries whose arrays are gone, then the least recently
+    # used ones until the cache holds at most LIMIT bytes
+    for key in [key for key in _slice3_cache
+                if not _slice3_alive (_slice3_cache [key] [0])] :
+        _slice3_cache_stats ['bytes'] -= _slice3_cache.pop (key) [2]
+        _slice3_cache_stats ['evictions'] += 1
+    while _slice3_cache_stats ['bytes'] > limit :
+        key = next (iter (_slice3_cache))
+        _slice3_cache_stats ['bytes'] -= _slice3_cache.pop (key) [2]
+        _slice3_cache_stats ['evictions'] += 1
+
+def _slice3_cached (key, refs, compute, * args, ** kw) :
+    # compute (* args, ** kw), or what it returned before for KEY,
+    # whose arrays are the weak references REFS; with the cache on,
+    # always as read-only arrays, cached or not
+    if _slice3_cache_bytes <= 0 :
+        return compute (* args, ** kw)
+    if key is None :
+        return _slice3_readonly (compute (* args, ** kw))
+    with _slice3_cache_lock :
+        entry = _slice3_cache.pop (key, None)
+        if entry is not None :
+            if _slice3_alive (entry [0]) :
+                _slice3_cache [key] = entry
+                _slice3_cache_stats ['hits'] += 1
+                return _slice3_readonly (entry [1])
+            _slice3_cache_stats ['bytes'] -= entry [2]
+            _slice3_cache_stats ['evictions'] += 1
+        _slice3_cache_stats ['misses'] += 1
+    result = compute (* args, ** kw)
+    nbytes = _nbytes (result)
+    if nbytes > _slice3_cache_bytes :
+        return _slice3_readonly (result)
+    with _slice3_cache_lock :
+        entry = _slice3_cache.pop (key, None)
+        if entry is not None :
+            _slice3_cache_stats ['bytes'] -= entry [2]
+        _slice3_cache [key] = [refs, result, nbytes]
+        _slice3_cache_stats ['bytes'] += nbytes
+        _slice3_trim (_slice3_cache_bytes)
+    return _slice3_readonly (result)
+
+def slice3_cache (nbytes = None, clear = 0) :
+
+    '''
+    slice3_cache (nbytes = None, clear = 0)
+      Return the statistics of the cache of slice3 and slice3mesh
+      results, a dictionary of the hits, misses and evictions so far,
+      the entries and bytes held now, and the limit on those bytes.
+      With NBYTES, make that the limit (_slice3_cache_bytes), dropping
+      the least recently used results over it; 0, the default, turns
+      the cache off.  With CLEAR=1, empty the cache and zero the counts
+      first.
+
+      A result is found again when the mesh and the arguments are the
+      same: the same array objects, compared by identity (arrays of up
+      to _slice3_key_size elements, numbers and lists by value), and
+      only while those arrays exist.  Calls with a slicing or coloring
+      function are never cached.  The arrays are not copied, so call
+      slice3_cache (clear = 1) after changing the values of a mesh in
+      place.  While the cache is on, slice3 and slice3mesh always
+      return read-only arrays, whether or not the result was kept.
+    '''
+
+    global _slice3_cache_bytes
+    with _slice3_cache_lock :
+        if clear :
+            _slice3_cache.clear ()
+            _slice3_index.clear ()
+            for k in _slice3_cache_stats :
+                _slice3_cache_stats [k] = 0
+        if nbytes is not None :
+            _slice3_cache_bytes = nbytes
+        _slice3_trim (max (_slice3_cache_bytes, 0))
+        stats = dict (_slice3_cache_stats)
+    stats ['entries'] = len (_slice3_cache)
+    stats ['limit'] = _slice3_cache_bytes
+    return stats
+
 
 def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
 
@@ -305,12 +930,55 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
       to return node-centered values rather than cell-centered
       values. (ZCM 4/16/97)
 
+      The mesh is sliced a chunk at a time (see iterator3 and
+      chunk3_limit).  With the keyword THREADS=n, n chunks are sliced
+      at once on threads of their own (0 for one per processor; the
+      default is _slice3_threads, 1).  FSLICE and FCOLOR functions must
+      then be safe to call from several threads; the result is the
+      same, in the same order.
+
+      The isosurface of a vertex centered variable of a logically
+      rectangular mesh, colored by nothing or another mesh variable,
+      is not chunked but cut in one compiled pass (gistF.isosurface3),
+      with the same result.  Either way, with _slice3_blocked = 1, only
+      the blocks of cells whose values straddle the isosurface value
+      are cut, when they are few, found from an index of the variable
+      built on the first isosurface through it (see block3); the
+      polygons are the same, in the order of the blocks.  Likewise,
+      a plane normal to a coordinate axis of a mesh whose x depends
+      on the first index only, and so on (such as a uniform mesh), is
+      cut only in the layers of cells it crosses; those polygons have
+      the geometry of the general path, to rounding (the vertices may
+      differ in their last bits), but not its order.
+
+      Once turned on with slice3_cache (nbytes), a cache keeps the
+      result and returns it again, as read-only arrays, when slice3 is
+      called with the same mesh arrays and the same FSLICE, FCOLOR,
+      value and node; see slice3_cache.
+
     '''
 
+    refs = []
+    # the path slice3 takes decides the order of the polygons
+    key = _slice3_key ([fslice, args,
+       [(k, kw [k]) for k in sorted (kw) if k != 'threads'],
+       _slice3_compiled, _slice3_blocked, _block3_cells, _block3_dense],
+       refs)
+    mesh = _slice3_key (m3, refs, 1)
+    if key is not None and mesh is not None :
+        key = ('slice3', mesh, key)
+    else :
+        key = None
+    return _slice3_cached (key, refs, _slice3, m3, fslice, nverts,
+       xyzverts, * args, ** kw)
+
+def _slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
+    # slice3, without the cache
+
     global _poly_permutations
 
     iso_index = None
-    if not isinstance(fslice, collections.Callable):
+    if not callable(fslice):
         if 'value' not in kw and not is_scalar (fslice) and \
            len (numpy.shape (fslice)) == 1 and len (fslice) == 4 :
             normal = fslice [0:3]
@@ -339,230 +1007,74 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
 
     if need_clist :
         fcolor = args [0]
-        if fcolor == None :
+        if fcolor is None :
             need_clist = 0
     else :
         fcolor = None
 
     # test the different possibilities for fcolor
-    if need_clist and not isinstance(fcolor, collections.Callable):
+    if need_clist and not callable(fcolor):
         if not is_scalar (fcolor) or type (fcolor) != int :
             raise _Slice3Error('illegal form of FCOLOR argument, try help,slice3')
 
+    if fslice == _isosurface_slicer :
+        result = _slice3_iso_rect (m3, iso_index, _value, fcolor, nointerp,
+                                   node)
+        if result != 0 :
+            return result
+    elif fslice == _plane_slicer :
+        result = _slice3_plane_rect (m3, normal, projection, fcolor,
+                                     nointerp, node)
+        if result != 0 :
+            return result
+
     # chunk up the m3 mesh and evaluate the slicing function to
     # find those cells cut by fslice==0
     # chunking avoids potentially disastrously large temporaries
+    if fslice == _isosurface_slicer :
+        slicer_args = (iso_index, _value)
+    elif fslice == _plane_slicer :
+        slicer_args = (normal, projection)
+    else :
+        slicer_args = ()
+    if 'threads' in kw :
+        threads = kw ['threads']
+    else :
+        threads = _slice3_threads
+    chunks = None
+    if fslice == _isosurface_slicer :
+        boxes = _block3_boxes (m3, iso_index, numpy.float64 (_value),
+                               chunk3_limit (m3 [1] [0]))
+        if boxes is not None :
+            chunks = [numpy.array ( [first, last, [0, 0, 0], m3 [1] [0]])
+                      for [first, last] in boxes]
     got_xyz = 0
-    ntotal = 0
-    # The following are used only for an irregular mesh, to
-    # give the sizes of each portion of the mesh.
-    ntotal8 = 0
-    ntotal6 = 0
-    ntotal5 = 0
-    ntotal4 = 0
-    # The following are used only for an irregular mesh, to
-    # give the indices of the different types of chunk in the
-    # results list.
-    i8 = []
-    i6 = []
-    i5 = []
-    i4 = []
-    itot = [i4, i5, i6, i8]
+    # The number of cut cells of each type, tetrahedra, pyramids, prisms
+    # and hexahedra, the cells of a rectangular mesh counting as the
+    # last; the indices in the results list of the chunks which have
+    # them; and, for an irregular mesh, the number of the first cell of
+    # each type.
+    ntot = [0, 0, 0, 0]
+    itot = [[], [], [], []]
+    cell_offsets = [0, 0, 0, 0]
     nchunk = 0
     results = []
-    chunk = iterator3 (m3)
-    cell_offsets = [0, 0, 0, 0]
-    while chunk != None :
-
-        # get the values of the slicing function at the vertices of
-        # this chunk
-        if fslice == _isosurface_slicer :
-            fs = fslice (m3, chunk, iso_index, _value)
-            # an isosurface slicer brings back a list [vals, None]
-            # where vals is simply an array of the values of the
-            # iso_index'th function on the vertices of the specified
-            # chunk, or a triple, consisting of the array of
-            # values, an array of relative cell numbers in the
-            # chunk, and an offset to add to the preceding to
-            # get absolute cell numbers.
-        elif fslice == _plane_slicer :
-            fs = fslice (m3, chunk, normal, projection)
-            # In the case of a plane slice, fs is a list [vals, _xyz3]
-            # (or [ [vals, clist, cell_offset], _xyz3] in the irregular case)
-            # where _xyz3 is the array of vertices of the chunk. _xyz3
-            # is ncells by 3 by something (in the irregular case),
-            # ncells by 3 by 2 by 2 by 2 in the regular case,
-            # and 3 by ni by nj by nk otherwise. vals will be
-            # the values of the projections of the corresponding
-            # vertex on the normal to the plane, positive if in
-            # front, and negative if in back.
-        else :
-            fs = fslice (m3, chunk)
-        if node == 1 and fcolor != None and not isinstance(fcolor, collections.Callable):
-            # need vertex-centered data
-            col = getv3 (fcolor, m3, chunk)
-            if type (col) == list :
-                col = col [0]
-        else :
-            col = None
-        # ZCM 2/24/97 Elimination of _xyz3 as a global necessitates the following:
-        # (_xyz3 comes back as the last element of the list fs)
-        _xyz3 = fs [1]
-        fs = fs [0]
-
-        irregular = type (fs) == list
-        if irregular :
-            cell_offset = fs [2]
-
-        # will need cell list if fslice did not compute xyz
-        got_xyz = _xyz3 != None
+    for [kind, ncut, cell_offset, got, result] in _slice3_chunks (m3,
+       [fslice, slicer_args, node, fcolor, need_clist], threads, chunks) :
+        got_xyz = got
         need_clist = need_clist or not got_xyz
-
-        # If the m3 mesh is totally unstructured, the chunk should be
-        # arranged so that fslice returns an ncells-by-2-by-2-by-2
-        # (or ncells-by-3-by-2 or ncells-by-5 or ncells-by-4) array
-        # of vertex values of the slicing function. Note that a
-        # chunk of an irregular mesh always consists of just one
-        # kind of cell.
-        # On the other hand, if the mesh vertices are arranged in a
-        # rectangular grid (or a few patches of rectangular grids), the
-        # chunk should be the far less redundant rectangular patch.
-        if (irregular) :
-            # fs is a 2-sequence, of which the first element is an ncells-by-
-            # 2-by-2-by-2 (by-3-by-2, by-5, or by-4) array, and the second
-            # is the array of corresponding cell numbers.
-            # here is the fastest way to generate the required cell list
-            dims = numpy.shape (fs [0])
-            dim1 = dims [0]
-            slice3_precision = 0.0
-            if len (dims) == 4 : # hex case
-                # Note that the sum below will be between 1 and 7
-                # precisely if f changes sign in the cell.
-                critical_cells = numpy.bitwise_and (numpy.add.reduce \
-                   (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
-                   (8, dim1))), 7)
-                if (numpy.sum (critical_cells,axis=0) != 0) :
-                    clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
-                    ntotal8 = ntotal8 + len (clist)
-                else :
-                    clist = None
-                i8.append (len (results))
-                cell_offsets [3] = cell_offset
-            elif len (dims) == 3 : # prism case
-                # Note that the sum below will be between 1 and 5
-                # precisely if f changes sign in the cell.
-                critical_cells = numpy.add.reduce \
-                   (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
-                   (6, dim1)))
-                critical_cells = numpy.logical_and (numpy.greater (critical_cells, 0),
-                                             numpy.less (critical_cells, 6))
-                if (numpy.sum (critical_cells,axis=0) != 0) :
-                    clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
-                    ntotal6 = ntotal6 + len (clist)
-                else :
-                    clist = None
-                i6.append (len (results))
-                cell_offsets [2] = cell_offset
-            elif dims [1] == 5 : # pyramid case
-                # Note that the sum below will be between 1 and 4
-                # precisely if f changes sign in the cell.
-                critical_cells = numpy.add.reduce \
-                   (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
-                   (5, dim1)))
-                critical_cells = numpy.logical_and (numpy.greater (critical_cells, 0),
-                                             numpy.less (critical_cells, 5))
-                if (numpy.sum (critical_cells,axis=0) != 0) :
-                    clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
-                    ntotal5 = ntotal5 + len (clist)
-                else :
-                    clist = None
-                i5.append (len (results))
-                cell_offsets [1] = cell_offset
-            else : # tet case
-                # Note that the sum below will be between 1 and 3
-                # precisely if f changes sign in the cell.
-                critical_cells = numpy.bitwise_and (numpy.add.reduce \
-                   (numpy.reshape (numpy.ravel (numpy.transpose (numpy.less (fs [0], slice3_precision))), \
-                   (4, dim1))), 3)
-                if (numpy.sum (critical_cells,axis=0) != 0) :
-                    clist = numpy.take (fs [1], numpy.nonzero(critical_cells)[0],axis=0)
-                    ntotal4 = ntotal4 + len (clist)
-                else :
-                    clist = None
-                i4.append (len (results))
-                cell_offsets [0] = cell_offset
-        else :
-            dims = numpy.shape (fs)
-            # fs is an ni-by-nj-by-nk array
-            # result of the zcen is 0, 1/8, 2/8, ..., 7/8, or 1
-#        slice3_precision = max (numpy.ravel (abs (fs))) * (-1.e-12)
-            slice3_precision = 0
-            clist1 = numpy.ravel (zcen_ (zcen_ (zcen_
-               (numpy.array (numpy.less (fs, slice3_precision), numpy.float32), 0), 1), 2))
-            clist1 = numpy.logical_and (numpy.less (clist1, .9), numpy.greater (clist1, .1))
-            if numpy.sum (clist1,axis=0) > 0 :
-                clist = numpy.nonzero(clist1)[0]
-                ntotal = ntotal + len (clist)
-            else :
-                clist = None
-            i8.append (len (results)) # Treat regular case as hex
-
-        if clist != None :
-            #  we need to save:
-            # (1) the absolute cell indices of the cells in clist
-            # (2) the corresponding ncells-by-2-by-2-by-2 (by-3-by-2,
-            #     by-5, or by-4) list of fslice
-            #     values at the vertices of these cells
-            if (irregular) :
-                # extract the portions of the data indexed by clist
-                fs = numpy.take (fs [0], clist,axis=0)
-                if got_xyz :
-                    _xyz3 = numpy.take (_xyz3, clist,axis=0)
-                if col :
-                    col = numpy.take (col, clist,axis=0)
-            else :
-                # extract the to_corners portions of the data indexed by clist
-                indices = to_corners3 (clist, dims [1], dims [2])
-                no_cells = numpy.shape (indices) [0]
-                indices = numpy.ravel (indices)
-                fs = numpy.reshape (numpy.take (numpy.ravel (fs), indices,axis=0),\
-                   (no_cells, 2, 2, 2))
-                if got_xyz :
-                    new_xyz3 = numpy.zeros ( (no_cells, 3, 2, 2, 2), numpy.float32 )
-                    new_xyz3 [:, 0, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [0, ...]),\
-                       indices,axis=0), (no_cells, 2, 2, 2))
-                    new_xyz3 [:, 1, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [1, ...]),\
-                       indices,axis=0), (no_cells, 2, 2, 2))
-                    new_xyz3 [:, 2, ...] = numpy.reshape (numpy.take (numpy.ravel (_xyz3 [2, ...]),\
-                       indices,axis=0), (no_cells, 2, 2, 2))
-                    _xyz3 = new_xyz3
-                    del new_xyz3
-                if col != None :
-                    col = numpy.reshape (numpy.take (numpy.ravel (col), indices,axis=0), (no_cells, 2, 2, 2))
-                    # NB: col represents node colors, and is only used
-                    # if those are requested.
-            # here, the iterator converts to absolute cell indices without
-            # incrementing the chunk
-            if (need_clist) :
-                clist = iterator3 (m3, chunk, clist)
-            else :
-                clist = None
+        if cell_offset is not None :
+            cell_offsets [kind] = cell_offset
+        if ncut :
+            ntot [kind] = ntot [kind] + ncut
+            itot [kind].append (len (results))
             nchunk = nchunk + 1
-            need_vert_col = col != None
-            results.append ( [clist, fs, _xyz3, col])
-        else :
-            results.append ( [None, None, None, None])
-        chunk = iterator3 (m3, chunk)
-        # endwhile chunk != None
+            need_vert_col = result [3] is not None
+            results.append (result)
 
     # collect the results of the chunking loop
-    if not ntotal and not (ntotal8 + ntotal6 + ntotal5 + ntotal4) :
+    if not sum (ntot) :
         return None
-    if ntotal : # (regular mesh, but can be handled same as hex)
-        ntotal8 = ntotal
-        i8 = list(range(len (results)))
-        itot [3] = i8
-    ntot = [ntotal4, ntotal5, ntotal6, ntotal8]
     new_results = []
     for i in range (len (ntot)) :
         # This loop processes each kind of cell independently,
@@ -571,11 +1083,11 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
             continue
         if need_clist :
             clist = numpy.zeros (ntot [i], numpy.int32)
-            fs = numpy.zeros ( (ntot [i], _no_verts [i]), numpy.float32 )
-            if got_xyz :
-                xyz = numpy.zeros ( (ntot [i], 3, _no_verts [i]), numpy.float32 )
-            else :
-                xyz = None
+        fs = numpy.zeros ( (ntot [i], _no_verts [i]), numpy.float32 )
+        if got_xyz :
+            xyz = numpy.zeros ( (ntot [i], 3, _no_verts [i]), numpy.float32 )
+        else :
+            xyz = None
         if need_vert_col :
             col = numpy.zeros ( (ntot [i], _no_verts [i]), numpy.float32 )
         else :
@@ -585,14 +1097,14 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
        # collect the results of the chunking loop
         for j in range (len (itot [i])) :
             l = k
-            k = k + len (results [itot [i] [j]] [0])
+            k = k + len (results [itot [i] [j]] [1])
             if need_clist :
                 clist [l:k] = results [itot [i] [j]] [0]
             fs [l:k] = numpy.reshape (results [itot [i] [j]] [1], (k - l, _no_verts [i]))
-            if xyz != None :
+            if xyz is not None :
                 xyz [l:k] = numpy.reshape (results [itot [i] [j]] [2],
                    (k - l, 3, _no_verts [i]))
-            if col != None :
+            if col is not None :
                 col [l:k] = numpy.reshape (results [itot [i] [j]] [3],
                    (k - l, _no_verts [i]))
         if not got_xyz :
@@ -610,7 +1122,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         mask = find_mask (below, _node_edges [i])
         lst = numpy.nonzero(mask)[0]
         edges = numpy.array (lst, copy = 1)
-        cells = edges / _no_edges [i]
+        cells = edges // _no_edges [i]
         edges = edges % _no_edges [i]
         # construct edge endpoint indices in fs, xyz arrays
         # the numbers are the endpoint indices corresponding to
@@ -632,7 +1144,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
            numpy.take (numpy.ravel (xyz [:, 2]), upper,axis=0) * fsl), (len (lower),))
         xyz = new_xyz
         del new_xyz
-        if col != None :
+        if col is not None :
             # Extract subset of the data the same way
             col = numpy.take (numpy.ravel (col), lower,axis=0) * fsu - \
                numpy.take (numpy.ravel (col), upper,axis=0) * fsl
@@ -647,7 +1159,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         pattern = numpy.transpose (numpy.sum (numpy.transpose (numpy.multiply (below, p2)),axis=0))
 
         # broadcast the cell's pattern onto each of its sliced edges
-        pattern = numpy.take (pattern, lst / _no_edges [i],axis=0)
+        pattern = numpy.take (pattern, lst // _no_edges [i],axis=0)
         # Let ne represent the number of edges of this type of cell,
         # and nv the number of vertices.
         # To each pattern, there corresponds a permutation of the
@@ -668,10 +1180,15 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         xyz1 [:,1] = numpy.take (numpy.ravel (xyz [:,1]), order,axis=0)
         xyz1 [:,2] = numpy.take (numpy.ravel (xyz [:,2]), order,axis=0)
         xyz = xyz1
-        if col != None :
+        if col is not None :
             col = numpy.take (col, order,axis=0)
         edges = numpy.take (edges, order,axis=0)
         pattern = numpy.take (pattern, order,axis=0)
+        # the interpolation coefficients go along, for getc3
+        lower = numpy.take (lower, order,axis=0)
+        upper = numpy.take (upper, order,axis=0)
+        fsl = numpy.take (fsl, order,axis=0)
+        fsu = numpy.take (fsu, order,axis=0)
         # cells(order) is same as cells by construction */
 
         # There remains only the question of splitting the points in
@@ -686,7 +1203,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         # _poly_permutations(as described above) + _no_edges [i]*poly_splits
         # (this doesn't change the ordering of _poly_permutations).
         # I assume this has been done here:
-        pattern = pattern / _no_edges [i]
+        pattern = pattern // _no_edges [i]
         # now pattern jumps by 4 between cells, smaller jumps within cells
         # get the list of places where a new value begins, and form a
         # new pattern with values that increment by 1 between each plateau
@@ -703,26 +1220,28 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         xyzverts = xyz
 
         # finally, deal with any fcolor function
-        if fcolor == None :
+        if fcolor is None :
             new_results.append ( [nverts, xyzverts, None])
             continue
 
         # if some polys have been split, need to split clist as well
+        # (but lower and upper index the corners of the cells of clist)
+        pclist = clist
         if len (lst) > len (clist) :
-            clist = numpy.take (clist, numpy.take (cells, lst, axis=0),axis=0)
-        if col == None :
-            if nointerp == None :
-                if isinstance(fcolor, collections.Callable):
+            pclist = numpy.take (clist, numpy.take (cells, lst, axis=0),axis=0)
+        if col is None :
+            if nointerp is None :
+                if callable(fcolor):
                     col = fcolor (m3, clist + cell_offsets [i], lower, upper, fsl,
                        fsu, pattern - 1)
                 else :
                     col = getc3 (fcolor, m3, clist + cell_offsets [i], lower, upper,
                        fsl, fsu, pattern - 1)
             else :
-                if isinstance(fcolor, collections.Callable):
-                    col = fcolor (m3, clist + cell_offsets [i])
+                if callable(fcolor):
+                    col = fcolor (m3, pclist + cell_offsets [i])
                 else :
-                    col = getc3 (fcolor, m3, clist + cell_offsets [i])
+                    col = getc3 (fcolor, m3, pclist + cell_offsets [i])
         new_results.append ( [nverts, xyzverts, col])
     # New loop to consolidate the return values
     nv_n = 0
@@ -731,7 +1250,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
     for i in range (len (new_results)) :
         nv_n = nv_n + len (new_results [i] [0])
         xyzv_n = xyzv_n + numpy.shape (new_results [i] [1]) [0]
-        if new_results [i] [2] != None :
+        if new_results [i] [2] is not None :
             col_n = col_n + len (new_results [i] [2])
     nverts = numpy.zeros (nv_n, numpy.int32)
     xyzverts = numpy.zeros ( (xyzv_n, 3), numpy.float32 )
@@ -747,7 +1266,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
         xyzv_n2 = numpy.shape (new_results [i] [1]) [0]
         nverts [nv_n1:nv_n1 + nv_n2] = new_results [i] [0]
         xyzverts [xyzv_n1:xyzv_n1 + xyzv_n2] = new_results [i] [1]
-        if new_results [i] [2] != None :
+        if new_results [i] [2] is not None :
             col_n2 = len (new_results [i] [2])
             col [col_n1:col_n1 + col_n2] = new_results [i] [2]
             col_n1 = col_n1 + col_n2
@@ -758,7 +1277,7 @@ def slice3 (m3, fslice, nverts, xyzverts, * args, ** kw) :
  # The iterator3 function combines three distinct operations:
  # (1) If only the M3 argument is given, return the initial
  #     chunk of the mesh.  The chunk will be no more than
- #     _chunk3_limit cells of the mesh.
+ #     chunk3_limit cells of the mesh.
  # (2) If only M3 and CHUNK are given, return the next CHUNK,
  #     or [] if there are no more chunks.
  # (3) If M3, CHUNK, and CLIST are all specified, return the
@@ -820,8 +1339,20 @@ def slice3mesh (xyz, * args, ** kw) :
     can both be nx by ny, in which case they represent a
     general quadrilateral mesh.
     color, if specified, is as above.
+
+    Like that of slice3, the result can be cached (see slice3_cache).
     '''
 
+    refs = []
+    key = _slice3_key ([xyz, args,
+       [(k, kw [k]) for k in sorted (kw)]], refs)
+    if key is not None :
+        key = ('slice3mesh', key)
+    return _slice3_cached (key, refs, _slice3mesh, xyz, * args, ** kw)
+
+def _slice3mesh (xyz, * args, ** kw) :
+    # slice3mesh, without the cache
+
     two_d = 0
     if 'smooth' in kw :
         smooth = kw ['smooth']
@@ -877,7 +1408,7 @@ def slice3mesh (xyz, * args, ** kw) :
         color = kw ['color']
     else :
         color = None
-    if color != None :
+    if color is not None :
 #     col = numpy.array (len (nverts), numpy.float32 )
         if numpy.shape (color) == (ncx - 1, ncy - 1) :
             col = color
@@ -966,9 +1497,40 @@ def iterator3 (m3 , chunk = None, clist = None) :
 
     return m3 [0] [3] (m3, chunk, clist)
 
-# biggest temporary is 3 doubles times this,
-# perhaps 4 or 5 doubles times this is most at one time
-_chunk3_limit = 10000
+# The chunks of a mesh are sized by chunk3_limit.  The biggest
+# temporary of slice3 is 3 doubles times the cells of a chunk, perhaps
+# 4 or 5 doubles times that is most at one time, which should fit in
+# _chunk3_bytes, about the size of a processor cache; below _chunk3_min
+# cells, a chunk spends more time in the python code of slice3 than in
+# numpy.  Set _chunk3_limit to a number of cells to use that instead.
+_chunk3_limit = None
+_chunk3_bytes = 1 << 22
+_chunk3_cell_bytes = 40
+_chunk3_min = 4096
+
+def chunk3_limit (dims = None) :
+
+    '''
+    chunk3_limit (dims = None)
+      Return the most cells in one chunk of a mesh whose cell dimensions
+      are DIMS, [ni, nj, nk] for a rectangular mesh, or of any mesh if
+      DIMS is None (see iterator3).  Unless _chunk3_limit is set, that
+      is as many cells as fit their slice3 temporaries in _chunk3_bytes,
+      but at least _chunk3_min; for a rectangular mesh, it is rounded
+      down to whole planes or rows of cells, so that iterator3_rect cuts
+      the mesh into chunks of about that size.
+    '''
+
+    if _chunk3_limit :
+        return _chunk3_limit
+    limit = max (_chunk3_bytes // _chunk3_cell_bytes, _chunk3_min)
+    if dims is not None :
+        plane = dims [1] * dims [2]
+        if limit >= plane :
+            limit = limit // plane * plane
+        elif limit >= dims [2] :
+            limit = limit // dims [2] * dims [2]
+    return limit
 
 def iterator3_rect (m3, chunk, clist) :
 
@@ -1005,24 +1567,23 @@ def iterator3_rect (m3, chunk, clist) :
 #  will see that the significance of the subscripts is reversed.
 #  This is because we do things in row-major order.
 
-    global _chunk3_limit
-
-    if chunk == None :
+    if chunk is None :
         dims = m3 [1] [0]      # [ni,nj,nk] cell dimensions
         [ni, nj, nk] = [dims [0], dims [1], dims [2]]
         njnk = nj * nk
-        if _chunk3_limit <= nk :
+        limit = chunk3_limit (dims)
+        if limit <= nk :
             # stuck with 1D chunks
-            ck = (nk - 1) / _chunk3_limit + 1
+            ck = (nk - 1) // limit + 1
             cj = ci = 0
-        elif _chunk3_limit <= njnk :
+        elif limit <= njnk :
             # 2D chunks
             ci = ck = 0
-            cj = (njnk - 1) / _chunk3_limit + 1
+            cj = (njnk - 1) // limit + 1
         else :
             # 3D chunks
             cj = ck = 0
-            ci = (njnk * ni - 1) / _chunk3_limit + 1
+            ci = (njnk * ni - 1) // limit + 1
         chunk = numpy.array ( [[ci == 0, cj == 0, ck == 0],
                          [not ci, nj * (ci != 0) + (ck != 0),
                           nk * ( (cj + ci) != 0)],
@@ -1032,10 +1593,13 @@ def iterator3_rect (m3, chunk, clist) :
         nj = chunk [3,1]
         nk = chunk [3,2]
         njnk = nj * nk
-        offsets = numpy.array ( [njnk, nj, 1], numpy.int32)
-        if clist != None :
-            # add offset for this chunk to clist and return
-            return numpy.sum (offsets * ( chunk [0] - 1),axis=0) + clist
+        if clist is not None :
+            # clist numbers the cells of the chunk, whose rows and planes
+            # are shorter than those of the mesh unless it is 3D
+            cells = numpy.unravel_index (clist, chunk [1] - chunk [0] + 1)
+            return numpy.ravel_multi_index ( (cells [0] + chunk [0, 0] - 1,
+               cells [1] + chunk [0, 1] - 1, cells [2] + chunk [0, 2] - 1),
+               (ni, nj, nk)).astype (numpy.int32)
 
     # increment to next chunk
     xi = chunk [1, 0]
@@ -1054,8 +1618,8 @@ def iterator3_rect (m3, chunk, clist) :
                 xj = xj + 1
             xk = 0
         ck = xk + 1
-        step = ck / np
-        frst = ck % np     # first frst steps are step+1
+        step = nk // np
+        frst = nk % np     # first frst steps are step+1
         if (xk < (step + 1) * frst) : step = step + 1
         xk = xk + step
         chunk [0] = numpy.array ( [xi, xj, ck])
@@ -1068,7 +1632,7 @@ def iterator3_rect (m3, chunk, clist) :
                 xi = xi + 1
                 xj = 0
             cj = xj + 1
-            step = nj / np
+            step = nj // np
             frst = nj % np    # first frst steps are step+1
             if (xj < (step + 1) * frst) : step = step + 1
             xj = xj + step
@@ -1078,7 +1642,7 @@ def iterator3_rect (m3, chunk, clist) :
             if xi == ni : return None
             ci = xi + 1
             np = chunk [2, 0]
-            step = ni / np
+            step = ni // np
             frst = ni % np    # first frst steps are step+1
             if (xi < (step + 1) * frst) : step = step + 1
             xi = xi + step
@@ -1128,33 +1692,32 @@ def iterator3_irreg (m3, chunk, clist) :
     the second gives a list of corresponding cell numbers.
     '''
 
-    global _chunk3_limit
-
-    if clist != None:
+    if clist is not None:
         return clist
 
     dims = m3 [1] [0]     # ncells by _no_verts array of subscripts
                           # (or a list of from one to four of same)
 
+    limit = chunk3_limit ( )
     if type (dims) != list :
-        if chunk == None:     # get the first chunk
-            return [ [0, min (numpy.shape (dims) [0], _chunk3_limit)],
-                     numpy.arange (0, min (numpy.shape (dims) [0], _chunk3_limit),
+        if chunk is None:     # get the first chunk
+            return [ [0, min (numpy.shape (dims) [0], limit)],
+                     numpy.arange (0, min (numpy.shape (dims) [0], limit),
                      dtype = numpy.int32)]
         else :                # iterate to next chunk
             start = chunk [0] [1]
             if start >= numpy.shape(dims) [0] :
                 return None
             else :
-                return [ [start, min (numpy.shape (dims) [0], start + _chunk3_limit)],
+                return [ [start, min (numpy.shape (dims) [0], start + limit)],
                          numpy.arange (start, min (numpy.shape (dims) [0],
-                                                   start + _chunk3_limit),
+                                                   start + limit),
                          dtype = numpy.int32)]
     else :
         totals = m3 [1] [3] # cumulative totals of numbers of cells
-        if chunk == None :
-            return [ [0, min (totals [0], _chunk3_limit)],
-                     numpy.arange (0, min (totals [0], _chunk3_limit),
+        if chunk is None :
+            return [ [0, min (totals [0], limit)],
+                     numpy.arange (0, min (totals [0], limit),
                      dtype = numpy.int32)]
         else :                # iterate to next chunk
             start = chunk [0] [1]
@@ -1164,9 +1727,9 @@ def iterator3_irreg (m3, chunk, clist) :
                 for i in range (len (totals)) :
                     if start < totals [i] :
                         break
-                return [ [start, min (totals [i], start + _chunk3_limit)],
+                return [ [start, min (totals [i], start + limit)],
                          numpy.arange (start,
-                            min (totals [i], start + _chunk3_limit),
+                            min (totals [i], start + limit),
                             dtype = numpy.int32)]
 
 
@@ -1356,10 +1919,13 @@ def getc3_rect (i, m3, chunk, l, u, fsl, fsu, cells) :
             return fi [i - 1] [c [0, 0] - 1:1 + c [1, 0],
                                c [0, 1] - 1:1 + c [1, 1] ,
                                c [0, 2] - 1:1 + c [1, 2]]
+        elif l is None :
+            return numpy.take (numpy.ravel (fi [i - 1]), chunk,axis=0)
         else :
-            [k, l. m] = dims
-            return numpy.reshape (numpy.take (numpy.ravel (fi [i - 1]), chunk,axis=0),
-               (len (chunk), k, l, m))
+            # the value in the cell of each vertex of each poly
+            corners = numpy.take (numpy.ravel (fi [i - 1]),
+               numpy.take (chunk, l // 8,axis=0),axis=0)
+            return numpy.bincount (cells, corners) / numpy.bincount (cells)
     else :
         # it is vertex-centered, so we take averages to get cell quantity
         if len (numpy.shape (chunk)) != 1 :
@@ -1376,7 +1942,7 @@ def getc3_rect (i, m3, chunk, l, u, fsl, fsu, cells) :
             no_cells = numpy.shape (indices) [0]
             indices = numpy.ravel (indices)
             corners = numpy.take (numpy.ravel (fi [i - 1]), indices,axis=0)
-            if l == None :
+            if l is None :
                 return 0.125 * numpy.sum (numpy.transpose (numpy.reshape (corners, (no_cells, 8))),axis=0)
             else :
                 # interpolate corner values to get edge values
@@ -1463,7 +2029,7 @@ def getc3_irreg (i, m3, chunk, l, u, fsl, fsu, cells) :
     no_cells = shp [0]
     indices = numpy.ravel (indices)
     corners = numpy.take (fi [i - 1], indices,axis=0)
-    if l == None :
+    if l is None :
         return (1. / shp [1]) * numpy.transpose ((numpy.sum (numpy.transpose (numpy.reshape (corners,
            (no_cells, shp [1]))) [0:shp [1]],axis=0)))
     else :
@@ -1612,7 +2178,7 @@ def plzcont (nverts, xyzverts, contours = 8, scale = 'lin', clear = 1,
       If CLEAR = 1, clear the display list first.
       If EDGES = 1, plot the edges.
       The algorithm is to apply slice2x repeatedly to the surface.
-      If color == None, then bytscl the palette into N + 1 colors
+      If color is None, then bytscl the palette into N + 1 colors
       and send each of the slices to pl3tree with the appropriate color.
       If color == 'bg', will plot only the edges.
       If CMIN is given, use it instead of the minimum z actually
@@ -1632,13 +2198,13 @@ def plzcont (nverts, xyzverts, contours = 8, scale = 'lin', clear = 1,
     # 1. Get contour colors
     if type (contours) == int :
         n = contours
-        if cmin != None :
+        if cmin is not None :
             vcmin = cmin
             minz = min (xyzverts [:, 2])
         else :
             vcmin = min (xyzverts [:, 2])
             minz = vcmin
-        if cmax != None :
+        if cmax is not None :
             vcmax = cmax
             maxz = max (xyzverts [:, 2])
         else :
@@ -1689,14 +2255,14 @@ def plzcont (nverts, xyzverts, contours = 8, scale = 'lin', clear = 1,
             imax = n
     # now make sure that the minimum and maximum contour levels computed
     # are not outside the axis limits.
-    if zaxis_min != None and zaxis_min > vc [imin] :
+    if zaxis_min is not None and zaxis_min > vc [imin] :
         for i in range (imin, imax) :
             if i + 1 < imax and zaxis_min > vc [i + 1] :
                 imin = i + 1
             else :
                 break
         vc [imin] = zaxis_min
-    if zaxis_max != None and zaxis_max < vc [imax - 1] :
+    if zaxis_max is not None and zaxis_max < vc [imax - 1] :
         for i in range (imax - imin) :
             if imax - 2 >= imin and zaxis_max < vc [imax - 2] :
                 imax = imax - 1
@@ -1706,19 +2272,19 @@ def plzcont (nverts, xyzverts, contours = 8, scale = 'lin', clear = 1,
     for i in range (imin, imax) :
         [nv, xyzv, d1, nvb, xyzvb, d2] = \
            slice2x (numpy.array ( [0., 0., 1., vc [i]], numpy.float32) , nv, xyzv, None)
-        if i == imin and zaxis_min != None and zaxis_min == vc [i]:
+        if i == imin and zaxis_min is not None and zaxis_min == vc [i]:
             # Don't send the 'back' surface if it's below zaxis_min.
             continue
         else:
-            if color == None :
+            if color is None :
                 pl3tree (nvb, xyzvb, (numpy.ones (len (nvb)) * colors [i]).astype (numpy.uint8),
                    split = 0, edges = edges)
             else :
                 # N. B. Force edges to be on, otherwise the graph is empty.
                 pl3tree (nvb, xyzvb, 'bg', split = 0, edges = 1)
-    if zaxis_max == None or vc [imax - 1] < zaxis_max:
+    if zaxis_max is None or vc [imax - 1] < zaxis_max:
         # send 'front' surface if it's not beyond zaxis_max
-        if color == None :
+        if color is None :
             pl3tree (nv, xyzv, (numpy.ones (len (nv)) * colors [i]).astype (numpy.uint8),
                split = 0, edges = edges)
         else :
@@ -1747,7 +2313,7 @@ def pl4cont (nverts, xyzverts, values, contours = 8, scale = 'lin', clear = 1,
       If CLEAR == 1, clear the display list first.
       If EDGES == 1, plot the edges.
       The algorithm is to apply slice2x repeatedly to the surface.
-      If color == None, then bytscl the palette into N + 1 colors
+      If color is None, then bytscl the palette into N + 1 colors
       and send each of the slices to pl3tree with the appropriate color.
       If color == 'bg', will plot only the edges.
       If CMIN is given, use it instead of the minimum c actually
@@ -1767,13 +2333,13 @@ def pl4cont (nverts, xyzverts, values, contours = 8, scale = 'lin', clear = 1,
     # 1. Get contour colors
     if type (contours) == int :
         n = contours
-        if cmin != None :
+        if cmin is not None :
             vcmin = cmin
             minz = min (values)
         else :
             vcmin = min (values)
             minz = vcmin
-        if cmax != None :
+        if cmax is not None :
             vcmax = cmax
             maxz = max (values)
         else :
@@ -1825,14 +2391,14 @@ def pl4cont (nverts, xyzverts, values, contours = 8, scale = 'lin', clear = 1,
             imax = n
     # now make sure that the minimum and maximum contour levels computed
     # are not outside the axis limits.
-    if caxis_min != None and caxis_min > vc [imin] :
+    if caxis_min is not None and caxis_min > vc [imin] :
         for i in range (imin, imax) :
             if i + 1 < imax and caxis_min > vc [i + 1] :
                 imin = i + 1
             else :
                 break
         vc [imin] = caxis_min
-    if caxis_max != None and caxis_max < vc [imax - 1] :
+    if caxis_max is not None and caxis_max < vc [imax - 1] :
         for i in range (imax - imin) :
             if imax - 2 >= imin and caxis_max < vc [imax - 2] :
                 imax = imax - 1
@@ -1846,19 +2412,19 @@ def pl4cont (nverts, xyzverts, values, contours = 8, scale = 'lin', clear = 1,
             break
         [nv, xyzv, vals, nvb, xyzvb, d2] = \
            slice2x (vc [i], nv, xyzv, vals)
-        if i == imin and caxis_min != None and caxis_min == vc [i]:
+        if i == imin and caxis_min is not None and caxis_min == vc [i]:
             # Don't send the 'back' surface if it's below caxis_min.
             continue
         else:
-            if color == None :
+            if color is None :
                 pl3tree (nvb, xyzvb, (numpy.ones (len (nvb)) * colors [i]).astype (numpy.uint8),
                    split = 0, edges = edges)
             else :
                 # N. B. Force edges to be on, otherwise the graph is empty.
                 pl3tree (nvb, xyzvb, 'bg', split = 0, edges = 1)
-    if caxis_max == None or vc [imax - 1] < caxis_max:
+    if caxis_max is None or vc [imax - 1] < caxis_max:
         # send 'front' surface if it's not beyond caxis_max
-        if color == None :
+        if color is None :
             pl3tree (nv, xyzv, (numpy.ones (len (nv)) * colors [i]).astype (numpy.uint8),
                split = 0, edges = edges)
         else :
@@ -1903,6 +2469,34 @@ def slice2x (plane, nverts, xyzverts, values = None) :
 class _Pl3surfError(Exception):
   pass
 
+def _pl3surf_project (xyzverts, nverts, shade, view = None) :
+    ## Scale xyzverts to avoid loss of accuracy
+    xyzverts = numpy.asarray (xyzverts)
+    lim = [numpy.min (xyzverts, axis = 0), numpy.max (xyzverts, axis = 0)]
+    return get3_project (xyzverts, nverts, shade, lim, view = view)
+
+def _pl3surf_order (xyztmp, zcen, nverts, sort) :
+    # polygon order, back to front, and the x and y of the vertices;
+    # SORT is the DepthSort of the display list entry (see get3_kept_)
+    [lst, vlist] = sort.by_centroid (zcen, nverts)
+    return [lst, numpy.take (xyztmp [:, 0], vlist,axis=0),
+            numpy.take (xyztmp [:, 1], vlist,axis=0)]
+
+def _pl3surf_prepare (lst, view) :
+    # what pl3surf (lst) gets from get3_cached when drawn with VIEW,
+    # computed by spin3 ahead of time (see set3_prepare); the frames
+    # ahead follow one another too, so they have a DepthSort of their own
+    nverts = lst [0]
+    shade = lst [2] is None
+    key = view3_key_ (view)
+    proj = _pl3surf_project (lst [1], nverts, shade, view)
+    order = _pl3surf_order (proj [0], proj [1], nverts,
+                            get3_kept_ ('ahead sort', DepthSort, lst))
+    if shade :
+        return [['project', (key, light3_key_ (view)), proj],
+                ['order', key, order]]
+    return [['project', key, proj], ['order', key, order]]
+
 def pl3surf(nverts, xyzverts = None, values = None, cmin = None, cmax = None,
             lim = None, edges = 0) :
     '''
@@ -1926,35 +2520,26 @@ def pl3surf(nverts, xyzverts = None, values = None, cmin = None, cmax = None,
     if type (nverts) == list :
         lst = nverts
         nverts = lst [0]
-        xyzverts = numpy.array (lst [1], copy = 1)
         values = lst [2]
         cmin = lst [3]
         cmax = lst [4]
         edges = lst [6]
-        ## Scale xyzverts to avoid loss of accuracy
-        minx = min (xyzverts [:, 0])
-        maxx = max (xyzverts [:, 0])
-        miny = min (xyzverts [:, 1])
-        maxy = max (xyzverts [:, 1])
-        minz = min (xyzverts [:, 2])
-        maxz = max (xyzverts [:, 2])
-        xyzverts [:, 0] = (xyzverts [:, 0] - minx) / (maxx - minx)
-        xyzverts [:, 1] = (xyzverts [:, 1] - miny) / (maxy - miny)
-        xyzverts [:, 2] = (xyzverts [:, 2] - minz) / (maxz - minz)
-        xyztmp = get3_xy (xyzverts, 1)
-        x = xyztmp [:, 0]
-        y = xyztmp [:, 1]
-        z = xyztmp [:, 2]
-        if values == None :
-#        xyzverts [:, 0] = x
-#        xyzverts [:, 1] = y
-#        xyzverts [:, 2] = z
-            values = get3_light (xyztmp, nverts)
-        [lst, vlist] = sort3d (z, nverts)
-        nverts = numpy.take (nverts, lst,axis=0)
-        values = numpy.take (values, lst,axis=0)
-        x = numpy.take (x, vlist,axis=0)
-        y = numpy.take (y, vlist,axis=0)
+        # the projection and depth order change only with the view, the
+        # shading also with light3: draw3 keeps them between redraws
+        view = view3_key_ ( )
+        shade = values is None
+        key = view
+        if shade :
+            key = (view, light3_key_ ( ))
+        [xyztmp, zcen, light] = get3_cached ('project', key,
+            lambda : _pl3surf_project (lst [1], nverts, shade))
+        if shade :
+            values = light
+        [order, x, y] = get3_cached ('order', view,
+            lambda : _pl3surf_order (xyztmp, zcen, nverts,
+                                     get3_kept_ ('sort', DepthSort)))
+        nverts = numpy.take (nverts, order,axis=0)
+        values = numpy.take (values, order,axis=0)
         _square = get_square_ ( )
         [_xfactor, _yfactor] = get_factors_ ()
         xmax = max (x)
@@ -1995,10 +2580,10 @@ def pl3surf(nverts, xyzverts = None, values = None, cmin = None, cmax = None,
         print(numpy.shape (xyzverts) [0])
         print(numpy.sum (nverts,axis=0))
         raise _Pl3surfError('illegal or inconsistent polygon list')
-    if values != None and len (values) != len (nverts) :
+    if values is not None and len (values) != len (nverts) :
         raise _Pl3surfError('illegal or inconsistent polygon color values')
 
-    if values != None :
+    if values is not None :
         values = numpy.array (values, numpy.float32 )
 
     clear3 ( )
@@ -2013,6 +2598,8 @@ def pl3surf(nverts, xyzverts = None, values = None, cmin = None, cmax = None,
         return None
 
 
+set3_prepare (pl3surf, _pl3surf_prepare)
+
 # ------------------------------------------------------------------------
 
 class _Pl3treeError(Exception):
@@ -2094,9 +2681,9 @@ def pl3tree (nverts, xyzverts = None, values = None, plane = None,
     xyzverts = numpy.array (xyzverts, numpy.float32 )
     if values == 'background' :
         values = 'bg'
-    elif values != None and values != 'bg' :
+    elif values is not None and values != 'bg' :
         values = numpy.array (values, values.dtype)
-    if plane != None :
+    if plane is not None :
         plane = plane.astype (numpy.float32)
 
     if numpy.shape(xyzverts)[0] != numpy.sum(nverts,axis=0) or numpy.sum(numpy.less (nverts, 3),axis=0) > 0 or \
@@ -2120,7 +2707,7 @@ def pl3tree (nverts, xyzverts = None, values = None, plane = None,
         array_set (lst, numpy.cumsum (nverts,axis=0) [0:-1], numpy.ones (len (nverts), numpy.int32))
         tpc = values.dtype
         values = (numpy.bincount (numpy.cumsum (lst,axis=0), values) / nverts).astype (tpc)
-    if plane != None :
+    if plane is not None :
         if (len (numpy.shape (plane)) != 1 or numpy.shape (plane) [0] != 4) :
             raise _Pl3treeError('illegal plane format, try plane3 function')
 
@@ -2601,9 +3188,9 @@ def _pl3tree (tree, minmax) :
     #   back_tree= tree [1]    is the part behind plane
     #   inplane_leaf= tree [2] is the part in the plane itself
     #   front_tree= tree [3]   is the part in front of plane
-    if tree == None or tree == [] :
+    if tree is None or tree == [] :
         return None
-    if tree [0] == None or tree [0] == [] :
+    if tree [0] is None or tree [0] == [] :
         # only the leaf is non-nil (but not a plane)
         return _pl3leaf ( tree [2], 1, minmax)
 
@@ -2622,33 +3209,33 @@ def _pl3tree (tree, minmax) :
         q1 = _pl3tree (tree [3], minmax)
         q2 = _pl3leaf (tree [2], 0, minmax)
         q3 = _pl3tree (tree [1], minmax)
-    if q1 != None :
-        if q2 != None and q3 == None :
+    if q1 is not None :
+        if q2 is not None and q3 is None :
             return [min (q2 [0], q1 [0]),
                     max (q2 [1], q1 [1]),
                     min (q2 [2], q1 [2]),
                     max (q2 [3], q1 [3])]
-        elif q2 == None and q3 != None :
+        elif q2 is None and q3 is not None :
             return [min (q3 [0], q1 [0]),
                     max (q3 [1], q1 [1]),
                     min (q3 [2], q1 [2]),
                     max (q3 [3], q1 [3])]
-        elif q2 != None and q3 != None :
+        elif q2 is not None and q3 is not None :
             return [min (q3 [0], q2 [0], q1 [0]),
                     max (q3 [1], q2 [1], q1 [1]),
                     min (q3 [2], q2 [2], q1 [2]),
                     max (q3 [3], q2 [3], q1 [3])]
         else :
             return q1
-    elif q2 != None :
-        if q3 == None :
+    elif q2 is not None :
+        if q3 is None :
             return q2
         else :
             return [min (q2 [0], q3 [0]),
                     max (q2 [1], q3 [1]),
                     min (q2 [2], q3 [2]),
                     max (q2 [3], q3 [3])]
-    elif q3 != None :
+    elif q3 is not None :
         return q3
     else :
         return None
@@ -2699,7 +3286,9 @@ def _pl3leaf (leaf, not_plane, minmax) :
 
     # sort the single polygon list
     if not_plane :
-        [_list, _vlist] = sort3d (_z, _nverts)
+        # each leaf of the tree keeps its own depth order
+        sort = get3_kept_ (('sort', id (leaf)), DepthSort)
+        [_list, _vlist] = sort (_z, _nverts)
         _nverts = numpy.take (_nverts, _list,axis=0)
         if _values != 'bg' :
             _values = numpy.take (_values, _list,axis=0)
@@ -2770,7 +3359,7 @@ def _pl3tree_accum (item, not_plane, _x, _y, _z, _list, _vlist, _values,
     # when one coordinate is insignificant with
     # respect to the others and doesn't have significant digits.
     # It is awfully hard to come up with a numerical criterion for this.)
-    if item [2] == None or not_plane or has_multiple_components ():
+    if item [2] is None or not_plane or has_multiple_components ():
         minx = minmax [0]
         maxx = minmax [1]
         miny = minmax [2]
@@ -2780,20 +3369,18 @@ def _pl3tree_accum (item, not_plane, _x, _y, _z, _list, _vlist, _values,
         _xyzverts [:, 0] = (_xyzverts [:, 0] - minx) / (maxx - minx)
         _xyzverts [:, 1] = (_xyzverts [:, 1] - miny) / (maxy - miny)
         _xyzverts [:, 2] = (_xyzverts [:, 2] - minz) / (maxz - minz)
-    if  item [2] == None :
+    if  item [2] is None :
         # this is an isosurface to be shaded (no values specified)
-        _xyzverts = get3_xy (_xyzverts, 1)
+        [_xyzverts, zcen, light] = get3_project (_xyzverts, item [0])
         # accumulate nverts and values
         incr = len (item [0])
         _nverts [ _list - 1: _list - 1 + incr] = item [0]
         if item [5] != 0 :
             _values [ _list - 1: _list - 1 + incr] = split_bytscl (
-               get3_light (_xyzverts, item [0]), 1, cmin = 0.0,
-               cmax = item [4]).astype (numpy.uint8)
+               light, 1, cmin = 0.0, cmax = item [4]).astype (numpy.uint8)
         else : # no split
             _values [ _list - 1: _list - 1 + incr] = bytscl (
-               get3_light (_xyzverts, item [0]), cmin = 0.0,
-               cmax = item [4]).astype (numpy.uint8)
+               light, cmin = 0.0, cmax = item [4]).astype (numpy.uint8)
         _list = _list + incr
         # accumulate x, y, and z
         incr = numpy.shape (_xyzverts) [0]
@@ -2833,22 +3420,22 @@ def _pl3tree_accum (item, not_plane, _x, _y, _z, _list, _vlist, _values,
     return [_list, _vlist, item [6]]
 
 def _pl3tree_add (leaf, plane, tree) :
-    if tree != None and tree != [] and \
-       not is_scalar (tree) and tree [0] != None :
+    if tree is not None and tree != [] and \
+       not is_scalar (tree) and tree [0] is not None :
         # tree has slicing plane, slice new leaf or plane and descend
         [back, leaf1] = _pl3tree_slice (tree [0], leaf)
         if back :
-            if len (tree) >= 2 and tree [1] != None and tree [1] != [] :
+            if len (tree) >= 2 and tree [1] is not None and tree [1] != [] :
                 _pl3tree_add (back, plane, tree [1])
             else :
                 tree [1] = [None, [], back, []]
         if (leaf1) :
-            if len (tree) >= 4 and tree [3] != None and tree [3] != [] :
+            if len (tree) >= 4 and tree [3] is not None and tree [3] != [] :
                 _pl3tree_add (leaf1, plane, tree [3])
             else :
                 tree [3] = [None, [], leaf1, []]
 
-    elif plane != None :
+    elif plane is not None :
         # tree is just a leaf, but this leaf has slicing plane
         tree [0] = plane
         tmp = tree [2]
@@ -2869,17 +3456,17 @@ def _pl3tree_slice (plane, leaf) :
     for ll in leaf :
         # each item in the leaf list is itself a list
         nvf = ll [0]
-        if nvf != None :
+        if nvf is not None :
             nvb = numpy.array (nvf, copy = 1)
         else :
             nvb = None
         xyzf = ll [1]
-        if xyzf != None :
+        if xyzf is not None :
             xyzb = numpy.array (xyzf, copy = 1)
         else :
             xyzb = None
         valf = ll [2]
-        if valf != None :
+        if valf is not None :
             tpc = valf.dtype.char
             valb = numpy.array (valf, copy = 1)
         else :
@@ -2898,17 +3485,17 @@ def _pl3tree_slice (plane, leaf) :
             ll6 = 0
         [nvf, xyzf, valf, nvb, xyzb, valb] = \
            slice2x (plane, nvf, xyzf, valf)
-        if valf != None:
+        if valf is not None:
             valf = valf.astype (tpc)
-        if valb != None:
+        if valb is not None:
             valb = valb.astype (tpc)
-        if nvf != None :
-            if frnt != None :
+        if nvf is not None :
+            if frnt is not None :
                 frnt = [ [nvf, xyzf, valf, ll [3], ll4, ll5, ll6]] + frnt
             else :
                 frnt = [ [nvf, xyzf, valf, ll [3], ll4, ll5, ll6]]
-        if nvb != None :
-            if back != None :
+        if nvb is not None :
+            if back is not None :
                 back = [ [nvb, xyzb, valb, ll [3], ll4, ll5, ll6]] + back
             else :
                 back = [ [nvb, xyzb, valb, ll [3], ll4, ll5, ll6]]
@@ -2922,7 +3509,7 @@ def pl3tree_prt () :
     _draw3_n = get_draw3_n_ ()
     if len (_draw3_list) >= _draw3_n :
         tree = _draw3_list [_draw3_n:]
-        if tree == None or tree == [] or tree [0] != pl3tree :
+        if tree is None or tree == [] or tree [0] != pl3tree :
             print('<current 3D display not a pl3tree>')
 #        raise _Pl3tree_prtError, '<current 3D display not a pl3tree>'
         else :
@@ -2930,16 +3517,16 @@ def pl3tree_prt () :
             _pl3tree_prt (tree, 0)
 
 def pl3_other_prt(tree = None):
-    if tree == None:
+    if tree is None:
         pl3tree_prt ()
     else :
-        if tree == None or tree == []:
+        if tree is None or tree == []:
             print('<current 3D display not a pl3tree>')
         else :
             _pl3tree_prt (tree, 0)
 
 def _pl3tree_prt (tree, depth) :
-    if tree == None or tree == [] :
+    if tree is None or tree == [] :
         return
     indent = (' ' * (1 + 2 * depth)) [0:-1]
     print((indent + '+DEPTH= ' + repr(depth)))
@@ -2949,7 +3536,7 @@ def _pl3tree_prt (tree, depth) :
     back = tree [1]
     lst = tree [2]
     frnt = tree [3]
-    if back == None or back == [] :
+    if back is None or back == [] :
         print((indent + 'back = []'))
     else :
         _pl3tree_prt (back, depth + 1)
@@ -2961,7 +3548,7 @@ def _pl3tree_prt (tree, depth) :
         print((indent + 'nverts= ' + repr(numpy.shape (leaf [1]) [0]) + \
            ', nvals= ' + repr(len (leaf [2]))))
 
-    if frnt == None or frnt == [] :
+    if frnt is None or frnt == [] :
         print((indent + 'frnt = []'))
     else :
         _pl3tree_prt (frnt, depth + 1)
@@ -2988,6 +3575,17 @@ def _plane_slicer (m3, chunk, normal, projection) :
     # (ZCM 2/24/97) In all cases, return x as the last element of
     # the tuple. This eliminates the global _xyz3.
 
+    if m3 [0] [0] == xyz3_unif and isinstance (chunk, numpy.ndarray) \
+       and chunk.ndim == 2 :
+        # the coordinates of the chunk as x, y and z vectors which
+        # broadcast against each other, never making a full array
+        axes = _slice3_axes (m3)
+        c = chunk
+        x = [axes [d] [c [0, d] - 1:1 + c [1, d]] for d in range (3)]
+        x = [x [0] [:, numpy.newaxis, numpy.newaxis],
+             x [1] [:, numpy.newaxis], x [2]]
+        return [x [0] * normal [0] + x [1] * normal [1] + \
+           x [2] * normal [2] - projection, x]
     x = xyz3(m3,chunk)
     irregular = type (chunk) == list and len (chunk) == 2 \
        or type (chunk) == numpy.ndarray and len (numpy.shape (chunk)) == 1 \
@@ -3156,75 +3754,37 @@ def xyz3_irreg (m3, chunk) :
     return retval
 
 def xyz3_unif (m3, chunk) :
-    m3 = m3 [1]
-    n = m3 [1]
+    [xx, yy, zz] = _slice3_axes (m3)
     if len (chunk.shape) != 1 :
         c = chunk
-        i = c [0] - 1
-        dn = c [1] + 1 - i
-        xyz = numpy.zeros ( (3, dn [0], dn [1], dn [2]), numpy.float32)
+        # The difference here is that our arrays are 0-based, while
+        # yorick's are 1-based; and the last element in a range is not
+        # included in the result array.
+        xx = xx [c [0, 0] - 1:1 + c [1, 0]]
+        yy = yy [c [0, 1] - 1:1 + c [1, 1]]
+        zz = zz [c [0, 2] - 1:1 + c [1, 2]]
+        xyz = numpy.zeros ( (3, len (xx), len (yy), len (zz)), numpy.float32)
+        xyz [0] = xx [:, numpy.newaxis, numpy.newaxis]
+        xyz [1] = yy [:, numpy.newaxis]
+        xyz [2] = zz
     else :
-        dims = m3 [0]
-        nj = dims [1]
-        nk = dims [2]
-        njnk = nj * nk
-        zchunk = chunk % nk
-        ychunk = chunk / nk % nj
-        xchunk = chunk / njnk
-        xyz = numpy.zeros ( (len (chunk), 3, 2, 2, 2), numpy.float32 )
-        ijk0 = numpy.array ( [numpy.zeros ( (2, 2), numpy.int32 ), numpy.ones ( (2, 2), numpy.int32 )])
-        ijk1 = numpy.array ( [ [0, 0], [1, 1]], numpy.int32 )
-        ijk1 = numpy.array ( [ijk1, ijk1] , numpy.int32 )
-        ijk2 = numpy.array ( [ [0, 1], [0, 1]], numpy.int32 )
-        ijk2 = numpy.array ( [ijk2, ijk2] , numpy.int32 )
-    if len (n) == 2: # we have dxdydz and x0y0z0
-        dxdydz = n [0]
-        x0y0z0 = n [1]
-        if len (numpy.shape (chunk)) != 1:
-            # Convert the increment and size into array coordinates
-            # -- consecutive values
-            xx = numpy.arange (dn [0], dtype = numpy.float32 ) * dxdydz [0] / (dn [0] - 1)
-            yy = numpy.arange (dn [1], dtype = numpy.float32 ) * dxdydz [1] / (dn [1] - 1)
-            zz = numpy.arange (dn [2], dtype = numpy.float32 ) * dxdydz [2] / (dn [2] - 1)
-            xyz [0] = x0y0z0 [0] + i [0] * dxdydz [0] + numpy.multiply.outer (
-               numpy.multiply.outer ( xx, numpy.ones (dn [1], numpy.float32 )),
-               numpy.ones (dn [2], numpy.float32 ))
-            xyz [1] = x0y0z0 [1] + i [1] * dxdydz [0] + \
-               numpy.multiply.outer ( numpy.ones (dn [0], numpy.float32 ), \
-               numpy.multiply.outer ( yy, numpy.ones (dn [2], numpy.float32 )))
-            xyz [2] = x0y0z0 [2] + i [2] * dxdydz [0] + \
-               numpy.multiply.outer ( numpy.ones (dn [0], numpy.float32 ), \
-               numpy.multiply.outer ( numpy.ones (dn [1], numpy.float32 ), zz))
-        else :
-            # -- nonconsecutive values
-            xyz [:, 0] = numpy.add.outer ( xchunk, ijk0) * dxdydz [0] + x0y0z0 [0]
-            xyz [:, 1] = numpy.add.outer ( ychunk, ijk1) * dxdydz [1] + x0y0z0 [1]
-            xyz [:, 2] = numpy.add.outer ( zchunk, ijk2) * dxdydz [2] + x0y0z0 [2]
-    elif type (n) == list and len (n) == 3: # We have three one-dimensional arrays.
-        xx = n [0]
-        yy = n [1]
-        zz = n [2]
-        n0 = len (xx)
-        n1 = len (yy)
-        n2 = len (zz)
-        if len (numpy.shape (chunk)) != 1:
-            # Convert the increment and size into array coordinates
-            # -- consecutive values
-            xyz [0] = numpy.multiply.outer (
-               numpy.multiply.outer ( xx [i [0]:i [0] + n0],  numpy.ones (n1, numpy.float32 )), \
-               numpy.ones (n2, numpy.float32 ))
-            xyz [1] =  numpy.multiply.outer ( numpy.ones (n0, numpy.float32 ), \
-               numpy.multiply.outer ( yy [i [1]: i[1] + n1], numpy.ones (n2, numpy.float32 )))
-            xyz [2] = numpy.multiply.outer ( numpy.ones (n0, numpy.float32 ), \
-               numpy.multiply.outer ( numpy.ones (n1, numpy.float32 ), zz [i [2]: i[2] + n2]))
-        else :
-            # -- nonconsecutive values
-            xyz [:, 0] = numpy.reshape (numpy.take (xx, numpy.ravel (numpy.add.outer (xchunk, ijk0)),axis=0),
-               (len (chunk),  2, 2, 2))
-            xyz [:, 1] = numpy.reshape (numpy.take (yy, numpy.ravel (numpy.add.outer (ychunk, ijk1)),axis=0),
-               (len (chunk),  2, 2, 2))
-            xyz [:, 2] = numpy.reshape (numpy.take (zz, numpy.ravel (numpy.add.outer (zchunk, ijk2)),axis=0),
-               (len (chunk),  2, 2, 2))
+        # -- nonconsecutive values
+        xyz = _xyz3_corners ( [xx, yy, zz],
+           numpy.unravel_index (chunk, m3 [1] [0]))
+    return xyz
+
+def _xyz3_corners (axes, cells) :
+    # the len (cells [0]) by 3 by 2 by 2 by 2 vertex coordinates of the
+    # CELLS [i, j, k] of a mesh whose x, y and z are the vectors AXES,
+    # x depending on the first index only, and so on
+    xyz = numpy.zeros ( (len (cells [0]), 3, 2, 2, 2), numpy.float32 )
+    ijk = numpy.array ( [0, 1])
+    xyz [:, 0] = numpy.take (numpy.ravel (axes [0]), numpy.add.outer (
+       cells [0], ijk), axis=0) [:, :, numpy.newaxis, numpy.newaxis]
+    xyz [:, 1] = numpy.take (numpy.ravel (axes [1]), numpy.add.outer (
+       cells [1], ijk), axis=0) [:, numpy.newaxis, :, numpy.newaxis]
+    xyz [:, 2] = numpy.take (numpy.ravel (axes [2]), numpy.add.outer (
+       cells [2], ijk), axis=0) [:, numpy.newaxis, numpy.newaxis, :]
     return xyz
 
 def to_corners3 (lst, nj, nk) :
@@ -3246,11 +3806,8 @@ def to_corners3 (lst, nj, nk) :
     '''
 
     njnk = nj * nk
-    kk = lst / (nk - 1)
-    lst = lst + kk + nk * (kk / (nj - 1))
+    kk = lst // (nk - 1)
+    lst = lst + kk + nk * (kk // (nj - 1))
     adder = numpy.array ( [ [ [0, 1], [nk, nk + 1]],
                       [ [njnk, njnk + 1], [nk + njnk, nk + njnk + 1]]])
-    res = numpy.zeros ( (len (lst), 2, 2, 2), numpy.int32)
-    for i in range (len(lst)):
-        res [i] = adder + lst [i]
-    return res
+    return numpy.add.outer (lst, adder).astype (numpy.int32)
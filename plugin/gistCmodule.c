@@ -99,6 +99,8 @@
 #include <math.h>
 #include <setjmp.h>
 #include <string.h>
+#include <unistd.h>
+#include <zlib.h>
 
 #include "gist.h"
 #include "xbasic.h"
@@ -111,6 +113,8 @@
 #include "draw.h"
 
 #include "plug-hlevel.h"
+#include "plug-raster.h"
+#include "plug-threads.h"
 #include "plug-internals.h"
 
 #if PY_MAJOR_VERSION >= 3
@@ -687,12 +691,209 @@ static void clearMemList(void)
   return;
 }
 
+/*************************************************************************/
+/*              Real (GpReal) argument ingestion                         */
+/*************************************************************************/
+
+/* The Gist plotters copy their non-mesh data (GdLines, GdDisjoint,     */
+/* GdFill, and the z/u/v/colors of GdContours, GdFillMesh, GdVectors)   */
+/* into the drawing element before returning, so the double arrays we  */
+/* hand them only need to live until the Gd call is done.  Contiguous  */
+/* double arrays are passed through untouched.  float32 and strided     */
+/* input -- NumPy arrays or any other buffer exporter -- is read in a   */
+/* single pass straight into a recycled scratch buffer, instead of      */
+/* having NumPy build a new converted array on every call.  Scratch     */
+/* buffers are handed out round robin; no primitive needs more than 4   */
+/* at once, so a buffer is never reused before its caller is finished. */
+
+#define SCRATCH_LIST_SIZE 8
+
+static double * scratchList[SCRATCH_LIST_SIZE];
+static npy_intp scratchSize[SCRATCH_LIST_SIZE];
+static int scratch_next = 0;
+
+/* Conversion accounting, switched on and read back with conv_stats(). */
+static int convTrack = 0;
+static long convCount = 0;
+static long long convBytes = 0;
+
+#define CONV_NOTE(nbytes) \
+  do{if(convTrack){convCount++;convBytes+=(long long)(nbytes);}} while(0)
+
+static double * getScratch(npy_intp n)
+{
+  int i = scratch_next;
+  double * p;
+
+  scratch_next = (scratch_next + 1) % SCRATCH_LIST_SIZE;
+
+  if (n < 1)
+    { n = 1; }
+
+  if (scratchSize[i] < n)
+    {
+      if (!(p = (double *)realloc(scratchList[i], n * sizeof(double))))
+        {
+          return (double *)PyErr_NoMemory();
+        }
+
+      scratchList[i] = p;
+      scratchSize[i] = n;
+    }
+
+  return scratchList[i];
+}
+
+/* Read an ndim float or double array with arbitrary (byte) strides */
+/* into a contiguous scratch double array.                          */
+static double * readStrided(char * src, int isfloat, int ndim,
+                            const npy_intp * shape, const npy_intp * strides)
+{
+  npy_intp idx[NPY_MAXDIMS];
+  npy_intp n, j, inner, istride;
+  double * out, *dst;
+  char * p;
+  int i;
+
+  for (n = 1, i = 0; i < ndim; i++)
+    {
+      n *= shape[i];
+      idx[i] = 0;
+    }
+
+  if (!(out = getScratch(n)))
+    { return 0; }
+
+  CONV_NOTE(n * sizeof(double));
+
+  if (n == 0)
+    { return out; }
+
+  inner = shape[ndim - 1];
+  istride = strides[ndim - 1];
+  dst = out;
+
+  for (;;)
+    {
+      for (p = src, i = 0; i < ndim - 1; i++)
+        { p += idx[i] * strides[i]; }
+
+      if (isfloat)
+        for (j = 0; j < inner; j++, p += istride)
+          { *dst++ = (double) * (float *)p; }
+
+      else
+        for (j = 0; j < inner; j++, p += istride)
+          { *dst++ = *(double *)p; }
+
+      for (i = ndim - 2; i >= 0; i--)
+        {
+          if (++idx[i] < shape[i])
+            { break; }
+
+          idx[i] = 0;
+        }
+
+      if (i < 0)
+        { break; }
+    }
+
+  return out;
+}
+
+/* Return a pointer to contiguous double data for OP, which must have */
+/* exactly ND dimensions (or at least one if ND is 0).  The shape is  */
+/* stored in DIMS (NPY_MAXDIMS long) and the total size in *SIZE.     */
+/* Anything that is not float32/float64 falls back on NumPy, and the  */
+/* resulting array goes on the ArrayList like GET_ARR.                */
+static double * getRealArray(PyObject * op, int nd, npy_intp * dims,
+                             long * size)
+{
+  PyArrayObject * ap;
+  Py_buffer view;
+  double * data = 0;
+  int i, ndim;
+
+  if (PyArray_Check(op))
+    {
+      ap = (PyArrayObject *) op;
+      ndim = PyArray_NDIM(ap);
+
+      if ((nd ? ndim == nd : ndim > 0) && PyArray_ISNOTSWAPPED(ap)
+          && PyArray_ISALIGNED(ap) && (PyArray_TYPE(ap) == NPY_DOUBLE
+                                       || PyArray_TYPE(ap) == NPY_FLOAT))
+        {
+          for (*size = 1, i = 0; i < ndim; i++)
+            { *size *= (dims[i] = PyArray_DIM(ap, i)); }
+
+          if (PyArray_TYPE(ap) == NPY_DOUBLE && PyArray_IS_C_CONTIGUOUS(ap))
+            { return (double *)PyArray_DATA(ap); }
+
+          return readStrided(PyArray_BYTES(ap),
+                             PyArray_TYPE(ap) == NPY_FLOAT, ndim,
+                             PyArray_DIMS(ap), PyArray_STRIDES(ap));
+        }
+    }
+
+  else if (PyObject_CheckBuffer(op))
+    {
+      if (PyObject_GetBuffer(op, &view, PyBUF_STRIDES | PyBUF_FORMAT) == 0)
+        {
+          char * fmt = view.format ? view.format : "B";
+
+          if (*fmt == '@' || *fmt == '=')
+            { fmt++; }
+
+          ndim = view.ndim;
+
+          if ((nd ? ndim == nd : ndim > 0) && !fmt[1]
+              && (*fmt == 'd' || *fmt == 'f'))
+            {
+              for (*size = 1, i = 0; i < ndim; i++)
+                { *size *= (dims[i] = view.shape[i]); }
+
+              data = readStrided((char *)view.buf, *fmt == 'f', ndim,
+                                 view.shape, view.strides);
+              PyBuffer_Release(&view);
+              return data;
+            }
+
+          PyBuffer_Release(&view);
+        }
+
+      else
+        { PyErr_Clear(); }
+    }
+
+  ap = (PyArrayObject *) PyArray_ContiguousFromObject(op, NPY_DOUBLE,
+       nd ? nd : 1, nd);
+
+  if (!addToArrayList((PyObject *) ap))
+    {
+      Py_XDECREF(ap);
+      return 0;
+    }
+
+  if ((PyObject *) ap != op)
+    { CONV_NOTE(PyArray_NBYTES(ap)); }
+
+  for (*size = 1, i = 0; i < PyArray_NDIM(ap); i++)
+    { *size *= (dims[i] = PyArray_DIM(ap, i)); }
+
+  return (double *)PyArray_DATA(ap);
+}
+
+/* GET_ARR for GpReal arguments which Gist copies (see getRealArray). */
+#define GET_REAL(p,op,dim,dims,n,cast) \
+  TRY(p=getRealArray(op,dim,dims,&n), (cast)PyErr_NoMemory ())
+
 /******************************E N D***********************************/
 
 /* Routines in the Gist user interface */
 static PyObject * animate(PyObject * self, PyObject * args);
 static PyObject * bytscl(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * contour(PyObject * self, PyObject * args, PyObject * kd);
+static PyObject * conv_stats(PyObject * self, PyObject * args);
 static PyObject * gridxy(PyObject * self, PyObject * args, PyObject * kd);
 // static PyObject * hcp_file(PyObject * self, PyObject * args, PyObject * kd);
 // static PyObject * hcp_finish(PyObject * self, PyObject * args);
@@ -701,18 +902,23 @@ static PyObject * gridxy(PyObject * self, PyObject * args, PyObject * kd);
 // static PyObject * hcp(PyObject * self, PyObject * args);
 static PyObject * limits(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * logxy(PyObject * self, PyObject * args);
-static PyObject * mesh_loc(PyObject * self, PyObject * args);
+static PyObject * mesh_loc(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * mouse(PyObject * self, PyObject * args);
 static PyObject * palette(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plc(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * pldefault(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * pldj(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * pledit(PyObject * self, PyObject * args, PyObject * kd);
+static PyObject * plupdate(PyObject * self, PyObject * args, PyObject * kd);
+static PyObject * rgb_write(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plg(PyObject * self, PyObject * args, PyObject * kd);
+static PyObject * plg_many(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plmesh(PyObject * self, PyObject * args, PyObject * kd);
+static PyObject * plmesh_register(PyObject * self, PyObject * args,
+                                  PyObject * kd);
 static PyObject * plm(PyObject * self, PyObject * args, PyObject * kd);
 static PyObject * plq(PyObject * self, PyObject * args);
 static PyObject * plremove(PyObject * self, PyObject * args);
@@ -756,6 +962,11 @@ static long set_pyMsh(PyObject * args, char * errstr, PyObject * tri);
 static long set_reg(PyObject * rop);
 static long set_tri(PyObject * top);
 static long set_yx(PyObject * yop, PyObject * xop);
+static long UpdateColors(PyObject * zop, PyObject * kwt[], char * keywrds[],
+                         GpColor * colors, long width, long height,
+                         long stride, int * reg, int region);
+static unsigned long color_from_int(long color1);
+static int linetype_from_int(long type);
 static long setkw_boolean(PyObject * v, int * t, char * kw);
 static long setkw_color(PyObject * v, unsigned long * t, char * kw);
 static long setkw_double(PyObject * v, double * t, char * kw);
@@ -767,14 +978,24 @@ static long setkw_linetype(PyObject * v, int * t, char * kw);
 static long setkw_string(PyObject * v, char ** t, char * kw);
 static long setkw_xinteger(PyObject * v, int * t, char * kw);
 static long setvu_mesh(PyObject * args, PyObject ** vop,
-                       PyObject ** uop, char * errstr);
+                       PyObject ** uop, char * errstr, PyObject * mesh);
 static long setz_mesh(PyObject * args, PyObject ** zop,
-                      char * errstr, PyObject * tri);
+                      char * errstr, PyObject * tri, PyObject * mesh);
 static long unpack_color_tuple(PyObject * ob, unsigned long color_triple[3]);
 static long unpack_limit_tuple(PyObject * ob, double limits[], int * flags);
 static int verify_kw(char * keyword, char * kwlist[]);
 static long FindMeshZone(double xx, double yy, double * x, double * y,
                          int * reg, long ix, long jx);
+static void ForgetDecimated(int device);
+static int FindDecimated(int index);
+static int ScaledType(int type);
+static long ScaleArray(PyArrayObject * zap, PyObject * kwt[],
+                       char * keywrds[], GpColor * zc);
+static void RedecimateLines(void);
+static void ForgetMeshIndexes(void);
+static void ForgetDefaultMeshIndex(void);
+static void ForgetSharedMeshIndexes(PyArrayObject * y, PyArrayObject * x);
+static long UseMesh(PyObject * op);
 static long Safe_strlen(const char * s);
 static void AllocTmpLegend(long len);
 static void CheckDefaultPalette(void);
@@ -2153,7 +2374,8 @@ static void GetZCrange(double * zmn, double * zmx, double * z, int * reg,
   *zmx = zmax;
 }
 
-/* Called from bytscl, pli, plf, and plfp */
+/* Called from bytscl, pli, plf, and plfp.  With Z 0, *ZN and *ZX hold
+ * the range of the data on entry (see ScaleArray). */
 static int GrabByteScale(PyObject * kwt[], char * keywrds[],
                          double * scale, double * offset, double * zn,
                          double * zx, double * z, int * reg, int region,
@@ -2189,8 +2411,10 @@ static int GrabByteScale(PyObject * kwt[], char * keywrds[],
   /* fill in zmin and zmax from data if not specified */
   if (!minGiven || !maxGiven)
     {
-      double zmn, zmx;
-      GetZCrange(&zmn, &zmx, z, reg, region, iMax, jMax, zCompressed);
+      double zmn = *zn, zmx = *zx;
+
+      if (z)
+        { GetZCrange(&zmn, &zmx, z, reg, region, iMax, jMax, zCompressed); }
 
       if (!minGiven)
         { zmin = zmn; }
@@ -2352,7 +2576,7 @@ static PyObject * contour(PyObject * self, PyObject * args, PyObject * kd)
     PyObject * newargs;
     n = PyTuple_Size(args);
     TRY(newargs = PyTuple_GetSlice(args, 1, n), (PyObject *) NULL);
-    TRY(setz_mesh(newargs, &zop, errstr, kwt[0]),
+    TRY(setz_mesh(newargs, &zop, errstr, kwt[0], 0),
         (PyObject *) NULL);
   }
 
@@ -2468,6 +2692,41 @@ static PyObject * contour(PyObject * self, PyObject * args, PyObject * kd)
   return retval;
 }
 
+/*  -------------------------------------------------------------------- */
+/*  conv_stats */
+
+static char conv_stats__doc__[] =
+  "conv_stats( [track] )\n"
+  "     Return the tuple (count, nbytes): how many array arguments the\n"
+  "     plotting primitives had to convert or gather into contiguous\n"
+  "     double storage, and how many bytes those conversions produced.\n"
+  "     Contiguous float64 arguments cost nothing and are not counted.\n"
+  "     conv_stats(1) resets the counters and starts counting,\n"
+  "     conv_stats(0) stops counting.  Counting is off by default.\n"
+  "\n"
+  "   SEE ALSO: plg, plm, plc, plv, plf, pli, pldj, plfp, plmesh\n";
+
+static PyObject * conv_stats(PyObject * self, PyObject * args)
+{
+  int track = -1;
+
+  if (!PyArg_ParseTuple(args, "|i", &track))
+    {
+      return ERRSS("conv_stats takes at most one integer argument");
+    }
+
+  if (track == 1)
+    {
+      convCount = 0;
+      convBytes = 0;
+    }
+
+  if (track >= 0)
+    { convTrack = (track != 0); }
+
+  return Py_BuildValue("lL", convCount, convBytes);
+}
+
 static int MouseCallBack(Engine * engine, int system,
                          int release, double x, double y,
                          int butmod, double xn, double yn)
@@ -2753,29 +3012,232 @@ static void PrintTypeWidth(char * line, int suffix)
   PrintSuffix(suffix);
 }
 
-static GpColor * PushColors(double * z, long len, double zmin,
-                            double zmax, double scale, double offset)
+/* Byte scaling, for bytscl and the z of plf, pli, plfp and plupdate,
+ * runs over blocks of the data, a thread for each block of a large
+ * array, with the GIL released.  bytscl and pli read the data in its
+ * own type (see ScaledType); short types go through a table of the
+ * 65536 possible colors when the array is larger than that.
+ */
+#define SCALE_BLOCK 262144	/* smallest block worth a thread */
+
+typedef struct ByteScaler ByteScaler;
+struct ByteScaler
+{
+  const void * z;		/* the data, of NumPy type */
+  int type;
+  long start, stop;		/* this block of z and zc */
+  double zmin, zmax;		/* clipping range, or range found */
+  double scale, offset;
+  const GpColor * lut;		/* colors of the short values, or 0 */
+  GpColor * zc;
+};
+
+static int ScaledType(int type)
+{
+  return type == NPY_DOUBLE || type == NPY_FLOAT
+         || type == NPY_SHORT || type == NPY_USHORT;
+}
+
+#define RANGE_LOOP(T) \
+  { \
+    const T * z = (const T *)s->z; \
+    T lo = z[s->start], hi = lo; \
+    for (i = s->start + 1; i < s->stop; i++) \
+      { \
+        if (z[i] < lo) { lo = z[i]; } \
+        else if (z[i] > hi) { hi = z[i]; } \
+      } \
+    s->zmin = lo; \
+    s->zmax = hi; \
+  }
+
+static void * ScaleRange(void * arg)
 {
+  ByteScaler * s = (ByteScaler *)arg;
   long i;
-  double zz;
-  GpColor * zc = (GpColor *) malloc(len * sizeof(GpColor));
 
-  if (!zc)
-    { return (GpColor *) PyErr_NoMemory(); }
+  if (s->start >= s->stop)
+    {
+      s->zmin = s->zmax = 0.0;
+      return 0;
+    }
+
+  switch (s->type)
+    {
+    case NPY_FLOAT: RANGE_LOOP(float) break;
+    case NPY_SHORT: RANGE_LOOP(short) break;
+    case NPY_USHORT: RANGE_LOOP(unsigned short) break;
+    default: RANGE_LOOP(double)
+    }
+
+  return 0;
+}
+
+#define SCALE_LOOP(T) \
+  { \
+    const T * z = (const T *)s->z; \
+    for (i = s->start; i < s->stop; i++) \
+      { \
+        zz = z[i]; \
+        if (zz < zmin) { zz = zmin; } \
+        else if (zz > zmax) { zz = zmax; } \
+        zc[i] = (int)((zz - offset) * scale); \
+      } \
+  }
+
+static void * ScaleBlock(void * arg)
+{
+  ByteScaler * s = (ByteScaler *)arg;
+  double zz, zmin = s->zmin, zmax = s->zmax;
+  double scale = s->scale, offset = s->offset;
+  GpColor * zc = s->zc;
+  long i;
+
+  if (s->lut && s->type == NPY_SHORT)
+    {
+      const short * z = (const short *)s->z;
+
+      for (i = s->start; i < s->stop; i++)
+        { zc[i] = s->lut[z[i] + 32768]; }
+    }
+
+  else if (s->lut)
+    {
+      const unsigned short * z = (const unsigned short *)s->z;
+
+      for (i = s->start; i < s->stop; i++)
+        { zc[i] = s->lut[z[i]]; }
+    }
+
+  else
+    {
+      switch (s->type)
+        {
+        case NPY_FLOAT: SCALE_LOOP(float) break;
+        case NPY_SHORT: SCALE_LOOP(short) break;
+        case NPY_USHORT: SCALE_LOOP(unsigned short) break;
+        default: SCALE_LOOP(double)
+        }
+    }
+
+  return 0;
+}
+
+/* Cut the LEN values at Z into blocks, return how many. */
+static int SplitScalers(ByteScaler * s, const void * z, int type, long len)
+{
+  int i, n = ThreadCount(len, SCALE_BLOCK);
+
+  for (i = 0; i < n; i++)
+    {
+      s[i].z = z;
+      s[i].type = type;
+      s[i].start = len * i / n;
+      s[i].stop = len * (i + 1) / n;
+      s[i].lut = 0;
+      s[i].zc = 0;
+    }
 
-  for (i = 0; i < len; i++)
+  return n;
+}
+
+/* Return in *ZMIN, *ZMAX the range of the LEN values at Z. */
+static void ScaleDataRange(const void * z, int type, long len,
+                           double * zmin, double * zmax)
+{
+  ByteScaler s[MAX_THREADS];
+  int i, n = SplitScalers(s, z, type, len);
+
+  RunThreads(ScaleRange, s, sizeof(ByteScaler), n);
+  *zmin = s[0].zmin;
+  *zmax = s[0].zmax;
+
+  for (i = 1; i < n; i++)
+    {
+      if (s[i].zmin < *zmin)
+        { *zmin = s[i].zmin; }
+
+      if (s[i].zmax > *zmax)
+        { *zmax = s[i].zmax; }
+    }
+}
+
+/* Scale the LEN values at Z into ZC, as described in GrabByteScale. */
+static void ScaleData(const void * z, int type, long len, GpColor * zc,
+                      double zmin, double zmax, double scale, double offset)
+{
+  ByteScaler s[MAX_THREADS];
+  GpColor * lut = 0;
+  int i, n = SplitScalers(s, z, type, len);
+
+  if ((type == NPY_SHORT || type == NPY_USHORT) && len > 65536
+      && (lut = (GpColor *) malloc(65536 * sizeof(GpColor))))
     {
-      zz = z[i];
+      double zz;
+      long v;
+
+      /* the table is the scaling of every value of the type */
+      for (v = 0; v < 65536; v++)
+        {
+          zz = (type == NPY_SHORT) ? (double)(v - 32768) : (double)v;
+
+          if (zz < zmin)
+            { zz = zmin; }
 
-      if (zz < zmin)
-        { zz = zmin; }
+          else if (zz > zmax)
+            { zz = zmax; }
 
-      else if (zz > zmax)
-        { zz = zmax; }
+          lut[v] = (int)((zz - offset) * scale);
+        }
+    }
 
-      zc[i] = (int)((zz - offset) * scale);
+  for (i = 0; i < n; i++)
+    {
+      s[i].zmin = zmin;
+      s[i].zmax = zmax;
+      s[i].scale = scale;
+      s[i].offset = offset;
+      s[i].lut = lut;
+      s[i].zc = zc;
     }
 
+  RunThreads(ScaleBlock, s, sizeof(ByteScaler), n);
+
+  if (lut)
+    { free(lut); }
+}
+
+/* Byte scale the contiguous array ZAP, of a ScaledType, into ZC as
+ * bytscl does, with the top, cmin, cmax keywords KWT, KEYWRDS.
+ */
+static long ScaleArray(PyArrayObject * zap, PyObject * kwt[],
+                       char * keywrds[], GpColor * zc)
+{
+  double zmin = 0.0, zmax = 0.0, scale, offset;
+  long len = PyArray_SIZE(zap);
+  int type = PyArray_TYPE(zap);
+
+  /* the data range is only needed if cmin or cmax is missing */
+  if (!kwt[1] || kwt[1] == Py_None || !kwt[2] || kwt[2] == Py_None)
+    { ScaleDataRange(PyArray_DATA(zap), type, len, &zmin, &zmax); }
+
+  if (!GrabByteScale(kwt, keywrds, &scale, &offset, &zmin, &zmax,
+                     (double *)0, (int *)0, 0, len + 1, 2L, 1))
+    { return 0; }
+
+  ScaleData(PyArray_DATA(zap), type, len, zc, zmin, zmax, scale, offset);
+  return 1;
+}
+
+static GpColor * PushColors(double * z, long len, double zmin,
+                            double zmax, double scale, double offset)
+{
+  GpColor * zc = (GpColor *) malloc(len * sizeof(GpColor));
+
+  if (!zc)
+    { return (GpColor *) PyErr_NoMemory(); }
+
+  ScaleData(z, NPY_DOUBLE, len, zc, zmin, zmax, scale, offset);
   return zc;
 }
 
@@ -2919,11 +3381,40 @@ static char rgb_read__doc__[] =
   "    black and 255 full intensity.  RGB(1,,) is the top row of the\n"
   "    window, RGB(1,,) the second row, and so on to RGB(-1,,), which is\n"
   "    the bottom row.  (So RGB(,,::-1) to pli redraws a copy.)\n"
+  "    Any pending drawing is done first, so RGB shows the finished\n"
+  "    picture; this also makes rgb_read work in batch jobs with no X\n"
+  "    display, for a window made with raster=1.  In animation mode the\n"
+  "    X window shows the previous frame until the next fma.\n"
   "EXAMPLE\n"
   "  x = gist.rgb_read()\n"
   "  gist.Mplot.matview(numpy.sum(x,2).astype(numpy.float))\n";
 
-#define RGB_READER g_rgb_read
+#define RGB_READER(e, rgb, nx, ny) \
+  (GisRasterEngine(e) ? GpRasterRead(e, rgb, nx, ny) : g_rgb_read(e, rgb, nx, ny))
+
+/* Do any drawing still pending on window N, so that reading its pixels
+ * gives the finished picture: a raster window is drawn by nothing else,
+ * an X window would otherwise only be updated when python goes idle.
+ * Decimated plg curves are brought up to date with the limits first,
+ * as pyg_on_idle does.
+ */
+static void DrawWindow(int n)
+{
+  int n0;
+
+  RedecimateLines();
+  n0 = GhGetPlotter();
+
+  if (n0 != n)
+    { GhSetPlotter(n); }
+
+  GpPreempt(ghDevices[n].display);
+  GdDraw(1);
+  GpPreempt(0);
+
+  if (n0 != n && n0 >= 0)
+    { GhSetPlotter(n0); }
+}
 
 static PyObject * rgb_read(PyObject * self, PyObject * args)
 {
@@ -2941,6 +3432,8 @@ static PyObject * rgb_read(PyObject * self, PyObject * args)
       return ERRSS("rgb_read(n_window) with no such n_window");
     }
 
+  DrawWindow(n);
+
   npy_intp dims[3];
   PyArrayObject * result;
   unsigned char * pdata; // GpColor = uchar
@@ -2962,65 +3455,353 @@ static PyObject * rgb_read(PyObject * self, PyObject * args)
 }
 
 
-
 /*  -------------------------------------------------------------------- */
+/*  rgb_write */
+
+static char rgb_write__doc__[] =
+  "rgb_write( filename )\n"
+  "or rgb_write( filename, n, bw=None )\n"
+  "     Save the contents of the current graphics window, or of graphics\n"
+  "     window N, in the image file FILENAME.  A name ending in .png makes\n"
+  "     a PNG file; any other name makes a binary PPM file (or PGM, for\n"
+  "     grayscale).  The picture is encoded a row at a time straight from\n"
+  "     the window pixels, no array of the whole image is made.\n"
+  "     With BW, save a grayscale picture instead, using the weights\n"
+  "     below; a name ending in .pgm is always grayscale, 'ntsc' unless\n"
+  "     BW says otherwise.\n"
+  "       'ntsc'       0.2989 R + 0.5870 G + 0.1140 B\n"
+  "       'atsc'       0.2126 R + 0.7152 G + 0.0722 B (or 'hdtv')\n"
+  "       'lightness'  (max(R,G,B) + min(R,G,B)) / 2\n"
+  "       'average'    (R + G + B) / 3\n"
+  "\n"
+  "   SEE ALSO: rgb_read, hcp\n";
 
-static char win_xid__doc__[] =
-  " win_xid( n )\n"
-  "     returns the X window id for gist window [0..7].\n"
-  "\n" "   SEE ALSO: window\n";
+#undef N_KEYWORDS
+#define N_KEYWORDS 1
+static char * rgbwriteKeys[N_KEYWORDS + 1] = { "bw", 0 };
 
-static PyObject * win_xid(PyObject * self, PyObject * args)
+enum { BW_NONE, BW_NTSC, BW_ATSC, BW_LIGHTNESS, BW_AVERAGE };
+
+/* Copy one row of NX (r,g,b) pixels to ROW, converted to gray if BW.
+ * The gray weights are 16 bit fixed point, so the result is exact to
+ * the last bit and does not depend on the floating point unit.
+ */
+static void GrayRow(unsigned char * row, const unsigned char * rgb,
+                    long nx, int bw)
 {
-  int n;
+  long i;
+  int lo, hi;
 
-  if (!PyArg_ParseTuple(args, "i", &n))
+  if (bw == BW_NONE)
     {
-      return ERRSS("win_xid takes one int argument.");
+      memcpy(row, rgb, 3 * nx);
+      return;
     }
 
-  if (n < 0 || n > 7)
+  for (i = 0; i < nx; i++, rgb += 3)
     {
-      return ERRSS("graphics windows are numbered from 0 to 7");
-    }
+      switch (bw)
+        {
+        case BW_NTSC:
+          row[i] = (19589 * rgb[0] + 38470 * rgb[1] + 7471 * rgb[2] + 32768) >> 16;
+          break;
 
-  /* printf ("GhXid(%d) = %d\n",n,GhXid(n)); */
+        case BW_ATSC:
+          row[i] = (13933 * rgb[0] + 46871 * rgb[1] + 4732 * rgb[2] + 32768) >> 16;
+          break;
 
-  return PyLong_FromLong(GhXid(n));
+        case BW_LIGHTNESS:
+          lo = hi = rgb[0];
+
+          if (rgb[1] < lo) { lo = rgb[1]; }
+          if (rgb[1] > hi) { hi = rgb[1]; }
+          if (rgb[2] < lo) { lo = rgb[2]; }
+          if (rgb[2] > hi) { hi = rgb[2]; }
+
+          row[i] = (lo + hi) >> 1;
+          break;
+
+        default:
+          row[i] = (rgb[0] + rgb[1] + rgb[2] + 1) / 3;
+        }
+    }
 }
 
-// /*  -------------------------------------------------------------------- */
-//
-// static char keybd_focus__doc__[] =
-//   " keybd_focus(0|1)\n"
-//   " or keybd_focus(0|1,win)\n"
-//   " Set the input hint, 0 meaning that Yorick graphics"
-//   " windows do not ever want keyboard focus, leaving it"
-//   " grey and unmanaged. This is not supposed"
-//   " to affect mouse input events, which are wanted..\n"
-//   "\n" "   SEE ALSO: window\n";
-//
-// static PyObject * keybd_focus(PyObject * self, PyObject * args)
-// {
-//   int n, win;
-//
-//   win = -1;
-//
-//   if (!PyArg_ParseTuple(args, "i|i", &n, &win))
-//     {
-//       return ERRSS("keybd_focus takes one or two int arguments.");
-//     }
-//
-//   gist_input_hint = n;
-//
-//   if (win >= 0)
-//     {
-//       GhSetHint(win, n);
-//     }
-//
-//   Py_INCREF(Py_None);
-//   return Py_None;
-// }
+static int WritePPM(FILE * f, const unsigned char * rgb, long nx, long ny,
+                    int bw)
+{
+  long j, rowlen = bw ? nx : 3 * nx;
+  unsigned char * row;
+
+  if (!(row = (unsigned char *)malloc(rowlen)))
+    { return 0; }
+
+  fprintf(f, "%s\n%ld %ld\n255\n", bw ? "P5" : "P6", nx, ny);
+
+  for (j = 0; j < ny && !ferror(f); j++)
+    {
+      GrayRow(row, rgb + 3 * nx * j, nx, bw);
+      fwrite(row, 1, rowlen, f);
+    }
+
+  free(row);
+  return !ferror(f);
+}
+
+static void PutBE32(unsigned char * p, unsigned long v)
+{
+  p[0] = (v >> 24) & 0xff;
+  p[1] = (v >> 16) & 0xff;
+  p[2] = (v >> 8) & 0xff;
+  p[3] = v & 0xff;
+}
+
+static void WritePNGChunk(FILE * f, const char * type,
+                          const unsigned char * data, unsigned long len)
+{
+  unsigned char b[4];
+  uLong crc = crc32(0L, (const Bytef *)type, 4);
+
+  if (len)
+    { crc = crc32(crc, (const Bytef *)data, len); }
+
+  PutBE32(b, len);
+  fwrite(b, 1, 4, f);
+  fwrite(type, 1, 4, f);
+
+  if (len)
+    { fwrite(data, 1, len, f); }
+
+  PutBE32(b, crc);
+  fwrite(b, 1, 4, f);
+}
+
+/* Each row gets the Sub filter (a pixel minus the one on its left),
+ * which suits the flat colors and straight lines of a plot, and is
+ * deflated as soon as it is made; every full output buffer becomes
+ * one IDAT chunk.
+ */
+static int WritePNG(FILE * f, const unsigned char * rgb, long nx, long ny,
+                    int bw)
+{
+  static const unsigned char signature[8] = { 137, 80, 78, 71, 13, 10, 26, 10 };
+  unsigned char ihdr[13], out[16384], *row;
+  int channels = bw ? 1 : 3, flush, status = Z_OK;
+  long i, j, rowlen = 1 + channels * nx;
+  z_stream z;
+
+  memset(&z, 0, sizeof(z));
+
+  if (!(row = (unsigned char *)malloc(rowlen)))
+    { return 0; }
+
+  if (deflateInit(&z, Z_DEFAULT_COMPRESSION) != Z_OK)
+    {
+      free(row);
+      return 0;
+    }
+
+  fwrite(signature, 1, 8, f);
+  PutBE32(ihdr, nx);
+  PutBE32(ihdr + 4, ny);
+  ihdr[8] = 8;			/* bit depth */
+  ihdr[9] = bw ? 0 : 2;		/* gray or rgb color type */
+  ihdr[10] = ihdr[11] = ihdr[12] = 0;	/* deflate, filter 0, no interlace */
+  WritePNGChunk(f, "IHDR", ihdr, 13);
+
+  for (j = 0; j < ny && status != Z_STREAM_ERROR && !ferror(f); j++)
+    {
+      row[0] = 1;		/* Sub filter */
+      GrayRow(row + 1, rgb + 3 * nx * j, nx, bw);
+
+      for (i = rowlen - 1; i > channels; i--)
+        { row[i] -= row[i - channels]; }
+
+      z.next_in = row;
+      z.avail_in = rowlen;
+      flush = (j == ny - 1) ? Z_FINISH : Z_NO_FLUSH;
+
+      do
+        {
+          z.next_out = out;
+          z.avail_out = sizeof(out);
+          status = deflate(&z, flush);
+
+          if (status == Z_STREAM_ERROR)
+            { break; }
+
+          if (z.avail_out < sizeof(out))
+            { WritePNGChunk(f, "IDAT", out, sizeof(out) - z.avail_out); }
+        }
+      while (z.avail_out == 0 || (flush == Z_FINISH && status != Z_STREAM_END));
+    }
+
+  deflateEnd(&z);
+  free(row);
+
+  if (status != Z_STREAM_END)
+    { return 0; }
+
+  WritePNGChunk(f, "IEND", 0, 0);
+  return !ferror(f);
+}
+
+static PyObject * rgb_write(PyObject * self, PyObject * args, PyObject * kd)
+{
+  int n = GhGetPlotter(), bw = BW_NONE, png, ok;
+  char * filename, *path, *bwname = 0;
+  long nx, ny, len;
+  unsigned char * rgb;
+  RasterEngine * re;
+  Engine * engine;
+  FILE * f;
+  PyObject * kwt[NELT(rgbwriteKeys) - 1];
+
+  if (!PyArg_ParseTuple(args, "s|i", &filename, &n))
+    {
+      return ERRSS("rgb_write takes a file name and an optional window number.");
+    }
+
+  BUILD_KWT(kd, rgbwriteKeys, kwt);
+  SETKW(kwt[0], bwname, setkw_string, rgbwriteKeys[0]);
+
+  if (bwname)
+    {
+      if (!strcmp(bwname, "ntsc"))
+        { bw = BW_NTSC; }
+      else if (!strcmp(bwname, "atsc") || !strcmp(bwname, "hdtv"))
+        { bw = BW_ATSC; }
+      else if (!strcmp(bwname, "lightness"))
+        { bw = BW_LIGHTNESS; }
+      else if (!strcmp(bwname, "average"))
+        { bw = BW_AVERAGE; }
+
+      free(bwname);
+
+      if (bw == BW_NONE)
+        {
+          return ERRSS("rgb_write: bw must be 'ntsc', 'atsc', 'hdtv', "
+                       "'lightness' or 'average'");
+        }
+    }
+
+  if (n<0 || n>=GH_NDEVS || !(engine = ghDevices[n].display) ||
+      RGB_READER(engine, (GpColor *)0, &nx, &ny))
+    {
+      return ERRSS("rgb_write(filename, n_window) with no such n_window");
+    }
+
+  DrawWindow(n);
+
+  /* a raster window is encoded in place, an X window read out first */
+  if ((re = GisRasterEngine(engine)))
+    { rgb = re->rgb; }
+
+  else
+    {
+      TRY(rgb = (unsigned char *)malloc(3 * nx * ny),
+          (PyObject *)PyErr_NoMemory());
+      g_rgb_read(engine, rgb, &nx, &ny);
+    }
+
+  if (!(path = expand_pathname(filename)))
+    {
+      if (!re)
+        { free(rgb); }
+
+      return 0;
+    }
+
+  len = strlen(path);
+  png = len > 4 && (!strcmp(path + len - 4, ".png") ||
+                    !strcmp(path + len - 4, ".PNG"));
+
+  /* a PGM file can only hold a grayscale picture */
+  if (bw == BW_NONE && len > 4 && (!strcmp(path + len - 4, ".pgm") ||
+                                   !strcmp(path + len - 4, ".PGM")))
+    { bw = BW_NTSC; }
+
+  if ((f = fopen(path, "wb")))
+    {
+      ok = png ? WritePNG(f, rgb, nx, ny, bw) : WritePPM(f, rgb, nx, ny, bw);
+      ok = !fclose(f) && ok;
+    }
+
+  free(path);
+
+  if (!re)
+    { free(rgb); }
+
+  if (!f)
+    { return ERRSS("rgb_write: unable to create the image file"); }
+
+  if (!ok)
+    { return ERRSS("rgb_write: error writing the image file"); }
+
+  Py_INCREF(Py_None);
+  return Py_None;
+}
+
+
+
+/*  -------------------------------------------------------------------- */
+
+static char win_xid__doc__[] =
+  " win_xid( n )\n"
+  "     returns the X window id for gist window [0..7].\n"
+  "\n" "   SEE ALSO: window\n";
+
+static PyObject * win_xid(PyObject * self, PyObject * args)
+{
+  int n;
+
+  if (!PyArg_ParseTuple(args, "i", &n))
+    {
+      return ERRSS("win_xid takes one int argument.");
+    }
+
+  if (n < 0 || n > 7)
+    {
+      return ERRSS("graphics windows are numbered from 0 to 7");
+    }
+
+  /* printf ("GhXid(%d) = %d\n",n,GhXid(n)); */
+
+  return PyLong_FromLong(GhXid(n));
+}
+
+// /*  -------------------------------------------------------------------- */
+//
+// static char keybd_focus__doc__[] =
+//   " keybd_focus(0|1)\n"
+//   " or keybd_focus(0|1,win)\n"
+//   " Set the input hint, 0 meaning that Yorick graphics"
+//   " windows do not ever want keyboard focus, leaving it"
+//   " grey and unmanaged. This is not supposed"
+//   " to affect mouse input events, which are wanted..\n"
+//   "\n" "   SEE ALSO: window\n";
+//
+// static PyObject * keybd_focus(PyObject * self, PyObject * args)
+// {
+//   int n, win;
+//
+//   win = -1;
+//
+//   if (!PyArg_ParseTuple(args, "i|i", &n, &win))
+//     {
+//       return ERRSS("keybd_focus takes one or two int arguments.");
+//     }
+//
+//   gist_input_hint = n;
+//
+//   if (win >= 0)
+//     {
+//       GhSetHint(win, n);
+//     }
+//
+//   Py_INCREF(Py_None);
+//   return Py_None;
+// }
 
 /* Build an array of pointers to the keyword values in kwt[],
  * or nil, if that keyword wasn't given in the command arguments.
@@ -3077,7 +3858,7 @@ static long build_kwt(PyObject * kd, char * kwlist[], PyObject * kwt[])
 
 static char bytscl__doc__[] =
   "bytscl(z)\n"
-  "or bytscl(z, top=max_byte, cmin=lower_cutoff, cmax=upper_cutoff)\n"
+  "or bytscl(z, top=max_byte, cmin=lower_cutoff, cmax=upper_cutoff, out=zc)\n"
   "     Returns a char array of the same shape as Z, with values linearly\n"
   "     scaled to the range 0 to one less than the current palette size.\n"
   "     If MAX_BYTE is specified, the scaled values will run from 0 to\n"
@@ -3085,20 +3866,22 @@ static char bytscl__doc__[] =
   "     If LOWER_CUTOFF and/or UPPER_CUTOFF are specified, Z values outside\n"
   "     this range are mapped to the cutoff value; otherwise the linear\n"
   "     scaling maps the extreme values of Z to 0 and MAX_BYTE.\n"
+  "     Z of type float64, float32, int16 or uint16 is read as is, other\n"
+  "     types are converted to float64 first.  With OUT, a writable\n"
+  "     contiguous uint8 array of the shape of Z, the result is stored in\n"
+  "     ZC and ZC returned, so no new array is made.  Large arrays are\n"
+  "     scaled by several threads.\n"
   "\n" "   SEE ALSO: plf, pli\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 3
-static char * bsKeys[N_KEYWORDS + 1] = { "top", "cmin", "cmax", 0 };
+#define N_KEYWORDS 4
+static char * bsKeys[N_KEYWORDS + 1] = { "top", "cmin", "cmax", "out", 0 };
 
 static PyObject * bytscl(PyObject * self, PyObject * args, PyObject * kd)
 {
   PyObject * zop, *kwt[NELT(bsKeys) - 1];
   PyArrayObject * zap, *zcap;
-  double * z, zmin, zmax, scale, offset;
-  GpColor * zc, *zc1;
-  int i;
-  long len;
+  int type;
 
   if (!PyArg_ParseTuple(args, "O", &zop))
     {
@@ -3106,32 +3889,60 @@ static PyObject * bytscl(PyObject * self, PyObject * args, PyObject * kd)
         ERRSS("bytscl requires exactly one non-keyword argument");
     }
 
+  BUILD_KWT(kd, bsKeys, kwt);
+  type = isARRAY(zop) ? PyArray_TYPE((PyArrayObject *)zop) : NPY_DOUBLE;
+
+  if (!ScaledType(type))
+    { type = NPY_DOUBLE; }
+
   TRY(addToArrayList((PyObject *)(zap = (PyArrayObject *) PyArray_ContiguousFromObject
-                                        (zop, NPY_DOUBLE, 1, 0))), (PyObject *) PyErr_NoMemory());
-  z = (double *)PyArray_DATA(zap);
-  len = PyArray_SIZE(zap);
+                                        (zop, type, 1, 0))), (PyObject *) PyErr_NoMemory());
 
-  BUILD_KWT(kd, bsKeys, kwt);
-  TRY(GrabByteScale
-      (&kwt[0], &bsKeys[0], &scale, &offset, &zmin, &zmax, z,
-       (int *)0, 0, len + 1, 2L, 1), (PyObject *) NULL);
-  TRY(zc =
-        PushColors(z, len, zmin, zmax, scale, offset), (PyObject *) NULL);
-  NEW_ARR(zcap, PyArray_NDIM((PyArrayObject *)zap), PyArray_DIMS(zap), Py_GpColor, PyObject *);
-  Py_DECREF(zap);
-  zc1 = (GpColor *) PyArray_DATA(zcap);
+  if (kwt[3] && kwt[3] != Py_None)
+    {
+      zcap = (PyArrayObject *) kwt[3];
+
+      if (!PyArray_Check(kwt[3]) || PyArray_TYPE(zcap) != NPY_UBYTE
+          || !PyArray_IS_C_CONTIGUOUS(zcap) || !PyArray_ISWRITEABLE(zcap)
+          || PyArray_NDIM(zcap) != PyArray_NDIM(zap)
+          || !PyArray_CompareLists(PyArray_DIMS(zcap), PyArray_DIMS(zap),
+                                   PyArray_NDIM(zap)))
+        {
+          clearArrayList();
+          return ERRSS("bytscl out= must be a writable contiguous uint8 "
+                       "array of the same shape as z");
+        }
+
+      Py_INCREF(zcap);
+    }
+
+  else
+    {
+      NEW_ARR(zcap, PyArray_NDIM((PyArrayObject *)zap), PyArray_DIMS(zap), Py_GpColor, PyObject *);
+    }
 
-  for (i = 0; i < len; i++)
-    { zc1[i] = zc[i]; }
+  if (!ScaleArray(zap, kwt, bsKeys, (GpColor *) PyArray_DATA(zcap)))
+    {
+      if (kwt[3] && kwt[3] != Py_None)
+        { Py_DECREF(zcap); }
+
+      clearArrayList();
+      return 0;
+    }
 
+  Py_DECREF(zap);
   array_list_length = 0;
-  free(zc);
   return (PyObject *) zcap;
 }
 
-/* Zero out the global pyMsh struct, and free any mesh arrays. */
+/* Zero out the global pyMsh struct, and free any mesh arrays.  The
+ * arrays of the next mesh may be these same ones changed in place, so
+ * the mesh_loc index of the default mesh goes with them. */
 static void clear_pyMsh(void)
 {
+  if (pyMsh.y)
+    { ForgetDefaultMeshIndex(); }
+
   Py_XDECREF(pyMsh.y);
   Py_XDECREF(pyMsh.x);
   Py_XDECREF(pyMsh.reg);
@@ -3242,6 +4053,7 @@ static PyObject * pyg_fma(PyObject * self, PyObject * args)
     }
 
   curElement = -1;
+  ForgetDecimated(GhGetPlotter());
   GhFMA();
   Py_INCREF(Py_None);
   return Py_None;
@@ -3884,92 +4696,635 @@ static PyObject * logxy(PyObject * self, PyObject * args)
 /*  -------------------------------------------------------------------- */
 /*  mesh_loc */
 
-static char mesh_loc__doc__[] =
-  "mesh_loc(y0, x0)\n"
-  "or mesh_loc(y0, x0, y, x)\n"
-  "or mesh_loc(y0, x0, y, x, ireg)\n"
-  "   Returns the zone index (=i+imax*(j-1)) of the zone of the mesh\n"
-  "   (X,Y) (with optional region number array IREG) containing the\n"
-  "   point (X0,Y0).  If (X0,Y0) lies outside the mesh, returns 0.\n"
-  "   Thus, eg- ireg(mesh_loc(x0, y0, y, x, ireg)) is the region number of\n"
-  "   the region containing (x0,y0).  If no mesh specified, uses default.\n"
-  "   X0 and Y0 may be arrays as long as they are conformable.\n"
-  "\n" "   SEE ALSO: plmesh, mouse\n";
+/* mesh_loc locates points through a uniform grid of buckets over the
+ * current mesh.  Each bucket lists, in increasing order, the zones
+ * whose bounding box meets it, so the first zone of a bucket winding
+ * around a point is the zone the scan of FindMeshZone would return.
+ * The index holds references to the mesh arrays it was built for, and
+ * is rebuilt when mesh_loc sees another mesh.  Since those may be the
+ * caller's own arrays, changed in place since, the index of the default
+ * mesh is dropped whenever plmesh or mesh_loc(y0, x0, y, x) replaces it
+ * (see clear_pyMsh), and every index when plupdate moves a mesh.
+ */
+#define LOC_BLOCK 16384		/* fewest points worth a thread */
+
+typedef struct MeshIndex MeshIndex;
+struct MeshIndex
+{
+  PyArrayObject * y, *x, *reg;	/* the mesh indexed, or 0 */
+  long ix, jx, gx, gy;		/* mesh and bucket grid shape */
+  double xmin, ymin, sx, sy;	/* bucket of (x,y) is ((x-xmin)*sx, ...) */
+  long * start;			/* gx*gy+1 offsets in zones */
+  long * zones;
+};
+
+/* index of a mesh given as (y, x, ireg); see meshCache for the others */
+static MeshIndex meshIndex;
 
-static PyObject * mesh_loc(PyObject * self, PyObject * args)
+typedef struct MeshLocator MeshLocator;
+struct MeshLocator
 {
+  MeshIndex * index;
+  const double * x0, *y0;
   long * zone;
-  int i;
-  npy_intp n;
-  GaQuadMesh mesh;
-  double * x0 = 0, *y0 = 0;
-  PyObject * y0op, *x0op;
-  PyArrayObject * y0ap = 0, *x0ap = 0, *rap = 0;
-  char * errstr =
-    "mesh_loc requires arguments (y0, x0 [ , y, x [ ,ireg ] ])";
-  struct
-  {
-    double x, y;
-  } dbuf;
+  long start, stop;
+};
 
-  if (PyTuple_Size(args) < 2)
+static void ForgetMeshIndex(MeshIndex * mi)
+{
+  Py_XDECREF(mi->y);
+  Py_XDECREF(mi->x);
+  Py_XDECREF(mi->reg);
+  mi->y = mi->x = mi->reg = 0;
+
+  if (mi->start)
+    { free(mi->start); }
+
+  if (mi->zones)
+    { free(mi->zones); }
+
+  mi->start = mi->zones = 0;
+}
+
+/* Bucket range [*b0, *b1] covering the coordinates v0 to v1. */
+static void MeshBuckets(double v0, double v1, double vmin, double sv,
+                        long gv, long * b0, long * b1)
+{
+  *b0 = (long)((v0 - vmin) * sv);
+  *b1 = (long)((v1 - vmin) * sv);
+
+  if (*b0 >= gv)
+    { *b0 = gv - 1; }
+
+  if (*b1 >= gv)
+    { *b1 = gv - 1; }
+}
+
+/* Index the zones of MESH in MI; return 0 if out of memory. */
+static int BuildMeshIndex(MeshIndex * mi, GaQuadMesh * mesh)
+{
+  double * x = mesh->x, *y = mesh->y;
+  double xmin, xmax, ymin, ymax, zx0, zx1, zy0, zy1;
+  long ix = mesh->iMax, ijx = mesh->iMax * mesh->jMax;
+  long i, k, bx, by, bx0, bx1, by0, by1, nzones = 0, ncells;
+  int * reg = mesh->reg;
+  long * fill = 0;
+
+  ForgetMeshIndex(mi);
+
+  xmin = xmax = x[0];
+  ymin = ymax = y[0];
+
+  for (i = 1; i < ijx; i++)
     {
-      return ERRSS("mesh_loc requires at least two arguments");
-    }
+      if (x[i] < xmin)
+        { xmin = x[i]; }
 
-  TRY(setvu_mesh(args, &y0op, &x0op, errstr), (PyObject *) NULL);
+      else if (x[i] > xmax)
+        { xmax = x[i]; }
 
-  if (!pyMsh.y)
+      if (y[i] < ymin)
+        { ymin = y[i]; }
+
+      else if (y[i] > ymax)
+        { ymax = y[i]; }
+    }
+
+  for (i = ix + 1; i < ijx; i++)
     {
-      return ERRSS("No current mesh - set (y, x) first");
+      if (i % ix && (!reg || reg[i]))
+        { nzones++; }
     }
 
-  get_mesh(&mesh);
+  /* about two zones per bucket, buckets shaped like the mesh extent */
+  ncells = nzones / 2 + 1;
 
-  if (isARRAY(y0op))
+  if (xmax > xmin && ymax > ymin)
     {
-      TRY(addToArrayList((PyObject *)(y0ap = (PyArrayObject *)
-                                             PyArray_ContiguousFromObject
-                                             (y0op, NPY_DOUBLE, 1, 0))),
-          (PyObject *) PyErr_NoMemory());
-      n = PyArray_SIZE(y0ap);
-      TRY(addToArrayList((PyObject *)(x0ap = (PyArrayObject *)
-                                             PyArray_ContiguousFromObject
-                                             (x0op, NPY_DOUBLE, 1, 0))),
-          (PyObject *) PyErr_NoMemory());
+      mi->gx = (long)sqrt(ncells * (xmax - xmin) / (ymax - ymin));
 
-      if (n != PyArray_SIZE(x0ap))
-        {
-          clearArrayList();
-          return ERRSS("(y0, x0) must be same size");
-        }
+      if (mi->gx < 1)
+        { mi->gx = 1; }
 
-      y0 = (double *)PyArray_DATA(y0ap);
-      x0 = (double *)PyArray_DATA(x0ap);
+      else if (mi->gx > ncells)
+        { mi->gx = ncells; }
+
+      mi->gy = ncells / mi->gx;
     }
 
-  else if (PyFloat_Check(y0op))
+  else if (xmax > xmin)
     {
-      y0 = &dbuf.y;
-      x0 = &dbuf.x;
-      y0[0] = PyFloat_AsDouble(y0op);
-      x0[0] = PyFloat_AsDouble(x0op);
-      n = 1;
+      mi->gx = ncells;
+      mi->gy = 1;
     }
 
   else
     {
-      return
-        ERRSS("(y0, x0) must be floating point scalars or arrays.");
+      mi->gx = 1;
+      mi->gy = (ymax > ymin) ? ncells : 1;
     }
 
-  NEW_ARR(rap, 1, &n, NPY_LONG, PyObject *);
-  zone = (long *)PyArray_DATA(rap);
+  ncells = mi->gx * mi->gy;
+  mi->ix = ix;
+  mi->jx = mesh->jMax;
+  mi->xmin = xmin;
+  mi->ymin = ymin;
+  mi->sx = (xmax > xmin) ? mi->gx / (xmax - xmin) : 0.0;
+  mi->sy = (ymax > ymin) ? mi->gy / (ymax - ymin) : 0.0;
 
-  for (i = 0; i < n; i++)
-    zone[i] =
-      1 + FindMeshZone(x0[i], y0[i], mesh.x, mesh.y,
-                       mesh.reg, mesh.iMax, mesh.jMax);
+  if (!(mi->start = (long *)calloc(ncells + 1, sizeof(long))))
+    { return 0; }
+
+  /* two passes over the zones: count the entries of each bucket, then
+     fill them in, in zone order */
+  for (k = 0; k < 2; k++)
+    {
+      for (i = ix + 1; i < ijx; i++)
+        {
+          if (!(i % ix) || (reg && !reg[i]))
+            { continue; }
+
+          zx0 = zx1 = x[i];
+          zy0 = zy1 = y[i];
+
+          if (x[i - 1] < zx0) { zx0 = x[i - 1]; }
+          if (x[i - 1] > zx1) { zx1 = x[i - 1]; }
+          if (x[i - ix] < zx0) { zx0 = x[i - ix]; }
+          if (x[i - ix] > zx1) { zx1 = x[i - ix]; }
+          if (x[i - ix - 1] < zx0) { zx0 = x[i - ix - 1]; }
+          if (x[i - ix - 1] > zx1) { zx1 = x[i - ix - 1]; }
+          if (y[i - 1] < zy0) { zy0 = y[i - 1]; }
+          if (y[i - 1] > zy1) { zy1 = y[i - 1]; }
+          if (y[i - ix] < zy0) { zy0 = y[i - ix]; }
+          if (y[i - ix] > zy1) { zy1 = y[i - ix]; }
+          if (y[i - ix - 1] < zy0) { zy0 = y[i - ix - 1]; }
+          if (y[i - ix - 1] > zy1) { zy1 = y[i - ix - 1]; }
+
+          MeshBuckets(zx0, zx1, xmin, mi->sx, mi->gx, &bx0, &bx1);
+          MeshBuckets(zy0, zy1, ymin, mi->sy, mi->gy, &by0, &by1);
+
+          for (by = by0; by <= by1; by++)
+            {
+              for (bx = bx0; bx <= bx1; bx++)
+                {
+                  if (k)
+                    { mi->zones[fill[by * mi->gx + bx]++] = i; }
+
+                  else
+                    { mi->start[by * mi->gx + bx + 1]++; }
+                }
+            }
+        }
+
+      if (!k)
+        {
+          for (i = 0; i < ncells; i++)
+            { mi->start[i + 1] += mi->start[i]; }
+
+          mi->zones = (long *)malloc((mi->start[ncells] + 1)
+                                           * sizeof(long));
+          fill = (long *)malloc(ncells * sizeof(long));
+
+          if (!mi->zones || !fill)
+            {
+              if (fill)
+                { free(fill); }
+
+              ForgetMeshIndex(mi);
+              return 0;
+            }
+
+          memcpy(fill, mi->start, ncells * sizeof(long));
+        }
+    }
+
+  free(fill);
+  return 1;
+}
+
+/* Same winding test as FindMeshZone, for zone I alone. */
+static int MeshZoneWinds(double xx, double yy, const double * x,
+                         const double * y, long i, long ix)
+{
+  int wind = 0;
+  double x00 = x[i - ix - 1] - xx, y00 = y[i - ix - 1] - yy;
+  double x01 = x[i - ix] - xx, y01 = y[i - ix] - yy;
+  double x10 = x[i - 1] - xx, y10 = y[i - 1] - yy;
+  double x11 = x[i] - xx, y11 = y[i] - yy;
+
+  if ((x00 < 0.0) ^ (x01 < 0.0))
+    { wind += (x00 * y01 > x01 * y00) ? 1 : -1; }
+
+  if ((x01 < 0.0) ^ (x11 < 0.0))
+    { wind += (x01 * y11 > x11 * y01) ? 1 : -1; }
+
+  if ((x11 < 0.0) ^ (x10 < 0.0))
+    { wind += (x11 * y10 > x10 * y11) ? 1 : -1; }
+
+  if ((x10 < 0.0) ^ (x00 < 0.0))
+    { wind += (x10 * y00 > x00 * y10) ? 1 : -1; }
+
+  return wind;
+}
+
+static void * LocatePoints(void * arg)
+{
+  MeshLocator * loc = (MeshLocator *)arg;
+  MeshIndex * mi = loc->index;
+  const double * x = (const double *)PyArray_DATA(mi->x);
+  const double * y = (const double *)PyArray_DATA(mi->y);
+  double xx, yy, fx, fy;
+  long i, k, b, zone, ix = mi->ix;
+
+  for (i = loc->start; i < loc->stop; i++)
+    {
+      xx = loc->x0[i];
+      yy = loc->y0[i];
+      fx = (xx - mi->xmin) * mi->sx;
+      fy = (yy - mi->ymin) * mi->sy;
+      zone = -1;
+
+      /* also false for NaN */
+      if (xx >= mi->xmin && yy >= mi->ymin
+          && fx <= mi->gx && fy <= mi->gy
+          && (mi->sx > 0.0 || xx == mi->xmin)
+          && (mi->sy > 0.0 || yy == mi->ymin))
+        {
+          long bx = (long)fx, by = (long)fy;
+
+          if (bx >= mi->gx)
+            { bx = mi->gx - 1; }
+
+          if (by >= mi->gy)
+            { by = mi->gy - 1; }
+
+          b = by * mi->gx + bx;
+
+          for (k = mi->start[b]; k < mi->start[b + 1]; k++)
+            {
+              if (MeshZoneWinds(xx, yy, x, y, mi->zones[k], ix))
+                {
+                  zone = mi->zones[k];
+                  break;
+                }
+            }
+        }
+
+      loc->zone[i] = 1 + zone;
+    }
+
+  return 0;
+}
+
+/* Meshes registered by plmesh_register.  mesh=id makes one of them
+ * the current mesh without converting or checking (y, x, ireg) again,
+ * and each keeps its own mesh_loc index.  Once the cached arrays and
+ * indexes pass MESH_CACHE_BYTES, the least recently used meshes are
+ * dropped (the one just registered is always kept).
+ */
+#define MESH_CACHE_SIZE 32
+#define MESH_CACHE_BYTES (256L << 20)
+
+typedef struct MeshEntry MeshEntry;
+struct MeshEntry
+{
+  long id;			/* 0 for a free entry */
+  unsigned long used;		/* meshClock when last used */
+  PyArrayObject * y, *x, *reg, *triangle;
+  MeshIndex index;
+};
+
+static MeshEntry meshCache[MESH_CACHE_SIZE];
+static long meshLastId = 0;
+static unsigned long meshClock = 0;
+
+static void DropMeshEntry(MeshEntry * e)
+{
+  ForgetMeshIndex(&e->index);
+  Py_XDECREF(e->y);
+  Py_XDECREF(e->x);
+  Py_XDECREF(e->reg);
+  Py_XDECREF(e->triangle);
+  e->y = e->x = e->reg = e->triangle = 0;
+  e->id = 0;
+}
+
+static long MeshEntryBytes(MeshEntry * e)
+{
+  long nbytes = PyArray_NBYTES(e->y) + PyArray_NBYTES(e->x)
+    + PyArray_NBYTES(e->reg);
+  long nb = e->index.gx * e->index.gy;
+
+  if (e->triangle)
+    { nbytes += PyArray_NBYTES(e->triangle); }
+
+  if (e->index.start)
+    { nbytes += (nb + 1 + e->index.start[nb]) * sizeof(long); }
+
+  return nbytes;
+}
+
+/* A free entry, else the least recently used one other than KEEP. */
+static MeshEntry * OldestMeshEntry(MeshEntry * keep)
+{
+  MeshEntry * e, *old = 0;
+
+  for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+    {
+      if (e == keep)
+        { continue; }
+
+      if (!e->id)
+        { return e; }
+
+      if (!old || e->used < old->used)
+        { old = e; }
+    }
+
+  return old;
+}
+
+/* Drop least recently used meshes until the cache fits its budget. */
+static void TrimMeshCache(MeshEntry * keep)
+{
+  MeshEntry * e;
+  long nbytes;
+
+  for (;;)
+    {
+      nbytes = 0;
+
+      for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+        {
+          if (e->id)
+            { nbytes += MeshEntryBytes(e); }
+        }
+
+      if (nbytes <= MESH_CACHE_BYTES || !(e = OldestMeshEntry(keep))
+          || !e->id)
+        { return; }
+
+      DropMeshEntry(e);
+    }
+}
+
+static MeshEntry * GetMeshEntry(long id)
+{
+  MeshEntry * e;
+
+  for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+    {
+      if (id > 0 && e->id == id)
+        { return e; }
+    }
+
+  return 0;
+}
+
+/* The registered mesh which is the current one, if any. */
+static MeshEntry * CurrentMeshEntry(void)
+{
+  MeshEntry * e;
+
+  for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+    {
+      if (e->id && e->y == pyMsh.y && e->x == pyMsh.x
+          && e->reg == pyMsh.reg)
+        { return e; }
+    }
+
+  return 0;
+}
+
+/* Make the registered mesh OP (an id from plmesh_register) current. */
+static long UseMesh(PyObject * op)
+{
+  MeshEntry * e;
+
+  if (!PyInt_Check(op))
+    { return (long)ERRSS("mesh= takes an id returned by plmesh_register"); }
+
+  if (!(e = GetMeshEntry(PyInt_AsLong(op))))
+    {
+      return (long)ERRSS("mesh= is not a registered mesh "
+                         "(or it was dropped from the cache)");
+    }
+
+  clear_pyMsh();
+  Py_INCREF(e->y);
+  Py_INCREF(e->x);
+  Py_INCREF(e->reg);
+  pyMsh.y = e->y;
+  pyMsh.x = e->x;
+  pyMsh.reg = e->reg;
+
+  if (e->triangle)
+    {
+      Py_INCREF(e->triangle);
+      pyMsh.triangle = e->triangle;
+    }
+
+  e->used = ++meshClock;
+  return 1;
+}
+
+/* Forget the mesh_loc index of the default (unregistered) mesh. */
+static void ForgetDefaultMeshIndex(void)
+{
+  ForgetMeshIndex(&meshIndex);
+}
+
+/* Forget the mesh_loc index of each registered mesh with the Y or X
+ * array: a caller setting those again may have changed them in place. */
+static void ForgetSharedMeshIndexes(PyArrayObject * y, PyArrayObject * x)
+{
+  MeshEntry * e;
+
+  for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+    {
+      if (e->id && (e->y == y || e->x == x))
+        { ForgetMeshIndex(&e->index); }
+    }
+}
+
+/* Forget every mesh_loc index, after the mesh arrays changed in place. */
+static void ForgetMeshIndexes(void)
+{
+  MeshEntry * e;
+
+  ForgetMeshIndex(&meshIndex);
+
+  for (e = meshCache; e < meshCache + MESH_CACHE_SIZE; e++)
+    {
+      if (e->id)
+        { ForgetMeshIndex(&e->index); }
+    }
+}
+
+/* Set ZONE to the 1-origin zone (0 if none) of the N points (X0, Y0)
+ * in the current mesh; return 0 if out of memory. */
+static int LocateMeshPoints(const double * x0, const double * y0,
+                            long * zone, long n)
+{
+  MeshLocator loc[MAX_THREADS];
+  MeshEntry * e = CurrentMeshEntry();
+  MeshIndex * mi = e ? &e->index : &meshIndex;
+  GaQuadMesh mesh;
+  long ne;
+  int i, nt;
+
+  if (mi->y != pyMsh.y || mi->x != pyMsh.x || mi->reg != pyMsh.reg)
+    {
+      /* mesh_loc(y0, x0, y, x) makes a new default region array
+         every time: an equal one does not call for a new index */
+      ne = PyArray_SIZE(pyMsh.reg);
+
+      if (mi->y == pyMsh.y && mi->x == pyMsh.x
+          && mi->reg && PyArray_SIZE(mi->reg) == ne
+          && PyArray_TYPE(mi->reg) == PyArray_TYPE(pyMsh.reg)
+          && !memcmp(PyArray_DATA(mi->reg), PyArray_DATA(pyMsh.reg),
+                     PyArray_NBYTES(pyMsh.reg)))
+        {
+          Py_DECREF(mi->reg);
+        }
+
+      else
+        {
+          get_mesh(&mesh);
+
+          if (!BuildMeshIndex(mi, &mesh))
+            { return 0; }
+
+          Py_INCREF(pyMsh.y);
+          Py_INCREF(pyMsh.x);
+          mi->y = pyMsh.y;
+          mi->x = pyMsh.x;
+
+          if (e)
+            { TrimMeshCache(e); }
+        }
+
+      Py_INCREF(pyMsh.reg);
+      mi->reg = pyMsh.reg;
+    }
+
+  nt = ThreadCount(n, LOC_BLOCK);
+
+  for (i = 0; i < nt; i++)
+    {
+      loc[i].index = mi;
+      loc[i].x0 = x0;
+      loc[i].y0 = y0;
+      loc[i].zone = zone;
+      loc[i].start = n * i / nt;
+      loc[i].stop = n * (i + 1) / nt;
+    }
+
+  RunThreads(LocatePoints, loc, sizeof(MeshLocator), nt);
+  return 1;
+}
+
+static char mesh_loc__doc__[] =
+  "mesh_loc(y0, x0)\n"
+  "or mesh_loc(y0, x0, y, x)\n"
+  "or mesh_loc(y0, x0, y, x, ireg)\n"
+  "or mesh_loc(y0, x0, mesh=mesh_id)\n"
+  "   Returns the zone index (=i+imax*(j-1)) of the zone of the mesh\n"
+  "   (X,Y) (with optional region number array IREG) containing the\n"
+  "   point (X0,Y0).  If (X0,Y0) lies outside the mesh, returns 0.\n"
+  "   Thus, eg- ireg(mesh_loc(x0, y0, y, x, ireg)) is the region number of\n"
+  "   the region containing (x0,y0).  If no mesh specified, uses default.\n"
+  "   X0 and Y0 may be arrays as long as they are conformable.\n"
+  "   The zones of the mesh are indexed, so that only the few zones near\n"
+  "   each point are tested; large arrays of points are located by\n"
+  "   several threads.  The index of the default mesh is kept until\n"
+  "   plmesh (or mesh_loc with Y, X) sets the mesh again, which also\n"
+  "   picks up any change made to the mesh arrays in place; with Y, X\n"
+  "   given, the mesh is indexed anew on every call.  Each mesh of\n"
+  "   plmesh_register (given as mesh=MESH_ID) keeps its own index.\n"
+  "\n" "   SEE ALSO: plmesh, plmesh_register, mouse\n";
+
+#undef N_KEYWORDS
+#define N_KEYWORDS 1
+static char * locKeys[N_KEYWORDS + 1] = { "mesh", 0 };
+
+static PyObject * mesh_loc(PyObject * self, PyObject * args, PyObject * kd)
+{
+  long * zone;
+  npy_intp i, n;
+  GaQuadMesh mesh;
+  double * x0 = 0, *y0 = 0;
+  PyObject * y0op, *x0op;
+  PyArrayObject * y0ap = 0, *x0ap = 0, *rap = 0;
+  PyObject * kwt[NELT(locKeys) - 1];
+  char * errstr =
+    "mesh_loc requires arguments (y0, x0 [ , y, x [ ,ireg ] ])";
+  struct
+  {
+    double x, y;
+  } dbuf;
+
+  if (PyTuple_Size(args) < 2)
+    {
+      return ERRSS("mesh_loc requires at least two arguments");
+    }
+
+  BUILD_KWT(kd, locKeys, kwt);
+  TRY(setvu_mesh(args, &y0op, &x0op, errstr, kwt[0]), (PyObject *) NULL);
+
+  if (!pyMsh.y)
+    {
+      return ERRSS("No current mesh - set (y, x) first");
+    }
+
+  get_mesh(&mesh);
+
+  if (isARRAY(y0op))
+    {
+      TRY(addToArrayList((PyObject *)(y0ap = (PyArrayObject *)
+                                             PyArray_ContiguousFromObject
+                                             (y0op, NPY_DOUBLE, 1, 0))),
+          (PyObject *) PyErr_NoMemory());
+      n = PyArray_SIZE(y0ap);
+      TRY(addToArrayList((PyObject *)(x0ap = (PyArrayObject *)
+                                             PyArray_ContiguousFromObject
+                                             (x0op, NPY_DOUBLE, 1, 0))),
+          (PyObject *) PyErr_NoMemory());
+
+      if (n != PyArray_SIZE(x0ap))
+        {
+          clearArrayList();
+          return ERRSS("(y0, x0) must be same size");
+        }
+
+      y0 = (double *)PyArray_DATA(y0ap);
+      x0 = (double *)PyArray_DATA(x0ap);
+    }
+
+  else if (PyFloat_Check(y0op))
+    {
+      y0 = &dbuf.y;
+      x0 = &dbuf.x;
+      y0[0] = PyFloat_AsDouble(y0op);
+      x0[0] = PyFloat_AsDouble(x0op);
+      n = 1;
+    }
+
+  else
+    {
+      return
+        ERRSS("(y0, x0) must be floating point scalars or arrays.");
+    }
+
+  NEW_ARR(rap, 1, &n, NPY_LONG, PyObject *);
+  zone = (long *)PyArray_DATA(rap);
+
+  /* without memory for the index, scan the mesh for each point */
+  if (!LocateMeshPoints(x0, y0, zone, n))
+    for (i = 0; i < n; i++)
+      zone[i] =
+        1 + FindMeshZone(x0[i], y0[i], mesh.x, mesh.y,
+                         mesh.reg, mesh.iMax, mesh.jMax);
 
   if (isARRAY(y0op))
     {
@@ -4403,7 +5758,8 @@ static char plc__doc__[] =
   "     The function being contoured takes the value Z at each point\n"
   "     (X,Y) -- that is, the Z array is presumed to be point-centered.\n"
   "     The Y, X, and IREG arguments may all be omitted to default to the\n"
-  "     mesh set by the most recent plmesh call.\n"
+  "     mesh set by the most recent plmesh call, or, with mesh=MESH_ID,\n"
+  "     to a mesh kept by plmesh_register.\n"
   "     The LEVS keyword is a list of the values of Z at which you want\n"
   "     contour curves.  The default is eight contours spanning the\n"
   "     range of Z.\n"
@@ -4412,28 +5768,28 @@ static char plc__doc__[] =
   "   KEYWORDS: legend, hide\n"
   "             type, width, color, smooth\n"
   "             marks, marker, mspace, mphase\n"
-  "             triangle, region\n"
+  "             triangle, region, mesh\n"
   "\n"
   "   SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp, plmesh\n"
   "             limits, logxy, ylimits, fma, hcp\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 15
+#define N_KEYWORDS 16
 static char * plcKeys[N_KEYWORDS + 1] =
 {
   "legend", "hide", "region", "color", "type", "width",
   "marks", "mcolor", "marker", "msize", "mspace", "mphase",
-  "smooth", "triangle", "levs", 0
+  "smooth", "triangle", "levs", "mesh", 0
 };
 
 static PyObject * plc(PyObject * self, PyObject * args, PyObject * kd)
 {
   GaQuadMesh mesh;
-  PyArrayObject * zap;
   PyObject * zop;
+  npy_intp dims[NPY_MAXDIMS];
   int i;
   char * z_name = 0, *y_name = 0, *x_name = 0, *r_name = 0;
-  long iMax = 0, jMax = 0, nLevels = 0;
+  long iMax = 0, jMax = 0, nLevels = 0, nz;
   double * z = 0, *levels = 0;	/* UPDATE */
   PyObject * kwt[NELT(plcKeys) - 1];
   char * errstr =
@@ -4447,16 +5803,16 @@ static PyObject * plc(PyObject * self, PyObject * args, PyObject * kd)
     }
 
   BUILD_KWT(kd, plcKeys, kwt);
-  TRY(setz_mesh(args, &zop, errstr, kwt[13]), (PyObject *) NULL);
+  TRY(setz_mesh(args, &zop, errstr, kwt[13], kwt[15]), (PyObject *) NULL);
 
   if (!pyMsh.y)
     {
       return ERRSS("No current mesh - set (y, x) first");
     }
 
-  GET_ARR(zap, zop, NPY_DOUBLE, 2, PyObject *);
-  jMax = PyArray_DIM((PyArrayObject *)zap, 0);
-  iMax = PyArray_DIM((PyArrayObject *)zap, 1);
+  GET_REAL(z, zop, 2, dims, nz, PyObject *);
+  jMax = dims[0];
+  iMax = dims[1];
 
   if (PyArray_DIM((PyArrayObject *)pyMsh.y, 0) != jMax || PyArray_DIM((PyArrayObject *)pyMsh.y, 1) != iMax)
     {
@@ -4464,7 +5820,6 @@ static PyObject * plc(PyObject * self, PyObject * args, PyObject * kd)
       return ERRSS("Z array must match (y, x) mesh arrays in shape");
     }
 
-  z = (double *)PyArray_DATA(zap);
   get_mesh(&mesh);
 
   if (mesh.iMax != iMax || mesh.jMax != jMax)
@@ -4550,9 +5905,8 @@ static PyObject * plc(PyObject * self, PyObject * args, PyObject * kd)
     GdContours(NOCOPY_MESH, &mesh, gistD.region, z, levels,
                (int)nLevels);
   PyFPE_END_PROTECT(dummy)
-  Py_DECREF(zap);
+  clearArrayList();
   SAFE_FREE(levels);
-  array_list_length = 0;
   mem_list_length = 0;
 
   if (curElement < 0)
@@ -4833,11 +6187,11 @@ static char pldj__doc__[] =
 static PyObject * pldj(PyObject * self, PyObject * args, PyObject * kd)
 {
   PyObject * op[4];
-  PyArrayObject * ap[4];
+  npy_intp dims[NPY_MAXDIMS];
   double * d[4];
   int i;
   char * x0_name = 0, *y0_name = 0, *x1_name = 0, *y1_name = 0;
-  long n = 0;
+  long n = 0, len[4];
 
   PyObject * kwt[NELT(pldjKeys) - 1];
   char * errstr = "pldj requires exactly four non-keyword arguments";
@@ -4850,18 +6204,12 @@ static PyObject * pldj(PyObject * self, PyObject * args, PyObject * kd)
     }
 
   for (i = 0; i < 4; i++)
-    TRY(addToArrayList((PyObject *)(ap[i] = (PyArrayObject *)
-                                            PyArray_ContiguousFromObject(op
-                                                [i],
-                                                NPY_DOUBLE,
-                                                1,
-                                                0))),
-        (PyObject *) PyErr_NoMemory());
+    { GET_REAL(d[i], op[i], 0, dims, len[i], PyObject *); }
 
-  n = PyArray_SIZE(ap[0]);
+  n = len[0];
 
   for (i = 1; i < 4; i++)
-    if (PyArray_SIZE(ap[i]) != n)
+    if (len[i] != n)
       {
         clearArrayList();
         return
@@ -4885,9 +6233,6 @@ static PyObject * pldj(PyObject * self, PyObject * args, PyObject * kd)
   SETKW(kwt[3], gistA.l.type, setkw_linetype, pldjKeys[3]);
   SETKW(kwt[4], gistA.l.width, setkw_double, pldjKeys[4]);
 
-  for (i = 0; i < 4; i++)
-    { d[i] = (double *)PyArray_DATA(ap[i]); }
-
   curElement = -1;
   PyFPE_START_PROTECT("pldj", return 0)
   curElement = GdDisjoint(n, d[0], d[1], d[2], d[3]);
@@ -5302,7 +6647,285 @@ static PyObject * pledit(PyObject * self, PyObject * args, PyObject * kd)
 }
 
 /*  -------------------------------------------------------------------- */
-/*  plf */
+/*  plupdate */
+
+static char plupdate__doc__[] =
+  "plupdate( y=y, x=x, z=z )\n"
+  "or plupdate( n_element, y=y, x=x, z=z )\n"
+  "     Replaces the data of element number N_ELEMENT in place, without\n"
+  "     deleting and re-creating it.  As for pledit, the default is the\n"
+  "     most recently added element, or the element specified in the\n"
+  "     most recent plq query command.  Every new array must have the\n"
+  "     same shape as the one it replaces; only the changed element is\n"
+  "     redrawn, which makes plupdate the cheap way to animate a plot.\n"
+  "\n"
+  "     The keywords that apply to each kind of element are:\n"
+  "       plg:  y, x\n"
+  "       plm:  y, x\n"
+  "       plf:  y, x, z, top, cmin, cmax\n"
+  "       pli:  z, top, cmin, cmax\n"
+  "     For plg, y and x are 1-D with the current number of points.\n"
+  "     For plm and plf, y and x are the mesh node coordinates, which the\n"
+  "     element shares with the current mesh (see plmesh): the new values\n"
+  "     are copied into the mesh arrays, those passed to plmesh when they\n"
+  "     were contiguous doubles, and every element drawn on that mesh is\n"
+  "     redrawn.  Z is a new array of colors for plf or pli, as for those\n"
+  "     functions; if it is not of type char it is scaled with top, cmin,\n"
+  "     cmax as for bytscl.  Elements drawn with (r,g,b) colors, or plf\n"
+  "     elements drawn without z, cannot be given a new z (ValueError).\n"
+  "     Curves drawn by plg with decimate= cannot be updated; delete and\n"
+  "     plot them again instead.\n"
+  "\n"
+  "   SEE ALSO: pledit, plq, plg, plm, plf, pli\n";
+
+#undef N_KEYWORDS
+#define N_KEYWORDS 6
+static char * updateKeys[N_KEYWORDS + 1] =
+{
+  "y", "x", "z", "top", "cmin", "cmax", 0
+};
+
+/* Copy Z into HEIGHT rows of WIDTH colors at COLORS, whose rows are
+ * STRIDE apart, byte-scaling it first unless it is already unsigned
+ * char.  Z is HEIGHTxWIDTH, or (HEIGHT+1)x(WIDTH+1) as when plf is
+ * given z on the mesh nodes, in which case its first row and column
+ * are unused.  KWT and KEYWRDS are the top, cmin, cmax keywords.
+ */
+static long UpdateColors(PyObject * zop, PyObject * kwt[], char * keywrds[],
+                         GpColor * colors, long width, long height,
+                         long stride, int * reg, int region)
+{
+  PyArrayObject * zap;
+  npy_intp dims[NPY_MAXDIMS];
+  GpColor * zc, *src;
+  double * z, zmin, zmax, scale, offset;
+  long j, nz, zw;
+  int converted = 0;
+
+  if (isARRAY(zop) && (PyArray_TYPE((PyArrayObject *)zop) == NPY_UBYTE))
+    {
+      GET_ARR(zap, zop, Py_GpColor, 2, long);
+      dims[0] = PyArray_DIM(zap, 0);
+      dims[1] = PyArray_DIM(zap, 1);
+      zc = (GpColor *) PyArray_DATA(zap);
+    }
+
+  else
+    {
+      GET_REAL(z, zop, 2, dims, nz, long);
+      zc = 0;
+    }
+
+  zw = dims[1];
+
+  if ((dims[0] != height || zw != width)
+      && (dims[0] != height + 1 || zw != width + 1))
+    {
+      clearArrayList();
+      return (long)ERRSS("plupdate z array does not match the element");
+    }
+
+  if (!zc)
+    {
+      TRY(GrabByteScale(kwt, keywrds, &scale, &offset, &zmin, &zmax,
+                        z, reg, region, width + 1, height + 1,
+                        (int)(zw == width)), 0);
+      TRY(zc = PushColors(z, dims[0] * zw, zmin, zmax, scale, offset), 0);
+      converted = 1;
+    }
+
+  src = (zw == width) ? zc : zc + zw + 1;
+
+  for (j = 0; j < height; j++)
+    { memcpy(colors + j * stride, src + j * zw, width * sizeof(GpColor)); }
+
+  if (converted)
+    { free(zc); }
+
+  clearArrayList();
+  return 1;
+}
+
+/* Mark damaged every element of the current drawing, in any system,
+ * drawn on the mesh whose node coordinates are at MESHY, MESHX, since
+ * they all share those arrays; then select element N_ELEMENT of the
+ * current system again. */
+static void DamageMesh(const double * meshy, const double * meshx,
+                       int n_element)
+{
+  int s0 = GdGetSystem(), s, i, type;
+
+  for (s = 0; GdSetSystem(s) == E_SYSTEM || s == 0; s++)
+    for (i = 0; (type = GdSetElement(i)) != E_NONE; i++)
+      if ((type == E_MESH || type == E_FILLED || type == E_VECTORS
+           || type == E_CONTOURS)
+          && gistD.mesh.y == meshy && gistD.mesh.x == meshx)
+        { GdEdit(CHANGE_XY); }
+
+  GdSetSystem(s0);
+  GdSetElement(n_element);
+}
+
+static PyObject * plupdate(PyObject * self, PyObject * args, PyObject * kd)
+{
+  int type, n_element = 0, changes = 0;
+  PyObject * kwt[NELT(updateKeys) - 1];
+  npy_intp ydims[NPY_MAXDIMS], xdims[NPY_MAXDIMS];
+  double * y = 0, *x = 0, *meshy = 0, *meshx = 0;
+  long ny = 0, nx = 0, npts = 0;
+
+  TRY(PyArg_ParseTuple(args, "|i", &n_element), (PyObject *) NULL);
+
+  /* Pygist uses 1-origin element numbering, Gist uses 0-origin */
+  n_element--;
+
+  if (n_element < 0)
+    {
+      if (curElement >= 0)
+        {
+          n_element = GdFindIndex(curElement);
+
+          if (n_element < 0)
+            {
+              curElement = -1;
+              return
+                ERRSS
+                ("lost current graphical element for plupdate (BUG?)");
+            }
+        }
+
+      else if (curElement == -6666 && curIXc < 0)
+        {
+          n_element = curIX;
+        }
+
+      else
+        {
+          return ERRSS("no current graphical element for plupdate");
+        }
+    }
+
+  if (FindDecimated(n_element) >= 0)
+    {
+      return ERRSS("plupdate does not support decimated curves");
+    }
+
+  BUILD_KWT(kd, updateKeys, kwt);
+  type = GdSetElement(n_element);
+
+  if (type != E_LINES && type != E_MESH && type != E_FILLED
+      && type != E_CELLS)
+    {
+      return ERRSS("plupdate works only for plg, plm, plf, pli elements");
+    }
+
+  if (kwt[2] && (type == E_LINES || type == E_MESH))
+    {
+      return ERRSS("z = in plupdate allowed only for plf, pli");
+    }
+
+  if ((kwt[0] || kwt[1]) && type == E_CELLS)
+    {
+      return ERRSS("y =, x = in plupdate not allowed for pli");
+    }
+
+  if (kwt[2] && gistA.rgb)
+    {
+      return ERRSS("plupdate cannot replace (r,g,b) colors");
+    }
+
+  if (kwt[2] && type == E_FILLED && !gistD.colors)
+    {
+      PyErr_SetString(PyExc_ValueError,
+                      "plupdate z = for a plf drawn without z");
+      return (PyObject *) NULL;
+    }
+
+  curElement = -6666;	/* as after pledit */
+  curIX = n_element;
+  curIXc = -1;
+
+  if (type == E_LINES)
+    {
+      npts = gistD.n;
+    }
+
+  else if (type != E_CELLS)
+    {
+      npts = gistD.mesh.iMax * gistD.mesh.jMax;
+    }
+
+  if (kwt[0])
+    { GET_REAL(y, kwt[0], (type == E_LINES) ? 1 : 2, ydims, ny, PyObject *); }
+
+  if (kwt[1])
+    { GET_REAL(x, kwt[1], (type == E_LINES) ? 1 : 2, xdims, nx, PyObject *); }
+
+  if ((y && ny != npts) || (x && nx != npts)
+      || (type != E_LINES
+          && ((y && ydims[1] != gistD.mesh.iMax)
+              || (x && xdims[1] != gistD.mesh.iMax))))
+    {
+      clearArrayList();
+      return ERRSS("plupdate y, x arrays do not match the element");
+    }
+
+  if (type == E_LINES)
+    {
+      if (y)
+        { memcpy(gistD.y, y, npts * sizeof(double)); }
+
+      if (x)
+        { memcpy(gistD.x, x, npts * sizeof(double)); }
+    }
+
+  else if (y || x)
+    {
+      if (y)
+        { memcpy(gistD.mesh.y, y, npts * sizeof(double)); }
+
+      if (x)
+        { memcpy(gistD.mesh.x, x, npts * sizeof(double)); }
+
+      /* the mesh may be the one mesh_loc indexed */
+      ForgetMeshIndexes();
+      meshy = gistD.mesh.y;
+      meshx = gistD.mesh.x;
+    }
+
+  clearArrayList();
+
+  if (y || x)
+    { changes |= CHANGE_XY; }
+
+  if (kwt[2] && type == E_FILLED)
+    {
+      TRY(UpdateColors(kwt[2], &kwt[3], &updateKeys[3], gistD.colors,
+                       gistD.mesh.iMax - 1, gistD.mesh.jMax - 1,
+                       gistD.nColumns, gistD.mesh.reg, gistD.region),
+          (PyObject *) NULL);
+      changes |= CHANGE_Z;
+    }
+
+  else if (kwt[2])
+    {
+      TRY(UpdateColors(kwt[2], &kwt[3], &updateKeys[3], gistD.colors,
+                       gistD.width, gistD.height, gistD.width,
+                       (int *)0, 0), (PyObject *) NULL);
+      changes |= CHANGE_Z;
+    }
+
+  GdEdit(changes);
+
+  if (meshy)
+    { DamageMesh(meshy, meshx, n_element); }
+
+  Py_INCREF(Py_None);
+  return Py_None;
+}
+
+/*  -------------------------------------------------------------------- */
+/*  plf */
 
 static char plf__doc__[] =
   "plf( z, y, x )\n"
@@ -5318,7 +6941,8 @@ static char plf__doc__[] =
   "     function and the current palette; thus Z is interpreted as a\n"
   "     zone-centered array.\n"
   "     The Y, X, and IREG arguments may all be omitted to default to the\n"
-  "     mesh set by the most recent plmesh call.\n"
+  "     mesh set by the most recent plmesh call, or, with mesh=MESH_ID,\n"
+  "     to a mesh kept by plmesh_register.\n"
   "     A solid edge can optionally be drawn around each zone by setting\n"
   "     the EDGES keyword non-zero.  ECOLOR and EWIDTH determine the edge\n"
   "     color and width.  The mesh is drawn zone by zone in order from\n"
@@ -5330,25 +6954,26 @@ static char plf__doc__[] =
   "     The following keywords are legal (each has a separate help entry):\n"
   "\n"
   "   KEYWORDS: legend, hide\n"
-  "             region, top, cmin, cmax, edges, ecolor, ewidth\n"
+  "             region, top, cmin, cmax, edges, ecolor, ewidth, mesh\n"
   "\n"
   "   SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp, plmesh,\n"
   "             limits, logxy, ylimits, fma, hcp, palette, bytscl\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 9
+#define N_KEYWORDS 10
 static char * plfKeys[N_KEYWORDS + 1] =
 {
   "legend", "hide", "region", "top", "cmin", "cmax",
-  "edges", "ecolor", "ewidth", 0
+  "edges", "ecolor", "ewidth", "mesh", 0
 };
 
 static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd)
 {
   PyArrayObject * zap;
   PyObject * zop = 0;
+  npy_intp dims[NPY_MAXDIMS];
   char * z_name = 0, *y_name = 0, *x_name = 0, *r_name = 0;
-  long iMax = 0, jMax = 0;
+  long iMax = 0, jMax = 0, nz;
   double * z = 0;
   GpColor * zc = 0;
   GaQuadMesh mesh;
@@ -5366,7 +6991,7 @@ static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd)
     }
 
   BUILD_KWT(kd, plfKeys, kwt);
-  TRY(setz_mesh(args, &zop, errstr, 0), (PyObject *) NULL);
+  TRY(setz_mesh(args, &zop, errstr, 0, kwt[9]), (PyObject *) NULL);
 
   if (!pyMsh.y)
     {
@@ -5417,19 +7042,19 @@ static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd)
 
   else
     {
+      zap = 0;
+
       if (isARRAY(zop)
           && ((PyArray_TYPE((PyArrayObject *)zop) == NPY_DOUBLE)
               || (PyArray_TYPE((PyArrayObject *)zop) == NPY_FLOAT)))
         {
-          GET_ARR(zap, zop, NPY_DOUBLE, 2, PyObject *);
-          z = (double *)PyArray_DATA(zap);
+          GET_REAL(z, zop, 2, dims, nz, PyObject *);
         }
 
       else
         {
           z = 0;
           zc = 0;
-          zap = 0;
         }
     }
 
@@ -5439,6 +7064,12 @@ static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd)
       iMax = PyArray_DIM((PyArrayObject *)zap, 1);
     }
 
+  else if (z)
+    {
+      jMax = dims[0];
+      iMax = dims[1];
+    }
+
   else
     {
       jMax = iMax = 0;
@@ -5447,7 +7078,7 @@ static PyObject * plf(PyObject * self, PyObject * args, PyObject * kd)
   if ((z || zc) && ((mesh.iMax != iMax || mesh.jMax != jMax) &&
                     (mesh.iMax != iMax + 1 || mesh.jMax != jMax + 1)))
     {
-      removeFromArrayList((PyObject *) zap);
+      clearArrayList();
       return
         ERRSS
         ("z array must have same or 1 smaller dimensions as mesh in plf");
@@ -5566,8 +7197,9 @@ static char * plfpKeys[N_KEYWORDS + 1] =
 
 static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd)
 {
-  PyArrayObject * zap = 0, *yap, *xap, *nap;
+  PyArrayObject * zap = 0, *nap;
   PyObject * zop, *yop, *xop, *nop;
+  npy_intp dims[NPY_MAXDIMS];
   int i;
   long nz, nx, nn, np;
   long ny = 0, *pn = 0;
@@ -5630,8 +7262,7 @@ static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd)
            && ((PyArray_TYPE((PyArrayObject *)zop) == NPY_DOUBLE)
                || (PyArray_TYPE((PyArrayObject *)zop) == NPY_FLOAT)))
     {
-      GET_ARR(zap, zop, NPY_DOUBLE, 1, PyObject *);
-      z = (double *)PyArray_DATA(zap);
+      GET_REAL(z, zop, 1, dims, nz, PyObject *);
     }
 
   else
@@ -5641,15 +7272,14 @@ static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd)
         ("z array must be of type uint8, float or double");
     }
 
-  GET_ARR(yap, yop, NPY_DOUBLE, 1, PyObject *);
-  GET_ARR(xap, xop, NPY_DOUBLE, 1, PyObject *);
+  GET_REAL(y, yop, 1, dims, ny, PyObject *);
+  GET_REAL(x, xop, 1, dims, nx, PyObject *);
   GET_ARR(nap, nop, NPY_LONG, 1, PyObject *);
   nn = PyArray_SIZE(nap);
-  nx = PyArray_SIZE(xap);
-  ny = PyArray_SIZE(yap);
-  nz = (zap) ? PyArray_SIZE(zap) : nn;
-  y = (double *)PyArray_DATA(yap);
-  x = (double *)PyArray_DATA(xap);
+
+  if (zc)
+    { nz = PyArray_SIZE(zap); }
+
   pn = (long *)PyArray_DATA(nap);
 
   /* Error checking is complicated by required DECREF's on failure. */
@@ -5685,52 +7315,531 @@ static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd)
                      (char *)0, (char *)0, kwt, plfpKeys))
     { return ERRSS("Error in plfp: LegendAndHide"); }
 
-  if (!zc && z)
+  if (!zc && z)
+    {
+      double zmin, zmax, scale, offset;
+
+      TRY(GrabByteScale
+          (&kwt[2], &plfpKeys[2], &scale, &offset, &zmin,
+           &zmax, z, (int *)0, 0, nz + 1, 2L, 1), (PyObject *) NULL);
+      TRY(zc =
+            PushColors(z, nz, zmin, zmax, scale, offset),
+          (PyObject *) NULL);
+      convertedZ = 1;
+    }
+
+  else
+    {
+      convertedZ = 0;
+    }
+
+  GhGetFill();
+
+  SETKW(kwt[0], gistD.legend, setkw_string, plfpKeys[0]);
+  SETKW(kwt[1], gistD.hidden, setkw_boolean, plfpKeys[1]);
+
+  if (kwt[5])
+    {
+      int edgetype = 0;
+      SETKW(kwt[5], edgetype, setkw_boolean, plfpKeys[5]);
+      gistA.e.type = edgetype ? L_SOLID : L_NONE;
+    }
+
+  SETKW(kwt[6], gistA.e.color, setkw_color, plfpKeys[6]);
+  SETKW(kwt[7], gistA.e.width, setkw_double, plfpKeys[7]);
+  gistA.rgb = rgb;
+
+  curElement = -1;
+  PyFPE_START_PROTECT("plfp", return 0)
+  curElement = GdFill(nz, zc, x, y, pn);
+  PyFPE_END_PROTECT(dummy)
+  clearArrayList();
+
+  if (convertedZ)
+    { free(zc); }
+
+  if (curElement < 0)
+    {
+      return ERRSS("Gist GdFill plotter failed");
+    }
+
+  Py_INCREF(Py_None);
+  return Py_None;
+}
+
+/*  -------------------------------------------------------------------- */
+/*  plg */
+
+static char plg__doc__[] =
+  "plg( y [, x] )\n"
+  "  Plot a graph of Y versus X.  Y and X must be 1-D arrays of equal\n"
+  "  length; if X is omitted, it defaults to [1, 2, ..., 1+range(len(Y))].\n"
+  "  The following keywords are legal (each has a separate help entry):\n"
+  "\n"
+  "  KEYWORDS: legend, hide\n"
+  "             type, width, color, closed, smooth\n"
+  "             marks, marker, mspace, mphase\n"
+  "             rays, arrowl, arroww, rspace, rphase\n"
+  "             decimate\n"
+  "\n"
+  "  Example:    plg ( y, x, type=0, marker=character )\n"
+  "\n"
+  "  If character is '\\1', '\\2', '\\3', '\\4', or '\\5', you get point, plus,\n"
+  "  asterisk, circle, and cross, respectively.  If you make the marker size\n"
+  "  small enough (the default is small enough), then '\\1' will plot points\n"
+  "  on the X display, which is the most usual request.  For 2-5 or for large\n"
+  "  marker size, you get the characters on the X display, but in the\n"
+  "  hardcopy files (postscript or cgm) those special markers will be\n"
+  "  rendered nicely.\n"
+  "\n"
+  "  For very long series, decimate=1 draws only what can be seen: X must\n"
+  "  be nondecreasing, and the samples are binned into one bin per device\n"
+  "  pixel column across the current x limits and viewport, keeping the\n"
+  "  first, smallest, largest and last sample of each bin.  The curve\n"
+  "  looks the same as the full one, and is decimated again whenever the\n"
+  "  x limits change (limits, unzoom, or mouse zoom).  decimate=N>1 uses\n"
+  "  N bins instead of the pixel width.  Ignored for log x axes.\n"
+  "\n"
+  "  SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp\n"
+  "             limits, logxy, ylimits, fma, hcp\n";
+
+#undef N_KEYWORDS
+#define N_KEYWORDS 20
+static char * plgKeys[N_KEYWORDS + 1] =
+{
+  "legend", "hide", "color", "type", "width",
+  "marks", "mcolor", "marker", "msize", "mspace", "mphase",
+  "rays", "arrowl", "arroww", "rspace", "rphase",
+  "closed", "smooth", "n", "decimate", 0
+};
+
+/* plg decimate= support.
+ * A decimated curve is drawn from a fixed number of points, 4 per bin
+ * (first, min, max, last), padded by repeating the final point.  The
+ * source arrays are remembered here so that, when the x limits of the
+ * curve's system change, the element points can be recomputed in place
+ * (same length, so Gist's copy is simply overwritten) before redrawing.
+ */
+#define DECIMATE_LIST_SIZE 16
+
+static struct
+{
+  int device, system, id;
+  long bins, request, capacity;
+  double xmin, xmax;
+  PyArrayObject * y, *x;	/* x == 0 means 1, 2, ..., len(y) */
+} decimateList[DECIMATE_LIST_SIZE];
+static int decimate_list_length = 0;
+
+#define DEC_X(x, i) ((x) ? (x)[i] : (double)(1 + (i)))
+
+/* Bin the nondecreasing curve (x, y) into NBINS equal columns of
+ * [XMIN, XMAX), plus one bin on either side for points outside, and
+ * keep the first, smallest, largest and last point of each bin in
+ * their original order.  XD and YD hold 4*(NBINS+2) points; the return
+ * value is the number actually used. */
+static long DecimateLines(long n, const double * x, const double * y,
+                          double xmin, double xmax, long nbins,
+                          double * xd, double * yd)
+{
+  long i, j, k, m = 0, bin, cur = -2, keep[4], t;
+  double scale = nbins / (xmax - xmin);
+
+  keep[0] = keep[1] = keep[2] = 0;
+
+  for (i = 0; i <= n; i++)
+    {
+      if (i == n)
+        { bin = -3; }
+
+      else if (DEC_X(x, i) < xmin)
+        { bin = -1; }
+
+      else if (DEC_X(x, i) >= xmax)
+        { bin = nbins; }
+
+      else if ((bin = (long)((DEC_X(x, i) - xmin) * scale)) >= nbins)
+        { bin = nbins - 1; }
+
+      if (bin == cur)
+        {
+          if (y[i] < y[keep[1]])
+            { keep[1] = i; }
+
+          if (y[i] > y[keep[2]])
+            { keep[2] = i; }
+
+          continue;
+        }
+
+      if (cur != -2)
+        {
+          /* emit first, min, max, last of the finished bin in order */
+          keep[3] = i - 1;
+
+          for (j = 1; j < 4; j++)
+            for (k = j; k > 0 && keep[k - 1] > keep[k]; k--)
+              {
+                t = keep[k];
+                keep[k] = keep[k - 1];
+                keep[k - 1] = t;
+              }
+
+          for (j = 0; j < 4; j++)
+            if (!j || keep[j] != keep[j - 1])
+              {
+                xd[m] = DEC_X(x, keep[j]);
+                yd[m++] = y[keep[j]];
+              }
+        }
+
+      cur = bin;
+      keep[0] = keep[1] = keep[2] = i;
+    }
+
+  return m;
+}
+
+/* Number of bins for decimate=REQUEST in the current system: the
+ * width of the viewport in device pixels unless REQUEST > 1. */
+static long DecimateBins(long request)
+{
+  int n = GhGetPlotter();
+  Engine * engine = (n >= 0) ? ghDevices[n].display : 0;
+  double width = gistD.trans.viewport.xmax - gistD.trans.viewport.xmin;
+  int dpi = defaultDPI;
+
+  if (request > 1)
+    { return request; }
+
+  /* engine->map is the WC->pixel map, the viewport is in NDC */
+  if (GisRasterEngine(engine))
+    { dpi = GisRasterEngine(engine)->dpi; }
+
+  else if (GisXEngine(engine))
+    { dpi = GisXEngine(engine)->dpi; }
+
+  width *= dpi / (72.27 * ONE_POINT);
+
+  return (width < 1.0) ? 1 : (long)(width + 0.5);
+}
+
+/* x range to decimate over, from the current limits (GdGetLimits
+ * must have been called) or from the data where they are extreme. */
+static void DecimateRange(long n, const double * x, double * xmin,
+                          double * xmax)
+{
+  double lo = gistD.limits.xmin, hi = gistD.limits.xmax, t;
+
+  if (lo > hi)
+    {
+      t = lo;
+      lo = hi;
+      hi = t;
+    }
+
+  if (gistD.flags & (D_XMIN | D_XMAX))
+    {
+      if (gistD.flags & D_XMIN)
+        { lo = DEC_X(x, 0); }
+
+      if (gistD.flags & D_XMAX)
+        { hi = DEC_X(x, n - 1); }
+    }
+
+  if (!(hi > lo))
+    { hi = lo + 1.0; }
+
+  *xmin = lo;
+  *xmax = hi;
+}
+
+/* Fill XD, YD with exactly CAPACITY points. */
+static void DecimatePadded(long n, const double * x, const double * y,
+                           double xmin, double xmax, long bins,
+                           long capacity, double * xd, double * yd)
+{
+  long m = DecimateLines(n, x, y, xmin, xmax, bins, xd, yd);
+
+  for (; m < capacity; m++)
+    {
+      xd[m] = xd[m - 1];
+      yd[m] = yd[m - 1];
+    }
+}
+
+static void DropDecimated(int k)
+{
+  Py_XDECREF(decimateList[k].y);
+  Py_XDECREF(decimateList[k].x);
+
+  for (decimate_list_length--; k < decimate_list_length; k++)
+    { decimateList[k] = decimateList[k + 1]; }
+}
+
+/* Forget every decimated curve on DEVICE, or all of them if DEVICE < 0. */
+static void ForgetDecimated(int device)
+{
+  int k;
+
+  for (k = decimate_list_length - 1; k >= 0; k--)
+    if (device < 0 || decimateList[k].device == device)
+      { DropDecimated(k); }
+}
+
+/* Position in decimateList of element INDEX of the current system on
+ * the current device, or -1 if that element is not a decimated curve. */
+static int FindDecimated(int index)
+{
+  int k, dev = GhGetPlotter(), sys = GdGetSystem();
+
+  for (k = 0; k < decimate_list_length; k++)
+    if (decimateList[k].device == dev && decimateList[k].system == sys
+        && GdFindIndex(decimateList[k].id) == index)
+      { return k; }
+
+  return -1;
+}
+
+static void RememberDecimated(PyObject * yop, PyObject * xop, long request,
+                              long bins, long capacity, double xmin,
+                              double xmax)
+{
+  PyArrayObject * yap, *xap = 0;
+  int k;
+
+  yap = (PyArrayObject *) PyArray_ContiguousFromObject(yop, NPY_DOUBLE,
+        1, 1);
+
+  if (yap && xop)
+    {
+      xap = (PyArrayObject *) PyArray_ContiguousFromObject(xop,
+            NPY_DOUBLE, 1, 1);
+    }
+
+  if (!yap || (xop && !xap))
+    {
+      /* the curve just stays decimated at its current resolution */
+      Py_XDECREF(yap);
+      PyErr_Clear();
+      return;
+    }
+
+  if (decimate_list_length == DECIMATE_LIST_SIZE)
+    { DropDecimated(0); }
+
+  k = decimate_list_length++;
+  decimateList[k].device = GhGetPlotter();
+  decimateList[k].system = GdGetSystem();
+  decimateList[k].id = curElement;
+  decimateList[k].request = request;
+  decimateList[k].bins = bins;
+  decimateList[k].capacity = capacity;
+  decimateList[k].xmin = xmin;
+  decimateList[k].xmax = xmax;
+  decimateList[k].y = yap;
+  decimateList[k].x = xap;
+}
+
+/* Called at idle time: re-decimate any curve whose x limits (or device
+ * width) changed since it was last decimated.  The new points overwrite
+ * the element's own arrays, then GdEdit marks just that element damaged.
+ * Every device visited gets its current system back afterwards (which
+ * also leaves no element selected; pledit and friends select theirs by
+ * id), the current device last.
+ */
+static void RedecimateLines(void)
+{
+  PyGILState_STATE gil;
+  int k, n0, s0, idx, dev, saved[GH_NDEVS];
+  long n, bins;
+  double xmin, xmax, * x, * y;
+
+  if (!decimate_list_length)
+    { return; }
+
+  gil = PyGILState_Ensure();
+  n0 = GhGetPlotter();
+  s0 = GdGetSystem();
+
+  for (dev = 0; dev < GH_NDEVS; dev++)
+    { saved[dev] = -2; }
+
+  if (n0 >= 0 && n0 < GH_NDEVS)
+    { saved[n0] = s0; }
+
+  for (k = decimate_list_length - 1; k >= 0; k--)
+    {
+      dev = decimateList[k].device;
+
+      if (dev < 0 || dev >= GH_NDEVS || !ghDevices[dev].drawing)
+        {
+          DropDecimated(k);
+          continue;
+        }
+
+      if (GhGetPlotter() != dev)
+        { GhSetPlotter(dev); }
+
+      if (saved[dev] == -2)
+        { saved[dev] = GdGetSystem(); }
+
+      GdSetSystem(decimateList[k].system);
+      GdGetLimits();
+
+      if (gistD.flags & D_LOGX)
+        { continue; }
+
+      n = PyArray_SIZE(decimateList[k].y);
+      y = (double *)PyArray_DATA(decimateList[k].y);
+      x = decimateList[k].x ? (double *)PyArray_DATA(decimateList[k].x) : 0;
+      DecimateRange(n, x, &xmin, &xmax);
+      bins = DecimateBins(decimateList[k].request);
+
+      if (bins > decimateList[k].capacity / 4 - 2)
+        { bins = decimateList[k].capacity / 4 - 2; }
+
+      if (xmin == decimateList[k].xmin && xmax == decimateList[k].xmax
+          && bins == decimateList[k].bins)
+        { continue; }
+
+      idx = GdFindIndex(decimateList[k].id);
+
+      if (idx < 0 || GdSetElement(idx) != E_LINES
+          || gistD.n != decimateList[k].capacity)
+        {
+          DropDecimated(k);
+          continue;
+        }
+
+      DecimatePadded(n, x, y, xmin, xmax, bins, gistD.n, gistD.x, gistD.y);
+      GdEdit(CHANGE_XY);
+      decimateList[k].bins = bins;
+      decimateList[k].xmin = xmin;
+      decimateList[k].xmax = xmax;
+    }
+
+  for (dev = 0; dev < GH_NDEVS; dev++)
+    if (dev != n0 && saved[dev] != -2 && ghDevices[dev].drawing)
+      {
+        GhSetPlotter(dev);
+        GdSetSystem(saved[dev]);
+      }
+
+  if (n0 >= 0 && GhGetPlotter() != n0)
+    { GhSetPlotter(n0); }
+
+  GdSetSystem(s0);
+  PyGILState_Release(gil);
+}
+
+static PyObject * plg(PyObject * self, PyObject * args, PyObject * kd)
+{
+  PyObject * xop = 0, *yop;
+  npy_intp dims[NPY_MAXDIMS];
+  double * x = 0, *y = 0, *xd, *yd, xmin, xmax;
+
+  int i, decimate = 0;
+  long length, xlength, bins = 0, capacity = 0;
+  PyObject * kwt[NELT(plgKeys) - 1];
+  char * errstr =
+    "plg requires one or two 1-D double arrays, of the same length";
+
+  SETJMP0;		/* See Xerror_longjmp() */
+
+  if (!PyArg_ParseTuple(args, "O|O", &yop, &xop))
+    {
+      return ERRSS(errstr);
+    }
+
+  GET_REAL(y, yop, 1, dims, length, PyObject *);
+
+  TRYS(CheckDefaultWindow())GhGetLines();	/* Properties start from defaults for decorated polylines. */
+  BUILD_KWT(kd, plgKeys, kwt);
+  SETKW(kwt[0], gistD.legend, setkw_string, plgKeys[0]);
+  SETKW(kwt[1], gistD.hidden, setkw_boolean, plgKeys[1]);
+  SETKW(kwt[2], gistA.l.color, setkw_color, plgKeys[2]);
+  SETKW(kwt[2], gistA.m.color, setkw_color, plgKeys[2]);
+  SETKW(kwt[3], gistA.l.type, setkw_linetype, plgKeys[3]);
+  SETKW(kwt[4], gistA.l.width, setkw_double, plgKeys[4]);
+  SETKW(kwt[5], gistA.dl.marks, setkw_boolean, plgKeys[5]);
+  SETKW(kwt[6], gistA.m.color, setkw_color, plgKeys[6]);
+  SETKW(kwt[7], gistA.m.type, setkw_xinteger, plgKeys[7]);
+  SETKW(kwt[8], gistA.m.size, setkw_double, plgKeys[8]);
+  SETKW(kwt[9], gistA.dl.mSpace, setkw_double, plgKeys[9]);
+  SETKW(kwt[10], gistA.dl.mPhase, setkw_double, plgKeys[10]);
+  SETKW(kwt[11], gistA.dl.rays, setkw_boolean, plgKeys[11]);
+  SETKW(kwt[12], gistA.dl.arrowL, setkw_double, plgKeys[12]);
+  SETKW(kwt[13], gistA.dl.arrowW, setkw_double, plgKeys[13]);
+  SETKW(kwt[14], gistA.dl.rSpace, setkw_double, plgKeys[14]);
+  SETKW(kwt[15], gistA.dl.rPhase, setkw_double, plgKeys[15]);
+  SETKW(kwt[16], gistA.dl.closed, setkw_boolean, plgKeys[16]);
+  SETKW(kwt[17], gistA.dl.smooth, setkw_boolean, plgKeys[17]);
+  SETKW(kwt[19], decimate, setkw_integer, plgKeys[19]);
+
+  if (xop)
+    {
+      GET_REAL(x, xop, 1, dims, xlength, PyObject *);
+
+      if (xlength != length)
+        {
+          clearArrayList();
+          return ERRSS(errstr);
+        }
+    }
+
+  else
     {
-      double zmin, zmax, scale, offset;
+      NEW_MEM(x, length, double, PyObject *);
 
-      TRY(GrabByteScale
-          (&kwt[2], &plfpKeys[2], &scale, &offset, &zmin,
-           &zmax, z, (int *)0, 0, nz + 1, 2L, 1), (PyObject *) NULL);
-      TRY(zc =
-            PushColors(z, nz, zmin, zmax, scale, offset),
-          (PyObject *) NULL);
-      convertedZ = 1;
+      for (i = 0; i < length; i++)
+        { x[i] = (double)(1 + i); }
     }
 
-  else
+  if (decimate > 0)
     {
-      convertedZ = 0;
+      GdGetLimits();
+      bins = DecimateBins(decimate);
+      capacity = 4 * (bins + 2);
+
+      for (i = 1; i < length && x[i] >= x[i - 1]; i++);
+
+      if (i < length || length <= capacity || (gistD.flags & D_LOGX))
+        { decimate = 0; }	/* plot every point */
     }
 
-  GhGetFill();
+  if (decimate > 0)
+    {
+      NEW_MEM(xd, capacity, double, PyObject *);
+      NEW_MEM(yd, capacity, double, PyObject *);
+    }
 
-  SETKW(kwt[0], gistD.legend, setkw_string, plfpKeys[0]);
-  SETKW(kwt[1], gistD.hidden, setkw_boolean, plfpKeys[1]);
+  curElement = -1;
+  PyFPE_START_PROTECT("plg", return 0)
 
-  if (kwt[5])
+  if (decimate > 0)
     {
-      int edgetype = 0;
-      SETKW(kwt[5], edgetype, setkw_boolean, plfpKeys[5]);
-      gistA.e.type = edgetype ? L_SOLID : L_NONE;
+      DecimateRange(length, xop ? x : 0, &xmin, &xmax);
+      DecimatePadded(length, xop ? x : 0, y, xmin, xmax, bins, capacity,
+                     xd, yd);
+      curElement = GdLines(capacity, xd, yd);
     }
 
-  SETKW(kwt[6], gistA.e.color, setkw_color, plfpKeys[6]);
-  SETKW(kwt[7], gistA.e.width, setkw_double, plfpKeys[7]);
-  gistA.rgb = rgb;
+  else
+    { curElement = GdLines(length, x, y); }
 
-  curElement = -1;
-  PyFPE_START_PROTECT("plfp", return 0)
-  curElement = GdFill(nz, zc, x, y, pn);
   PyFPE_END_PROTECT(dummy)
   clearArrayList();
-
-  if (convertedZ)
-    { free(zc); }
+  clearMemList();
 
   if (curElement < 0)
     {
-      return ERRSS("Gist GdFill plotter failed");
+      return ERRSS("Gist GdLines plotter failed");
+    }
+
+  if (decimate > 0)
+    {
+      RememberDecimated(yop, xop, decimate, bins, capacity, xmin, xmax);
     }
 
   Py_INCREF(Py_None);
@@ -5738,73 +7847,119 @@ static PyObject * plfp(PyObject * self, PyObject * args, PyObject * kd)
 }
 
 /*  -------------------------------------------------------------------- */
-/*  plg */
-
-static char plg__doc__[] =
-  "plg( y [, x] )\n"
-  "  Plot a graph of Y versus X.  Y and X must be 1-D arrays of equal\n"
-  "  length; if X is omitted, it defaults to [1, 2, ..., 1+range(len(Y))].\n"
-  "  The following keywords are legal (each has a separate help entry):\n"
+/*  plg_many */
+
+static char plg_many__doc__[] =
+  "plg_many( y, x, offsets )\n"
+  "  Plot many graphs of Y versus X in one call.  Y and X are 1-D arrays\n"
+  "  holding all the curves one after the other; curve I is\n"
+  "  Y[OFFSETS[I]:OFFSETS[I+1]] versus X[OFFSETS[I]:OFFSETS[I+1]], so\n"
+  "  OFFSETS has one more element than there are curves and must be\n"
+  "  strictly increasing, since every curve needs at least one point.\n"
+  "  Each curve becomes a separate element, exactly as if plg had been\n"
+  "  called on it.\n"
+  "  The keywords are those of plg, and apply to every curve, except that\n"
+  "  color, type and width may also be given as a list or 1-D array with\n"
+  "  one value per curve (integer colors as for the color keyword,\n"
+  "  integer line types 0-5).  A legend is attached to the first curve\n"
+  "  only.\n"
   "\n"
-  "  KEYWORDS: legend, hide\n"
-  "             type, width, color, closed, smooth\n"
-  "             marks, marker, mspace, mphase\n"
-  "             rays, arrowl, arroww, rspace, rphase\n"
-  "\n"
-  "  Example:    plg ( y, x, type=0, marker=character )\n"
-  "\n"
-  "  If character is '\\1', '\\2', '\\3', '\\4', or '\\5', you get point, plus,\n"
-  "  asterisk, circle, and cross, respectively.  If you make the marker size\n"
-  "  small enough (the default is small enough), then '\\1' will plot points\n"
-  "  on the X display, which is the most usual request.  For 2-5 or for large\n"
-  "  marker size, you get the characters on the X display, but in the\n"
-  "  hardcopy files (postscript or cgm) those special markers will be\n"
-  "  rendered nicely.\n"
+  "  Example:    plg_many ( y, x, [0, 100, 250], color=[-5, -7] )\n"
   "\n"
-  "  SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp\n"
-  "             limits, logxy, ylimits, fma, hcp\n";
+  "  SEE ALSO: plg, pledit, plq\n";
 
-#undef N_KEYWORDS
-#define N_KEYWORDS 19
-static char * plgKeys[N_KEYWORDS + 1] =
-{
-  "legend", "hide", "color", "type", "width",
-  "marks", "mcolor", "marker", "msize", "mspace", "mphase",
-  "rays", "arrowl", "arroww", "rspace", "rphase",
-  "closed", "smooth", "n", 0
-};
+/* Per-curve keyword values are lists or arrays; a tuple is an (r,g,b). */
+#define isPERCURVE(v) ((v) && (isARRAY(v) || PyList_Check(v)))
 
-static PyObject * plg(PyObject * self, PyObject * args, PyObject * kd)
+static PyObject * plg_many(PyObject * self, PyObject * args, PyObject * kd)
 {
-  PyObject * xop = 0, *yop;
-  PyArrayObject * xap, *yap;
-  double * x = 0, *y = 0;
-
-  int i;
-  long length;
+  PyObject * xop, *yop, *oop;
+  PyArrayObject * oap, *cap = 0, *tap = 0, *wap = 0;
+  npy_intp dims[NPY_MAXDIMS];
+  double * x, *y, *widths = 0;
+  long * offsets, *colors = 0, *types = 0;
+  long i, ncurves, length, xlength;
   PyObject * kwt[NELT(plgKeys) - 1];
   char * errstr =
-    "plg requires one or two 1-D double arrays, of the same length";
+    "plg_many requires 1-D arrays (y, x, offsets), y and x of the same length";
 
   SETJMP0;		/* See Xerror_longjmp() */
 
-  if (!PyArg_ParseTuple(args, "O|O", &yop, &xop))
+  if (!PyArg_ParseTuple(args, "OOO", &yop, &xop, &oop))
+    {
+      return ERRSS(errstr);
+    }
+
+  GET_REAL(y, yop, 1, dims, length, PyObject *);
+  GET_REAL(x, xop, 1, dims, xlength, PyObject *);
+  GET_ARR(oap, oop, NPY_LONG, 1, PyObject *);
+  offsets = (long *)PyArray_DATA(oap);
+  ncurves = PyArray_SIZE(oap) - 1;
+
+  if (xlength != length || ncurves < 0)
     {
+      clearArrayList();
       return ERRSS(errstr);
     }
 
-  GET_ARR(yap, yop, NPY_DOUBLE, 1, PyObject *);
-  length = PyArray_SIZE(yap);
-  y = (double *)PyArray_DATA(yap);
+  for (i = 0; i < ncurves; i++)
+    if (offsets[i] < 0 || offsets[i] >= offsets[i + 1]
+        || offsets[i + 1] > length)
+      {
+        clearArrayList();
+        return ERRSS("plg_many offsets must increase within len(y)");
+      }
 
   TRYS(CheckDefaultWindow())GhGetLines();	/* Properties start from defaults for decorated polylines. */
   BUILD_KWT(kd, plgKeys, kwt);
+
+  if (kwt[19])
+    {
+      clearArrayList();
+      return ERRSS("plg_many does not support decimate, use plg");
+    }
+
   SETKW(kwt[0], gistD.legend, setkw_string, plgKeys[0]);
   SETKW(kwt[1], gistD.hidden, setkw_boolean, plgKeys[1]);
-  SETKW(kwt[2], gistA.l.color, setkw_color, plgKeys[2]);
-  SETKW(kwt[2], gistA.m.color, setkw_color, plgKeys[2]);
-  SETKW(kwt[3], gistA.l.type, setkw_linetype, plgKeys[3]);
-  SETKW(kwt[4], gistA.l.width, setkw_double, plgKeys[4]);
+
+  if (isPERCURVE(kwt[2]))
+    {
+      GET_ARR(cap, kwt[2], NPY_LONG, 1, PyObject *);
+      colors = (long *)PyArray_DATA(cap);
+    }
+
+  else
+    {
+      SETKW(kwt[2], gistA.l.color, setkw_color, plgKeys[2]);
+      SETKW(kwt[2], gistA.m.color, setkw_color, plgKeys[2]);
+    }
+
+  if (isPERCURVE(kwt[3]))
+    {
+      GET_ARR(tap, kwt[3], NPY_LONG, 1, PyObject *);
+      types = (long *)PyArray_DATA(tap);
+    }
+
+  else
+    { SETKW(kwt[3], gistA.l.type, setkw_linetype, plgKeys[3]); }
+
+  if (isPERCURVE(kwt[4]))
+    {
+      GET_ARR(wap, kwt[4], NPY_DOUBLE, 1, PyObject *);
+      widths = (double *)PyArray_DATA(wap);
+    }
+
+  else
+    { SETKW(kwt[4], gistA.l.width, setkw_double, plgKeys[4]); }
+
+  if ((cap && PyArray_SIZE(cap) != ncurves)
+      || (tap && PyArray_SIZE(tap) != ncurves)
+      || (wap && PyArray_SIZE(wap) != ncurves))
+    {
+      clearArrayList();
+      return ERRSS("plg_many per-curve color, type and width need one value per curve");
+    }
+
   SETKW(kwt[5], gistA.dl.marks, setkw_boolean, plgKeys[5]);
   SETKW(kwt[6], gistA.m.color, setkw_color, plgKeys[6]);
   SETKW(kwt[7], gistA.m.type, setkw_xinteger, plgKeys[7]);
@@ -5819,35 +7974,38 @@ static PyObject * plg(PyObject * self, PyObject * args, PyObject * kd)
   SETKW(kwt[16], gistA.dl.closed, setkw_boolean, plgKeys[16]);
   SETKW(kwt[17], gistA.dl.smooth, setkw_boolean, plgKeys[17]);
 
-  if (xop)
-    {
-      GET_ARR(xap, xop, NPY_DOUBLE, 1, PyObject *);
+  curElement = -1;
+  PyFPE_START_PROTECT("plg_many", return 0)
 
-      if (PyArray_SIZE(xap) != length)
+  for (i = 0; i < ncurves; i++)
+    {
+      if (colors)
         {
-          clearArrayList();
-          return ERRSS(errstr);
+          gistA.l.color = gistA.m.color = color_from_int(colors[i]);
+
+          if (kwt[6])
+            { setkw_color(kwt[6], &gistA.m.color, plgKeys[6]); }
         }
 
-      x = (double *)PyArray_DATA(xap);
-    }
+      if (types)
+        { gistA.l.type = linetype_from_int(types[i]); }
 
-  else
-    {
-      NEW_MEM(x, length, double, PyObject *);
+      if (widths)
+        { gistA.l.width = widths[i]; }
 
-      for (i = 0; i < length; i++)
-        { x[i] = (double)(1 + i); }
+      curElement = GdLines(offsets[i + 1] - offsets[i],
+                           x + offsets[i], y + offsets[i]);
+
+      if (curElement < 0)
+        { break; }
+
+      gistD.legend = 0;	/* legend goes with the first curve only */
     }
 
-  curElement = -1;
-  PyFPE_START_PROTECT("plg", return 0)
-  curElement = GdLines(length, x, y);
   PyFPE_END_PROTECT(dummy)
   clearArrayList();
-  clearMemList();
 
-  if (curElement < 0)
+  if (ncurves && curElement < 0)
     {
       return ERRSS("Gist GdLines plotter failed");
     }
@@ -5976,8 +8134,9 @@ static char * pliKeys[N_KEYWORDS + 1] =
 
 static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd)
 {
-  PyArrayObject * zap;
+  PyArrayObject * zap = 0, *zsap = 0;
   PyObject * zop = 0;
+  npy_intp dims[NPY_MAXDIMS];
   char * z_name = 0;
   int nargs;
   double * z = 0, x0, y0, x1, y1;
@@ -6059,14 +8218,28 @@ static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd)
 
     }
 
+  else if (isARRAY(zop) && ScaledType(PyArray_TYPE((PyArrayObject *)zop)))
+    {
+      /* scaled in its own type, see ScaleArray */
+      GET_ARR(zsap, zop, PyArray_TYPE((PyArrayObject *)zop), 2, PyObject *);
+      zap = zsap;
+    }
+
   else
     {
-      GET_ARR(zap, zop, NPY_DOUBLE, 2, PyObject *);
-      z = (double *)PyArray_DATA(zap);
+      long nz;
+
+      GET_REAL(z, zop, 2, dims, nz, PyObject *);
+    }
+
+  if (zap)
+    {
+      dims[0] = PyArray_DIM((PyArrayObject *)zap, 0);
+      dims[1] = PyArray_DIM((PyArrayObject *)zap, 1);
     }
 
-  iMax = PyArray_DIM((PyArrayObject *)zap, 1);
-  jMax = PyArray_DIM((PyArrayObject *)zap, 0);
+  iMax = dims[1];
+  jMax = dims[0];
 
   if (1 == nargs)
     {
@@ -6074,7 +8247,7 @@ static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd)
       y1 = (double)jMax;
     }
 
-  if (!z && !zc)
+  if (!z && !zc && !zsap)
     { return ERRSS("pli needs at least one non-keyword argument"); }
 
   BUILD_KWT(kd, pliKeys, kwt);
@@ -6085,7 +8258,22 @@ static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd)
       ("pli, ", z_name, (char *)0, (char *)0, (char *)0, kwt, pliKeys))
     { return ERRSS("Error in pli: LegendAndHide"); }
 
-  if (!zc)
+  if (zsap)
+    {
+      TRY(zc = (GpColor *) malloc(iMax * jMax * sizeof(GpColor)),
+          (PyObject *) PyErr_NoMemory());
+
+      if (!ScaleArray(zsap, &kwt[2], &pliKeys[2], zc))
+        {
+          free(zc);
+          clearArrayList();
+          return 0;
+        }
+
+      convertedZ = 1;
+    }
+
+  else if (!zc)
     {
       /* need to generate colors array on stack now */
       double zmin, zmax, scale, offset;
@@ -6109,7 +8297,7 @@ static PyObject * pli(PyObject * self, PyObject * args, PyObject * kd)
   PyFPE_START_PROTECT("pli", return 0)
   curElement = GdCells(x0, y0, x1, y1, iMax, jMax, iMax, zc);
   PyFPE_END_PROTECT(dummy)
-  removeFromArrayList((PyObject *) zap);
+  clearArrayList();
 
   if (convertedZ)
     { free(zc); }
@@ -6144,23 +8332,24 @@ static char plm__doc__[] =
   "   By default (inhibit=0), mesh lines in both logical directions are\n"
   "   plotted.\n"
   "   The Y, X, and IREG arguments may all be omitted to default to the\n"
-  "   mesh set by the most recent plmesh call.\n"
+  "   mesh set by the most recent plmesh call, or, with mesh=MESH_ID,\n"
+  "   to a mesh kept by plmesh_register.\n"
   "   The following keywords are legal (each has a separate help entry):\n"
   "\n"
   "   KEYWORDS: legend, hide\n"
   "             type, width, color\n"
-  "             region\n"
+  "             region, mesh\n"
   "\n"
   "   SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp, plmesh\n"
   "             limits, logxy, ylimits, fma, hcp\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 8
+#define N_KEYWORDS 9
 static char * plmKeys[N_KEYWORDS + 1] =
 {
   "legend", "hide", "color", "type", "width", "region",
   "boundary",
-  "inhibit", 0
+  "inhibit", "mesh", 0
 };
 
 static PyObject * plm(PyObject * self, PyObject * args, PyObject * kd)
@@ -6172,13 +8361,19 @@ static PyObject * plm(PyObject * self, PyObject * args, PyObject * kd)
 
   SETJMP0;
 
-  if (PyTuple_Size(args) > 0)
+  BUILD_KWT(kd, plmKeys, kwt);
+
+  if (kwt[8] && PyTuple_Size(args) > 0)
+    { return ERRSS("mesh= cannot be given with (y, x, ireg)"); }
+
+  if (kwt[8])
+    { TRY(UseMesh(kwt[8]), (PyObject *) NULL); }
+
+  else if (PyTuple_Size(args) > 0)
     { TRY(set_pyMsh(args, errstr, 0), (PyObject *) NULL); }
 
   get_mesh(&mesh);
 
-  BUILD_KWT(kd, plmKeys, kwt);
-
   /* set legend and hide in gistD */
 
   TRYS(CheckDefaultWindow())if (!LegendAndHide
@@ -6245,7 +8440,7 @@ static char plmesh__doc__[] =
   "   defined if you do this.\n"
   "   If Y is supplied, X must be supplied, and vice-versa.\n"
   "\n"
-  "   SEE ALSO: plm, plc, plv, plf, plfp\n";
+  "   SEE ALSO: plm, plc, plv, plf, plfp, plmesh_register\n";
 
 #undef N_KEYWORDS
 #define N_KEYWORDS 1
@@ -6263,6 +8458,77 @@ static PyObject * plmesh(PyObject * self, PyObject * args, PyObject * kd)
   return Py_None;
 }
 
+static char plmesh_register__doc__[] =
+  "mesh_id = plmesh_register( y, x, ireg, triangle=tri_array )\n"
+  "or mesh_id = plmesh_register( y, x )\n"
+  "   Convert and check the mesh (Y, X, IREG, TRI_ARRAY) once, as plmesh\n"
+  "   does, and keep it under the returned MESH_ID without changing the\n"
+  "   default mesh.  The mesh=MESH_ID keyword of plm, plc, plv, plf and\n"
+  "   mesh_loc then makes it the default mesh at no further cost, and\n"
+  "   mesh_loc keeps a separate zone index for each registered mesh, so\n"
+  "   that several meshes may be used in turn without redoing that work.\n"
+  "   At most 32 meshes, and about 256 MB of arrays and indexes, are\n"
+  "   kept: past that, the least recently used meshes are dropped and\n"
+  "   their ids are no longer accepted.  Register a mesh again after\n"
+  "   changing its arrays in place: passing the same arrays to\n"
+  "   plmesh_register, plmesh or mesh_loc drops the index of every\n"
+  "   registered mesh built on them.\n"
+  "\n"
+  "   SEE ALSO: plmesh, plm, plc, plv, plf, mesh_loc\n";
+
+static PyObject * plmesh_register(PyObject * self, PyObject * args,
+                                  PyObject * kd)
+{
+  PyObject * kwt[NELT(meshKeys) - 1];
+  PyArrayObject * y = pyMsh.y, *x = pyMsh.x, *reg = pyMsh.reg;
+  PyArrayObject * triangle = pyMsh.triangle;
+  MeshEntry * e;
+  char * errstr =
+    "plmesh_register takes 2-3 non-keyword arguments: (y, x, ireg).";
+
+  if (PyTuple_Size(args) < 2)
+    {
+      return ERRSS(errstr);
+    }
+
+  BUILD_KWT(kd, meshKeys, kwt);
+
+  /* build the new mesh as the default one, then put the default back */
+  pyMsh.y = pyMsh.x = pyMsh.reg = pyMsh.triangle = 0;
+
+  if (!set_pyMsh(args, errstr, 0) || (kwt[0] && !set_tri(kwt[0])))
+    {
+      clear_pyMsh();
+      pyMsh.y = y;
+      pyMsh.x = x;
+      pyMsh.reg = reg;
+      pyMsh.triangle = triangle;
+      return 0;
+    }
+
+  e = OldestMeshEntry(0);
+
+  if (e->id)
+    { DropMeshEntry(e); }
+
+  /* the slot must not keep an index of the mesh it held before */
+  ForgetMeshIndex(&e->index);
+
+  e->y = pyMsh.y;
+  e->x = pyMsh.x;
+  e->reg = pyMsh.reg;
+  e->triangle = pyMsh.triangle;
+  e->id = ++meshLastId;
+  e->used = ++meshClock;
+  pyMsh.y = y;
+  pyMsh.x = x;
+  pyMsh.reg = reg;
+  pyMsh.triangle = triangle;
+  TrimMeshCache(e);
+
+  return PyInt_FromLong(e->id);
+}
+
 /*  -------------------------------------------------------------------- */
 
 static char plq__doc__[] =
@@ -7026,7 +9292,8 @@ static char plv__doc__[] =
   "     as for plm.  The VY and VX arrays must have the same shape\n"
   "     as Y and X.\n"
   "     The Y, X, and IREG arguments may all be omitted to default to the\n"
-  "     mesh set by the most recent plmesh call.\n"
+  "     mesh set by the most recent plmesh call, or, with mesh=MESH_ID,\n"
+  "     to a mesh kept by plmesh_register.\n"
   "     The SCALE keyword is the conversion factor from the units of\n"
   "     (VX,VY) to the units of (X,Y) -- a time interval if (VX,VY) is a\n"
   "     velocity\n"
@@ -7041,25 +9308,25 @@ static char plv__doc__[] =
   "   KEYWORDS: legend, hide\n"
   "             type, width, color, smooth\n"
   "             marks, marker, mspace, mphase\n"
-  "             triangle, region\n"
+  "             triangle, region, mesh\n"
   "\n"
   "   SEE ALSO: plg, plm, plc, plv, plf, pli, plt, pldj, plfp, plmesh,\n"
   "             pledit, limits, logxy, ylimits, fma, hcp\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 8
+#define N_KEYWORDS 9
 static char * plvKeys[N_KEYWORDS + 1] =
 {
   "legend", "hide", "region",
-  "color", "hollow", "width", "aspect", "scale", 0
+  "color", "hollow", "width", "aspect", "scale", "mesh", 0
 };
 
 static PyObject * plv(PyObject * self, PyObject * args, PyObject * kd)
 {
-  PyArrayObject * uap, *vap;
   PyObject * uop, *vop;
+  npy_intp vdims[NPY_MAXDIMS], udims[NPY_MAXDIMS];
   char * v_name = 0, *u_name = 0, *y_name = 0, *x_name = 0;
-  long iMax = 0, jMax = 0;
+  long iMax = 0, jMax = 0, nv, nu;
   double * u = 0, *v = 0, scale;
   GaQuadMesh mesh;
 
@@ -7081,17 +9348,17 @@ static PyObject * plv(PyObject * self, PyObject * args, PyObject * kd)
       return ERRSS("plv requires at least two arguments");
     }
 
-  TRY(setvu_mesh(args, &vop, &uop, errstr), (PyObject *) NULL);
+  TRY(setvu_mesh(args, &vop, &uop, errstr, kwt[8]), (PyObject *) NULL);
 
   if (!pyMsh.y)
     {
       return ERRSS("No current mesh - set (y, x) first");
     }
 
-  GET_ARR(vap, vop, NPY_DOUBLE, 2, PyObject *);
-  GET_ARR(uap, uop, NPY_DOUBLE, 2, PyObject *);
-  jMax = (PyArray_DIM((PyArrayObject *)vap, 0) == PyArray_DIM((PyArrayObject *)uap, 0)) ? PyArray_DIM((PyArrayObject *)vap, 0) : 0;
-  iMax = (PyArray_DIM((PyArrayObject *)vap, 1) == PyArray_DIM((PyArrayObject *)uap, 1)) ? PyArray_DIM((PyArrayObject *)vap, 1) : 0;
+  GET_REAL(v, vop, 2, vdims, nv, PyObject *);
+  GET_REAL(u, uop, 2, udims, nu, PyObject *);
+  jMax = (vdims[0] == udims[0]) ? vdims[0] : 0;
+  iMax = (vdims[1] == udims[1]) ? vdims[1] : 0;
 
   if (PyArray_DIM((PyArrayObject *)pyMsh.y, 0) != jMax || PyArray_DIM((PyArrayObject *)pyMsh.y, 1) != iMax)
     {
@@ -7101,8 +9368,6 @@ static PyObject * plv(PyObject * self, PyObject * args, PyObject * kd)
         ("(v, u) arrays must match (y, x) mesh arrays in shape");
     }
 
-  v = (double *)PyArray_DATA(vap);
-  u = (double *)PyArray_DATA(uap);
   get_mesh(&mesh);
 
   if (mesh.iMax != iMax || mesh.jMax != jMax)
@@ -7586,6 +9851,9 @@ static long set_yx(PyObject * yop, PyObject * xop)
       return 0;
     }
 
+  if ((PyObject *) pyMsh.y != yop)
+    { CONV_NOTE(PyArray_NBYTES(pyMsh.y)); }
+
   nr = PyArray_DIM((PyArrayObject *)pyMsh.y, 0);
   nc = PyArray_DIM((PyArrayObject *)pyMsh.y, 1);
 
@@ -7613,6 +9881,9 @@ static long set_yx(PyObject * yop, PyObject * xop)
       return 0;
     }
 
+  if ((PyObject *) pyMsh.x != xop)
+    { CONV_NOTE(PyArray_NBYTES(pyMsh.x)); }
+
   if (PyArray_DIM((PyArrayObject *)pyMsh.x, 0) != nr || PyArray_DIM((PyArrayObject *)pyMsh.x, 1) != nc)
     {
       Py_DECREF(pyMsh.y);
@@ -7627,6 +9898,7 @@ static long set_yx(PyObject * yop, PyObject * xop)
   print_array_stats(yop);
 #endif
 
+  ForgetSharedMeshIndexes(pyMsh.y, pyMsh.x);
   return 1;
 }
 
@@ -7649,6 +9921,18 @@ static long setkw_boolean(PyObject * v, int * t, char * kw)
  * an integer, or a triple.  All these setkw_*() functions return 0 on error,
  * non-zero otherwise. */
 
+/* Integer colors: negative values index P_color (see play.h), */
+/* anything else is RGB as 0xrrggbb.                            */
+static unsigned long color_from_int(long color1)
+{
+  if (color1 < 0)
+    {
+      return (color1 & 0xff);
+    }
+
+  return P_RGB((color1 >> 16) & 0xff, (color1 >> 8) & 0xff, color1 & 0xff);
+}
+
 static long setkw_color(PyObject * v, unsigned long * t, char * kw)
 {
   unsigned long color = P_FG;
@@ -7700,19 +9984,7 @@ static long setkw_color(PyObject * v, unsigned long * t, char * kw)
 
   else if (PyInt_Check(v))
     {
-      int color1 = PyInt_AsLong(v);
-
-      if (color1 < 0)
-        {
-          color = (color1 & 0xff);	/* index in P_color, see play.h */
-        }
-
-      else
-        {
-          // use RGB as 0xrrggbb
-          color = P_RGB((color1>>16)&0xff, (color1>>8)&0xff,color1&0xff);
-        }
-
+      color = color_from_int(PyInt_AsLong(v));
     }
 
   /* Handle case of 3 element array for trucolor */
@@ -7955,6 +10227,18 @@ static long setkw_justify(PyObject * v, int * t, char * kw)
   return 1;
 }
 
+/* Integer line types 0-5 are L_NONE to L_DASHDOTDOT; wrap larger ones. */
+static int linetype_from_int(long type)
+{
+  if (type < 0)
+    { return 0; }
+
+  if (type > 5)
+    { return 1 + (type - 1) % 5; }
+
+  return (int)type;
+}
+
 static long setkw_linetype(PyObject * v, int * t, char * kw)
 {
   int type = 0;
@@ -7990,13 +10274,7 @@ static long setkw_linetype(PyObject * v, int * t, char * kw)
 
   else if (PyInt_Check(v))
     {
-      type = PyInt_AsLong(v);
-
-      if (type < 0)
-        { type = 0; }
-
-      else if (type > 5)
-        { type = 1 + (type - 1) % 5; }
+      type = linetype_from_int(PyInt_AsLong(v));
     }
 
   else
@@ -8082,12 +10360,13 @@ static long setkw_xinteger(PyObject * v, int * t, char * kw)
 
 /* Set v, u, and the (y, x, ireg) mesh variables.
  * Called from plv and from mesh_loc, which happens to take the same args.
+ * MESH, if not 0, is the mesh= keyword, allowed only without (y, x).
  * Note that PyObject references returned in vop and uop are
  * borrowed, so should usually NOT be DECREF'ed.
  * Returns 0 on failure, 1 otherwise.
  */
 static long setvu_mesh(PyObject * args, PyObject ** vop,
-                       PyObject ** uop, char * errstr)
+                       PyObject ** uop, char * errstr, PyObject * mesh)
 {
   int n;
   PyObject * newargs;
@@ -8096,12 +10375,18 @@ static long setvu_mesh(PyObject * args, PyObject ** vop,
     {
     case 5:		/* (v, u, y, x, ireg) given */
     case 4:		/* (v, u, y, x) given */
+      if (mesh)
+        { return (long)ERRSS("mesh= cannot be given with (y, x, ireg)"); }
+
       TRY(newargs = PyTuple_GetSlice(args, 2, n), 0);
       TRY(set_pyMsh(newargs, errstr, 0), 0);
       Py_DECREF(newargs);
 
       /* (Fall through.) */
     case 2:		/* (v, u) only given */
+      if (n == 2 && mesh)
+        { TRY(UseMesh(mesh), 0); }
+
       TRY(*vop = PyTuple_GetItem(args, 0), 0);	/* Borrowed reference returned */
       TRY(*uop = PyTuple_GetItem(args, 1), 0);
       break;
@@ -8114,12 +10399,13 @@ static long setvu_mesh(PyObject * args, PyObject ** vop,
 }
 
 /* Set z and the (y, x, ireg) mesh variables.  Called from plc and plf.
+ * MESH, if not 0, is the mesh= keyword, allowed only without (y, x).
  * Note that PyObject reference returned in zop is borrowed, so should
  * usually NOT be DECREF'ed.
  * Returns 0 on failure, 1 otherwise.
  */
 static long setz_mesh(PyObject * args, PyObject ** zop, char * errstr,
-                      PyObject * tri)
+                      PyObject * tri, PyObject * mesh)
 {
   int n;
   PyObject * newargs;
@@ -8128,12 +10414,18 @@ static long setz_mesh(PyObject * args, PyObject ** zop, char * errstr,
     {
     case 4:		/* (z, y, x, ireg) given */
     case 3:		/* (z, y, x) given */
+      if (mesh)
+        { return (long)ERRSS("mesh= cannot be given with (y, x, ireg)"); }
+
       TRY(newargs = PyTuple_GetSlice(args, 1, n), 0);
       TRY(set_pyMsh(newargs, errstr, tri), 0);
       Py_DECREF(newargs);
 
       /* (Fall through.) */
     case 1:		/* (z) only given */
+      if (n == 1 && mesh)
+        { TRY(UseMesh(mesh), 0); }
+
       TRY(*zop = PyTuple_GetItem(args, 0), 0);
       break;
 
@@ -9754,7 +12046,8 @@ static char window__doc__[] =
   "window( [n] [, display = `host:server.screen', dpi=100/75, wait=0/1,\n"
   "            private=0/1, hcp=`hcp_filename', dump=0/1,\n"
   "            legends=1/0, style=`style_sheet_filename',\n"
-  "            width=0, height=0, rgb=0, parent=0, xpos=0, ypos=0] )\n"
+  "            width=0, height=0, rgb=0, parent=0, xpos=0, ypos=0,\n"
+  "            raster=0/1] )\n"
   "     select window N as the current graphics output window.  N may\n"
   "     range from 0 to 7, inclusive.  Each graphics window corresponds to\n"
   "     an X window, and optionally has its own associated hardcopy file.\n"
@@ -9767,6 +12060,12 @@ static char window__doc__[] =
   "     no associated X window (you should do this if you want to make\n"
   "     plots in a non-interactive batch mode).\n"
   "\n"
+  "     With raster=1, the window is drawn into an RGB image in memory\n"
+  "     instead of an X window, so no X server is needed.  The image is\n"
+  "     the part of the page an X window with the same dpi, width and\n"
+  "     height would show; read it with rgb_read, or save it with hcp.\n"
+  "     The display keyword is ignored for a raster window.\n"
+  "\n"
   "     By default, an X window will attempt to use shared colors, which\n"
   "     permits several Pygist graphics windows (including windows from\n"
   "     multiple instances of Python) to use a common palette.  You can\n"
@@ -9816,12 +12115,12 @@ static char window__doc__[] =
   "             winkill, gridxy\n";
 
 #undef N_KEYWORDS
-#define N_KEYWORDS 14
+#define N_KEYWORDS 15
 static char * windowKeys[N_KEYWORDS + 1] =
 {
   "display", "dpi", "private", "hcp", "legends", "dump", "style",
   "wait",
-  "width", "height", "rgb", "parent", "xpos", "ypos", 0
+  "width", "height", "rgb", "parent", "xpos", "ypos", "raster", 0
 };
 
 static PyObject * window(PyObject * self, PyObject * args, PyObject * kd)
@@ -9836,6 +12135,7 @@ static PyObject * window(PyObject * self, PyObject * args, PyObject * kd)
   long parent = 0;
   int xpos = 0;
   int ypos = 0;
+  int raster = 0;
 
   SETJMP0;		/* See Xerror_longjmp() */
 
@@ -9906,7 +12206,9 @@ static PyObject * window(PyObject * self, PyObject * args, PyObject * kd)
         }
     }
 
-  if (nGiven || kwt[0] || kwt[1] || kwt[2])
+  SETKW(kwt[14], raster, setkw_boolean, windowKeys[14]);
+
+  if (nGiven || kwt[0] || kwt[1] || kwt[2] || raster)
     {
       /* display= and/or dpi= keywords */
       char * display = 0;
@@ -10013,8 +12315,28 @@ static PyObject * window(PyObject * self, PyObject * args, PyObject * kd)
           GpKillEngine(engine);
         }
 
-      if (nGiven ? (!display || display[0])
-          : (display && display[0]))
+      if (raster)
+        {
+          extern int gx75width, gx100width, gx75height, gx100height;
+
+          engine = GpRasterEngine(windowNames[n], 0, dpi,
+                                  (dpi < 88) ? gx75width : gx100width,
+                                  (dpi < 88) ? gx75height : gx100height);
+
+          if (!engine)
+            {
+              SAFE_FREE(display);
+              return ERRSS("failed to create raster window");
+            }
+
+          ghDevices[n].display = engine;
+
+          if (palette)
+            { GhSetPalette(n, palette, nColors); }
+        }
+
+      else if (nGiven ? (!display || display[0])
+               : (display && display[0]))
         {
           gist_private_map = privmap;
           gist_rgb_hint = rgb;
@@ -10351,7 +12673,19 @@ static PyObject * win_geom(PyObject * self, PyObject * args)
 
   engine = ghDevices[win].display;
 
-  if (engine)
+  if (GisRasterEngine(engine))
+    {
+      RasterEngine * re = GisRasterEngine(engine);
+
+      dpi = re->dpi;
+      one_pixel = 1.0 / re->ppn;
+      xbias = (re->x0 + 0.5) / re->ppn;
+      ybias = re->ymax - (re->y0 + 0.5) / re->ppn;
+      width = re->width;
+      height = re->height;
+    }
+
+  else if (engine)
     {
       map = &engine->map;
       /* transform = &(engine->transform); */
@@ -12373,9 +14707,11 @@ static int pyg_on_idle(void)
 {
   /*
    *  Gist does all its drawing in GhBeforeWait, which should be called
-   *  at idle time.
+   *  at idle time.  Decimated plg curves are brought up to date with
+   *  any zoom first, so they are redrawn in the same pass.
    */
 
+  RedecimateLines();
   GhBeforeWait();
   return 0;
 }
@@ -12430,6 +14766,7 @@ static struct PyMethodDef gist_methods[] =
   {"animate", PYCF animate, METH_VARARGS, animate__doc__},
   {"bytscl", PYCFWK bytscl, KWFLG, bytscl__doc__},
   {"contour", PYCFWK contour, KWFLG, contour__doc__},
+  {"conv_stats", PYCF conv_stats, METH_VARARGS, conv_stats__doc__},
   {"fma", PYCF pyg_fma, METH_VARARGS, fma__doc__},
   {"get_style", PYCF get_style, METH_VARARGS, get_style__doc__},
   {"gridxy", PYCFWK gridxy, KWFLG, gridxy__doc__},
@@ -12441,7 +14778,7 @@ static struct PyMethodDef gist_methods[] =
 //  {"keybd_focus", PYCF keybd_focus, METH_VARARGS, keybd_focus__doc__}, //--- useless, call before window(), coredumps
   {"limits", PYCFWK limits, KWFLG, limits__doc__},
   {"logxy", PYCF logxy, METH_VARARGS, logxy__doc__},
-  {"mesh_loc", PYCF mesh_loc, METH_VARARGS, mesh_loc__doc__},
+  {"mesh_loc", PYCFWK mesh_loc, KWFLG, mesh_loc__doc__},
   {"mouse", PYCF mouse, METH_VARARGS, mouse__doc__},
   {"palette", PYCFWK palette, KWFLG, palette__doc__},
   {"pause", PYCF pyg_pause, METH_VARARGS, pause__doc__},
@@ -12449,11 +14786,15 @@ static struct PyMethodDef gist_methods[] =
   {"pldefault", PYCFWK pldefault, KWFLG, pldefault__doc__},
   {"pldj", PYCFWK pldj, KWFLG, pldj__doc__},
   {"pledit", PYCFWK pledit, KWFLG, pledit__doc__},
+  {"plupdate", PYCFWK plupdate, KWFLG, plupdate__doc__},
   {"plfp", PYCFWK plfp, KWFLG, plfp__doc__},
   {"plf", PYCFWK plf, KWFLG, plf__doc__},
   {"plg", PYCFWK plg, KWFLG, plg__doc__},
+  {"plg_many", PYCFWK plg_many, KWFLG, plg_many__doc__},
   {"pli", PYCFWK pli, KWFLG, pli__doc__},
   {"plmesh", PYCFWK plmesh, KWFLG, plmesh__doc__},
+  {"plmesh_register", PYCFWK plmesh_register, KWFLG,
+   plmesh_register__doc__},
   {"plm", PYCFWK plm, KWFLG, plm__doc__},
   {"plq", PYCF plq, METH_VARARGS, plq__doc__},
   {"plremove", PYCF plremove, METH_VARARGS, plremove__doc__},
@@ -12467,6 +14808,7 @@ static struct PyMethodDef gist_methods[] =
   {"pyg_register", PYCF pyg_register, METH_VARARGS, pyg_register__doc__},
   {"pyg_unhook", PYCF pyg_unhook, METH_VARARGS, pyg_unhook__doc__},
   {"rgb_read", PYCF rgb_read, METH_VARARGS, rgb_read__doc__},
+  {"rgb_write", PYCFWK rgb_write, KWFLG, rgb_write__doc__},
   {"set_style", PYCF set_style, METH_VARARGS, set_style__doc__},
   {"slice2", PYCF slice2, METH_VARARGS, slice2__doc__},
   {"viewport", PYCF viewport, METH_VARARGS, viewport__doc__},
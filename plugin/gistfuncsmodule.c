@@ -8,6 +8,10 @@
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <math.h>
+
+#include "plug-threads.h"
 
 #if PY_MAJOR_VERSION >= 3
 #define PyString_Check PyUnicode_Check
@@ -582,26 +586,13 @@ static void _adjust(double * k, int * list, int i, int n)
   list[lowj] = kj;
 }
 
-static char arr_index_sort__doc__[] =
-  "index_sort accepts one array of some numerical type and returns\n\
-an integer array of the same length whose entries are the\n\
-subscripts of the elements of the original array arranged\n\
-in increasing order. I chose to use heap sort because its\n\
-worst behavior is n*log(n), unlike quicksort, whose worst\n\
-behavior is n**2.";
-
-static PyObject * arr_index_sort(PyObject * self, PyObject * args)
+/* Sort the LEN doubles at DATA by heap sort, return their subscripts
+ * in increasing order as int (the index_sort of earlier versions). */
+static PyObject * heap_index_sort(double * data, npy_intp len)
 {
-
-  PyObject * list;
-  PyArrayObject * alist, *ilist;
-  double * data;
+  PyArrayObject * ilist;
   int i, *isubs, itmp;
-  npy_intp len;
 
-  Py_Try(PyArg_ParseTuple(args, "O", &list));
-  GET_ARR(alist, list, NPY_DOUBLE, 1);
-  len = PyArray_SIZE(alist);
   Py_Try(ilist =
            (PyArrayObject *) PyArray_SimpleNew(1, &len, NPY_INT));
   isubs = (int *)PyArray_DATA(ilist);
@@ -609,8 +600,6 @@ static PyObject * arr_index_sort(PyObject * self, PyObject * args)
   for (i = 0; i < len; i++)
     { isubs[i] = i; }
 
-  data = (double *)PyArray_DATA(alist);
-
   /* now do heap sort on subscripts */
   for (i = len / 2; i >= 0; i--)
     {
@@ -625,158 +614,464 @@ static PyObject * arr_index_sort(PyObject * self, PyObject * args)
       _adjust(data, isubs, 0, i);
     }
 
-  Py_DECREF(alist);
   return (PyObject *) ilist;
 }
 
-static int _binary_search(double dval, double dlist[], int len)
+/* index_sort sorts by least significant digit radix sort.  The float
+ * or double keys are mapped to unsigned integers of the same width
+ * which compare as the floats do, then sorted 8 bits at a time, each
+ * pass a counting sort, so equal keys keep their order.  Passes over
+ * a digit which is the same for all keys are skipped.  Above
+ * RADIX_BLOCK keys, each pass counts and moves blocks of keys on
+ * threads of their own; the blocks take their places for each digit
+ * in block order, which keeps the sort stable.
+ */
+#define RADIX_BITS 8
+#define RADIX_SIZE (1 << RADIX_BITS)
+#define RADIX_BLOCK 65536	/* fewest keys worth a thread */
+#define RADIX_MIN 32		/* fewer keys are sorted by insertion */
+
+typedef struct
 {
-  /* binary_search accepts three arguments: a numeric value and
-   * a numeric array and its length. It assumes that the array is sorted in
-   * increasing order. It returns the index of the array's
-   * largest element which is <= the value. It will return -1 if
-   * the value is less than the least element of the array. */
-  /* self is not used */
-  int bottom, top, middle, result;
+  int wide;			/* 64 bit keys, else 32 bit */
+  int shift;			/* of the digit of this pass */
+  const void * key;
+  void * keyout;
+  const npy_intp * idx;
+  npy_intp * idxout;
+  npy_intp start, stop;
+  npy_intp count[RADIX_SIZE];	/* then where each digit goes */
+} RadixJob;
+
+#define RADIX_DIGIT(k, shift) ((unsigned)((k) >> (shift)) & (RADIX_SIZE - 1))
+
+static void * radix_count(void * arg)
+{
+  RadixJob * job = (RadixJob *)arg;
+  npy_intp i;
+
+  memset(job->count, 0, sizeof(job->count));
+
+  if (job->wide)
+    {
+      const npy_uint64 * k = (const npy_uint64 *)job->key;
 
-  if (dval < dlist[0])
-    { result = -1; }
+      for (i = job->start; i < job->stop; i++)
+        { job->count[RADIX_DIGIT(k[i], job->shift)]++; }
+    }
 
   else
     {
-      bottom = 0;
-      top = len - 1;
+      const npy_uint32 * k = (const npy_uint32 *)job->key;
+
+      for (i = job->start; i < job->stop; i++)
+        { job->count[RADIX_DIGIT(k[i], job->shift)]++; }
+    }
+
+  return 0;
+}
+
+static void * radix_move(void * arg)
+{
+  RadixJob * job = (RadixJob *)arg;
+  npy_intp i, j;
+
+  if (job->wide)
+    {
+      const npy_uint64 * k = (const npy_uint64 *)job->key;
+      npy_uint64 * kout = (npy_uint64 *)job->keyout;
 
-      while (bottom < top)
+      for (i = job->start; i < job->stop; i++)
         {
-          middle = (top + bottom) / 2;
+          j = job->count[RADIX_DIGIT(k[i], job->shift)]++;
+          kout[j] = k[i];
+          job->idxout[j] = job->idx[i];
+        }
+    }
+
+  else
+    {
+      const npy_uint32 * k = (const npy_uint32 *)job->key;
+      npy_uint32 * kout = (npy_uint32 *)job->keyout;
 
-          if (dlist[middle] < dval)
-            { bottom = middle + 1; }
+      for (i = job->start; i < job->stop; i++)
+        {
+          j = job->count[RADIX_DIGIT(k[i], job->shift)]++;
+          kout[j] = k[i];
+          job->idxout[j] = job->idx[i];
+        }
+    }
 
-          else if (dlist[middle] > dval)
-            { top = middle - 1; }
+  return 0;
+}
 
-          else
-            { return middle; }
+/* Sort the N keys at KEY (64 bit if WIDE) with their subscripts at
+ * IDX, using KTMP and ITMP of the same sizes; the sorted subscripts
+ * end up at IDX. */
+static void radix_sort(void * key, void * ktmp, npy_intp * idx,
+                       npy_intp * itmp, npy_intp n, int wide)
+{
+  RadixJob job[MAX_THREADS];
+  npy_intp sum, c, * iswap;
+  void * kswap;
+  int i, d, shift, nt = ThreadCount(n, RADIX_BLOCK);
+  int bits = wide ? 64 : 32;
+  npy_intp * idx0 = idx;
+
+  for (shift = 0; shift < bits; shift += RADIX_BITS)
+    {
+      for (i = 0; i < nt; i++)
+        {
+          job[i].wide = wide;
+          job[i].shift = shift;
+          job[i].key = key;
+          job[i].keyout = ktmp;
+          job[i].idx = idx;
+          job[i].idxout = itmp;
+          job[i].start = n * i / nt;
+          job[i].stop = n * (i + 1) / nt;
         }
 
-      if (dlist[bottom] > dval)
-        { result = bottom - 1; }
+      RunThreads(radix_count, job, sizeof(RadixJob), nt);
 
-      else
-        { result = bottom; }
+      for (d = 0, sum = 0; d < RADIX_SIZE && !sum; d++)
+        {
+          for (i = 0; i < nt; i++)
+            { sum += job[i].count[d]; }
+        }
+
+      if (sum == n)
+        { continue; }		/* one digit for all keys */
+
+      for (d = 0, sum = 0; d < RADIX_SIZE; d++)
+        {
+          for (i = 0; i < nt; i++)
+            {
+              c = job[i].count[d];
+              job[i].count[d] = sum;
+              sum += c;
+            }
+        }
+
+      RunThreads(radix_move, job, sizeof(RadixJob), nt);
+      kswap = key;
+      key = ktmp;
+      ktmp = kswap;
+      iswap = idx;
+      idx = itmp;
+      itmp = iswap;
     }
 
-  return result;
+  if (idx != idx0)
+    { memcpy(idx0, idx, n * sizeof(npy_intp)); }
 }
 
-static int _binary_searchf(float dval, float dlist[], int len)
+/* Stable insertion sort of a few keys with their subscripts. */
+#define INSERTION_SORT(type, key, idx, n) \
+  do { \
+    npy_intp i_, j_, s_; \
+    type k_; \
+    for (i_ = 1; i_ < (n); i_++) \
+      { \
+        k_ = (key)[i_]; \
+        s_ = (idx)[i_]; \
+        for (j_ = i_; j_ > 0 && (key)[j_ - 1] > k_; j_--) \
+          { \
+            (key)[j_] = (key)[j_ - 1]; \
+            (idx)[j_] = (idx)[j_ - 1]; \
+          } \
+        (key)[j_] = k_; \
+        (idx)[j_] = s_; \
+      } \
+  } while (0)
+
+static char arr_index_sort__doc__[] =
+  "index_sort(a [, method]) accepts one array of some numerical type\n\
+and returns an integer array of the same length whose entries are\n\
+the subscripts of the elements of the original array arranged in\n\
+increasing order.  Equal elements keep their order; -0.0 and 0.0\n\
+are equal, and NaNs come last, as for numpy.argsort(kind='stable').\n\
+Float32 and float64 arrays are sorted as they are, other types as\n\
+float64.\n\
+The sort is a radix sort, by several threads for large arrays, and\n\
+returns intp subscripts.  METHOD \"heap\" selects the heap sort of\n\
+earlier versions instead, which returns int subscripts and does not\n\
+keep equal elements in order.";
+
+static PyObject * arr_index_sort(PyObject * self, PyObject * args)
 {
-  /* binary_search accepts three arguments: a numeric value and
-   * a numeric array and its length. It assumes that the array is sorted in
-   * increasing order. It returns the index of the array's
-   * largest element which is <= the value. It will return -1 if
-   * the value is less than the least element of the array. */
-  /* self is not used */
-  int bottom, top, middle, result;
+  PyObject * list, *ilist;
+  PyArrayObject * alist;
+  char * method = "radix";
+  npy_intp i, len, *isubs, *itmp = 0;
+  void * keys = 0;
+  int wide;
 
-  if (dval < dlist[0])
-    { result = -1; }
+  Py_Try(PyArg_ParseTuple(args, "O|s", &list, &method));
 
-  else
+  if (!strcmp(method, "heap"))
+    {
+      GET_ARR(alist, list, NPY_DOUBLE, 1);
+      ilist = heap_index_sort((double *)PyArray_DATA(alist),
+                              PyArray_SIZE(alist));
+      Py_DECREF(alist);
+      return ilist;
+    }
+
+  Py_Assert(!strcmp(method, "radix"), ErrorObject,
+            "index_sort method must be \"radix\" or \"heap\"");
+  wide = !(isARRAY(list)
+           && PyArray_TYPE((PyArrayObject *)list) == NPY_FLOAT);
+  GET_ARR(alist, list, wide ? NPY_DOUBLE : NPY_FLOAT, 1);
+  len = PyArray_SIZE(alist);
+
+  if (!(ilist = PyArray_SimpleNew(1, &len, NPY_INTP)))
+    {
+      Py_DECREF(alist);
+      return NULL;
+    }
+
+  isubs = (npy_intp *)PyArray_DATA((PyArrayObject *)ilist);
+
+  if (len > 0)
+    {
+      keys = malloc(len * (wide ? 16 : 8));
+      itmp = (npy_intp *)malloc(len * sizeof(npy_intp));
+    }
+
+  if (len > 0 && (!keys || !itmp))
+    {
+      free(keys);
+      free(itmp);
+      Py_DECREF(alist);
+      Py_DECREF(ilist);
+      return PyErr_NoMemory();
+    }
+
+  for (i = 0; i < len; i++)
+    { isubs[i] = i; }
+
+  /* flip the sign bit of positive floats and all bits of negative
+     ones: the unsigned integers then order as the floats do.  -0.0
+     gets the key of 0.0, and every NaN the largest key, so that they
+     sort as numpy does */
+  if (wide)
     {
-      bottom = 0;
-      top = len - 1;
+      const npy_uint64 * f = (const npy_uint64 *)PyArray_DATA(alist);
+      npy_uint64 * k = (npy_uint64 *)keys, b, sign = (npy_uint64)1 << 63;
 
-      while (bottom < top)
+      for (i = 0; i < len; i++)
         {
-          middle = (top + bottom) / 2;
+          b = f[i] & ~sign;
+
+          if (b > (npy_uint64)0x7ff << 52)
+            { k[i] = ~(npy_uint64)0; }
+
+          else
+            { k[i] = (f[i] >> 63) && b ? ~f[i] : b | sign; }
+        }
+
+      if (len < RADIX_MIN)
+        { INSERTION_SORT(npy_uint64, k, isubs, len); }
+
+      else
+        { radix_sort(k, k + len, isubs, itmp, len, 1); }
+    }
+
+  else
+    {
+      const npy_uint32 * f = (const npy_uint32 *)PyArray_DATA(alist);
+      npy_uint32 * k = (npy_uint32 *)keys, b, sign = (npy_uint32)1 << 31;
 
-          if (dlist[middle] < dval)
-            { bottom = middle + 1; }
+      for (i = 0; i < len; i++)
+        {
+          b = f[i] & ~sign;
 
-          else if (dlist[middle] > dval)
-            { top = middle - 1; }
+          if (b > (npy_uint32)0xff << 23)
+            { k[i] = ~(npy_uint32)0; }
 
           else
-            { return middle; }
+            { k[i] = (f[i] >> 31) && b ? ~f[i] : b | sign; }
         }
 
-      if (dlist[bottom] > dval)
-        { result = bottom - 1; }
+      if (len < RADIX_MIN)
+        { INSERTION_SORT(npy_uint32, k, isubs, len); }
 
       else
-        { result = bottom; }
+        { radix_sort(k, k + len, isubs, itmp, len, 0); }
     }
 
-  return result;
+  free(keys);
+  free(itmp);
+  Py_DECREF(alist);
+  return ilist;
 }
 
-/* return float, rather than double */
-
-static PyObject * arr_interpf(PyObject * self, PyObject * args)
+/* interp keeps the slopes of the last (x, y) of each type, with copies
+ * of x and y to tell whether the next call has the same ones.  Each
+ * call holds a reference to the table it uses, so that a call from
+ * another thread, while this one interpolates with the GIL released,
+ * replaces the kept table instead of freeing it; the reference counts
+ * only change with the GIL held.  For
+ * each z it starts from the interval of the previous z, which is the
+ * right one or close for sorted z, or from (z - x0) / dx when x is
+ * evenly spaced; only when a few steps do not get there does it search.
+ * Large z are cut into blocks interpolated on threads of their own.
+ */
+#define INTERP_STEPS 4		/* steps before a binary search */
+#define INTERP_BLOCK 65536	/* fewest points worth a thread */
+
+typedef struct
 {
-  /* interp (y, x, z) treats (x, y) as a piecewise linear function
-   * whose value is y [0] for x < x [0] and y [len (y) -1] for x >
-   * x [len (y) -1]. An array of floats the same length as z is
-   * returned, whose values are ordinates for the corresponding z
-   * abscissae interpolated into the piecewise linear function.         */
-  /* self is not used */
-  PyObject * oy, *ox, *oz;
-  PyArrayObject * ay, *ax, *az, *_interp;
-  float * dy, *dx, *dz, *dres, *slopes;
-  int leny, lenz, i, left;
+  int refs;			/* the kept table and calls using it */
+  int type;			/* NPY_FLOAT or NPY_DOUBLE */
+  npy_intp n;			/* length of x and y, 0 if none yet */
+  void * x, *y, *slopes;	/* slopes[i] between x[i] and x[i + 1] */
+  int uniform;			/* x evenly spaced: guess the interval */
+  double x0, rdx;		/* interval of z is about (z - x0) * rdx */
+} InterpTable;
 
-  PyObject * tpo = Py_None;	/* unused argument, we've already parsed it */
-
-  Py_Try(PyArg_ParseTuple(args, "OOO|O", &oy, &ox, &oz, &tpo));
-  GET_ARR(ay, oy, NPY_FLOAT, 1);
-  GET_ARR(ax, ox, NPY_FLOAT, 1);
+static InterpTable * interpTables[2];	/* double, float */
 
-  if ((leny = PyArray_SIZE(ay)) != PyArray_SIZE(ax))
+typedef struct
+{
+  const InterpTable * table;
+  const void * z;
+  void * res;
+  npy_intp start, stop;
+} InterpJob;
+
+#define INTERP_TABLE(type) \
+  do { \
+    const type * x_ = (const type *)t->x, *y_ = (const type *)t->y; \
+    type * s_ = (type *)t->slopes; \
+    double dx_ = n > 2 ? ((double)x_[n - 1] - x_[0]) / (n - 1) : 0.0; \
+    for (i = 0; i < n - 1; i++) \
+      { s_[i] = (y_[i + 1] - y_[i]) / (x_[i + 1] - x_[i]); } \
+    t->uniform = dx_ > 0.0; \
+    for (i = 1; i < n && t->uniform; i++) \
+      { t->uniform = fabs(x_[i] - (x_[0] + i * dx_)) <= 0.25 * dx_; } \
+    t->x0 = t->uniform ? x_[0] : 0.0; \
+    t->rdx = t->uniform ? 1.0 / dx_ : 0.0; \
+  } while (0)
+
+static void interp_release(InterpTable * t)
+{
+  if (t && !--t->refs)
     {
-      SETERR("interp: x and y are not the same length.");
-      Py_DECREF(ay);
-      Py_DECREF(ax);
-      return NULL;
+      free(t->x);
+      free(t);
     }
+}
 
-  GET_ARR2(az, oz, NPY_FLOAT, 1, MAX_INTERP_DIMS);
-  lenz = PyArray_SIZE(az);
-  dy = (float *)PyArray_DATA(ay);
-  dx = (float *)PyArray_DATA(ax);
-  dz = (float *)PyArray_DATA(az);
-  /* create output array with same size as 'Z' input array */
-  Py_Try(_interp = (PyArrayObject *) PyArray_SimpleNew
-                   (PyArray_NDIM((PyArrayObject *)az), PyArray_DIMS(az), NPY_FLOAT));
-  dres = (float *)PyArray_DATA(_interp);
-  slopes = (float *)malloc((leny - 1) * sizeof(float));
+/* A reference to the table for (AX, AY), made anew unless they equal
+ * the last ones; interp_release it when done. */
+static InterpTable * interp_table(PyArrayObject * ay, PyArrayObject * ax,
+                                  int type)
+{
+  InterpTable ** kept = &interpTables[type == NPY_FLOAT];
+  InterpTable * t = *kept;
+  size_t size = type == NPY_FLOAT ? sizeof(float) : sizeof(double);
+  npy_intp i, n = PyArray_SIZE(ax);
 
-  for (i = 0; i < leny - 1; i++)
+  if (t && t->n == n && !memcmp(t->x, PyArray_DATA(ax), n * size)
+      && !memcmp(t->y, PyArray_DATA(ay), n * size))
     {
-      slopes[i] = (dy[i + 1] - dy[i]) / (dx[i + 1] - dx[i]);
+      t->refs++;
+      return t;
     }
 
-  for (i = 0; i < lenz; i++)
+  if (!(t = (InterpTable *)malloc(sizeof(InterpTable))))
+    { return (InterpTable *)PyErr_NoMemory(); }
+
+  if (!(t->x = malloc(3 * n * size)))
     {
-      left = _binary_searchf(dz[i], dx, leny);
+      free(t);
+      return (InterpTable *)PyErr_NoMemory();
+    }
 
-      if (left < 0)
-        { dres[i] = dy[0]; }
+  t->type = type;
+  t->y = (char *)t->x + n * size;
+  t->slopes = (char *)t->y + n * size;
+  memcpy(t->x, PyArray_DATA(ax), n * size);
+  memcpy(t->y, PyArray_DATA(ay), n * size);
 
-      else if (left >= leny - 1)
-        { dres[i] = dy[leny - 1]; }
+  if (type == NPY_FLOAT)
+    { INTERP_TABLE(float); }
 
-      else
-        { dres[i] = slopes[left] * (dz[i] - dx[left]) + dy[left]; }
-    }
+  else
+    { INTERP_TABLE(double); }
 
-  free(slopes);
-  Py_DECREF(ay);
-  Py_DECREF(ax);
-  Py_DECREF(az);
-  return PyArray_Return(_interp);
+  t->n = n;
+  t->refs = 2;
+  interp_release(*kept);
+  *kept = t;
+  return t;
+}
+
+#define INTERP_LOOP(type) \
+  do { \
+    const type * x = (const type *)t->x, *y = (const type *)t->y; \
+    const type * s = (const type *)t->slopes; \
+    const type * z = (const type *)job->z; \
+    type * res = (type *)job->res; \
+    for (i = job->start; i < job->stop; i++) \
+      { \
+        if (z[i] != z[i]) \
+          { \
+            res[i] = z[i];	/* NaN */ \
+            continue; \
+          } \
+        if (t->uniform) \
+          { \
+            g = (z[i] - t->x0) * t->rdx; \
+            left = (g < 0.0) ? -1 : (g >= n - 1) ? n - 1 : (npy_intp)g; \
+          } \
+        for (k = 0; k < INTERP_STEPS; k++) \
+          { \
+            if (left >= 0 && z[i] < x[left]) \
+              { left--; } \
+            else if (left < n - 1 && x[left + 1] <= z[i]) \
+              { left++; } \
+            else \
+              { break; } \
+          } \
+        if (k == INTERP_STEPS) \
+          { \
+            /* left is the last x <= z */ \
+            for (lo = 0, hi = n; lo < hi;) \
+              { \
+                mid = lo + (hi - lo) / 2; \
+                if (x[mid] <= z[i]) \
+                  { lo = mid + 1; } \
+                else \
+                  { hi = mid; } \
+              } \
+            left = lo - 1; \
+          } \
+        if (left < 0) \
+          { res[i] = y[0]; } \
+        else if (left >= n - 1) \
+          { res[i] = y[n - 1]; } \
+        else \
+          { res[i] = s[left] * (z[i] - x[left]) + y[left]; } \
+      } \
+  } while (0)
+
+static void * interp_run(void * arg)
+{
+  InterpJob * job = (InterpJob *)arg;
+  const InterpTable * t = job->table;
+  npy_intp i, k, lo, hi, mid, n = t->n, left = -1;
+  double g;
+
+  if (t->type == NPY_FLOAT)
+    { INTERP_LOOP(float); }
+
+  else
+    { INTERP_LOOP(double); }
+
+  return 0;
 }
 
 static char arr_interp__doc__[] =
@@ -785,86 +1080,113 @@ as piecewise fcn.\n\
 whose value is y [0] for x < x [0] and y [len (y) -1] for x >\n\
 x [len (y) -1]. An array of floats the same length as z is\n\
 returned, whose values are ordinates for the corresponding z\n\
-abscissae interpolated into the piecewise linear function.";
+abscissae interpolated into the piecewise linear function.\n\
+resulttypecode 'f' computes in float32, the default 'd' in float64.\n\
+Repeated calls with the same (x, y) reuse their slopes, and sorted z\n\
+or evenly spaced x take about constant time per point.";
 
 static PyObject * arr_interp(PyObject * self, PyObject * args)
 {
   PyObject * oy, *ox, *oz;
   PyArrayObject * ay, *ax, *az, *_interp;
-  double * dy, *dx, *dz, *dres, *slopes;
-  int leny, lenz, i, left;
-  PyObject * tpo = Py_None;
-  char type_char = 'd';
-  char * type = &type_char;
+  InterpTable * table;
+  InterpJob job[MAX_THREADS];
+  npy_intp lenz;
+  int i, nt, type;
+  PyObject * tpo = Py_None, *code;
+  char typecode = 'd';
 
   Py_Try(PyArg_ParseTuple(args, "OOO|O", &oy, &ox, &oz, &tpo));
 
   if (tpo != Py_None)
     {
-      type = PyString_AsString(tpo);
+      if (PyUnicode_Check(tpo))
+        { Py_Try(code = PyUnicode_AsUTF8String(tpo)); }
 
-      if (!type)
-        { return NULL; }
+      else if (PyBytes_Check(tpo))
+        {
+          Py_INCREF(tpo);
+          code = tpo;
+        }
 
-      if (!*type)
-        { type = &type_char; }
-    }
+      else
+        {
+          PyErr_SetString(PyExc_TypeError,
+                          "interp: resulttypecode must be a string.");
+          return NULL;
+        }
 
-  if (*type == 'f')
-    {
-      return arr_interpf(self, args);
+      if (PyBytes_GET_SIZE(code))
+        { typecode = PyBytes_AS_STRING(code)[0]; }
+
+      Py_DECREF(code);
     }
 
-  else if (*type != 'd')
+  if (typecode == 'f')
+    { type = NPY_FLOAT; }
+
+  else if (typecode == 'd')
+    { type = NPY_DOUBLE; }
+
+  else
     {
       SETERR("interp: unimplemented typecode.");
       return NULL;
     }
 
-  GET_ARR(ay, oy, NPY_DOUBLE, 1);
-  GET_ARR(ax, ox, NPY_DOUBLE, 1);
+  GET_ARR(ay, oy, type, 1);
+  GET_ARR(ax, ox, type, 1);
 
-  if ((leny = PyArray_SIZE(ay)) != PyArray_SIZE(ax))
+  if (PyArray_SIZE(ay) != PyArray_SIZE(ax) || PyArray_SIZE(ax) < 1)
     {
-      SETERR("interp: x and y are not the same length.");
+      SETERR(PyArray_SIZE(ax) < 1 ? "interp: x and y are empty."
+             : "interp: x and y are not the same length.");
       Py_DECREF(ay);
       Py_DECREF(ax);
       return NULL;
     }
 
-  GET_ARR2(az, oz, NPY_DOUBLE, 1, MAX_INTERP_DIMS);
-  lenz = PyArray_SIZE(az);
-  dy = (double *)PyArray_DATA(ay);
-  dx = (double *)PyArray_DATA(ax);
-  dz = (double *)PyArray_DATA(az);
-  /* create output array with same size as 'Z' input array */
-  Py_Try(_interp = (PyArrayObject *) PyArray_SimpleNew
-                   (PyArray_NDIM((PyArrayObject *)az), PyArray_DIMS(az), NPY_DOUBLE));
-  dres = (double *)PyArray_DATA(_interp);
-  slopes = (double *)malloc((leny - 1) * sizeof(double));
+  table = interp_table(ay, ax, type);
+  Py_DECREF(ay);
+  Py_DECREF(ax);
+  Py_Try(table);
 
-  for (i = 0; i < leny - 1; i++)
+  if (!(az = (PyArrayObject *)PyArray_ContiguousFromObject
+             (oz, type, 1, MAX_INTERP_DIMS)))
     {
-      slopes[i] = (dy[i + 1] - dy[i]) / (dx[i + 1] - dx[i]);
+      interp_release(table);
+      return NULL;
     }
 
-  for (i = 0; i < lenz; i++)
-    {
-      left = _binary_search(dz[i], dx, leny);
+  lenz = PyArray_SIZE(az);
 
-      if (left < 0)
-        { dres[i] = dy[0]; }
+  /* create output array with same size as 'Z' input array */
+  if (!(_interp = (PyArrayObject *) PyArray_SimpleNew
+                  (PyArray_NDIM(az), PyArray_DIMS(az), type)))
+    {
+      interp_release(table);
+      Py_DECREF(az);
+      return NULL;
+    }
 
-      else if (left >= leny - 1)
-        { dres[i] = dy[leny - 1]; }
+  nt = ThreadCount(lenz, INTERP_BLOCK);
 
-      else
-        { dres[i] = slopes[left] * (dz[i] - dx[left]) + dy[left]; }
+  for (i = 0; i < nt; i++)
+    {
+      job[i].table = table;
+      job[i].z = PyArray_DATA(az);
+      job[i].res = PyArray_DATA(_interp);
+      job[i].start = lenz * i / nt;
+      job[i].stop = lenz * (i + 1) / nt;
     }
 
-  free(slopes);
-  Py_DECREF(ay);
-  Py_DECREF(ax);
+  if (nt > 1)
+    { RunThreads(interp_run, job, sizeof(InterpJob), nt); }
+
+  else
+    { interp_run(job); }
+
+  interp_release(table);
   Py_DECREF(az);
   return PyArray_Return(_interp);
 }
@@ -1060,8 +1382,13 @@ static PyObject * arr_find_mask(PyObject * self, PyObject * args)
 
   ne = PyArray_DIM((PyArrayObject *)node_edgesa, 1);
   ans_size = ntotal * ne;
-  Py_Try(maska = (PyArrayObject *) PyArray_SimpleNew
-                 (1, &ans_size, NPY_INT));
+  if (!(maska = (PyArrayObject *) PyArray_ZEROS(1, &ans_size, NPY_INT, 0)))
+    {
+      Py_DECREF(fsa);
+      Py_DECREF(node_edgesa);
+      return NULL;
+    }
+
   mask = (int *)PyArray_DATA(maska);
 
   for (i = 0, ifs = 0, imask = 0; i < ntotal; i++, imask += ne, ifs += nv)
@@ -1078,6 +1405,8 @@ static PyObject * arr_find_mask(PyObject * self, PyObject * args)
         }
     }
 
+  Py_DECREF(fsa);
+  Py_DECREF(node_edgesa);
   return PyArray_Return(maska);
 
 }
@@ -1369,6 +1698,1489 @@ static PyObject * arr_to_corners(PyObject * self, PyObject * args)
   return PyArray_Return(ares);
 }
 
+static char arr_contour_bands__doc__[] = "\
+contour_bands (levels, z, y, x, ireg [, region]) returns\n\
+[nc, yc, xc, ib], the polygons filling the bands between the\n\
+increasing LEVELS of the point-centered Z on the mesh Y, X, as\n\
+plfp takes them: polygon k has nc[k] corners and lies in band ib[k],\n\
+where band 0 is below levels[0], band i between levels[i-1] and\n\
+levels[i], and band len(levels) above the last level. IREG is as for\n\
+zmin_zmax; with REGION nonzero only the zones of that region are\n\
+filled. The mesh is swept once for all levels: runs of zones lying\n\
+in one band are joined into a single strip polygon along each row,\n\
+and a zone which crosses levels is cut into two triangles, each\n\
+clipped to the bands it spans.";
+
+/* Growing output of contour_bands */
+typedef struct
+{
+  double * x, *y;
+  int * nc, *ib;
+  npy_intp np, nv, maxp, maxv;
+} BandPolys;
+
+/* Make room for one more polygon of n corners */
+static int band_reserve(BandPolys * bp, int n)
+{
+  if (bp->np == bp->maxp)
+    {
+      int * nc, *ib;
+
+      bp->maxp = 2 * bp->maxp + 256;
+
+      if (!(nc = (int *)realloc(bp->nc, bp->maxp * sizeof(int))))
+        { return 0; }
+
+      bp->nc = nc;
+
+      if (!(ib = (int *)realloc(bp->ib, bp->maxp * sizeof(int))))
+        { return 0; }
+
+      bp->ib = ib;
+    }
+
+  if (bp->nv + n > bp->maxv)
+    {
+      double * x, *y;
+
+      bp->maxv = 2 * bp->maxv + n + 1024;
+
+      if (!(x = (double *)realloc(bp->x, bp->maxv * sizeof(double))))
+        { return 0; }
+
+      bp->x = x;
+
+      if (!(y = (double *)realloc(bp->y, bp->maxv * sizeof(double))))
+        { return 0; }
+
+      bp->y = y;
+    }
+
+  return 1;
+}
+
+static int band_add(BandPolys * bp, double * x, double * y, int n, int ib)
+{
+  if (!band_reserve(bp, n))
+    { return 0; }
+
+  memcpy(bp->x + bp->nv, x, n * sizeof(double));
+  memcpy(bp->y + bp->nv, y, n * sizeof(double));
+  bp->nc[bp->np] = n;
+  bp->ib[bp->np++] = ib;
+  bp->nv += n;
+  return 1;
+}
+
+/* Band of the value v: the number of levels not above it */
+static int band_of(double v, double * lev, int nl)
+{
+  int lo = 0, hi = nl, mid;
+
+  while (lo < hi)
+    {
+      mid = (lo + hi) / 2;
+
+      if (lev[mid] <= v)
+        { lo = mid + 1; }
+
+      else
+        { hi = mid; }
+    }
+
+  return lo;
+}
+
+/* Clip the n corner polygon (x, y, z) to z >= level (above != 0) or to
+ * z < level, into (xo, yo, zo); return the number of corners left. */
+static int band_clip(double * x, double * y, double * z, int n,
+                     double level, int above,
+                     double * xo, double * yo, double * zo)
+{
+  int i, k, m = 0, in, ink;
+  double t;
+
+  for (i = 0; i < n; i++)
+    {
+      k = (i + 1) % n;
+      in = above ? z[i] >= level : z[i] < level;
+      ink = above ? z[k] >= level : z[k] < level;
+
+      if (in)
+        {
+          xo[m] = x[i];
+          yo[m] = y[i];
+          zo[m++] = z[i];
+        }
+
+      if (in != ink)
+        {
+          t = (level - z[i]) / (z[k] - z[i]);
+          xo[m] = x[i] + t * (x[k] - x[i]);
+          yo[m] = y[i] + t * (y[k] - y[i]);
+          zo[m++] = level;
+        }
+    }
+
+  return m;
+}
+
+/* Emit the pieces of the triangle (x, y, z) in each band it spans. */
+static int band_triangle(BandPolys * bp, double * x, double * y, double * z,
+                         int * b, double * lev, int nl)
+{
+  double x1[8], y1[8], z1[8], x2[8], y2[8], z2[8];
+  int k, n, kmin = b[0], kmax = b[0];
+
+  for (k = 1; k < 3; k++)
+    {
+      if (b[k] < kmin)
+        { kmin = b[k]; }
+
+      if (b[k] > kmax)
+        { kmax = b[k]; }
+    }
+
+  for (k = kmin; k <= kmax; k++)
+    {
+      if (k > kmin)
+        { n = band_clip(x, y, z, 3, lev[k - 1], 1, x1, y1, z1); }
+
+      else
+        {
+          for (n = 0; n < 3; n++)
+            {
+              x1[n] = x[n];
+              y1[n] = y[n];
+              z1[n] = z[n];
+            }
+        }
+
+      if (k < kmax)
+        { n = band_clip(x1, y1, z1, n, lev[k], 0, x2, y2, z2); }
+
+      else
+        {
+          memcpy(x2, x1, n * sizeof(double));
+          memcpy(y2, y1, n * sizeof(double));
+        }
+
+      if (n >= 3 && !band_add(bp, x2, y2, n, k))
+        { return 0; }
+    }
+
+  return 1;
+}
+
+/* Emit zones j0 to j1 of row i, all in band ib, as one strip. */
+static int band_strip(BandPolys * bp, double * x, double * y, int m,
+                      int i, int j0, int j1, int ib)
+{
+  int j, n = 2 * (j1 - j0 + 2);
+  npy_intp k;
+
+  if (!band_reserve(bp, n))
+    { return 0; }
+
+  k = bp->nv;
+
+  for (j = j0; j <= j1 + 1; j++, k++)
+    {
+      bp->x[k] = x[i * m + j];
+      bp->y[k] = y[i * m + j];
+    }
+
+  for (j = j1 + 1; j >= j0; j--, k++)
+    {
+      bp->x[k] = x[(i + 1) * m + j];
+      bp->y[k] = y[(i + 1) * m + j];
+    }
+
+  bp->nc[bp->np] = n;
+  bp->ib[bp->np++] = ib;
+  bp->nv = k;
+  return 1;
+}
+
+/* Close the strip of zones j0 to j - 1 of row i, if any */
+#define BAND_FLUSH \
+  if (run >= 0) \
+    { \
+      ok = band_strip(&bp, x, y, m, i, j0, j - 1, run); \
+      run = -1; \
+    }
+
+static PyObject * arr_contour_bands(PyObject * self, PyObject * args)
+{
+  static int tri[2][3] = { {0, 1, 2}, {0, 2, 3} };
+  PyObject * olev, *oz, *oy, *ox, *oreg, *result = NULL;
+  PyArrayObject * alev = 0, *az = 0, *ay = 0, *ax = 0, *areg = 0;
+  PyArrayObject * anc, *ayc, *axc, *aib;
+  BandPolys bp = { 0, 0, 0, 0, 0, 0, 0, 0 };
+  double * lev, *z, *y, *x, tx[3], ty[3], tz[3];
+  int * ireg, region = 0, nl, n, m, i, j, j0 = 0, q, t, run, ok = 1;
+  int zb[4], tb[3];
+  npy_intp c[4];
+
+  Py_Try(PyArg_ParseTuple(args, "OOOOO|i", &olev, &oz, &oy, &ox, &oreg,
+                          &region));
+
+  if (!(alev = (PyArrayObject *) PyArray_ContiguousFromObject(olev,
+               NPY_DOUBLE, 1, 1))
+      || !(az = (PyArrayObject *) PyArray_ContiguousFromObject(oz,
+                NPY_DOUBLE, 2, 2))
+      || !(ay = (PyArrayObject *) PyArray_ContiguousFromObject(oy,
+                NPY_DOUBLE, 2, 2))
+      || !(ax = (PyArrayObject *) PyArray_ContiguousFromObject(ox,
+                NPY_DOUBLE, 2, 2))
+      || !(areg = (PyArrayObject *) PyArray_ContiguousFromObject(oreg,
+                  NPY_INT, 2, 2)))
+    { goto done; }
+
+  n = PyArray_DIM(az, 0);
+  m = PyArray_DIM(az, 1);
+
+  if (n < 2 || m < 2 || !PyArray_SAMESHAPE(az, ay)
+      || !PyArray_SAMESHAPE(az, ax) || !PyArray_SAMESHAPE(az, areg))
+    {
+      SETERR("contour_bands: z, y, x and ireg must be 2D of the same shape.");
+      goto done;
+    }
+
+  lev = (double *)PyArray_DATA(alev);
+  nl = PyArray_DIM(alev, 0);
+
+  for (i = 1; i < nl; i++)
+    {
+      if (!(lev[i - 1] <= lev[i]))
+        {
+          SETERR("contour_bands: levels must not decrease.");
+          goto done;
+        }
+    }
+
+  z = (double *)PyArray_DATA(az);
+  y = (double *)PyArray_DATA(ay);
+  x = (double *)PyArray_DATA(ax);
+  ireg = (int *)PyArray_DATA(areg);
+
+  for (i = 0; i < n - 1 && ok; i++)
+    {
+      run = -1;		/* band of the strip begun at zone j0 */
+
+      for (j = 0; j < m - 1 && ok; j++)
+        {
+          /* ireg numbers a zone by its last corner */
+          q = ireg[(i + 1) * m + j + 1];
+
+          if (region ? q != region : !q)
+            {
+              BAND_FLUSH;
+              continue;
+            }
+
+          c[0] = i * m + j;
+          c[1] = c[0] + 1;
+          c[2] = c[1] + m;
+          c[3] = c[0] + m;
+
+          for (q = 0; q < 4; q++)
+            { zb[q] = band_of(z[c[q]], lev, nl); }
+
+          if (zb[0] == zb[1] && zb[0] == zb[2] && zb[0] == zb[3])
+            {
+              if (run != zb[0])
+                {
+                  BAND_FLUSH;
+                  run = zb[0];
+                  j0 = j;
+                }
+
+              continue;
+            }
+
+          BAND_FLUSH;
+
+          for (t = 0; t < 2 && ok; t++)
+            {
+              for (q = 0; q < 3; q++)
+                {
+                  tx[q] = x[c[tri[t][q]]];
+                  ty[q] = y[c[tri[t][q]]];
+                  tz[q] = z[c[tri[t][q]]];
+                  tb[q] = zb[tri[t][q]];
+                }
+
+              ok = band_triangle(&bp, tx, ty, tz, tb, lev, nl);
+            }
+        }
+
+      if (ok)
+        { BAND_FLUSH; }
+    }
+
+  if (!ok)
+    {
+      PyErr_NoMemory();
+      goto done;
+    }
+
+  if (!(anc = (PyArrayObject *) PyArray_SimpleNew(1, &bp.np, NPY_INT)))
+    { goto done; }
+
+  if (!(ayc = (PyArrayObject *) PyArray_SimpleNew(1, &bp.nv, NPY_DOUBLE)))
+    {
+      Py_DECREF(anc);
+      goto done;
+    }
+
+  if (!(axc = (PyArrayObject *) PyArray_SimpleNew(1, &bp.nv, NPY_DOUBLE)))
+    {
+      Py_DECREF(anc);
+      Py_DECREF(ayc);
+      goto done;
+    }
+
+  if (!(aib = (PyArrayObject *) PyArray_SimpleNew(1, &bp.np, NPY_INT)))
+    {
+      Py_DECREF(anc);
+      Py_DECREF(ayc);
+      Py_DECREF(axc);
+      goto done;
+    }
+
+  if (bp.np)
+    {
+      memcpy(PyArray_DATA(anc), bp.nc, bp.np * sizeof(int));
+      memcpy(PyArray_DATA(aib), bp.ib, bp.np * sizeof(int));
+      memcpy(PyArray_DATA(ayc), bp.y, bp.nv * sizeof(double));
+      memcpy(PyArray_DATA(axc), bp.x, bp.nv * sizeof(double));
+    }
+
+  result = Py_BuildValue("[NNNN]", anc, ayc, axc, aib);
+
+done:
+  free(bp.x);
+  free(bp.y);
+  free(bp.nc);
+  free(bp.ib);
+  Py_XDECREF(alev);
+  Py_XDECREF(az);
+  Py_XDECREF(ay);
+  Py_XDECREF(ax);
+  Py_XDECREF(areg);
+  return result;
+}
+
+/* project3 does in one pass over a polygon list what get3_xy, the
+ * centroids of sort3d and get3_light of pl3d.py do in many: each
+ * polygon has its vertices rotated into the viewer's coordinates and
+ * projected, its mean depth taken, and, when asked, its normal and
+ * light level computed while its vertices are at hand.  Above
+ * PROJECT_BLOCK polygons the list is cut into runs of polygons done
+ * on threads of their own.
+ */
+#define PROJECT_BLOCK 16384	/* fewest polygons worth a thread */
+
+typedef struct
+{
+  int rotate;			/* xyz not yet in viewer's coordinates */
+  int perspective;		/* camera at finite distance zc */
+  double rot[9], org[3], zc;
+  double ambient, diffuse;
+  int ns;			/* specular light sources */
+  const double * sources;	/* ns of unit direction, level, power */
+} Project3View;
+
+typedef struct
+{
+  const Project3View * view;
+  const double * xyz;
+  const int * nverts;
+  double * out, *zcen, *light;	/* light 0 for no lighting */
+  npy_intp start, stop;		/* polygons of this job */
+  npy_intp first;		/* first vertex of polygon start */
+} Project3Job;
+
+/* twice the midpoint of the vertices I and J of polygon Q */
+#define PROJECT_MID(m, q, i, j) \
+  do { \
+    m[0] = q[3 * (i)] + q[3 * (j)]; \
+    m[1] = q[3 * (i) + 1] + q[3 * (j) + 1]; \
+    m[2] = q[3 * (i) + 2] + q[3 * (j) + 2]; \
+  } while (0)
+
+static void * project3_run(void * arg)
+{
+  Project3Job * job = (Project3Job *)arg;
+  const Project3View * v = job->view;
+  const double * r = v->rot, *a, *s;
+  double * q, *b, c[3], c0[3], c1[3], c2[3], c3[3], nrm[3], vw[3];
+  double x, y, z, d, nv, l, w;
+  npy_intp p, f = job->first;
+  int n, n2, i, k;
+
+  for (p = job->start; p < job->stop; f += n, p++)
+    {
+      n = job->nverts[p];
+      q = job->out + 3 * f;
+      c[0] = c[1] = c[2] = 0.0;
+
+      for (k = 0; k < n; k++)
+        {
+          a = job->xyz + 3 * (f + k);
+          b = q + 3 * k;
+
+          if (v->rotate)
+            {
+              x = a[0] - v->org[0];
+              y = a[1] - v->org[1];
+              z = a[2] - v->org[2];
+
+              for (i = 0; i < 3; i++)
+                { b[i] = x * r[i] + y * r[3 + i] + z * r[6 + i]; }
+
+              if (v->perspective)
+                {
+                  /* protect behind camera, avoid zero divide */
+                  d = v->zc - b[2];
+
+                  if (d < 1.e-35)
+                    { d = 1.e-35; }
+
+                  b[0] /= d;
+                  b[1] /= d;
+                  b[2] /= d;
+                }
+            }
+
+          else
+            {
+              b[0] = a[0];
+              b[1] = a[1];
+              b[2] = a[2];
+            }
+
+          c[0] += b[0];
+          c[1] += b[1];
+          c[2] += b[2];
+        }
+
+      c[0] /= n;
+      c[1] /= n;
+      c[2] /= n;
+      job->zcen[p] = c[2];
+
+      if (!job->light)
+        { continue; }
+
+      /* normal from two diameters joining midpoints of edges which
+       * as nearly quarter the polygon as possible, as get3_normal */
+      n2 = (n + 1) / 2;
+      PROJECT_MID(c0, q, 0, 1 % n);
+      PROJECT_MID(c1, q, n2 - 1, n2 % n);
+      i = n2 / 2;
+      PROJECT_MID(c2, q, i, (i + 1) % n);
+      i = (i + n2 < n ? i + n2 : n) - 1;
+      PROJECT_MID(c3, q, i, (i + 1) % n);
+
+      for (i = 0; i < 3; i++)
+        {
+          c1[i] -= c0[i];
+          c3[i] -= c2[i];
+        }
+
+      nrm[0] = c1[2] * c3[1] - c1[1] * c3[2];
+      nrm[1] = c1[0] * c3[2] - c1[2] * c3[0];
+      nrm[2] = c1[1] * c3[0] - c1[0] * c3[1];
+      w = sqrt(nrm[0] * nrm[0] + nrm[1] * nrm[1] + nrm[2] * nrm[2]);
+
+      if (w == 0.0)
+        { w = 1.0; }
+
+      nrm[0] /= w;
+      nrm[1] /= w;
+      nrm[2] /= w;
+
+      /* direction from the polygon to the camera */
+      if (v->zc != 0.0)
+        {
+          vw[0] = -c[0];
+          vw[1] = -c[1];
+          vw[2] = v->zc - c[2];
+          w = sqrt(vw[0] * vw[0] + vw[1] * vw[1] + vw[2] * vw[2]);
+
+          if (w == 0.0)
+            { w = 1.0; }
+
+          vw[0] /= w;
+          vw[1] /= w;
+          vw[2] /= w;
+        }
+
+      else
+        {
+          vw[0] = vw[1] = 0.0;
+          vw[2] = 1.0;
+        }
+
+      nv = nrm[0] * vw[0] + nrm[1] * vw[1] + nrm[2] * vw[2];
+      l = v->ambient + v->diffuse * fabs(nv);
+
+      for (k = 0, s = v->sources; k < v->ns; k++, s += 5)
+        {
+          if (s[3] == 0.0)
+            { continue; }
+
+          w = (s[0] * nrm[0] + s[1] * nrm[1] + s[2] * nrm[2]) * nv
+              - 0.5 * (s[0] * vw[0] + s[1] * vw[1] + s[2] * vw[2]) + 0.5;
+
+          if (w < 1.e-30)
+            { w = 1.e-30; }
+
+          l += s[3] * pow(w, s[4]);
+        }
+
+      job->light[p] = l;
+    }
+
+  return 0;
+}
+
+/* Output K of project3: the array OP of the caller or a new one. */
+static PyArrayObject * project3_output(PyObject * op, int nd,
+                                       npy_intp * dims)
+{
+  PyArrayObject * ap = (PyArrayObject *)op;
+  npy_intp size = nd > 1 ? dims[0] * dims[1] : dims[0];
+
+  if (!op)
+    { return (PyArrayObject *)PyArray_SimpleNew(nd, dims, NPY_DOUBLE); }
+
+  if (!PyArray_Check(op) || PyArray_TYPE(ap) != NPY_DOUBLE
+      || !PyArray_IS_C_CONTIGUOUS(ap) || !PyArray_ISWRITEABLE(ap)
+      || PyArray_SIZE(ap) != size)
+    {
+      SETERR("project3: out must hold writeable contiguous float64 arrays of the sizes of the results.");
+      return NULL;
+    }
+
+  Py_INCREF(op);
+  return ap;
+}
+
+static char arr_project3__doc__[] = "\
+project3 (xyz, nverts, rot, org, zc, light [, out]) returns\n\
+[xyz1, zcen, values] for the polygon list XYZ (sum(nverts)-by-3),\n\
+NVERTS (number of vertices of each polygon, as for plfp):\n\
+XYZ1 is XYZ rotated by ROT about ORG into the viewer's coordinates and,\n\
+unless ZC is None, seen in perspective from the camera at distance ZC,\n\
+as get3_xy (xyz, 1) returns it; ZCEN is the mean depth of each polygon\n\
+in XYZ1, by which sort3d sorts; VALUES is None if LIGHT is None, else\n\
+the light level of each polygon, as get3_light (xyz1, nverts) with\n\
+LIGHT = (ambient, diffuse, specular, spower, sdir), the parameters of\n\
+light3. With ROT None, XYZ is already in the viewer's coordinates.\n\
+OUT, a list [xyz1, zcen, values] of float64 arrays, receives the\n\
+results instead of new arrays. Large lists are done on several threads.";
+
+static PyObject * arr_project3(PyObject * self, PyObject * args)
+{
+  PyObject * oxyz, *onv, *orot, *oorg, *ozc, *olight, *oout = Py_None;
+  PyObject * olt = 0, *ospec, *opow, *odir, *out[3] = { 0, 0, 0 };
+  PyObject * result = NULL;
+  PyArrayObject * axyz = 0, *anv = 0, *arot = 0, *aorg = 0;
+  PyArrayObject * aspec = 0, *apow = 0, *adir = 0, *ares[3] = { 0, 0, 0 };
+  Project3View view;
+  Project3Job job[MAX_THREADS];
+  double * sources = 0, *dir, w;
+  int * nv, i, k, nt;
+  npy_intp np, nxyz, sum, dims[2];
+
+  Py_Try(PyArg_ParseTuple(args, "OOOOOO|O", &oxyz, &onv, &orot, &oorg,
+                          &ozc, &olight, &oout));
+  memset(&view, 0, sizeof(view));
+
+  if (!(axyz = (PyArrayObject *) PyArray_ContiguousFromObject(oxyz,
+               NPY_DOUBLE, 2, 2))
+      || !(anv = (PyArrayObject *) PyArray_ContiguousFromObject(onv,
+                 NPY_INT, 1, 1)))
+    { goto done; }
+
+  nxyz = PyArray_DIM(axyz, 0);
+  np = PyArray_DIM(anv, 0);
+  nv = (int *)PyArray_DATA(anv);
+  nt = ThreadCount(np, PROJECT_BLOCK);
+
+  for (i = 0; i < nt; i++)
+    {
+      job[i].start = np * i / nt;
+      job[i].stop = np * (i + 1) / nt;
+    }
+
+  for (sum = 0, i = k = 0; i < np && nv[i] > 0; sum += nv[i++])
+    {
+      if (k < nt && job[k].start == i)
+        { job[k++].first = sum; }
+    }
+
+  if (PyArray_DIM(axyz, 1) != 3 || i < np || sum != nxyz)
+    {
+      SETERR("project3: illegal or inconsistent polygon list.");
+      goto done;
+    }
+
+  while (k < nt)
+    { job[k++].first = sum; }
+
+  if (orot != Py_None)
+    {
+      if (!(arot = (PyArrayObject *) PyArray_ContiguousFromObject(orot,
+                   NPY_DOUBLE, 2, 2))
+          || (oorg != Py_None
+              && !(aorg = (PyArrayObject *) PyArray_ContiguousFromObject
+                          (oorg, NPY_DOUBLE, 1, 1))))
+        { goto done; }
+
+      if (PyArray_SIZE(arot) != 9 || (aorg && PyArray_SIZE(aorg) != 3))
+        {
+          SETERR("project3: rot must be 3-by-3 and org a 3 vector.");
+          goto done;
+        }
+
+      view.rotate = 1;
+      memcpy(view.rot, PyArray_DATA(arot), 9 * sizeof(double));
+
+      if (aorg)
+        { memcpy(view.org, PyArray_DATA(aorg), 3 * sizeof(double)); }
+    }
+
+  if (ozc != Py_None)
+    {
+      view.zc = PyFloat_AsDouble(ozc);
+
+      if (PyErr_Occurred())
+        { goto done; }
+
+      view.perspective = view.rotate;
+    }
+
+  if (olight != Py_None)
+    {
+      if (!(olt = PySequence_Tuple(olight))
+          || !PyArg_ParseTuple(olt, "ddOOO", &view.ambient, &view.diffuse,
+                               &ospec, &opow, &odir)
+          || !(aspec = (PyArrayObject *) PyArray_ContiguousFromObject(ospec,
+                       NPY_DOUBLE, 0, 1))
+          || !(apow = (PyArrayObject *) PyArray_ContiguousFromObject(opow,
+                      NPY_DOUBLE, 0, 1))
+          || !(adir = (PyArrayObject *) PyArray_ContiguousFromObject(odir,
+                      NPY_DOUBLE, 1, 2)))
+        { goto done; }
+
+      view.ns = PyArray_SIZE(adir) / 3;
+
+      if (PyArray_SIZE(adir) != 3 * view.ns
+          || (PyArray_SIZE(aspec) != 1 && PyArray_SIZE(aspec) != view.ns)
+          || (PyArray_SIZE(apow) != 1 && PyArray_SIZE(apow) != view.ns))
+        {
+          SETERR("project3: sdir must be a 3 vector or ns-by-3, specular and spower scalars or ns long.");
+          goto done;
+        }
+
+      if (!(sources = (double *)malloc(5 * view.ns * sizeof(double))))
+        {
+          PyErr_NoMemory();
+          goto done;
+        }
+
+      for (k = 0; k < view.ns; k++)
+        {
+          dir = (double *)PyArray_DATA(adir) + 3 * k;
+          w = sqrt(dir[0] * dir[0] + dir[1] * dir[1] + dir[2] * dir[2]);
+
+          if (w == 0.0)
+            { w = 1.0; }
+
+          for (i = 0; i < 3; i++)
+            { sources[5 * k + i] = dir[i] / w; }
+
+          sources[5 * k + 3] = ((double *)PyArray_DATA(aspec))
+                               [PyArray_SIZE(aspec) > 1 ? k : 0];
+          sources[5 * k + 4] = ((double *)PyArray_DATA(apow))
+                               [PyArray_SIZE(apow) > 1 ? k : 0];
+        }
+
+      view.sources = sources;
+    }
+
+  if (oout != Py_None)
+    {
+      if (!PySequence_Check(oout) || PySequence_Size(oout) != 3)
+        {
+          SETERR("project3: out must be a list [xyz1, zcen, values].");
+          goto done;
+        }
+
+      for (k = 0; k < 3; k++)
+        {
+          if (!(out[k] = PySequence_GetItem(oout, k)))
+            { goto done; }
+
+          if (out[k] == Py_None)
+            { DECREF_AND_ZERO(out[k]); }
+        }
+    }
+
+  dims[0] = nxyz;
+  dims[1] = 3;
+
+  if (!(ares[0] = project3_output(out[0], 2, dims)))
+    { goto done; }
+
+  dims[0] = np;
+
+  if (!(ares[1] = project3_output(out[1], 1, dims)))
+    { goto done; }
+
+  if (olight != Py_None && !(ares[2] = project3_output(out[2], 1, dims)))
+    { goto done; }
+
+  for (i = 0; i < nt; i++)
+    {
+      job[i].view = &view;
+      job[i].xyz = (double *)PyArray_DATA(axyz);
+      job[i].nverts = nv;
+      job[i].out = (double *)PyArray_DATA(ares[0]);
+      job[i].zcen = (double *)PyArray_DATA(ares[1]);
+      job[i].light = ares[2] ? (double *)PyArray_DATA(ares[2]) : 0;
+    }
+
+  /* even one job runs without the GIL, for spin3 to draw meanwhile */
+  RunThreads(project3_run, job, sizeof(Project3Job), nt);
+
+  if (!ares[2])
+    {
+      Py_INCREF(Py_None);
+      ares[2] = (PyArrayObject *)Py_None;
+    }
+
+  result = Py_BuildValue("[NNN]", ares[0], ares[1], ares[2]);
+  ares[0] = ares[1] = ares[2] = 0;
+
+done:
+  free(sources);
+
+  for (k = 0; k < 3; k++)
+    {
+      Py_XDECREF(out[k]);
+      Py_XDECREF(ares[k]);
+    }
+
+  Py_XDECREF(olt);
+  Py_XDECREF(axyz);
+  Py_XDECREF(anv);
+  Py_XDECREF(arot);
+  Py_XDECREF(aorg);
+  Py_XDECREF(aspec);
+  Py_XDECREF(apow);
+  Py_XDECREF(adir);
+  return result;
+}
+
+/* isosurface3 cuts a logically rectangular mesh at a value of a vertex
+ * centered function in one pass, producing the polygons slice3 builds
+ * with find_mask, the permutations of construct3 and numpy: each cut
+ * hexahedron yields its cut edges in the order of its pattern in the
+ * permutation table, split into up to four polygons.  The point on a
+ * cut edge of the mesh is computed once and shared by the up to four
+ * cells around that edge, two planes of vertices being kept at a time,
+ * and rows of cells whose corners all lie on one side are skipped.
+ * Above ISO3_BLOCK vertices the mesh is cut into slabs of planes done on
+ * threads of their own, whose polygons are joined in order.
+ */
+#define ISO3_BLOCK 65536	/* fewest vertices worth a thread */
+
+/* kinds of color of isosurface3 */
+#define ISO3_MEAN 0		/* mean over the polygon's vertices */
+#define ISO3_CORNERS 1		/* mean over the cell's eight corners */
+#define ISO3_NODE 2		/* one per polygon vertex */
+#define ISO3_CELL 3		/* cell centered color, one per polygon */
+
+/* states of a row of vertices */
+#define ISO3_ABOVE 0
+#define ISO3_BELOW 1
+#define ISO3_MIXED 2
+
+/* element N of a float32 (SINGLE) or float64 array */
+#define ISO3_GET(a, single, n) \
+  ((single) ? (double)((const float *)(a))[n] : ((const double *)(a))[n])
+
+/* corners of the edges of a hexahedron, numbered as by slice3 */
+static int iso3_lower[12] = { 0, 1, 2, 3, 0, 1, 4, 5, 0, 2, 4, 6 };
+static int iso3_upper[12] = { 4, 5, 6, 7, 2, 3, 6, 7, 1, 3, 5, 7 };
+
+/* the polygons of a cell whose corners below value make one pattern */
+typedef struct
+{
+  int ncut, npoly;
+  unsigned char edges[12];	/* cut edges, polygon after polygon */
+  unsigned char sizes[4];	/* number of edges of each polygon */
+} Iso3Pattern;
+
+typedef struct
+{
+  npy_intp ni, nj, nk;		/* vertices along each index */
+  const char * f;
+  int fsingle;
+  double value;
+  Iso3Pattern pattern[256];
+  const char * xyz[3];
+  int xsingle[3];
+  int axes;			/* xyz[d] varies along index d only */
+  const char * c;		/* 0 for no colors */
+  int csingle, ckind;
+} Iso3Mesh;
+
+typedef struct
+{
+  const Iso3Mesh * mesh;
+  npy_intp start, stop;		/* planes of cells of this job */
+  unsigned char * below[2];	/* vertices of two planes below value */
+  unsigned char * rows[2];	/* states of their rows */
+  double * plane[2];		/* points on j then k edges of each plane */
+  double * across;		/* points on i edges between them */
+  int * nverts;
+  float * xyz, *c;
+  npy_intp np, nv, maxp, maxv;
+  int ok;
+} Iso3Job;
+
+/* The polygons of each pattern from PERM, the permutations of the
+ * edges of construct3: sorted by their number there, the cut edges go
+ * round the polygons, a new one starting with each new twelve. */
+static void iso3_patterns(const int * perm, Iso3Pattern * pattern)
+{
+  int bits, e, t, n, key[12], r;
+  Iso3Pattern * pat;
+
+  memset(pattern, 0, 256 * sizeof(Iso3Pattern));
+
+  for (bits = 1; bits < 255; bits++)
+    {
+      pat = pattern + bits;
+
+      for (e = n = 0; e < 12; e++)
+        {
+          if (!(bits >> iso3_lower[e] & 1) == !(bits >> iso3_upper[e] & 1))
+            { continue; }
+
+          key[n] = perm[e * 254 + bits - 1];
+
+          for (t = n++; t > 0 && key[t - 1] > key[t]; t--)
+            {
+              r = key[t - 1];
+              key[t - 1] = key[t];
+              key[t] = r;
+              pat->edges[t] = pat->edges[t - 1];
+            }
+
+          pat->edges[t] = (unsigned char)e;
+        }
+
+      pat->ncut = n;
+
+      for (t = 0; t < n; t++)
+        {
+          if (t && key[t] / 12 != key[t - 1] / 12 && pat->npoly < 3)
+            { pat->npoly++; }
+
+          pat->sizes[pat->npoly]++;
+        }
+
+      pat->npoly++;
+    }
+}
+
+/* Eight below flags from P on as one word */
+static npy_uint64 iso3_word(const unsigned char * p)
+{
+  npy_uint64 w;
+
+  memcpy(&w, p, sizeof(w));
+  return w;
+}
+
+/* The first k from K on and below N where flags A[k] and B[k] differ,
+ * or N, passing eight equal flags at a time */
+static npy_intp iso3_differ(const unsigned char * a, const unsigned char * b,
+                            npy_intp k, npy_intp n)
+{
+  while (k + 8 <= n && iso3_word(a + k) == iso3_word(b + k))
+    { k += 8; }
+
+  while (k < n && a[k] == b[k])
+    { k++; }
+
+  return k;
+}
+
+/* Whether one of the eight cells from the one whose corners of lowest
+ * index are A[0] and B[0] (in planes i and i + 1) is cut, when rows
+ * are NK long */
+static int iso3_cut8(const unsigned char * a, const unsigned char * b,
+                     npy_intp nk)
+{
+  npy_uint64 r0 = iso3_word(a), s0 = iso3_word(a + 1);
+
+  return ((r0 ^ iso3_word(a + nk)) | (r0 ^ iso3_word(b))
+          | (r0 ^ iso3_word(b + nk)) | (r0 ^ s0) | (s0 ^ iso3_word(a + nk + 1))
+          | (s0 ^ iso3_word(b + 1)) | (s0 ^ iso3_word(b + nk + 1))) != 0;
+}
+
+/* Make room for NPOLY more polygons of NV vertices in all */
+static int iso3_reserve(Iso3Job * job, int npoly, int nv)
+{
+  int node = job->mesh->ckind == ISO3_NODE;
+
+  if (job->np + npoly > job->maxp)
+    {
+      int * nverts;
+
+      job->maxp = 2 * job->maxp + 1024;
+
+      if (!(nverts = (int *)realloc(job->nverts, job->maxp * sizeof(int))))
+        { return 0; }
+
+      job->nverts = nverts;
+
+      if (job->mesh->c && !node)
+        {
+          float * c = (float *)realloc(job->c, job->maxp * sizeof(float));
+
+          if (!c)
+            { return 0; }
+
+          job->c = c;
+        }
+    }
+
+  if (job->nv + nv > job->maxv)
+    {
+      float * xyz;
+
+      job->maxv = 2 * job->maxv + 4096;
+
+      if (!(xyz = (float *)realloc(job->xyz, 3 * job->maxv * sizeof(float))))
+        { return 0; }
+
+      job->xyz = xyz;
+
+      if (job->mesh->c && node)
+        {
+          float * c = (float *)realloc(job->c, job->maxv * sizeof(float));
+
+          if (!c)
+            { return 0; }
+
+          job->c = c;
+        }
+    }
+
+  return 1;
+}
+
+/* Point P (x, y, z, color) where the function is value on the edge of
+ * the mesh from vertex (i, j, k) one step along index D. */
+static void iso3_edge(const Iso3Mesh * m, npy_intp i, npy_intp j,
+                      npy_intp k, int d, double * p)
+{
+  npy_intp idx[3], l = (i * m->nj + j) * m->nk + k, u;
+  double fl, fu, su, sl;
+  int e;
+
+  u = l + (d == 0 ? m->nj * m->nk : d == 1 ? m->nk : 1);
+  fl = ISO3_GET(m->f, m->fsingle, l) - m->value;
+  fu = ISO3_GET(m->f, m->fsingle, u) - m->value;
+  su = fu / (fu - fl);
+  sl = fl / (fu - fl);
+
+  if (m->axes)
+    {
+      idx[0] = i;
+      idx[1] = j;
+      idx[2] = k;
+
+      for (e = 0; e < 3; e++)
+        { p[e] = ISO3_GET(m->xyz[e], m->xsingle[e], idx[e]); }
+
+      p[d] = p[d] * su
+             - ISO3_GET(m->xyz[d], m->xsingle[d], idx[d] + 1) * sl;
+    }
+
+  else
+    {
+      for (e = 0; e < 3; e++)
+        {
+          p[e] = ISO3_GET(m->xyz[e], m->xsingle[e], l) * su
+                 - ISO3_GET(m->xyz[e], m->xsingle[e], u) * sl;
+        }
+    }
+
+  if (m->c && m->ckind != ISO3_CELL)
+    {
+      p[3] = ISO3_GET(m->c, m->csingle, l) * su
+             - ISO3_GET(m->c, m->csingle, u) * sl;
+    }
+}
+
+/* The below flags of plane I of vertices, the state of each of its
+ * rows and the points on its cut edges into slot S of JOB. */
+static void iso3_plane(Iso3Job * job, npy_intp i, int s)
+{
+  const Iso3Mesh * m = job->mesh;
+  npy_intp nj = m->nj, nk = m->nk, j, k, n, v = i * nj * nk;
+  unsigned char * b = job->below[s], *r = job->rows[s], any, all;
+  double * p = job->plane[s], *q = p + 4 * (nj - 1) * nk;
+  const float * fs = (const float *)m->f + v;
+  const double * fd = (const double *)m->f + v;
+  float value = (float)m->value;
+
+  for (j = 0, n = 0; j < nj; j++)
+    {
+      any = 0;
+      all = 1;
+
+      if (m->fsingle)
+        {
+          for (k = 0; k < nk; k++, n++)
+            {
+              b[n] = fs[n] < value;
+              any |= b[n];
+              all &= b[n];
+            }
+        }
+
+      else
+        {
+          for (k = 0; k < nk; k++, n++)
+            {
+              b[n] = fd[n] < m->value;
+              any |= b[n];
+              all &= b[n];
+            }
+        }
+
+      r[j] = any ? (all ? ISO3_BELOW : ISO3_MIXED) : ISO3_ABOVE;
+    }
+
+  for (j = 0, n = 0; j < nj; j++, n += nk)
+    {
+      for (k = r[j] == ISO3_MIXED ? iso3_differ(b + n, b + n + 1, 0, nk - 1)
+               : nk - 1; k < nk - 1;
+           k = iso3_differ(b + n, b + n + 1, k + 1, nk - 1))
+        { iso3_edge(m, i, j, k, 2, q + 4 * (n - j + k)); }
+
+      if (j == nj - 1 || (r[j] == r[j + 1] && r[j] != ISO3_MIXED))
+        { continue; }
+
+      for (k = iso3_differ(b + n, b + n + nk, 0, nk); k < nk;
+           k = iso3_differ(b + n, b + n + nk, k + 1, nk))
+        { iso3_edge(m, i, j, k, 1, p + 4 * (n + k)); }
+    }
+}
+
+static void * iso3_run(void * arg)
+{
+  Iso3Job * job = (Iso3Job *)arg;
+  const Iso3Mesh * m = job->mesh;
+  const Iso3Pattern * pat;
+  npy_intp nj = m->nj, nk = m->nk, njnk = nj * nk, i, j, k, n, v;
+  unsigned char * ba, *bb, *ra, *rb;
+  double * pa, *pb, *base[12], *q, sum, w;
+  int bits, e, a, t, np, nc, r;
+  float * x, *c;
+
+  job->ok = 1;
+
+  if (job->start >= job->stop)
+    { return 0; }
+
+  iso3_plane(job, job->start, 0);
+
+  for (i = job->start, a = 0; i < job->stop; i++, a = !a)
+    {
+      iso3_plane(job, i + 1, !a);
+      ba = job->below[a];
+      bb = job->below[!a];
+      ra = job->rows[a];
+      rb = job->rows[!a];
+      pa = job->plane[a];
+      pb = job->plane[!a];
+      v = i * njnk;
+
+      for (j = 0, n = 0; j < nj; j++, n += nk)
+        {
+          if (ra[j] == rb[j] && ra[j] != ISO3_MIXED)
+            { continue; }
+
+          for (k = iso3_differ(ba + n, bb + n, 0, nk); k < nk;
+               k = iso3_differ(ba + n, bb + n, k + 1, nk))
+            { iso3_edge(m, i, j, k, 0, job->across + 4 * (n + k)); }
+        }
+
+      for (j = 0; j < nj - 1; j++)
+        {
+          /* no cell of the row is cut if its four rows of corners
+           * lie on one side */
+          if (ra[j] != ISO3_MIXED && ra[j] == ra[j + 1] && ra[j] == rb[j]
+              && ra[j] == rb[j + 1])
+            { continue; }
+
+          /* the points on the twelve edges of the cell at k = 0 */
+          n = j * nk;
+          base[0] = job->across + 4 * n;
+          base[1] = base[0] + 4;
+          base[2] = base[0] + 4 * nk;
+          base[3] = base[2] + 4;
+          base[4] = pa + 4 * n;
+          base[5] = base[4] + 4;
+          base[6] = pb + 4 * n;
+          base[7] = base[6] + 4;
+          base[8] = pa + 4 * ((nj - 1) * nk + n - j);
+          base[9] = base[8] + 4 * (nk - 1);
+          base[10] = pb + 4 * ((nj - 1) * nk + n - j);
+          base[11] = base[10] + 4 * (nk - 1);
+
+          for (k = 0; k < nk - 1; k++, n++)
+            {
+              while (k + 9 <= nk && !iso3_cut8(ba + n, bb + n, nk))
+                {
+                  k += 8;
+                  n += 8;
+                }
+
+              if (k == nk - 1)
+                { break; }
+
+              /* corner (di, dj, dk) of the cell is bit 4 di + 2 dj + dk
+               * of its pattern */
+              bits = ba[n] | ba[n + 1] << 1 | ba[n + nk] << 2
+                     | ba[n + nk + 1] << 3 | bb[n] << 4 | bb[n + 1] << 5
+                     | bb[n + nk] << 6 | bb[n + nk + 1] << 7;
+
+              if (!bits || bits == 255)
+                { continue; }
+
+              pat = m->pattern + bits;
+
+              if (!iso3_reserve(job, pat->npoly, pat->ncut))
+                {
+                  job->ok = 0;
+                  return 0;
+                }
+
+              x = job->xyz + 3 * job->nv;
+              c = job->c;
+
+              for (np = e = 0; np < pat->npoly; np++)
+                {
+                  nc = pat->sizes[np];
+                  sum = 0.0;
+
+                  for (t = 0; t < nc; t++, e++, x += 3)
+                    {
+                      q = base[pat->edges[e]] + 4 * k;
+                      x[0] = (float)q[0];
+                      x[1] = (float)q[1];
+                      x[2] = (float)q[2];
+
+                      if (c && m->ckind == ISO3_NODE)
+                        { c[job->nv + e] = (float)q[3]; }
+
+                      else if (c && m->ckind == ISO3_MEAN)
+                        { sum += q[3]; }
+                    }
+
+                  if (c && m->ckind == ISO3_MEAN)
+                    { c[job->np + np] = (float)(sum / nc); }
+
+                  else if (c && m->ckind == ISO3_CELL)
+                    {
+                      c[job->np + np] = (float)ISO3_GET(m->c, m->csingle,
+                                                        (i * (nj - 1) + j) * (nk - 1) + k);
+                    }
+
+                  else if (c && m->ckind == ISO3_CORNERS)
+                    {
+                      for (r = 0, w = 0.0; r < 8; r++)
+                        {
+                          w += ISO3_GET(m->c, m->csingle, v + n
+                                        + (r >> 2) * njnk
+                                        + (r >> 1 & 1) * nk + (r & 1));
+                        }
+
+                      c[job->np + np] = (float)(0.125 * w);
+                    }
+
+                  job->nverts[job->np + np] = nc;
+                }
+
+              job->np += pat->npoly;
+              job->nv += pat->ncut;
+            }
+        }
+    }
+
+  return 0;
+}
+
+/* Float array OP of ND dimensions, float32 ones as they are (SINGLE set)
+ * and anything else as float64. */
+static PyArrayObject * iso3_array(PyObject * op, int nd, int * single)
+{
+  *single = PyArray_Check(op)
+            && PyArray_TYPE((PyArrayObject *)op) == NPY_FLOAT;
+  return (PyArrayObject *)PyArray_ContiguousFromObject(op,
+         *single ? NPY_FLOAT : NPY_DOUBLE, nd, nd);
+}
+
+static char arr_isosurface3__doc__[] = "\
+isosurface3 (f, value, perm, xyz, c, kind) returns [nverts, xyzverts,\n\
+colors], the isosurface F == VALUE of the vertex centered function F\n\
+(ni-by-nj-by-nk) on a logically rectangular mesh, as slice3 returns it\n\
+for such a mesh: NVERTS (int32) the number of vertices of each polygon,\n\
+XYZVERTS (float32, sum(nverts)-by-3) the vertices. PERM is the table of\n\
+hexahedron edge permutations slice3 builds with construct3. XYZ is\n\
+either the 3-by-ni-by-nj-by-nk array of vertex coordinates or a\n\
+sequence of the three coordinate vectors (ni, nj and nk long) of a\n\
+mesh whose x depends on the first index only, and so on. COLORS is\n\
+None if C is None; for C cell centered ((ni-1)-by-(nj-1)-by-(nk-1)) it\n\
+is its value in each polygon's cell, while for C vertex centered KIND\n\
+picks: 0 the mean of C interpolated to the polygon's vertices, 1 the\n\
+mean over the corners of its cell, 2 C at each vertex of each polygon.\n\
+All is float32 or float64. Large meshes are done on several threads.";
+
+static PyObject * arr_isosurface3(PyObject * self, PyObject * args)
+{
+  PyObject * of, *operm, *oxyz, *oc, *ox[3] = { 0, 0, 0 };
+  PyObject * result = NULL;
+  PyArrayObject * af = 0, *aperm = 0, *axyz[3] = { 0, 0, 0 }, *ac = 0;
+  PyArrayObject * anv = 0, *axv = 0, *acol = 0;
+  Iso3Mesh mesh;
+  Iso3Job job[MAX_THREADS];
+  npy_intp np, nv, nc, dims[2], *fd, *cd;
+  size_t plane;
+  int i, d, nt = 0;
+  char * nvo, *xvo, *co;
+
+  memset(&mesh, 0, sizeof(mesh));
+  memset(job, 0, sizeof(job));
+  Py_Try(PyArg_ParseTuple(args, "OdOOOi", &of, &mesh.value, &operm,
+                          &oxyz, &oc, &mesh.ckind));
+
+  if (!(af = iso3_array(of, 3, &mesh.fsingle))
+      || !(aperm = (PyArrayObject *) PyArray_ContiguousFromObject(operm,
+                   NPY_INT, 2, 2)))
+    { goto done; }
+
+  /* compare float32 values to a float32 value, as numpy would */
+  if (mesh.fsingle)
+    { mesh.value = (float)mesh.value; }
+
+  fd = PyArray_DIMS(af);
+  mesh.ni = fd[0];
+  mesh.nj = fd[1];
+  mesh.nk = fd[2];
+  mesh.f = PyArray_DATA(af);
+
+  if (mesh.ni < 2 || mesh.nj < 2 || mesh.nk < 2
+      || PyArray_DIM(aperm, 0) != 12 || PyArray_DIM(aperm, 1) != 254)
+    {
+      SETERR("isosurface3: f must be at least 2-by-2-by-2 and perm 12-by-254.");
+      goto done;
+    }
+
+  iso3_patterns((int *)PyArray_DATA(aperm), mesh.pattern);
+
+  if (PyArray_Check(oxyz))
+    {
+      if (!(axyz[0] = iso3_array(oxyz, 4, mesh.xsingle)))
+        { goto done; }
+
+      if (PyArray_DIM(axyz[0], 0) != 3 || PyArray_DIM(axyz[0], 1) != fd[0]
+          || PyArray_DIM(axyz[0], 2) != fd[1]
+          || PyArray_DIM(axyz[0], 3) != fd[2])
+        {
+          SETERR("isosurface3: xyz must be 3-by-ni-by-nj-by-nk.");
+          goto done;
+        }
+
+      for (d = 0; d < 3; d++)
+        {
+          mesh.xyz[d] = (char *)PyArray_DATA(axyz[0])
+                        + d * PyArray_SIZE(af) * PyArray_ITEMSIZE(axyz[0]);
+          mesh.xsingle[d] = mesh.xsingle[0];
+        }
+    }
+
+  else
+    {
+      mesh.axes = 1;
+
+      if (!PySequence_Check(oxyz) || PySequence_Size(oxyz) != 3)
+        {
+          SETERR("isosurface3: xyz must be an array or three vectors.");
+          goto done;
+        }
+
+      for (d = 0; d < 3; d++)
+        {
+          if (!(ox[d] = PySequence_GetItem(oxyz, d))
+              || !(axyz[d] = iso3_array(ox[d], 1, mesh.xsingle + d)))
+            { goto done; }
+
+          if (PyArray_DIM(axyz[d], 0) != fd[d])
+            {
+              SETERR("isosurface3: the coordinate vectors must be ni, nj and nk long.");
+              goto done;
+            }
+
+          mesh.xyz[d] = PyArray_DATA(axyz[d]);
+        }
+    }
+
+  if (oc != Py_None)
+    {
+      if (!(ac = iso3_array(oc, 3, &mesh.csingle)))
+        { goto done; }
+
+      cd = PyArray_DIMS(ac);
+
+      if (cd[0] == fd[0] - 1 && cd[1] == fd[1] - 1 && cd[2] == fd[2] - 1)
+        { mesh.ckind = ISO3_CELL; }
+
+      else if (cd[0] != fd[0] || cd[1] != fd[1] || cd[2] != fd[2]
+               || mesh.ckind < ISO3_MEAN || mesh.ckind > ISO3_NODE)
+        {
+          SETERR("isosurface3: c must be vertex or cell centered, kind 0, 1 or 2.");
+          goto done;
+        }
+
+      mesh.c = PyArray_DATA(ac);
+    }
+
+  nt = ThreadCount(PyArray_SIZE(af), ISO3_BLOCK);
+
+  if (nt > mesh.ni - 1)
+    { nt = mesh.ni - 1; }
+
+  plane = mesh.nj * mesh.nk;
+
+  for (i = 0; i < nt; i++)
+    {
+      job[i].mesh = &mesh;
+      job[i].start = (mesh.ni - 1) * i / nt;
+      job[i].stop = (mesh.ni - 1) * (i + 1) / nt;
+
+      if (!(job[i].below[0] = (unsigned char *)malloc(2 * plane
+                          + 2 * mesh.nj))
+          || !(job[i].plane[0] = (double *)malloc(16 * plane * sizeof(double)))
+          || !(job[i].across = (double *)malloc(4 * plane * sizeof(double))))
+        {
+          PyErr_NoMemory();
+          goto done;
+        }
+
+      job[i].below[1] = job[i].below[0] + plane;
+      job[i].rows[0] = job[i].below[1] + plane;
+      job[i].rows[1] = job[i].rows[0] + mesh.nj;
+      job[i].plane[1] = job[i].plane[0] + 8 * plane;
+    }
+
+  RunThreads(iso3_run, job, sizeof(Iso3Job), nt);
+
+  for (i = np = nv = 0; i < nt; i++)
+    {
+      if (!job[i].ok)
+        {
+          PyErr_NoMemory();
+          goto done;
+        }
+
+      np += job[i].np;
+      nv += job[i].nv;
+    }
+
+  nc = mesh.ckind == ISO3_NODE ? nv : np;
+  dims[0] = nv;
+  dims[1] = 3;
+
+  if (!(anv = (PyArrayObject *) PyArray_SimpleNew(1, &np, NPY_INT))
+      || !(axv = (PyArrayObject *) PyArray_SimpleNew(2, dims, NPY_FLOAT))
+      || (mesh.c
+          && !(acol = (PyArrayObject *) PyArray_SimpleNew(1, &nc, NPY_FLOAT))))
+    { goto done; }
+
+  nvo = PyArray_DATA(anv);
+  xvo = PyArray_DATA(axv);
+  co = acol ? PyArray_DATA(acol) : 0;
+
+  for (i = 0; i < nt; i++)
+    {
+      nc = mesh.ckind == ISO3_NODE ? job[i].nv : job[i].np;
+
+      if (job[i].np)
+        {
+          memcpy(nvo, job[i].nverts, job[i].np * sizeof(int));
+          memcpy(xvo, job[i].xyz, 3 * job[i].nv * sizeof(float));
+
+          if (co)
+            { memcpy(co, job[i].c, nc * sizeof(float)); }
+        }
+
+      nvo += job[i].np * sizeof(int);
+      xvo += 3 * job[i].nv * sizeof(float);
+
+      if (co)
+        { co += nc * sizeof(float); }
+    }
+
+  if (!acol)
+    {
+      Py_INCREF(Py_None);
+      acol = (PyArrayObject *)Py_None;
+    }
+
+  result = Py_BuildValue("[NNN]", anv, axv, acol);
+  anv = axv = acol = 0;
+
+done:
+
+  for (i = 0; i < nt; i++)
+    {
+      free(job[i].below[0]);
+      free(job[i].plane[0]);
+      free(job[i].across);
+      free(job[i].nverts);
+      free(job[i].xyz);
+      free(job[i].c);
+    }
+
+  for (d = 0; d < 3; d++)
+    {
+      Py_XDECREF(ox[d]);
+      Py_XDECREF(axyz[d]);
+    }
+
+  Py_XDECREF(af);
+  Py_XDECREF(aperm);
+  Py_XDECREF(ac);
+  Py_XDECREF(anv);
+  Py_XDECREF(axv);
+  Py_XDECREF(acol);
+  return result;
+}
+
 /* List of methods defined in the module */
 
 static struct PyMethodDef arr_methods[] =
@@ -1381,6 +3193,9 @@ static struct PyMethodDef arr_methods[] =
   {"find_mask", arr_find_mask, METH_VARARGS, arr_find_mask__doc__},
   {"construct3", arr_construct3, METH_VARARGS, arr_construct3__doc__},
   {"to_corners", arr_to_corners, METH_VARARGS, arr_to_corners__doc__},
+  {"contour_bands", arr_contour_bands, METH_VARARGS, arr_contour_bands__doc__},
+  {"project3", arr_project3, METH_VARARGS, arr_project3__doc__},
+  {"isosurface3", arr_isosurface3, METH_VARARGS, arr_isosurface3__doc__},
 
   {NULL, NULL}		/* sentinel */
 };
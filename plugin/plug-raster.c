@@ -0,0 +1,944 @@
+/* mdcb */
+#include <string.h>
+#include <stdlib.h>
+#include <math.h>
+#include "plug-raster.h"
+#include "pstdlib.h"
+
+/* Headless raster engine.
+ *
+ * Gist hands every engine world coordinates plus a WC->pixel map
+ * (engine->map, maintained by GpDeviceMap).  This engine rasterizes
+ * lines, markers, text, filled polygons and cell arrays directly into
+ * an RGB image, so no X server is needed to get pixels out of Gist.
+ * Text uses a built-in 5x7 bitmap font, scaled to the text height.
+ */
+
+static g_callbacks g_raster_on = { "gist RasterEngine" };
+
+/* same page boxes as the other Gist engines (8.5x11 inches in NDC) */
+static const GpBox portraitBox = { 0.0, 0.798584, 0.0, 1.033461 };
+static const GpBox landscapeBox = { 0.0, 1.033461, 0.0, 0.798584 };
+
+/* standard colors 255 (P_BG) down to 242 (P_GRAYA) */
+static const unsigned char stdColors[14][3] =
+{
+  {255, 255, 255}, {0, 0, 0}, {0, 0, 0}, {255, 255, 255},
+  {255, 0, 0}, {0, 255, 0}, {0, 0, 255}, {0, 255, 255},
+  {255, 0, 255}, {255, 255, 0},
+  {100, 100, 100}, {150, 150, 150}, {190, 190, 190}, {214, 214, 214}
+};
+
+/* dash patterns in pixels at 75 dpi, indexed by L_DASH ... */
+static const int dashDash[] = { 5, 5 };
+static const int dashDot[] = { 1, 3 };
+static const int dashDashDot[] = { 5, 3, 1, 3 };
+static const int dashDashDotDot[] = { 5, 3, 1, 3, 1, 3 };
+
+/* 5x7 font for ' ' through '~', one byte per column, bit 0 at top */
+static const unsigned char font5x7[95][5] =
+{
+  {0x00, 0x00, 0x00, 0x00, 0x00}, {0x00, 0x00, 0x5F, 0x00, 0x00},
+  {0x00, 0x07, 0x00, 0x07, 0x00}, {0x14, 0x7F, 0x14, 0x7F, 0x14},
+  {0x24, 0x2A, 0x7F, 0x2A, 0x12}, {0x23, 0x13, 0x08, 0x64, 0x62},
+  {0x36, 0x49, 0x55, 0x22, 0x50}, {0x00, 0x05, 0x03, 0x00, 0x00},
+  {0x00, 0x1C, 0x22, 0x41, 0x00}, {0x00, 0x41, 0x22, 0x1C, 0x00},
+  {0x08, 0x2A, 0x1C, 0x2A, 0x08}, {0x08, 0x08, 0x3E, 0x08, 0x08},
+  {0x00, 0x50, 0x30, 0x00, 0x00}, {0x08, 0x08, 0x08, 0x08, 0x08},
+  {0x00, 0x60, 0x60, 0x00, 0x00}, {0x20, 0x10, 0x08, 0x04, 0x02},
+  {0x3E, 0x51, 0x49, 0x45, 0x3E}, {0x00, 0x42, 0x7F, 0x40, 0x00},
+  {0x42, 0x61, 0x51, 0x49, 0x46}, {0x21, 0x41, 0x45, 0x4B, 0x31},
+  {0x18, 0x14, 0x12, 0x7F, 0x10}, {0x27, 0x45, 0x45, 0x45, 0x39},
+  {0x3C, 0x4A, 0x49, 0x49, 0x30}, {0x01, 0x71, 0x09, 0x05, 0x03},
+  {0x36, 0x49, 0x49, 0x49, 0x36}, {0x06, 0x49, 0x49, 0x29, 0x1E},
+  {0x00, 0x36, 0x36, 0x00, 0x00}, {0x00, 0x56, 0x36, 0x00, 0x00},
+  {0x08, 0x14, 0x22, 0x41, 0x00}, {0x14, 0x14, 0x14, 0x14, 0x14},
+  {0x00, 0x41, 0x22, 0x14, 0x08}, {0x02, 0x01, 0x51, 0x09, 0x06},
+  {0x32, 0x49, 0x79, 0x41, 0x3E}, {0x7E, 0x11, 0x11, 0x11, 0x7E},
+  {0x7F, 0x49, 0x49, 0x49, 0x36}, {0x3E, 0x41, 0x41, 0x41, 0x22},
+  {0x7F, 0x41, 0x41, 0x22, 0x1C}, {0x7F, 0x49, 0x49, 0x49, 0x41},
+  {0x7F, 0x09, 0x09, 0x09, 0x01}, {0x3E, 0x41, 0x49, 0x49, 0x7A},
+  {0x7F, 0x08, 0x08, 0x08, 0x7F}, {0x00, 0x41, 0x7F, 0x41, 0x00},
+  {0x20, 0x40, 0x41, 0x3F, 0x01}, {0x7F, 0x08, 0x14, 0x22, 0x41},
+  {0x7F, 0x40, 0x40, 0x40, 0x40}, {0x7F, 0x02, 0x0C, 0x02, 0x7F},
+  {0x7F, 0x04, 0x08, 0x10, 0x7F}, {0x3E, 0x41, 0x41, 0x41, 0x3E},
+  {0x7F, 0x09, 0x09, 0x09, 0x06}, {0x3E, 0x41, 0x51, 0x21, 0x5E},
+  {0x7F, 0x09, 0x19, 0x29, 0x46}, {0x46, 0x49, 0x49, 0x49, 0x31},
+  {0x01, 0x01, 0x7F, 0x01, 0x01}, {0x3F, 0x40, 0x40, 0x40, 0x3F},
+  {0x1F, 0x20, 0x40, 0x20, 0x1F}, {0x3F, 0x40, 0x38, 0x40, 0x3F},
+  {0x63, 0x14, 0x08, 0x14, 0x63}, {0x07, 0x08, 0x70, 0x08, 0x07},
+  {0x61, 0x51, 0x49, 0x45, 0x43}, {0x00, 0x7F, 0x41, 0x41, 0x00},
+  {0x02, 0x04, 0x08, 0x10, 0x20}, {0x00, 0x41, 0x41, 0x7F, 0x00},
+  {0x04, 0x02, 0x01, 0x02, 0x04}, {0x40, 0x40, 0x40, 0x40, 0x40},
+  {0x00, 0x01, 0x02, 0x04, 0x00}, {0x20, 0x54, 0x54, 0x54, 0x78},
+  {0x7F, 0x48, 0x44, 0x44, 0x38}, {0x38, 0x44, 0x44, 0x44, 0x20},
+  {0x38, 0x44, 0x44, 0x48, 0x7F}, {0x38, 0x54, 0x54, 0x54, 0x18},
+  {0x08, 0x7E, 0x09, 0x01, 0x02}, {0x0C, 0x52, 0x52, 0x52, 0x3E},
+  {0x7F, 0x08, 0x04, 0x04, 0x78}, {0x00, 0x44, 0x7D, 0x40, 0x00},
+  {0x20, 0x40, 0x44, 0x3D, 0x00}, {0x7F, 0x10, 0x28, 0x44, 0x00},
+  {0x00, 0x41, 0x7F, 0x40, 0x00}, {0x7C, 0x04, 0x18, 0x04, 0x78},
+  {0x7C, 0x08, 0x04, 0x04, 0x78}, {0x38, 0x44, 0x44, 0x44, 0x38},
+  {0x7C, 0x14, 0x14, 0x14, 0x08}, {0x08, 0x14, 0x14, 0x18, 0x7C},
+  {0x7C, 0x08, 0x04, 0x04, 0x08}, {0x48, 0x54, 0x54, 0x54, 0x20},
+  {0x04, 0x3F, 0x44, 0x40, 0x20}, {0x3C, 0x40, 0x40, 0x20, 0x7C},
+  {0x1C, 0x20, 0x40, 0x20, 0x1C}, {0x3C, 0x40, 0x30, 0x40, 0x3C},
+  {0x44, 0x28, 0x10, 0x28, 0x44}, {0x0C, 0x50, 0x50, 0x50, 0x3C},
+  {0x44, 0x64, 0x54, 0x4C, 0x44}, {0x00, 0x08, 0x36, 0x41, 0x00},
+  {0x00, 0x00, 0x7F, 0x00, 0x00}, {0x00, 0x41, 0x36, 0x08, 0x00},
+  {0x08, 0x04, 0x08, 0x10, 0x08}
+};
+
+/* A pen: color, square brush size, and dash state along a polyline. */
+typedef struct RasterPen RasterPen;
+struct RasterPen
+{
+  unsigned char c[3];
+  int t;
+  const int * dash;
+  int ndash, index;
+  double scale, left, period;
+};
+
+static void GetColor(RasterEngine * re, unsigned long color,
+                     unsigned char c[3])
+{
+  unsigned long cell;
+
+  if (color >= 256UL)
+    { cell = color; }	/* true color */
+
+  else if (color < (unsigned long)re->e.nColors && re->e.palette)
+    { cell = re->e.palette[color]; }
+
+  else if (color >= 242UL)
+    {
+      memcpy(c, stdColors[255 - color], 3);
+      return;
+    }
+
+  else if (re->e.nColors > 0 && re->e.palette)
+    { cell = re->e.palette[re->e.nColors - 1]; }
+
+  else
+    {
+      memcpy(c, stdColors[1], 3);
+      return;
+    }
+
+  c[0] = cell & 0xff;
+  c[1] = (cell >> 8) & 0xff;
+  c[2] = (cell >> 16) & 0xff;
+}
+
+static double NDCtoX(RasterEngine * re, double x)
+{
+  return re->ppn * x - re->x0;
+}
+
+static double NDCtoY(RasterEngine * re, double y)
+{
+  return re->ppn * (re->ymax - y) - re->y0;
+}
+
+/* Pixels Gist may draw into: the current viewport if clipping is on. */
+static void SetClip(RasterEngine * re)
+{
+  long * clip = re->clip;
+
+  clip[0] = 0;
+  clip[1] = re->width - 1;
+  clip[2] = 0;
+  clip[3] = re->height - 1;
+
+  if (gistClip)
+    {
+      double xa = NDCtoX(re, gistT.viewport.xmin);
+      double xb = NDCtoX(re, gistT.viewport.xmax);
+      double ya = NDCtoY(re, gistT.viewport.ymax);
+      double yb = NDCtoY(re, gistT.viewport.ymin);
+
+      if (xa > clip[0])
+        { clip[0] = (long)floor(xa); }
+
+      if (xb < clip[1])
+        { clip[1] = (long)floor(xb); }
+
+      if (ya > clip[2])
+        { clip[2] = (long)floor(ya); }
+
+      if (yb < clip[3])
+        { clip[3] = (long)floor(yb); }
+    }
+}
+
+static void PutSpan(RasterEngine * re, long y, long xa, long xb,
+                    const unsigned char c[3])
+{
+  unsigned char * p;
+
+  if (y < re->clip[2] || y > re->clip[3])
+    { return; }
+
+  if (xa < re->clip[0])
+    { xa = re->clip[0]; }
+
+  if (xb > re->clip[1])
+    { xb = re->clip[1]; }
+
+  for (p = re->rgb + 3 * (y * re->width + xa); xa <= xb; xa++, p += 3)
+    {
+      p[0] = c[0];
+      p[1] = c[1];
+      p[2] = c[2];
+    }
+}
+
+static void PutBrush(RasterEngine * re, double x, double y, int t,
+                     const unsigned char c[3])
+{
+  long xa = (long)floor(x - 0.5 * t + 0.5);
+  long ya = (long)floor(y - 0.5 * t + 0.5);
+  long yb = ya + t - 1;
+
+  for (; ya <= yb; ya++)
+    { PutSpan(re, ya, xa, xa + t - 1, c); }
+}
+
+static int SetPen(RasterEngine * re, RasterPen * pen,
+                  const GpLineAttribs * l)
+{
+  int i;
+
+  if (l->type == L_NONE)
+    { return 0; }
+
+  GetColor(re, l->color, pen->c);
+  pen->t = (int)(l->width * re->dpi / 75.0 + 0.5);
+
+  if (pen->t < 1)
+    { pen->t = 1; }
+
+  pen->dash = 0;
+  pen->ndash = 0;
+
+  if (l->type == L_DASH)
+    {
+      pen->dash = dashDash;
+      pen->ndash = 2;
+    }
+
+  else if (l->type == L_DOT)
+    {
+      pen->dash = dashDot;
+      pen->ndash = 2;
+    }
+
+  else if (l->type == L_DASHDOT)
+    {
+      pen->dash = dashDashDot;
+      pen->ndash = 4;
+    }
+
+  else if (l->type == L_DASHDOTDOT)
+    {
+      pen->dash = dashDashDotDot;
+      pen->ndash = 6;
+    }
+
+  pen->scale = pen->t * re->dpi / 75.0;
+  pen->index = 0;
+  pen->left = pen->ndash ? pen->dash[0] * pen->scale : 0.0;
+  pen->period = 0.0;
+
+  for (i = 0; i < pen->ndash; i++)
+    { pen->period += pen->dash[i] * pen->scale; }
+
+  return 1;
+}
+
+/* Move D pixels along the dash pattern. */
+static void PenAdvance(RasterPen * pen, double d)
+{
+  if (!pen->ndash)
+    { return; }
+
+  if (d > pen->left + pen->period)
+    { d = pen->left + fmod(d - pen->left, pen->period); }
+
+  while (d >= pen->left)
+    {
+      d -= pen->left;
+      pen->index = (pen->index + 1) % pen->ndash;
+      pen->left = pen->dash[pen->index] * pen->scale;
+    }
+
+  pen->left -= d;
+}
+
+/* Liang-Barsky: restrict [*t0, *t1] to the part of (x,y)+t*(dx,dy)
+ * inside BOX, return 0 if none is. */
+static int ClipLine(const double box[4], double x, double y, double dx,
+                    double dy, double * t0, double * t1)
+{
+  double p[4], q[4], r;
+  int k;
+
+  p[0] = -dx;
+  q[0] = x - box[0];
+  p[1] = dx;
+  q[1] = box[1] - x;
+  p[2] = -dy;
+  q[2] = y - box[2];
+  p[3] = dy;
+  q[3] = box[3] - y;
+
+  for (k = 0; k < 4; k++)
+    {
+      if (p[k] == 0.0)
+        {
+          if (q[k] < 0.0)
+            { return 0; }
+
+          continue;
+        }
+
+      r = q[k] / p[k];
+
+      if (p[k] < 0.0)
+        {
+          if (r > *t1)
+            { return 0; }
+
+          if (r > *t0)
+            { *t0 = r; }
+        }
+
+      else
+        {
+          if (r < *t0)
+            { return 0; }
+
+          if (r < *t1)
+            { *t1 = r; }
+        }
+    }
+
+  return 1;
+}
+
+static void DrawSegment(RasterEngine * re, RasterPen * pen, double xa,
+                        double ya, double xb, double yb)
+{
+  double dx = xb - xa, dy = yb - ya, len = sqrt(dx * dx + dy * dy);
+  double t0 = 0.0, t1 = 1.0, step, box[4];
+  long i, n;
+
+  box[0] = re->clip[0] - pen->t;
+  box[1] = re->clip[1] + pen->t + 1.0;
+  box[2] = re->clip[2] - pen->t;
+  box[3] = re->clip[3] + pen->t + 1.0;
+
+  if (!(len < 1.0e9) || !ClipLine(box, xa, ya, dx, dy, &t0, &t1))
+    {
+      PenAdvance(pen, (len < 1.0e9) ? len : 0.0);
+      return;
+    }
+
+  PenAdvance(pen, t0 * len);
+  n = (long)ceil((t1 - t0) * len);
+
+  if (n < 1)
+    { n = 1; }
+
+  step = (t1 - t0) / n;
+
+  for (i = 0; i <= n; i++)
+    {
+      if (!(pen->index & 1))
+        {
+          PutBrush(re, xa + dx * (t0 + i * step), ya + dy * (t0 + i * step),
+                   pen->t, pen->c);
+        }
+
+      if (i < n)
+        { PenAdvance(pen, step * len); }
+    }
+
+  PenAdvance(pen, (1.0 - t1) * len);
+}
+
+/* Draw character CH with its baseline origin at (bx,by); the glyph
+ * advances along (ax,ay) and is upright along (ux,uy). */
+static void DrawGlyph(RasterEngine * re, int ch, double bx, double by,
+                      int s, int ax, int ay, int ux, int uy,
+                      const unsigned char c[3])
+{
+  const unsigned char * glyph;
+  long x, y;
+  int k, r, du, dv, u, v;
+
+  if (ch < ' ' || ch > '~')
+    { ch = '?'; }
+
+  glyph = font5x7[ch - ' '];
+
+  for (k = 0; k < 5; k++)
+    for (r = 0; r < 7; r++)
+      if (glyph[k] & (1 << r))
+        for (du = 0; du < s; du++)
+          for (dv = 0; dv < s; dv++)
+            {
+              u = k * s + du;
+              v = (6 - r) * s + dv;
+              x = (long)floor(bx) + u * ax + v * ux;
+              y = (long)floor(by) - u * ay - v * uy;
+              PutSpan(re, y, x, x, c);
+            }
+}
+
+/* ------------------------------------------------------------------------ */
+/* Engine methods */
+
+static void Kill(Engine * engine)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+
+  p_free(re->rgb);
+  GpDelEngine(engine);
+}
+
+static int Clear(Engine * engine, int always)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  unsigned char c[3];
+  long i, n = (long)re->width * re->height;
+
+  if (always || engine->marked)
+    {
+      GetColor(re, P_BG, c);
+
+      for (i = 0; i < n; i++)
+        { memcpy(re->rgb + 3 * i, c, 3); }
+    }
+
+  engine->marked = 0;
+  return 0;
+}
+
+static int Flush(Engine * engine)
+{
+  return 0;
+}
+
+static void ChangeMap(Engine * engine)
+{
+  GpDeviceMap(engine);
+}
+
+static int ChangePalette(Engine * engine)
+{
+  return engine->nColors;
+}
+
+static void ClearArea(Engine * engine, GpBox * box)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  unsigned char c[3];
+  long y, ya, yb, xa, xb;
+
+  re->clip[0] = 0;
+  re->clip[1] = re->width - 1;
+  re->clip[2] = 0;
+  re->clip[3] = re->height - 1;
+  xa = (long)floor(NDCtoX(re, box->xmin)) - 2;
+  xb = (long)floor(NDCtoX(re, box->xmax)) + 2;
+  ya = (long)floor(NDCtoY(re, box->ymax)) - 2;
+  yb = (long)floor(NDCtoY(re, box->ymin)) + 2;
+  GetColor(re, P_BG, c);
+
+  for (y = ya; y <= yb; y++)
+    { PutSpan(re, y, xa, xb, c); }
+}
+
+static int DrawLines(Engine * engine, long n, const GpReal * px,
+                     const GpReal * py, int closed, int smooth)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  RasterPen pen;
+  double x0, y0, x, y, xp, yp;
+  long i;
+
+  if (n < 1 || !SetPen(re, &pen, &gistA.l))
+    { return 0; }
+
+  SetClip(re);
+  x0 = xp = map->x.scale * px[0] + map->x.offset;
+  y0 = yp = map->y.scale * py[0] + map->y.offset;
+
+  if (n == 1)
+    { PutBrush(re, x0, y0, pen.t, pen.c); }
+
+  for (i = 1; i < n; i++)
+    {
+      x = map->x.scale * px[i] + map->x.offset;
+      y = map->y.scale * py[i] + map->y.offset;
+      DrawSegment(re, &pen, xp, yp, x, y);
+      xp = x;
+      yp = y;
+    }
+
+  if (closed && n > 2)
+    { DrawSegment(re, &pen, xp, yp, x0, y0); }
+
+  engine->marked = 1;
+  return 0;
+}
+
+static int DrawDisjoint(Engine * engine, long n, const GpReal * px,
+                        const GpReal * py, const GpReal * qx,
+                        const GpReal * qy)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  RasterPen pen;
+  long i;
+
+  if (n < 1 || !SetPen(re, &pen, &gistA.l))
+    { return 0; }
+
+  SetClip(re);
+
+  for (i = 0; i < n; i++)
+    {
+      SetPen(re, &pen, &gistA.l);
+      DrawSegment(re, &pen,
+                  map->x.scale * px[i] + map->x.offset,
+                  map->y.scale * py[i] + map->y.offset,
+                  map->x.scale * qx[i] + map->x.offset,
+                  map->y.scale * qy[i] + map->y.offset);
+    }
+
+  engine->marked = 1;
+  return 0;
+}
+
+static int DrawMarkers(Engine * engine, long n, const GpReal * px,
+                       const GpReal * py)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  RasterPen pen;
+  GpLineAttribs l;
+  double x, y, h, d, a;
+  int type = gistA.m.type, s, k;
+  long i;
+
+  l.color = gistA.m.color;
+  l.type = L_SOLID;
+  l.width = 1.0;
+  SetPen(re, &pen, &l);
+  SetClip(re);
+  h = 0.5 * gistA.m.size * 10.0 * re->dpi / 72.27;	/* 10 point markers */
+
+  if (h < 1.0)
+    { h = 1.0; }
+
+  d = 0.7071 * h;
+  s = (int)(2.0 * h / 9.0 + 0.5);
+
+  if (s < 1)
+    { s = 1; }
+
+  for (i = 0; i < n; i++)
+    {
+      x = map->x.scale * px[i] + map->x.offset;
+      y = map->y.scale * py[i] + map->y.offset;
+
+      if (x < re->clip[0] - h || x > re->clip[1] + h + 1.0
+          || y < re->clip[2] - h || y > re->clip[3] + h + 1.0)
+        { continue; }
+
+      switch (type)
+        {
+        case M_POINT:
+          PutBrush(re, x, y, 2, pen.c);
+          break;
+
+        case M_ASTERISK:
+          DrawSegment(re, &pen, x - d, y - d, x + d, y + d);
+          DrawSegment(re, &pen, x - d, y + d, x + d, y - d);
+
+        /* fall through */
+        case M_PLUS:
+          DrawSegment(re, &pen, x - h, y, x + h, y);
+          DrawSegment(re, &pen, x, y - h, x, y + h);
+          break;
+
+        case M_CIRCLE:
+          for (k = 0; k < 16; k++)
+            {
+              a = k * (M_PI / 8.0);
+              DrawSegment(re, &pen, x + h * cos(a), y + h * sin(a),
+                          x + h * cos(a + M_PI / 8.0),
+                          y + h * sin(a + M_PI / 8.0));
+            }
+
+          break;
+
+        case M_CROSS:
+          DrawSegment(re, &pen, x - d, y - d, x + d, y + d);
+          DrawSegment(re, &pen, x - d, y + d, x + d, y - d);
+          break;
+
+        default:
+          DrawGlyph(re, type, x - 2.5 * s, y + 3.5 * s, s, 1, 0, 0, 1,
+                    pen.c);
+        }
+    }
+
+  engine->marked = 1;
+  return 0;
+}
+
+static int DrwText(Engine * engine, GpReal x0, GpReal y0, const char * text)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  unsigned char c[3];
+  const char * line;
+  double bx, by, u0, v0, u, v;
+  int s, ax, ay, ux, uy, nl, len, maxlen, i;
+
+  if (!text || !text[0])
+    { return 0; }
+
+  SetClip(re);
+  GetColor(re, gistA.t.color, c);
+  s = (int)(gistA.t.height * re->ppn / 9.0 + 0.5);
+
+  if (s < 1)
+    { s = 1; }
+
+  /* baseline direction (ax,ay) and up direction (ux,uy), y up */
+  ax = 1;
+  ay = ux = 0;
+  uy = 1;
+
+  if (gistA.t.orient == TX_UP)
+    {
+      ax = uy = 0;
+      ay = 1;
+      ux = -1;
+    }
+
+  else if (gistA.t.orient == TX_LEFT)
+    {
+      ax = -1;
+      uy = -1;
+    }
+
+  else if (gistA.t.orient == TX_DOWN)
+    {
+      ax = uy = 0;
+      ay = -1;
+      ux = 1;
+    }
+
+  for (nl = 1, maxlen = len = 0, line = text; *line; line++)
+    {
+      if (*line == '\n')
+        {
+          nl++;
+          len = 0;
+        }
+
+      else if (++len > maxlen)
+        { maxlen = len; }
+    }
+
+  if (gistA.t.alignV == TV_TOP || gistA.t.alignV == TV_CAP)
+    { v0 = -7.0 * s; }
+
+  else if (gistA.t.alignV == TV_HALF)
+    { v0 = 0.5 * ((nl - 1) * 9.0 * s - 7.0 * s); }
+
+  else if (gistA.t.alignV == TV_BOTTOM)
+    { v0 = (nl - 1) * 9.0 * s + s; }
+
+  else
+    { v0 = 0.0; }
+
+  x0 = map->x.scale * x0 + map->x.offset;
+  y0 = map->y.scale * y0 + map->y.offset;
+
+  if (gistA.t.opaque)
+    {
+      unsigned char bg[3];
+      double w = maxlen * 6.0 * s, h = (nl - 1) * 9.0 * s + 8.0 * s;
+      double ulo = (gistA.t.alignH == TH_CENTER) ? -0.5 * w :
+                   (gistA.t.alignH == TH_RIGHT) ? -w : 0.0;
+      double vlo = v0 - (nl - 1) * 9.0 * s - s;
+      double xa = x0 + ulo * ax + vlo * ux, xb = x0 + (ulo + w) * ax + (vlo + h) * ux;
+      double ya = y0 - ulo * ay - vlo * uy, yb = y0 - (ulo + w) * ay - (vlo + h) * uy;
+      long y;
+
+      GetColor(re, P_BG, bg);
+
+      for (y = (long)floor(ya < yb ? ya : yb); y <= (long)floor(ya < yb ? yb : ya); y++)
+        {
+          PutSpan(re, y, (long)floor(xa < xb ? xa : xb),
+                  (long)floor(xa < xb ? xb : xa), bg);
+        }
+    }
+
+  for (line = text; nl > 0; nl--, v0 -= 9.0 * s)
+    {
+      for (len = 0; line[len] && line[len] != '\n'; len++);
+
+      u0 = (gistA.t.alignH == TH_CENTER) ? -0.5 * (len * 6.0 * s - s) :
+           (gistA.t.alignH == TH_RIGHT) ? -(len * 6.0 * s - s) : 0.0;
+
+      for (i = 0; i < len; i++)
+        {
+          u = u0 + i * 6.0 * s;
+          v = v0;
+          bx = x0 + u * ax + v * ux;
+          by = y0 - u * ay - v * uy;
+          DrawGlyph(re, (unsigned char)line[i], bx, by, s, ax, ay, ux, uy, c);
+        }
+
+      line += len + (line[len] == '\n');
+    }
+
+  engine->marked = 1;
+  return 0;
+}
+
+static int CompareReal(const void * a, const void * b)
+{
+  double d = *(const double *)a - *(const double *)b;
+  return (d > 0.0) - (d < 0.0);
+}
+
+static int DrawFill(Engine * engine, long n, const GpReal * px,
+                    const GpReal * py)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  unsigned char c[3];
+  double stack[3 * 32], *x, *y, *cross, yc, ymin, ymax;
+  long i, j, m, row, ya, yb;
+
+  if (n < 3)
+    { return 0; }
+
+  x = (n <= 32) ? stack : (double *)p_malloc(3 * n * sizeof(double));
+
+  if (!x)
+    { return 1; }
+
+  y = x + n;
+  cross = y + n;
+  ymin = ymax = map->y.scale * py[0] + map->y.offset;
+
+  for (i = 0; i < n; i++)
+    {
+      x[i] = map->x.scale * px[i] + map->x.offset;
+      y[i] = map->y.scale * py[i] + map->y.offset;
+
+      if (y[i] < ymin)
+        { ymin = y[i]; }
+
+      else if (y[i] > ymax)
+        { ymax = y[i]; }
+    }
+
+  SetClip(re);
+  GetColor(re, gistA.f.color, c);
+  ya = (ymin < re->clip[2]) ? re->clip[2] : (long)ceil(ymin - 0.5);
+  yb = (ymax > re->clip[3]) ? re->clip[3] : (long)floor(ymax - 0.5);
+
+  /* even-odd scan conversion, sampling each row at pixel centers */
+  for (row = ya; row <= yb; row++)
+    {
+      yc = row + 0.5;
+
+      for (m = 0, i = 0, j = n - 1; i < n; j = i++)
+        if ((y[i] <= yc) != (y[j] <= yc))
+          { cross[m++] = x[j] + (yc - y[j]) * (x[i] - x[j]) / (y[i] - y[j]); }
+
+      qsort(cross, m, sizeof(double), &CompareReal);
+
+      for (i = 0; i + 1 < m; i += 2)
+        {
+          PutSpan(re, row, (long)ceil(cross[i] - 0.5),
+                  (long)floor(cross[i + 1] - 0.5), c);
+        }
+    }
+
+  if (x != stack)
+    { p_free(x); }
+
+  engine->marked = 1;
+  return 0;
+}
+
+static int DrawCells(Engine * engine, GpReal px, GpReal py, GpReal qx,
+                     GpReal qy, long width, long height, long nColumns,
+                     const GpColor * colors)
+{
+  RasterEngine * re = (RasterEngine *)engine;
+  GpXYMap * map = &engine->map;
+  unsigned char table[256][3], *p;
+  const GpColor * cell;
+  double x0, x1, y0, y1;
+  long i, j, row, col, xa, xb, ya, yb;
+  int rgb = gistA.rgb;
+
+  if (width < 1 || height < 1)
+    { return 0; }
+
+  x0 = map->x.scale * px + map->x.offset;
+  x1 = map->x.scale * qx + map->x.offset;
+  y0 = map->y.scale * py + map->y.offset;
+  y1 = map->y.scale * qy + map->y.offset;
+  SetClip(re);
+  xa = (long)ceil((x0 < x1 ? x0 : x1) - 0.5);
+  xb = (long)floor((x0 < x1 ? x1 : x0) - 0.5);
+  ya = (long)ceil((y0 < y1 ? y0 : y1) - 0.5);
+  yb = (long)floor((y0 < y1 ? y1 : y0) - 0.5);
+
+  if (xa < re->clip[0])
+    { xa = re->clip[0]; }
+
+  if (xb > re->clip[1])
+    { xb = re->clip[1]; }
+
+  if (ya < re->clip[2])
+    { ya = re->clip[2]; }
+
+  if (yb > re->clip[3])
+    { yb = re->clip[3]; }
+
+  if (!rgb)
+    for (i = 0; i < 256; i++)
+      { GetColor(re, (unsigned long)i, table[i]); }
+
+  for (row = ya; row <= yb; row++)
+    {
+      j = (long)((row + 0.5 - y0) / (y1 - y0) * height);
+
+      if (j < 0)
+        { j = 0; }
+
+      else if (j >= height)
+        { j = height - 1; }
+
+      p = re->rgb + 3 * (row * re->width + xa);
+
+      for (col = xa; col <= xb; col++, p += 3)
+        {
+          i = (long)((col + 0.5 - x0) / (x1 - x0) * width);
+
+          if (i < 0)
+            { i = 0; }
+
+          else if (i >= width)
+            { i = width - 1; }
+
+          if (rgb)
+            {
+              cell = colors + 3 * (j * nColumns + i);
+              p[0] = cell[0];
+              p[1] = cell[1];
+              p[2] = cell[2];
+            }
+
+          else
+            { memcpy(p, table[colors[j * nColumns + i]], 3); }
+        }
+    }
+
+  engine->marked = 1;
+  return 0;
+}
+
+/* ------------------------------------------------------------------------ */
+
+Engine * GpRasterEngine(char * name, int landscape, int dpi,
+                        int width, int height)
+{
+  RasterEngine * re;
+  GpTransform toPixels;
+  const GpBox * page = landscape ? &landscapeBox : &portraitBox;
+  double ppn = dpi / (72.27 * ONE_POINT);
+  double x0, y0;
+
+  /* show the same part of the page as a GpFXEngine window */
+  x0 = floor(0.5 * (ppn * page->xmax - width));
+  y0 = floor(0.5 * (ppn * (landscape ? page->ymax : page->xmax) - height));
+
+  if (x0 < 0.0)
+    { x0 = 0.0; }
+
+  if (y0 < 0.0)
+    { y0 = 0.0; }
+
+  toPixels.viewport = *page;
+  toPixels.window.xmin = -x0;
+  toPixels.window.xmax = ppn * page->xmax - x0;
+  toPixels.window.ymin = ppn * page->ymax - y0;
+  toPixels.window.ymax = -y0;
+
+  re = (RasterEngine *)
+       GpNewEngine(sizeof(RasterEngine), name, &g_raster_on, &toPixels,
+                   landscape, &Kill, &Clear, &Flush, &ChangeMap,
+                   &ChangePalette, &DrawLines, &DrawMarkers, &DrwText,
+                   &DrawFill, &DrawCells, &DrawDisjoint);
+
+  if (!re)
+    { return 0; }
+
+  re->e.ClearArea = &ClearArea;
+  re->dpi = dpi;
+  re->width = width;
+  re->height = height;
+  re->ppn = ppn;
+  re->x0 = x0;
+  re->y0 = y0;
+  re->ymax = page->ymax;
+  re->rgb = (unsigned char *)p_malloc(3 * (size_t)width * height);
+
+  if (!re->rgb)
+    {
+      GpDelEngine(&re->e);
+      return 0;
+    }
+
+  Clear(&re->e, 1);
+  return &re->e;
+}
+
+RasterEngine * GisRasterEngine(Engine * engine)
+{
+  return (engine && engine->on == &g_raster_on) ? (RasterEngine *)engine : 0;
+}
+
+/* Same calling convention as g_rgb_read: with RGB 0 just return the
+ * image size, nonzero if ENGINE is not a raster engine. */
+int GpRasterRead(Engine * engine, unsigned char * rgb, long * nx, long * ny)
+{
+  RasterEngine * re = GisRasterEngine(engine);
+
+  if (!re)
+    { return 1; }
+
+  *nx = re->width;
+  *ny = re->height;
+
+  if (rgb)
+    { memcpy(rgb, re->rgb, 3 * (size_t)re->width * re->height); }
+
+  return 0;
+}
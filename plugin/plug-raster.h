@@ -0,0 +1,24 @@
+/* mdcb */
+#include "engine.h"
+
+/* Headless engine: draws into an in-memory RGB image instead of an
+ * X window.  The image shows the same part of the page as an X window
+ * of the same dpi and size would, so rgb_read gives the same picture.
+ */
+typedef struct RasterEngine RasterEngine;
+struct RasterEngine
+{
+  Engine e;
+
+  int dpi, width, height;
+  double ppn;			/* pixels per NDC unit */
+  double x0, y0;		/* page pixel at image (0,0) */
+  double ymax;			/* NDC height of the page */
+  long clip[4];			/* xmin, xmax, ymin, ymax (inclusive) */
+  unsigned char * rgb;		/* height rows of width (r,g,b), top first */
+};
+
+Engine * GpRasterEngine(char * name, int landscape, int dpi,
+                        int width, int height);
+RasterEngine * GisRasterEngine(Engine * engine);
+int GpRasterRead(Engine * engine, unsigned char * rgb, long * nx, long * ny);
@@ -0,0 +1,66 @@
+/* mdcb */
+/* Worker threads shared by gistC and gistF.  Include after Python.h and
+ * numpy/arrayobject.h: the helpers are static, each module has its own.
+ */
+#include <pthread.h>
+#include <unistd.h>
+
+#define MAX_THREADS 16
+
+/* Number of threads for LEN items, at least BLOCK items each. */
+static int ThreadCount(npy_intp len, npy_intp block)
+{
+  static long ncpu = 0;
+  npy_intp n;
+
+  if (!ncpu)
+    {
+      ncpu = sysconf(_SC_NPROCESSORS_ONLN);
+
+      if (ncpu < 1)
+        { ncpu = 1; }
+
+      else if (ncpu > MAX_THREADS)
+        { ncpu = MAX_THREADS; }
+    }
+
+  n = len / block;
+
+  if (n > ncpu)
+    { n = ncpu; }
+
+  else if (n < 1)
+    { n = 1; }
+
+  return (int)n;
+}
+
+/* Run FN on each of the N jobs of SIZE bytes at JOBS, all but the
+ * first on threads of their own, with the GIL released.  FN must not
+ * touch any python object.
+ */
+static void RunThreads(void * (*fn)(void *), void * jobs, size_t size, int n)
+{
+  pthread_t threads[MAX_THREADS];
+  char * job = (char *)jobs;
+  int i, started;
+
+  Py_BEGIN_ALLOW_THREADS
+
+  for (started = 1; started < n; started++)
+    {
+      if (pthread_create(threads + started, 0, fn, job + started * size))
+        { break; }
+    }
+
+  /* jobs whose thread could not be started are done here too */
+  fn(job);
+
+  for (i = started; i < n; i++)
+    { fn(job + i * size); }
+
+  for (i = 1; i < started; i++)
+    { pthread_join(threads[i], 0); }
+
+  Py_END_ALLOW_THREADS
+}
@@ -92,6 +92,7 @@ include_dirs.extend(x11_info.get('include_dirs',[]))
 
 
 libraries = x11_info.get('libraries',['X11'])
+libraries.append('z')
 
 include_dirs.extend([numpy.get_include()])
 
@@ -99,6 +100,7 @@ include_dirs.extend([numpy.get_include()])
 sources = unixsource + x11source + anysource + gistsource
 sources = [ os.path.join(patch_work_dir,f) for f in sources]
 sources.append('plugin/plug-hlevel.c')
+sources.append('plugin/plug-raster.c')
 sources.append('plugin/gistCmodule.c')
 
 class patch_cmd(Command):
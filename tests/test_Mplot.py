@@ -0,0 +1,41 @@
+import numpy
+import pytest
+
+Mplot = pytest.importorskip("gist.Mplot")
+
+from gist import recorder
+
+
+class _FailingRecorder:
+    def __init__(self, *args, **kwds):
+        self.frames = []
+
+    def add(self, frame):
+        self.frames.append(frame)
+
+    def close(self):
+        raise IOError("disk full")
+
+
+@pytest.fixture
+def headless(monkeypatch):
+    for name in ("window", "fma", "limits", "animate", "pause"):
+        monkeypatch.setattr(Mplot.gist, name, lambda *args, **kwds: None)
+    monkeypatch.setattr(Mplot.gist, "rgb_read",
+                        lambda *args: numpy.zeros((2, 2, 3), numpy.uint8))
+    monkeypatch.setattr(recorder, "Recorder", _FailingRecorder)
+
+
+def test_movie_draw_error_wins_over_recorder_error(headless):
+    def draw(i):
+        if i == 2:
+            raise ZeroDivisionError("frame 2")
+        return 1
+
+    with pytest.raises(ZeroDivisionError, match="frame 2"):
+        Mplot.movie(draw, record="movie.apng")
+
+
+def test_movie_reports_recorder_error(headless):
+    with pytest.raises(IOError, match="disk full"):
+        Mplot.movie(lambda i: i < 3, record="movie.apng")
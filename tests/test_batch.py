@@ -0,0 +1,42 @@
+import numpy
+import pytest
+
+batch = pytest.importorskip("gist.batch")
+
+import gist
+
+
+def _draw(i):
+    x = numpy.linspace(0.0, 10.0, 200)
+    gist.plg(numpy.sin(x * (1 + 0.1 * i)), x)
+
+
+def _fail(i):
+    raise RuntimeError("job %d failed" % i)
+
+
+def _read_ppm(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, size, top, pixels = data.split(b"\n", 3)
+    assert magic == b"P6" and top == b"255"
+    nx, ny = size.split()
+    return numpy.frombuffer(pixels, numpy.uint8).reshape(int(ny), int(nx), 3)
+
+
+def test_run_writes_every_job(tmp_path):
+    jobs = [(_draw, (i,), str(tmp_path / ("plot%d.ppm" % i)))
+            for i in range(4)]
+    jobs.append((_fail, 7, str(tmp_path / "bad.ppm")))
+    seen = []
+    results = batch.run(jobs, processes=2, callback=seen.append)
+    assert sorted(r.path for r in results) == sorted(j[2] for j in jobs)
+    assert seen == results
+    errors = dict((r.path, r.error) for r in results)
+    assert errors[jobs[-1][2]] == "RuntimeError: job 7 failed"
+    assert not (tmp_path / "bad.ppm").exists()
+    images = [_read_ppm(j[2]) for j in jobs[:-1]]
+    for i, image in enumerate(images):
+        assert errors[jobs[i][2]] is None
+        assert (image != image[0, 0]).any()
+    assert not numpy.array_equal(images[0], images[1])
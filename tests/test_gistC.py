@@ -0,0 +1,337 @@
+import numpy
+import pytest
+
+gistC = pytest.importorskip("gist.gistC")
+
+WIN = 7
+
+
+@pytest.fixture
+def raster():
+    gistC.window(WIN, raster=1, dpi=75)
+    yield WIN
+    gistC.window(WIN, display="", hcp="")
+
+
+def _pixels(draw):
+    gistC.fma()
+    draw()
+    return gistC.rgb_read(WIN)
+
+
+def _curve(n=500):
+    x = numpy.linspace(0.0, 10.0, n)
+    return x, numpy.sin(x) * numpy.exp(-0.1 * x)
+
+
+def test_float32_plg_matches_float64(raster):
+    x, y = _curve()
+    ref = _pixels(lambda: gistC.plg(y, x))
+    got = _pixels(lambda: gistC.plg(y.astype(numpy.float32),
+                                     x.astype(numpy.float32)))
+    assert numpy.array_equal(got, ref)
+
+
+def test_strided_plg_matches_contiguous(raster):
+    x, y = _curve(1000)
+    ref = _pixels(lambda: gistC.plg(y[::3].copy(), x[::3].copy()))
+    got = _pixels(lambda: gistC.plg(y[::3], x[::3]))
+    assert numpy.array_equal(got, ref)
+
+
+def test_strided_float32_plf_matches_float64(raster):
+    y, x = numpy.mgrid[0.0:1.0:41j, 0.0:2.0:61j]
+    z = numpy.cos(3.0 * x) * y
+    ref = _pixels(lambda: gistC.plf(z[:-1, :-1].copy(), y, x))
+    big = numpy.zeros((2 * z.shape[0], z.shape[1]), numpy.float32)
+    big[::2] = z
+    got = _pixels(lambda: gistC.plf(big[:-2:2, :-1], y, x))
+    assert numpy.array_equal(got, ref)
+
+
+def test_conv_stats(raster):
+    x, y = _curve(100)
+    gistC.conv_stats(1)
+    try:
+        gistC.plg(y, x)
+        assert gistC.conv_stats() == (0, 0)
+        gistC.plg(y.astype(numpy.float32), x)
+        assert gistC.conv_stats() == (1, 8 * 100)
+        gistC.plg(y[::2], x[::2])
+        assert gistC.conv_stats() == (3, 8 * 100 + 2 * 8 * 50)
+    finally:
+        gistC.conv_stats(0)
+    gistC.plg(y.astype(numpy.float32), x)
+    assert gistC.conv_stats() == (3, 8 * 100 + 2 * 8 * 50)
+
+
+def _curves(ncurves=20, seed=2):
+    rng = numpy.random.RandomState(seed)
+    lengths = rng.randint(1, 40, ncurves)
+    offsets = numpy.concatenate(([0], numpy.cumsum(lengths)))
+    x = rng.uniform(0.0, 1.0, offsets[-1])
+    y = rng.uniform(0.0, 1.0, offsets[-1])
+    return y, x, offsets
+
+
+def test_plg_many_matches_plg(raster):
+    y, x, offsets = _curves()
+    colors = [-5 - (i % 3) for i in range(len(offsets) - 1)]
+
+    def separate():
+        for i, c in enumerate(colors):
+            s = slice(offsets[i], offsets[i + 1])
+            gistC.plg(y[s], x[s], color=c, marks=0)
+
+    ref = _pixels(separate)
+    got = _pixels(lambda: gistC.plg_many(y, x, offsets, color=colors,
+                                          marks=0))
+    assert numpy.array_equal(got, ref)
+
+
+@pytest.mark.parametrize("offsets", [[0, 5, 5, 10], [0, 6, 4, 10],
+                                     [-1, 10], [0, 11]])
+def test_plg_many_rejects_bad_offsets(raster, offsets):
+    y, x, _ = _curves()
+    with pytest.raises(gistC.error, match="offsets"):
+        gistC.plg_many(y[:10], x[:10], offsets)
+
+
+def _series(n=200000, seed=3):
+    rng = numpy.random.RandomState(seed)
+    x = numpy.linspace(0.0, 10.0, n)
+    return numpy.sin(x) + rng.normal(0.0, 0.3, n), x
+
+
+def test_decimate_looks_like_full_curve(raster):
+    y, x = _series()
+    ref = _pixels(lambda: gistC.plg(y, x, marks=0))
+    got = _pixels(lambda: gistC.plg(y, x, marks=0, decimate=1))
+    background = ref[0, 0]
+    drawn = (ref != background).any(axis=2).sum()
+    differ = (got != ref).any(axis=2).sum()
+    assert drawn > 0
+    assert differ <= 0.02 * drawn
+
+
+def test_decimate_ignored_for_unsorted_x(raster):
+    y, x = _series(20000)
+    x = x.copy()
+    x[100], x[101] = x[101], x[100]
+    ref = _pixels(lambda: gistC.plg(y, x, marks=0))
+    got = _pixels(lambda: gistC.plg(y, x, marks=0, decimate=1))
+    assert numpy.array_equal(got, ref)
+
+
+def test_decimate_follows_limits(raster):
+    y, x = _series()
+
+    def zoomed():
+        gistC.limits()
+        gistC.plg(y, x, marks=0, decimate=1)
+        gistC.limits(2.0, 3.0)
+
+    def direct():
+        gistC.limits(2.0, 3.0)
+        gistC.plg(y, x, marks=0, decimate=1)
+
+    got = _pixels(zoomed)
+    ref = _pixels(direct)
+    gistC.limits()
+    assert numpy.array_equal(got, ref)
+
+
+def test_plupdate_plg_matches_fresh_plot(raster):
+    x, y = _curve()
+
+    def updated():
+        gistC.limits(0.0, 10.0, -1.5, 1.5)
+        gistC.plg(y, x, marks=0)
+        gistC.plupdate(y=-y)
+
+    def fresh():
+        gistC.limits(0.0, 10.0, -1.5, 1.5)
+        gistC.plg(-y, x, marks=0)
+
+    got = _pixels(updated)
+    ref = _pixels(fresh)
+    gistC.limits()
+    assert numpy.array_equal(got, ref)
+
+
+def test_plupdate_plf_matches_fresh_plot(raster):
+    y, x = numpy.mgrid[0.0:1.0:21j, 0.0:2.0:31j]
+    z1 = (x * y)[:-1, :-1]
+    z2 = numpy.cos(4.0 * x)[:-1, :-1]
+
+    def updated():
+        gistC.plf(z1, y, x)
+        gistC.plupdate(z=z2)
+
+    got = _pixels(updated)
+    ref = _pixels(lambda: gistC.plf(z2, y, x))
+    assert numpy.array_equal(got, ref)
+
+
+def test_plupdate_rejects_bad_requests(raster):
+    y, x = numpy.mgrid[0.0:1.0:5j, 0.0:1.0:5j]
+    gistC.fma()
+    gistC.plf(None, y, x)
+    with pytest.raises(ValueError):
+        gistC.plupdate(z=x[:-1, :-1])
+    gistC.plg(x[0], y[0])
+    with pytest.raises(gistC.error, match="match"):
+        gistC.plupdate(y=numpy.zeros(4))
+    ys, xs = _series()
+    gistC.plg(ys, xs, decimate=1)
+    with pytest.raises(gistC.error, match="decimated"):
+        gistC.plupdate(y=ys)
+
+
+def test_raster_window_needs_no_display(monkeypatch):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    gistC.window(WIN, raster=1, dpi=75)
+    try:
+        gistC.fma()
+        blank = gistC.rgb_read(WIN)
+        assert blank.dtype == numpy.uint8
+        assert blank.ndim == 3 and blank.shape[2] == 3
+        assert (blank == blank[0, 0]).all()
+        x, y = _curve()
+        gistC.plg(y, x)
+        drawn = gistC.rgb_read(WIN)
+        assert drawn.shape == blank.shape
+        assert not numpy.array_equal(drawn, blank)
+        gistC.fma()
+        assert numpy.array_equal(gistC.rgb_read(WIN), blank)
+    finally:
+        gistC.window(WIN, display="", hcp="")
+    with pytest.raises(gistC.error):
+        gistC.rgb_read(WIN)
+
+
+def _read_pnm(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, size, top, pixels = data.split(b"\n", 3)
+    assert top == b"255"
+    nx, ny = [int(n) for n in size.split()]
+    depth = {b"P6": 3, b"P5": 1}[magic]
+    image = numpy.frombuffer(pixels, numpy.uint8)
+    return magic, image.reshape((ny, nx, depth)[:2 + (depth > 1)])
+
+
+def _read_png(path):
+    import struct
+    import zlib
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat = 8, b""
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert zlib.crc32(kind + body) & 0xffffffff == \
+            struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0]
+        if kind == b"IHDR":
+            nx, ny, bits, ctype = struct.unpack(">IIBB", body[:10])
+            assert bits == 8
+            depth = {0: 1, 2: 3}[ctype]
+        elif kind == b"IDAT":
+            idat += body
+        pos += 12 + length
+    rows = numpy.frombuffer(zlib.decompress(idat), numpy.uint8)
+    rows = rows.reshape(ny, 1 + nx * depth)
+    image = rows[:, 1:].reshape(ny, nx, depth).astype(numpy.int64)
+    for j in range(ny):
+        assert rows[j, 0] in (0, 1)
+        if rows[j, 0] == 1:
+            image[j] = numpy.cumsum(image[j], axis=0)
+    image = (image % 256).astype(numpy.uint8)
+    return image if depth > 1 else image[:, :, 0]
+
+
+def _ntsc(rgb):
+    rgb = rgb.astype(numpy.int64)
+    return ((19589 * rgb[:, :, 0] + 38470 * rgb[:, :, 1] +
+             7471 * rgb[:, :, 2] + 32768) >> 16).astype(numpy.uint8)
+
+
+def _colorful():
+    y, x = numpy.mgrid[0.0:1.0:21j, 0.0:2.0:31j]
+    gistC.plf(numpy.cos(4.0 * x) * y, y, x)
+    gistC.plg(y[:, 5], x[:, 5], color="red", width=4)
+
+
+def test_rgb_write_round_trips(raster, tmp_path):
+    rgb = _pixels(_colorful)
+    gistC.rgb_write(str(tmp_path / "a.ppm"), WIN)
+    gistC.rgb_write(str(tmp_path / "a.png"), WIN)
+    gistC.rgb_write(str(tmp_path / "g.png"), WIN, bw="average")
+    gistC.rgb_write(str(tmp_path / "g.ppm"), WIN, bw="ntsc")
+    magic, ppm = _read_pnm(str(tmp_path / "a.ppm"))
+    assert magic == b"P6"
+    assert numpy.array_equal(ppm, rgb)
+    assert numpy.array_equal(_read_png(str(tmp_path / "a.png")), rgb)
+    average = (rgb.astype(numpy.int64).sum(axis=2) + 1) // 3
+    assert numpy.array_equal(_read_png(str(tmp_path / "g.png")), average)
+    magic, gray = _read_pnm(str(tmp_path / "g.ppm"))
+    assert magic == b"P5"
+    assert numpy.array_equal(gray, _ntsc(rgb))
+
+
+def test_pgm_is_always_gray(raster, tmp_path):
+    from gist import gistY
+    rgb = _pixels(_colorful)
+    gistY.hcp(str(tmp_path / "h.pgm"))
+    gistC.rgb_write(str(tmp_path / "w.pgm"), WIN)
+    gistC.rgb_write(str(tmp_path / "l.pgm"), WIN, bw="lightness")
+    for name in ("h.pgm", "w.pgm"):
+        magic, gray = _read_pnm(str(tmp_path / name))
+        assert magic == b"P5"
+        assert numpy.array_equal(gray, _ntsc(rgb))
+    magic, gray = _read_pnm(str(tmp_path / "l.pgm"))
+    rgb = rgb.astype(numpy.int64)
+    assert numpy.array_equal(gray, (rgb.min(axis=2) + rgb.max(axis=2)) // 2)
+
+
+@pytest.mark.parametrize("dtype", [numpy.float32, numpy.int16, numpy.uint16,
+                                   numpy.int32])
+def test_bytscl_types_match_float64(dtype):
+    z = numpy.arange(-300, 700, 7).reshape(10, -1).astype(dtype)
+    ref = gistC.bytscl(z.astype(numpy.float64), top=200)
+    got = gistC.bytscl(z, top=200)
+    assert got.dtype == numpy.uint8 and got.shape == z.shape
+    assert numpy.array_equal(got, ref)
+
+
+def test_bytscl_out_reuses_buffer():
+    z = numpy.random.RandomState(4).normal(size=(300, 400))
+    out = numpy.empty(z.shape, numpy.uint8)
+    got = gistC.bytscl(z, cmin=-1.0, cmax=1.0, out=out)
+    assert got is out
+    assert numpy.array_equal(out, gistC.bytscl(z, cmin=-1.0, cmax=1.0))
+    assert gistC.bytscl(z, out=None).dtype == numpy.uint8
+
+
+def test_bytscl_threads_match_small_calls():
+    z = numpy.random.RandomState(5).uniform(-5.0, 5.0, 4000000)
+    got = gistC.bytscl(z, top=100, cmin=-4.0, cmax=4.0)
+    ref = numpy.concatenate([gistC.bytscl(part, top=100, cmin=-4.0, cmax=4.0)
+                             for part in numpy.split(z, 400)])
+    assert numpy.array_equal(got, ref)
+
+
+@pytest.mark.parametrize("out", [numpy.empty((3, 4), numpy.uint8),
+                                 numpy.empty((4, 3), numpy.int8),
+                                 numpy.empty((4, 6), numpy.uint8)[:, ::2]])
+def test_bytscl_rejects_bad_out(out):
+    with pytest.raises(gistC.error, match="out="):
+        gistC.bytscl(numpy.ones((4, 3)), out=out)
+
+
+def test_bytscl_rejects_read_only_out():
+    out = numpy.empty((4, 3), numpy.uint8)
+    out.flags.writeable = False
+    with pytest.raises(gistC.error, match="out="):
+        gistC.bytscl(numpy.ones((4, 3)), out=out)
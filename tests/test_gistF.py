@@ -0,0 +1,127 @@
+import numpy
+import pytest
+
+gistF = pytest.importorskip("gist.gistF")
+
+
+@pytest.mark.parametrize("n", [0, 1, 7, 31, 1000, 100000])
+@pytest.mark.parametrize("dtype", [numpy.float64, numpy.float32, numpy.int32])
+def test_index_sort_is_stable_argsort(n, dtype):
+    rng = numpy.random.default_rng(n)
+    # few distinct keys, so that the order of equal ones is tested
+    a = (rng.integers(-50, 50, n) * 1.5).astype(dtype)
+    expect = numpy.argsort(a, kind="stable")
+    assert numpy.array_equal(gistF.index_sort(a), expect)
+
+
+def test_index_sort_extremes():
+    a = numpy.array([numpy.inf, 1e300, -1e-300, -numpy.inf, 5e-324, 2.0,
+                     -2.0, 1e-300])
+    assert numpy.array_equal(gistF.index_sort(a),
+                             numpy.argsort(a, kind="stable"))
+
+
+def test_index_sort_heap():
+    a = numpy.random.default_rng(3).random(500)
+    assert numpy.array_equal(a[gistF.index_sort(a, "heap")], numpy.sort(a))
+
+
+@pytest.mark.parametrize("n", [20, 100000])
+@pytest.mark.parametrize("dtype", [numpy.float64, numpy.float32])
+def test_index_sort_signed_zero_and_nan(n, dtype):
+    rng = numpy.random.default_rng(n)
+    a = rng.choice(numpy.array([-0.0, 0.0, numpy.nan, -numpy.nan, 1.0,
+                                -1.0, numpy.inf, -numpy.inf]), n)
+    a = a.astype(dtype)
+    assert numpy.array_equal(gistF.index_sort(a),
+                             numpy.argsort(a, kind="stable"))
+
+
+@pytest.mark.parametrize("uniform", [0, 1])
+@pytest.mark.parametrize("sort_z", [0, 1])
+def test_interp_matches_numpy(uniform, sort_z):
+    rng = numpy.random.default_rng(2 * uniform + sort_z)
+    n = 200
+    x = numpy.linspace(-1.0, 3.0, n) if uniform \
+        else numpy.sort(rng.random(n) * 4.0 - 1.0)
+    y = rng.standard_normal(n)
+    z = rng.random(300000) * 6.0 - 2.0
+    if sort_z:
+        z.sort()
+    z = z.reshape(600, 500)
+    got = gistF.interp(y, x, z)
+    assert got.shape == z.shape
+    assert numpy.allclose(got, numpy.interp(z, x, y), rtol=0, atol=1e-12)
+    # the same (x, y) again, then other values of the same length
+    assert numpy.array_equal(gistF.interp(y, x, z), got)
+    y2 = y[::-1].copy()
+    assert numpy.allclose(gistF.interp(y2, x, z), numpy.interp(z, x, y2),
+                          rtol=0, atol=1e-12)
+
+
+def test_interp_duplicate_x():
+    x = numpy.array([0.0, 1.0, 1.0, 2.0, 3.0, 3.0])
+    y = numpy.array([0.0, 1.0, 3.0, 4.0, 5.0, 7.0])
+    z = numpy.array([-1.0, 0.5, 1.0, 1.5, 2.5, 3.0, 4.0])
+    # at a repeated x the value is that of its last y, on either side
+    # the line through the neighbouring points
+    assert numpy.allclose(gistF.interp(y, x, z),
+                          [0.0, 0.5, 3.0, 3.5, 4.5, 7.0, 7.0])
+
+
+def test_interp_types():
+    x = numpy.linspace(0.0, 1.0, 5, dtype=numpy.float32)
+    y = x * x
+    z = numpy.array([0.1, 0.6], numpy.float32)
+    assert gistF.interp(y, x, z, "f").dtype == numpy.float32
+    assert gistF.interp(y, x, z, b"d").dtype == numpy.float64
+    assert numpy.isnan(gistF.interp(y, x, numpy.array([numpy.nan]))[0])
+    with pytest.raises(TypeError):
+        gistF.interp(y, x, z, 3)
+
+
+def _areas(nc, y, x):
+    # the area of each polygon, by the shoelace formula
+    ends = numpy.cumsum(nc)
+    starts = ends - nc
+    nxt = numpy.arange(len(x)) + 1
+    nxt[ends - 1] = starts
+    cross = x * y[nxt] - x[nxt] * y
+    return numpy.abs(numpy.add.reduceat(cross, starts)) / 2.0
+
+
+def test_contour_bands_tile_the_mesh():
+    rng = numpy.random.default_rng(5)
+    xs = numpy.concatenate([[0.0], numpy.sort(rng.random(30)), [1.0]])
+    ys = numpy.concatenate([[0.0], numpy.sort(rng.random(20)), [1.0]])
+    y, x = numpy.meshgrid(ys, xs, indexing="ij")
+    ireg = numpy.zeros(x.shape, numpy.int32)
+    ireg[1:, 1:] = 1
+    # z = x is linear on every triangle, so the bands are exact strips
+    levels = numpy.array([0.2, 0.45, 0.9])
+    [nc, yc, xc, ib] = gistF.contour_bands(levels, x, y, x, ireg)
+    assert len(nc) == len(ib) and numpy.sum(nc) == len(xc) == len(yc)
+    areas = _areas(nc, yc, xc)
+    band = numpy.bincount(ib, areas, len(levels) + 1)
+    assert numpy.allclose(band, numpy.diff(numpy.concatenate(
+        [[0.0], levels, [1.0]])), rtol=0, atol=1e-12)
+    # each polygon lies within its band
+    corner = numpy.repeat(ib, nc)
+    lo = numpy.concatenate([[-numpy.inf], levels])[corner]
+    hi = numpy.concatenate([levels, [numpy.inf]])[corner]
+    assert numpy.all((xc >= lo - 1e-12) & (xc <= hi + 1e-12))
+
+
+def test_contour_bands_region():
+    x, y = numpy.meshgrid(numpy.linspace(0.0, 1.0, 9),
+                          numpy.linspace(0.0, 2.0, 5), indexing="ij")
+    z = numpy.sin(3.0 * x) * numpy.cos(2.0 * y)
+    ireg = numpy.zeros(x.shape, numpy.int32)
+    ireg[1:, 1:] = 1
+    ireg[1:5, 1:] = 2
+    levels = numpy.array([-0.5, 0.0, 0.5])
+    total = 0.0
+    for region in (1, 2):
+        [nc, yc, xc, ib] = gistF.contour_bands(levels, z, y, x, ireg, region)
+        total = total + _areas(nc, yc, xc).sum()
+    assert numpy.isclose(total, 2.0, rtol=0, atol=1e-12)
@@ -0,0 +1,37 @@
+import numpy
+import pytest
+
+gistY = pytest.importorskip("gist.gistY")
+
+from gist import gistF
+
+
+def test_plfc_draws_contour_bands(monkeypatch):
+    bands, drawn = [], []
+
+    def contour_bands(*args):
+        bands.append(args)
+        return gistF.contour_bands(*args)
+
+    monkeypatch.setattr(gistY, "contour_bands", contour_bands)
+    monkeypatch.setattr(gistY, "plmesh", lambda *args, **kwds: None)
+    monkeypatch.setattr(gistY, "plfp",
+                        lambda *args, **kwds: drawn.append((args, kwds)))
+    x, y = numpy.meshgrid(numpy.linspace(0.0, 1.0, 9),
+                          numpy.linspace(0.0, 2.0, 7), indexing="ij")
+    z = x + y
+    ireg = numpy.zeros(x.shape, numpy.int32)
+    ireg[1:, 1:] = 1
+    levels = numpy.array([0.5, 1.0, 2.5])
+    colors = numpy.array([10, 20, 30, 40], numpy.uint8)
+    gistY.plfc(z, y, x, ireg, contours=levels, colors=colors, region=1)
+    assert len(bands) == 1 and len(drawn) == 1
+    vc, zb, yb, xb, iregb, region = bands[0]
+    assert numpy.allclose(vc, levels) and region == 1
+    assert zb is z and yb is y and xb is x and iregb is ireg
+    [nc, yc, xc, ib] = gistF.contour_bands(vc, z, y, x, ireg, 1)
+    (c, yp, xp, np), kwds = drawn[0]
+    assert numpy.array_equal(c, colors[ib])
+    assert numpy.array_equal(np, nc) and numpy.array_equal(yp, yc)
+    assert numpy.array_equal(xp, xc)
+    assert kwds == {"edges": 0}
@@ -0,0 +1,60 @@
+import numpy
+import pytest
+
+mesh = pytest.importorskip("gist.mesh")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registered = []
+
+    def plmesh_register(y, x, ireg, triangle=None):
+        registered.append((y, x, ireg, triangle))
+        return len(registered)
+
+    monkeypatch.setattr(mesh.gist, "plmesh_register", plmesh_register)
+    return registered
+
+
+def _mesh():
+    (y, x) = numpy.meshgrid(numpy.linspace(0.0, 1.0, 4),
+                            numpy.linspace(0.0, 2.0, 5), indexing="ij")
+    return mesh.Mesh(x, y)
+
+
+def test_handle_registers_once_per_version(registry):
+    m = _mesh()
+    assert m.handle() == m.handle() == 1
+    assert len(registry) == 1
+    y, x, ireg, triangle = registry[0]
+    assert y is m.y and x is m.x and ireg is m.ireg and triangle is m.triangle
+    m.x *= 2.0
+    assert m.handle() == 1
+    m.changed()
+    assert m.handle() == m.handle() == 2
+    m.setReg(numpy.ones(m.shape, numpy.int32))
+    assert m.handle() == 3 and registry[2][2] is m.ireg
+    m.setTriangle(numpy.ones(m.shape, numpy.int16))
+    assert m.handle() == 4 and registry[3][3] is m.triangle
+    assert m.handle(renew=True) == 5 and m.handle() == 5
+
+
+def test_draw_registers_a_dropped_mesh_again(registry):
+    m = _mesh()
+    m.handle()
+    calls = []
+
+    def func(*args, **kwds):
+        calls.append(kwds["mesh"])
+        if len(calls) == 1:
+            raise mesh.gist.error("mesh=1 is not a registered mesh")
+
+    mesh._draw(func, (), m, {})
+    assert calls == [1, 2] and len(registry) == 2
+
+    def fails(**kwds):
+        raise mesh.gist.error("other error")
+
+    with pytest.raises(mesh.gist.error, match="other"):
+        mesh._draw(fails, (), m, {})
+    assert len(registry) == 2
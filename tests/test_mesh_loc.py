@@ -0,0 +1,136 @@
+import numpy
+import pytest
+
+gistC = pytest.importorskip("gist.gistC")
+
+
+def _mesh():
+    (y, x) = numpy.meshgrid(numpy.linspace(0.0, 3.0, 13),
+                            numpy.linspace(0.0, 4.0, 17), indexing="ij")
+    # curved, so that zones are not rectangles
+    return (y + 0.05 * numpy.sin(3.0 * x), x + 0.05 * numpy.sin(2.0 * y))
+
+
+def _points(n=2000):
+    rng = numpy.random.default_rng(0)
+    return (rng.random(n) * 3.4 - 0.2, rng.random(n) * 4.4 - 0.2)
+
+
+def _scan(y0, x0, y, x, ireg=None):
+    # what the full scan of FindMeshZone finds: the first zone, in
+    # storage order, whose four corners wind around the point
+    ix = x.shape[1]
+    zones = numpy.arange(ix + 1, x.size)
+    zones = zones[zones % ix != 0]
+    if ireg is not None:
+        zones = zones[ireg.ravel()[zones] != 0]
+    corners = [zones - ix - 1, zones - ix, zones, zones - 1]
+    xs = x.ravel()[corners] - x0.ravel()[:, None, None]
+    ys = y.ravel()[corners] - y0.ravel()[:, None, None]
+    wind = 0
+    for a, b in ((0, 1), (1, 2), (2, 3), (3, 0)):
+        turn = numpy.where(xs[:, a] * ys[:, b] > xs[:, b] * ys[:, a], 1, -1)
+        wind = wind + numpy.where((xs[:, a] < 0) ^ (xs[:, b] < 0), turn, 0)
+    inside = wind != 0
+    first = numpy.argmax(inside, axis=1)
+    return numpy.where(inside.any(axis=1), zones[first] + 1, 0)
+
+
+def _fresh(y0, x0, y, x):
+    # mesh_loc of a mesh it has never seen
+    return gistC.mesh_loc(y0, x0, y.copy(), x.copy())
+
+
+def test_mesh_loc_matches_full_scan():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    zone = gistC.mesh_loc(y0, x0, y, x)
+    assert numpy.array_equal(zone, _scan(y0, x0, y, x))
+    assert (zone == 0).any() and (zone != 0).any()
+    gistC.plmesh()
+
+
+def test_mesh_loc_matches_full_scan_with_ireg():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    ireg = numpy.zeros(x.shape, numpy.int32)
+    ireg[1:, 1:] = 1
+    ireg[4:8, 6:12] = 0
+    ireg[9:, 2:5] = 2
+    zone = gistC.mesh_loc(y0, x0, y, x, ireg)
+    assert numpy.array_equal(zone, _scan(y0, x0, y, x, ireg))
+    assert numpy.all(ireg.ravel()[zone[zone != 0] - 1] != 0)
+    gistC.plmesh()
+
+
+def test_mesh_loc_many_points_and_nan():
+    (y, x) = _mesh()
+    (y0, x0) = _points(200000)
+    y0[::1000] = numpy.nan
+    zone = gistC.mesh_loc(y0.reshape(400, 500), x0.reshape(400, 500), y, x)
+    assert zone.shape == (400, 500)
+    assert numpy.all(zone.ravel()[::1000] == 0)
+    part = slice(0, 200000, 37)
+    assert numpy.array_equal(zone.ravel()[part], _scan(y0[part], x0[part],
+                                                       y, x))
+    gistC.plmesh()
+
+
+def test_mesh_loc_after_plmesh_again():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    gistC.plmesh(y, x)
+    before = gistC.mesh_loc(y0, x0)
+    assert numpy.array_equal(before, _scan(y0, x0, y, x))
+    x *= 0.7
+    y += 0.4
+    gistC.plmesh(y, x)
+    after = gistC.mesh_loc(y0, x0)
+    assert not numpy.array_equal(after, before)
+    assert numpy.array_equal(after, _scan(y0, x0, y, x))
+    assert numpy.array_equal(after, _fresh(y0, x0, y, x))
+    gistC.plmesh()
+
+
+def test_mesh_loc_with_arrays_changed_in_place():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    before = gistC.mesh_loc(y0, x0, y, x)
+    x *= 0.7
+    after = gistC.mesh_loc(y0, x0, y, x)
+    assert not numpy.array_equal(after, before)
+    assert numpy.array_equal(after, _scan(y0, x0, y, x))
+    assert numpy.array_equal(after, _fresh(y0, x0, y, x))
+    gistC.plmesh()
+
+
+def test_mesh_loc_registered_meshes_in_turn():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    ireg = numpy.zeros(x.shape, numpy.int32)
+    ireg[1:, 1:] = 1
+    ireg[2:6, 3:9] = 0
+    (y2, x2) = (1.5 * y - 1.0, x + 0.3 * y)
+    ids = [gistC.plmesh_register(y, x), gistC.plmesh_register(y2, x2),
+           gistC.plmesh_register(y, x, ireg)]
+    expect = [_scan(y0, x0, y, x), _scan(y0, x0, y2, x2),
+              _scan(y0, x0, y, x, ireg)]
+    for k in (0, 1, 2, 1, 0, 2):
+        assert numpy.array_equal(gistC.mesh_loc(y0, x0, mesh=ids[k]),
+                                 expect[k])
+    gistC.plmesh()
+
+
+def test_mesh_loc_registered_again():
+    (y, x) = _mesh()
+    (y0, x0) = _points()
+    old = gistC.plmesh_register(y, x)
+    before = gistC.mesh_loc(y0, x0, mesh=old)
+    assert numpy.array_equal(before, _scan(y0, x0, y, x))
+    y *= 0.6
+    new = gistC.plmesh_register(y, x)
+    after = gistC.mesh_loc(y0, x0, mesh=new)
+    assert not numpy.array_equal(after, before)
+    assert numpy.array_equal(after, _scan(y0, x0, y, x))
+    assert numpy.array_equal(after, _fresh(y0, x0, y, x))
+    gistC.plmesh()
@@ -0,0 +1,224 @@
+import numpy
+import pytest
+
+pl3d = pytest.importorskip("gist.pl3d")
+
+
+def _polygons(seed, n=400):
+    rng = numpy.random.default_rng(seed)
+    nv = rng.integers(3, 7, n).astype(numpy.int32)
+    xyz = rng.random((int(nv.sum()), 3))
+    return xyz, nv
+
+
+def _light(xyz1, nv, zc, ambient, diffuse, specular, spower, sdir):
+    # get3_light of a polygon list as computed before project3, from
+    # get3_normal and the centroids
+    normal = numpy.asarray(pl3d.get3_normal(xyz1, nv))
+    centroid = numpy.add.reduceat(xyz1, numpy.cumsum(nv) - nv) \
+        / nv[:, numpy.newaxis]
+    if not zc:
+        view = numpy.array([0.0, 0.0, 1.0])
+        view = view[:, numpy.newaxis]
+    else:
+        view = numpy.transpose(numpy.array([0.0, 0.0, zc]) - centroid)
+        view = view / numpy.sqrt(numpy.sum(view * view, axis=0))
+    nv1 = numpy.sum(normal * view, axis=0)
+    light = ambient + diffuse * abs(nv1)
+    if specular:
+        sdir = numpy.asarray(sdir, numpy.float64)
+        sdir = sdir / numpy.sqrt(numpy.sum(sdir * sdir))
+        sv = numpy.dot(sdir, view)
+        sn = numpy.dot(sdir, normal)
+        light = light + specular * numpy.maximum(
+            sn * nv1 - 0.5 * sv + 0.5, 1.e-30) ** spower
+    return light
+
+
+@pytest.fixture
+def display_list(monkeypatch):
+    # set3_object without scheduling a redraw
+    monkeypatch.setattr(pl3d, "draw3_trigger", lambda: None)
+    pl3d.clear3()
+    yield
+    pl3d.clear3()
+
+
+def test_depth_sort_matches_sort3d():
+    xyz, nv = _polygons(1)
+    rng = numpy.random.default_rng(2)
+    z = xyz[:, 2].copy()
+    sort = pl3d.DepthSort()
+    for frame in range(8):
+        # a small turn each frame, then a big one
+        z = z + (0.01 if frame < 6 else 1.0) * rng.standard_normal(len(z))
+        lst, vlist = sort(z, nv)
+        ref = pl3d.sort3d(z, nv)
+        assert numpy.array_equal(lst, ref[0])
+        assert numpy.array_equal(vlist, ref[1])
+    # other polygons than last time
+    lst, vlist = sort(z[:-nv[-1]], nv[:-1])
+    ref = pl3d.sort3d(z[:-nv[-1]], nv[:-1])
+    assert numpy.array_equal(lst, ref[0]) and numpy.array_equal(vlist, ref[1])
+
+
+def test_depth_sort_by_centroid():
+    xyz, nv = _polygons(3)
+    zc = numpy.add.reduceat(xyz[:, 2], numpy.cumsum(nv) - nv) / nv
+    sort = pl3d.DepthSort()
+    for shift in (0.0, 1e-3, 2e-3):
+        lst, vlist = sort.by_centroid(zc + shift * numpy.arange(len(zc)), nv)
+        ref = pl3d.sort3d(numpy.repeat(zc + shift * numpy.arange(len(zc)),
+                                       nv), nv)
+        assert numpy.array_equal(lst, ref[0])
+        assert numpy.array_equal(vlist, ref[1])
+
+
+def test_depth_sort_kept_per_entry(display_list):
+    a, b = [1], [2]
+    pl3d.set3_object(len, a)
+    pl3d.set3_object(len, b)
+    sort = pl3d.get3_kept_("sort", pl3d.DepthSort, a)
+    assert isinstance(sort, pl3d.DepthSort)
+    assert pl3d.get3_kept_("sort", pl3d.DepthSort, a) is sort
+    assert pl3d.get3_kept_("sort", pl3d.DepthSort, b) is not sort
+    assert pl3d.get3_kept_("other", pl3d.DepthSort, a) is not sort
+    # not in the display list: nothing is kept
+    c = [3]
+    assert pl3d.get3_kept_("sort", pl3d.DepthSort, c) is not \
+        pl3d.get3_kept_("sort", pl3d.DepthSort, c)
+    pl3d.clear3()
+    pl3d.set3_object(len, a)
+    assert pl3d.get3_kept_("sort", pl3d.DepthSort, a) is not sort
+
+
+def test_get3_cached_hits_and_misses(display_list, monkeypatch):
+    arg = [1]
+    pl3d.set3_object(len, arg)
+    computed = []
+
+    def compute(value):
+        def f():
+            computed.append(value)
+            return value
+        return f
+
+    # outside of draw3 nothing is kept
+    assert pl3d.get3_cached("xy", 1, compute("a")) == "a"
+    assert pl3d.get3_cached("xy", 1, compute("b")) == "b"
+    monkeypatch.setattr(pl3d, "_draw3_arg", arg)
+    del computed[:]
+    assert pl3d.get3_cached("xy", 1, compute("one")) == "one"
+    assert pl3d.get3_cached("xy", 1, compute("again")) == "one"
+    assert pl3d.get3_cached("light", 1, compute("light")) == "light"
+    assert pl3d.get3_cached("xy", 2, compute("two")) == "two"
+    # the previous view is kept too, for undo3
+    assert pl3d.get3_cached("xy", 1, compute("again")) == "one"
+    assert pl3d.get3_cached("xy", 3, compute("three")) == "three"
+    assert pl3d.get3_cached("xy", 2, compute("two again")) == "two again"
+    assert computed == ["one", "light", "two", "three", "two again"]
+    pl3d.put3_cached_(arg, "xy", 4, "four")
+    assert pl3d.get3_cached("xy", 4, compute("x")) == "four"
+    assert pl3d.get3_cached("xy", 2, compute("x")) == "two again"
+    # a display list entry drawn anew starts over
+    pl3d.clear3()
+    pl3d.set3_object(len, arg)
+    assert pl3d.get3_cached("xy", 2, compute("fresh")) == "fresh"
+
+
+def test_get3_cached_keeps_one_frame_while_spinning(display_list,
+                                                   monkeypatch):
+    arg = [1]
+    pl3d.set3_object(len, arg)
+    monkeypatch.setattr(pl3d, "_draw3_arg", arg)
+    monkeypatch.setattr(pl3d, "_draw3_spinning", 1)
+    pl3d.get3_cached("xy", 1, lambda: "one")
+    pl3d.get3_cached("xy", 2, lambda: "two")
+    slots = pl3d._draw3_cache[id(arg)][1]["xy"]
+    assert slots == [(2, "two")]
+    pl3d.put3_cached_(arg, "xy", 3, "three")
+    assert slots == [(3, "three")]
+    assert pl3d.get3_cached("xy", 3, lambda: "x") == "three"
+
+
+@pytest.fixture
+def view():
+    saved = pl3d.save3()
+    yield
+    pl3d.restore3(saved)
+
+
+@pytest.mark.parametrize("zc", [None, 4.0])
+@pytest.mark.parametrize("specular", [0.0, 0.7])
+def test_project3_matches_get3_xy_and_light(view, zc, specular):
+    xyz, nv = _polygons(1)
+    pl3d.orient3(phi=0.3, theta=0.4)
+    pl3d.rot3(xa=0.2)
+    moved = pl3d.save3()
+    moved[1] = numpy.array([0.1, -0.2, 0.05])
+    pl3d.restore3(moved)
+    pl3d.setz3(zc)
+    sdir = [0.4, -0.3, 1.0]
+    pl3d.light3(ambient=0.1, diffuse=0.6, specular=specular, spower=3,
+                sdir=sdir)
+    [xyz1, zcen, light] = pl3d.get3_project(xyz, nv)
+    expect = pl3d.get3_xy(xyz, 1)
+    assert numpy.allclose(xyz1, expect, rtol=1e-12, atol=1e-12)
+    starts = numpy.cumsum(nv) - nv
+    assert numpy.allclose(zcen, numpy.add.reduceat(expect[:, 2], starts) / nv,
+                          rtol=1e-12, atol=1e-12)
+    assert numpy.allclose(light, _light(expect, nv, pl3d.getzc3_(), 0.1, 0.6,
+                                        specular, 3, sdir),
+                          rtol=1e-6, atol=1e-9)
+    assert numpy.allclose(pl3d.get3_light(expect, nv), light,
+                          rtol=1e-12, atol=1e-12)
+
+
+def test_project3_out_and_no_light(view):
+    xyz, nv = _polygons(2, 50)
+    pl3d.orient3()
+    [xyz1, zcen, light] = pl3d.get3_project(xyz, nv, shade=0)
+    assert light is None
+    out = [numpy.empty_like(xyz1), numpy.empty_like(zcen), None]
+    got = pl3d.get3_project(xyz, nv, shade=0, out=out)
+    assert got[0] is out[0] and got[1] is out[1]
+    assert numpy.array_equal(got[0], xyz1) and numpy.array_equal(got[1], zcen)
+
+
+@pytest.fixture
+def headless_spin(monkeypatch, view):
+    # spin3 without a window: record what pl3surf draws in each frame
+    Mplot = pytest.importorskip("gist.Mplot")
+    slice3 = pytest.importorskip("gist.slice3")
+    for name in ("window", "fma", "limits", "animate", "pause"):
+        monkeypatch.setattr(Mplot.gist, name, lambda *args, **kw: None)
+    monkeypatch.setattr(pl3d, "limits", lambda *args, **kw: None)
+    monkeypatch.setattr(pl3d, "set_idler", lambda *args: None)
+    drawn = []
+
+    def plfp(values, y, x, nverts, **kw):
+        drawn.append((values.copy(), y.copy(), x.copy(),
+                      numpy.array(nverts)))
+
+    monkeypatch.setattr(slice3, "plfp", plfp)
+    pl3d.set_draw3_(0)
+    yield slice3, drawn
+    pl3d.clear3()
+
+
+def test_spin3_ahead_draws_the_same_frames(headless_spin):
+    slice3, drawn = headless_spin
+    xyz, nv = _polygons(5, 2000)
+    frames = {}
+    for ahead in (0, 1, 3):
+        slice3.pl3surf(nv, xyz)
+        del drawn[:]
+        peak = pl3d.spin3(8, ahead=ahead)
+        assert (peak is None) == (ahead == 0)
+        frames[ahead] = drawn[:]
+    assert len(frames[0]) == 8
+    for ahead in (1, 3):
+        assert len(frames[ahead]) == len(frames[0])
+        for a, b in zip(frames[0], frames[ahead]):
+            for u, v in zip(a, b):
+                assert numpy.array_equal(u, v)
@@ -0,0 +1,389 @@
+import numpy
+import pytest
+
+slice3 = pytest.importorskip("gist.slice3")
+
+
+def _polygons(result):
+    # the polygons of a slice3 result, each with its color (of each
+    # vertex, with node=1)
+    if result is None:
+        return []
+    [nv, xyz, col] = result
+    out = []
+    o = 0
+    for i in range(len(nv)):
+        p = numpy.asarray(xyz[o:o + nv[i]], numpy.float64)
+        if col is None:
+            c = None
+        elif len(col) == len(xyz):
+            c = numpy.asarray(col[o:o + nv[i]], numpy.float64)
+        else:
+            c = numpy.float64(col[i])
+        o = o + nv[i]
+        out.append((p, c))
+    return out
+
+
+def _same_polygon(p, c, q, d):
+    # whether polygon P colored C is Q colored D, to the rounding of
+    # float32, from any corner and either way round: the paths of
+    # slice3 may start and turn polygons differently
+    if p.shape != q.shape or (c is None) != (d is None):
+        return False
+    turn = numpy.arange(len(p))
+    for order in [numpy.roll(turn, -k) for k in turn] + \
+            [numpy.roll(turn[::-1], -k) for k in turn]:
+        if numpy.allclose(p[order], q, rtol=1e-5, atol=1e-5) and \
+           (c is None or numpy.allclose(c[order] if c.shape else c, d,
+                                        rtol=1e-4, atol=1e-5)):
+            return True
+    return False
+
+
+def _same(a, b):
+    # whether the polygon lists A and B of _polygons hold the same
+    # polygons, in any order: the paths of slice3 may order them
+    # differently
+    if len(a) != len(b):
+        return False
+    if not a:
+        return True
+    centers = numpy.array([q.mean(axis=0) for (q, d) in b])
+    left = numpy.ones(len(b), bool)
+    for (p, c) in a:
+        near = left & numpy.all(abs(centers - p.mean(axis=0)) < 1e-4, axis=1)
+        for j in numpy.nonzero(near)[0]:
+            if _same_polygon(p, c, *b[j]):
+                left[j] = False
+                break
+        else:
+            return False
+    return True
+
+
+def _mesh(seed, uniform):
+    rng = numpy.random.default_rng(seed)
+    (ni, nj, nk) = (13, 17, 11)
+    if uniform:
+        m3 = slice3.mesh3(numpy.array([ni - 1, nj - 1, nk - 1], numpy.int32),
+                          numpy.array([2.0, 3.0, 1.5]),
+                          numpy.array([-1.0, -1.5, -0.7]))
+    else:
+        axes = [numpy.cumsum(0.5 + rng.random(n)) for n in (ni, nj, nk)]
+        (x, y, z) = numpy.meshgrid(*axes, indexing="ij")
+        m3 = slice3.mesh3(x, y, z)
+    (i, j, k) = numpy.meshgrid(numpy.arange(ni), numpy.arange(nj),
+                               numpy.arange(nk), indexing="ij")
+    c = rng.random(3) * [ni, nj, nk]
+    f = numpy.exp(-((i - c[0]) ** 2 + (j - c[1]) ** 2 + (k - c[2]) ** 2)
+                  / 20.0)
+    g = rng.standard_normal((ni, nj, nk))
+    m3[2] = [f, g, rng.standard_normal((ni - 1, nj - 1, nk - 1))]
+    return m3
+
+
+@pytest.fixture
+def settings():
+    names = ["_slice3_compiled", "_slice3_blocked", "_block3_cells",
+             "_block3_dense", "_slice3_threads", "_chunk3_limit",
+             "_slice3_cache_bytes"]
+    saved = [getattr(slice3, name) for name in names]
+    slice3.slice3_cache(0, clear=1)
+    yield
+    for (name, value) in zip(names, saved):
+        setattr(slice3, name, value)
+    slice3.slice3_cache(clear=1)
+
+
+COLORS = [((), {}), ((2,), {}), ((2, 1), {}), ((2,), {"node": 1}),
+          ((3,), {}), ((lambda m3, cells: numpy.ones(len(cells)), 1), {})]
+
+
+def test_chunk3_limit():
+    limit = slice3.chunk3_limit()
+    assert limit >= slice3._chunk3_min
+    # whole planes, or whole rows, of cells
+    assert slice3.chunk3_limit([400, 60, 50]) % 3000 == 0
+    assert 0 < limit - slice3.chunk3_limit([400, 60, 50]) < 3000
+    assert slice3.chunk3_limit([400, 6000, 50]) % 50 == 0
+    assert slice3.chunk3_limit([2, 3, 4]) % 12 == 0
+    assert 0 <= limit - slice3.chunk3_limit([2, 3, 4]) < 12
+
+
+def test_chunk3_limit_set(settings):
+    slice3._chunk3_limit = 200
+    assert slice3.chunk3_limit() == 200
+    assert slice3.chunk3_limit([400, 60, 50]) == 200
+
+
+@pytest.mark.parametrize("uniform", [0, 1])
+@pytest.mark.parametrize("color", range(len(COLORS)))
+def test_isosurface_threads_and_chunks_agree(settings, uniform, color):
+    m3 = _mesh(uniform, uniform)
+    (args, kw) = COLORS[color]
+    slice3._slice3_compiled = 0
+    expect = _polygons(slice3.slice3(m3, 1, None, None, *args, value=0.5,
+                                     **kw))
+    assert expect
+    for (threads, limit) in [(3, None), (1, 200), (2, 200), (0, 300)]:
+        slice3._chunk3_limit = limit
+        got = slice3.slice3(m3, 1, None, None, *args, value=0.5,
+                            threads=threads, **kw)
+        assert _same(_polygons(got), expect)
+    # threads keep the order of the chunks
+    slice3._chunk3_limit = 200
+    serial = slice3.slice3(m3, 1, None, None, *args, value=0.5, **kw)
+    threaded = slice3.slice3(m3, 1, None, None, *args, value=0.5,
+                             threads=3, **kw)
+    for (a, b) in zip(serial, threaded):
+        assert (a is None and b is None) or numpy.array_equal(a, b)
+    # the default number of threads
+    slice3._slice3_threads = 4
+    got = slice3.slice3(m3, 1, None, None, *args, value=0.5, **kw)
+    assert _same(_polygons(got), expect)
+
+
+@pytest.mark.parametrize("uniform", [0, 1])
+@pytest.mark.parametrize("color", range(len(COLORS)))
+def test_compiled_isosurface_agrees(settings, uniform, color):
+    m3 = _mesh(uniform + 6, uniform)
+    (args, kw) = COLORS[color]
+    for value in (0.5, 0.05):
+        slice3._slice3_compiled = 0
+        expect = _polygons(slice3.slice3(m3, 1, None, None, *args,
+                                         value=value, **kw))
+        assert expect
+        slice3._slice3_compiled = 1
+        got = slice3.slice3(m3, 1, None, None, *args, value=value, **kw)
+        assert _same(_polygons(got), expect)
+
+
+def test_compiled_isosurface_none(settings):
+    m3 = _mesh(8, 1)
+    for compiled in (0, 1):
+        slice3._slice3_compiled = compiled
+        assert slice3.slice3(m3, 1, None, None, value=10.0) is None
+
+
+def test_cache_is_opt_in_and_cleared(settings):
+    m3 = _mesh(4, 1)
+    f = m3[2][0]
+    first = slice3.slice3(m3, 1, None, None, 2, value=0.5)
+    assert first[1].flags.writeable
+    f *= 0.5
+    # off by default: a mesh changed in place is sliced anew
+    assert not _same(_polygons(slice3.slice3(m3, 1, None, None, 2,
+                                             value=0.5)), _polygons(first))
+    slice3.slice3_cache(1 << 24)
+    a = slice3.slice3(m3, 1, None, None, 2, value=0.3)
+    b = slice3.slice3(m3, 1, None, None, 2, value=0.3)
+    assert not a[1].flags.writeable and not b[1].flags.writeable
+    assert numpy.shares_memory(a[1], b[1])
+    assert slice3.slice3_cache()["hits"] == 1
+    # another path is another entry
+    slice3._slice3_compiled = 0
+    c = slice3.slice3(m3, 1, None, None, 2, value=0.3)
+    assert not numpy.shares_memory(a[1], c[1])
+    assert _same(_polygons(c), _polygons(a))
+    slice3._slice3_compiled = 1
+    # changed in place, then the cache cleared
+    f *= 2.0
+    slice3.slice3_cache(clear=1)
+    d = slice3.slice3(m3, 1, None, None, 2, value=0.3)
+    slice3.slice3_cache(0)
+    assert _same(_polygons(d), _polygons(slice3.slice3(m3, 1, None, None, 2,
+                                                       value=0.3)))
+    assert not _same(_polygons(d), _polygons(a))
+
+
+def test_cache_results_read_only_when_not_kept(settings):
+    m3 = _mesh(5, 1)
+    slice3.slice3_cache(16)
+    r = slice3.slice3(m3, 1, None, None, 2, value=0.5)
+    assert not r[1].flags.writeable
+    assert slice3.slice3_cache()["entries"] == 0
+    r = slice3.slice3(m3, 1, None, None, lambda m3, cells:
+                      numpy.ones(len(cells)), 1, value=0.5)
+    assert not r[1].flags.writeable
+
+
+def test_cache_evicts_least_recently_used(settings):
+    m3 = _mesh(9, 1)
+    slice3.slice3_cache(1 << 24)
+    results = [slice3.slice3(m3, 1, None, None, 2, value=v)
+               for v in (0.2, 0.3, 0.4)]
+    stats = slice3.slice3_cache()
+    assert (stats["misses"], stats["entries"]) == (3, 3)
+    sizes = [sum(x.nbytes for x in r) for r in results]
+    assert stats["bytes"] == sum(sizes)
+    # 0.2 used again, so 0.3 is the first to go
+    slice3.slice3(m3, 1, None, None, 2, value=0.2)
+    stats = slice3.slice3_cache(sizes[0] + sizes[2])
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    slice3.slice3(m3, 1, None, None, 2, value=0.2)
+    slice3.slice3(m3, 1, None, None, 2, value=0.4)
+    assert slice3.slice3_cache()["hits"] == 3
+    slice3.slice3(m3, 1, None, None, 2, value=0.3)
+    assert slice3.slice3_cache()["misses"] == 4
+
+
+def test_cache_forgets_deleted_arrays(settings):
+    m3 = _mesh(10, 1)
+    slice3.slice3_cache(1 << 24)
+    slice3.slice3(m3, 1, None, None, 2, value=0.5)
+    assert slice3.slice3_cache()["entries"] == 1
+    del m3
+    stats = slice3.slice3_cache()
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_cache_slice3mesh(settings):
+    (x, y) = numpy.meshgrid(numpy.linspace(0, 1, 20),
+                            numpy.linspace(0, 2, 30), indexing="ij")
+    z = numpy.sin(3 * x) * numpy.cos(2 * y)
+    slice3.slice3_cache(1 << 24)
+    a = slice3.slice3mesh(x, y, z)
+    b = slice3.slice3mesh(x, y, z)
+    assert slice3.slice3_cache()["hits"] == 1
+    assert numpy.shares_memory(a[1], b[1])
+    slice3.slice3_cache(0)
+    c = slice3.slice3mesh(x, y, z)
+    assert c[1].flags.writeable and numpy.array_equal(a[1], c[1])
+
+
+def test_block3_matches_blocks():
+    rng = numpy.random.default_rng(11)
+    f = rng.standard_normal((14, 9, 21))
+    f[3, 4, 5] = numpy.nan
+    [fmin, fmax] = slice3.block3(f, 4)
+    assert fmin.shape == fmax.shape == (4, 2, 5)
+    for (bi, bj, bk) in numpy.ndindex(fmin.shape):
+        # a block has the vertices of its cells, the last one smaller
+        b = f[4 * bi:4 * bi + 5, 4 * bj:4 * bj + 5, 4 * bk:4 * bk + 5]
+        assert fmin[bi, bj, bk] == numpy.nanmin(b)
+        assert numpy.array_equal(fmax[bi, bj, bk], numpy.max(b),
+                                 equal_nan=True)
+    assert numpy.isnan(fmax[0, 1, 1]) and numpy.isnan(fmax[0, 0, 1])
+    assert not numpy.isnan(fmin).any()
+
+
+def test_block3_kept_until_cleared(settings):
+    f = numpy.random.default_rng(12).random((9, 9, 9))
+    a = slice3.block3(f, 4)
+    assert slice3.block3(f, 4) is a
+    assert slice3.block3(f, 3) is not a
+    slice3.slice3_cache(clear=1)
+    assert slice3.block3(f, 4) is not a
+
+
+@pytest.mark.parametrize("uniform", [0, 1])
+@pytest.mark.parametrize("color", range(len(COLORS)))
+def test_blocked_isosurface_agrees(settings, uniform, color):
+    m3 = _mesh(uniform + 13, uniform)
+    (args, kw) = COLORS[color]
+    slice3._slice3_compiled = 0
+    expect = _polygons(slice3.slice3(m3, 1, None, None, *args, value=0.5,
+                                     **kw))
+    assert expect
+    slice3._slice3_blocked = 1
+    slice3._block3_dense = 1.0
+    for (compiled, cells, threads, limit) in [
+            (1, 4, 1, None), (1, 5, 2, None), (0, 3, 2, 300),
+            (0, 4, 1, None)]:
+        slice3._slice3_compiled = compiled
+        slice3._block3_cells = cells
+        slice3._chunk3_limit = limit
+        got = slice3.slice3(m3, 1, None, None, *args, value=0.5,
+                            threads=threads, **kw)
+        assert _same(_polygons(got), expect)
+
+
+def test_blocked_only_when_few_blocks_cross(settings):
+    m3 = _mesh(15, 1)
+    f = m3[2][0]
+    value = numpy.float64(0.5)
+    assert slice3._block3_boxes(m3, 1, value) is None
+    slice3._slice3_blocked = 1
+    slice3._block3_cells = 4
+    slice3._block3_dense = 1.0
+    boxes = slice3._block3_boxes(m3, 1, value)
+    assert boxes
+    # every cell the isosurface crosses is in a box
+    inside = numpy.zeros(f.shape, bool)[:-1, :-1, :-1]
+    for [first, last] in boxes:
+        inside[first[0] - 1:last[0], first[1] - 1:last[1],
+               first[2] - 1:last[2]] = True
+    cells = numpy.lib.stride_tricks.sliding_window_view(f, (2, 2, 2))
+    crossed = (cells.min(axis=(3, 4, 5)) < value) & \
+        ~(cells.max(axis=(3, 4, 5)) < value)
+    assert not (crossed & ~inside).any()
+    assert inside.sum() < inside.size
+    slice3._block3_dense = 0.0
+    assert slice3._block3_boxes(m3, 1, value) is None
+
+
+@pytest.mark.parametrize("uniform", [0, 1])
+@pytest.mark.parametrize("plane", [[0, 0, 1, 0.4], [1, 0, 0, 2.5],
+                                   [1, 1, 0, 3.0]])
+def test_plane_paths_agree(settings, uniform, plane):
+    m3 = _mesh(uniform + 2, uniform)
+    slice3._slice3_compiled = 0
+    expect = _polygons(slice3.slice3(m3, plane, None, None, 2))
+    slice3._slice3_compiled = 1
+    assert _same(_polygons(slice3.slice3(m3, plane, None, None, 2)), expect)
+
+
+def test_plane_sees_coordinates_changed_in_place(settings):
+    m3 = _mesh(17, 0)
+    xyz = m3[1][1]
+    plane = [1, 0, 0, 2.5]
+    first = _polygons(slice3.slice3(m3, plane, None, None, 2))
+    for change in range(2):
+        if change:
+            # x no longer depends on the first index only
+            xyz[0, :, 3] += 0.2
+        else:
+            xyz[0] += 0.3
+        slice3._slice3_compiled = 0
+        expect = _polygons(slice3.slice3(m3, plane, None, None, 2))
+        assert expect and not _same(expect, first)
+        slice3._slice3_compiled = 1
+        assert _same(_polygons(slice3.slice3(m3, plane, None, None, 2)),
+                     expect)
+        first = expect
+
+
+@pytest.mark.parametrize("compiled", [0, 1])
+@pytest.mark.parametrize("plane", [[0, 0, 1, 3.0], [1, 1, 0, 3.0]])
+def test_plane_slicer_sees_coordinates_changed_in_place(settings, compiled,
+                                                        plane):
+    m3 = _mesh(18, 0)
+    xyz = m3[1][1]
+    slice3._slice3_compiled = compiled
+    slice3._chunk3_limit = 300
+    first = _polygons(slice3.slice3(m3, plane, None, None, 2))
+    xyz[2] *= 1.5
+    xyz[0, 4] += 0.25
+    fresh = slice3.mesh3(*xyz.copy())
+    fresh[2] = m3[2]
+    expect = _polygons(slice3.slice3(fresh, plane, None, None, 2))
+    assert expect and not _same(expect, first)
+    assert _same(_polygons(slice3.slice3(m3, plane, None, None, 2)), expect)
+
+
+def test_plane_slicer_axis_vectors(settings):
+    # mesh3 of three vectors gives xyz3_unif coordinates, which
+    # _plane_slicer takes as axes without making a full array
+    rng = numpy.random.default_rng(19)
+    axes = [numpy.cumsum(0.5 + rng.random(n)) for n in (13, 17, 11)]
+    m3 = slice3.mesh3(*axes)
+    assert m3[0][0] == slice3.xyz3_unif
+    full = slice3.mesh3(*numpy.meshgrid(*axes, indexing="ij"))
+    m3[2] = full[2] = _mesh(19, 0)[2]
+    slice3._slice3_compiled = 0
+    for plane in ([1, 0, 0, 4.0], [1, 2, -1, 6.0]):
+        expect = _polygons(slice3.slice3(full, plane, None, None, 2))
+        assert expect
+        assert _same(_polygons(slice3.slice3(m3, plane, None, None, 2)),
+                     expect)